@@ -0,0 +1,77 @@
+"""
+FastAPI routes for operator-only endpoints.
+
+Every route requires `Authorization: Bearer <ADMIN_TOKEN>`. When no token is
+configured the routes answer 404, so the endpoints do not exist unless an
+operator opts in.
+"""
+import hmac
+import logging
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from ..services.profiler import MIN_INTERVAL_SECONDS, ProcessProfiler, ProfilerBusyError
+
+logger = logging.getLogger(__name__)
+
+
+def require_admin(request: Request) -> None:
+    """
+    Check the admin bearer token.
+
+    Raises:
+        HTTPException: 404 if admin routes are disabled, 401 if the token is missing or wrong
+    """
+    token = request.app.state.settings.admin_token
+    if not token:
+        raise HTTPException(status_code=404)
+    scheme, _, supplied = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(supplied.encode(), token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+def get_profiler(request: Request) -> ProcessProfiler:
+    """Return the current worker's profiler."""
+    return request.app.state.profiler
+
+
+@router.post("/profile")
+async def profile(
+    seconds: float = Query(10.0, gt=0),
+    mode: Literal["sampling", "deterministic"] = "sampling",
+    interval_ms: float = Query(10.0, ge=MIN_INTERVAL_SECONDS * 1000),
+    profiler: ProcessProfiler = Depends(get_profiler),
+) -> Response:
+    """
+    Profile this worker process for a bounded time.
+
+    Only the worker that receives the request is profiled. Durations above
+    the configured maximum are clamped, and a second concurrent request gets 409.
+
+    Returns:
+        Collapsed stacks (sampling) or a pstats dump (deterministic)
+    """
+    logger.warning("Admin profile started", extra={"mode": mode, "seconds": seconds})
+    try:
+        if mode == "sampling":
+            collapsed = await profiler.sample(seconds, interval_ms / 1000)
+            return Response(
+                collapsed,
+                media_type="text/plain",
+                headers={"Content-Disposition": 'attachment; filename="profile.collapsed"'},
+            )
+        stats = await profiler.trace(seconds)
+        return Response(
+            stats,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": 'attachment; filename="profile.pstats"'},
+        )
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    except RuntimeError as e:
+        # Sampling needs SIGPROF on the main thread; embedded servers may run the loop elsewhere
+        raise HTTPException(status_code=503, detail=str(e)) from e
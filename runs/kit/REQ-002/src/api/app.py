@@ -0,0 +1,178 @@
+"""
+FastAPI application factory.
+
+Creates the app with per-process resources: the Kafka producer, the
+DatabaseManager engine, the order pipeline and the handlers are built in the
+lifespan startup, i.e. after the worker process has been forked or spawned,
+so no socket or connection pool is ever shared between workers. On shutdown
+the server first drains in-flight requests, then the order pipeline finishes
+acknowledged interactions, the producer is flushed and stopped and the
+connection pool disposed. A startup that fails part-way releases whatever it
+had already created.
+"""
+import logging
+import os
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from functools import partial
+from typing import AsyncIterator, Callable
+
+from fastapi import FastAPI, Request, Response
+
+from storage.database import DatabaseManager, to_async_url
+from storage.order_writer import OrderWriter
+
+from ..config.logging_config import correlation_scope
+from ..config.secrets import CachedSecret, create_secret_provider
+from ..config.settings import Settings
+from ..handlers.coffee_command import create_coffee_command_handler
+from ..handlers.interactions import create_interactions_handler
+from ..services.admission import AdmissionController
+from ..services.kafka_producer import KafkaProducer, create_kafka_producer
+from ..services.order_pipeline import OrderPipeline
+from ..services.profiler import MAX_DETERMINISTIC_SECONDS, ProcessProfiler
+from ..services.stage_timing import StageTimer, route_label, stage_timer_var
+from ..services.user_directory import UserDirectory, UserDirectoryFeed, create_user_directory_consumer
+from .admin_routes import router as admin_router
+from .audit_routes import router as audit_router
+from .export_routes import router as export_router
+from .run_routes import router as run_router
+from .slack_routes import router as slack_router
+
+logger = logging.getLogger(__name__)
+
+ProducerFactory = Callable[[str], KafkaProducer]
+DatabaseFactory = Callable[..., DatabaseManager]
+
+
+def create_app(
+    settings: Settings | None = None,
+    producer_factory: ProducerFactory | None = None,
+    database_factory: DatabaseFactory = DatabaseManager,
+) -> FastAPI:
+    """
+    Create the CoffeeBuddy FastAPI application.
+
+    Usable as a uvicorn/gunicorn app factory; nothing is connected until the
+    lifespan starts inside a worker process.
+
+    Args:
+        settings: Application settings (default: loaded from environment)
+        producer_factory: Builds the worker's Kafka producer from the broker list
+            (default: create_kafka_producer with the settings' spill journal options)
+        database_factory: Builds the worker's DatabaseManager
+
+    Returns:
+        Configured FastAPI application
+    """
+    settings = settings or Settings()
+    producer_factory = producer_factory or partial(
+        create_kafka_producer,
+        spill_dir=settings.spill_journal_dir or None,
+        spill_max_bytes=settings.spill_journal_max_mb * 1024 * 1024,
+        spill_segment_bytes=settings.spill_segment_mb * 1024 * 1024,
+        spill_after=settings.spill_after_ms / 1000,
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        # Each resource's cleanup is registered as soon as it exists, so a failed startup
+        # releases whatever was already acquired. On shutdown (in-flight requests have drained
+        # by then) the stack unwinds in reverse: finish acknowledged interactions, flush
+        # pending events, then close the pool.
+        async with AsyncExitStack() as stack:
+            pool_size, max_overflow = settings.worker_pool_limits()
+            db_manager = database_factory(
+                to_async_url(settings.database_url), pool_size=pool_size, max_overflow=max_overflow
+            )
+            stack.push_async_callback(db_manager.close)
+            secret_provider = create_secret_provider(settings)
+            stack.push_async_callback(secret_provider.close)
+            signing_secret = CachedSecret(secret_provider, "slack_signing_secret", ttl=settings.secret_ttl_seconds)
+            await signing_secret.start()
+            stack.push_async_callback(signing_secret.stop)
+            kafka_producer = producer_factory(settings.kafka_brokers)
+            await kafka_producer.start()
+            stack.push_async_callback(kafka_producer.stop)
+            user_directory = None
+            if settings.user_directory_enabled:
+                user_directory = UserDirectory()
+                await user_directory.backfill(db_manager.session)
+                directory_feed = UserDirectoryFeed(
+                    user_directory, create_user_directory_consumer(settings.kafka_brokers)
+                )
+                stack.push_async_callback(directory_feed.stop)
+                await directory_feed.start(timeout=settings.user_directory_startup_seconds)
+            order_writer = OrderWriter(
+                db_manager.session,
+                max_batch=settings.order_batch_max,
+                max_delay=settings.order_batch_delay_ms / 1000,
+            )
+            stack.push_async_callback(order_writer.close)
+            pipeline = OrderPipeline(
+                db_manager.session,
+                order_writer,
+                kafka_producer,
+                queue_size=settings.interaction_queue_size,
+                workers=settings.interaction_workers,
+                user_directory=user_directory,
+            )
+            await pipeline.start()
+            stack.push_async_callback(pipeline.stop, timeout=settings.graceful_shutdown_timeout)
+
+            app.state.db_manager = db_manager
+            app.state.kafka_producer = kafka_producer
+            app.state.order_pipeline = pipeline
+            app.state.user_directory = user_directory
+            app.state.coffee_handler = create_coffee_command_handler(signing_secret, kafka_producer)
+            app.state.interactions_handler = create_interactions_handler(signing_secret, pipeline)
+            logger.info(
+                "Worker started",
+                extra={"pid": os.getpid(), "pool_size": pool_size, "max_overflow": max_overflow},
+            )
+            yield
+        logger.info("Worker stopped", extra={"pid": os.getpid()})
+
+    app = FastAPI(title="CoffeeBuddy", lifespan=lifespan)
+    app.state.settings = settings
+    app.state.profiler = ProcessProfiler(
+        max_sampling_seconds=settings.profiler_max_seconds,
+        max_deterministic_seconds=min(settings.profiler_max_seconds, MAX_DETERMINISTIC_SECONDS),
+    )
+    app.state.admission = AdmissionController(
+        max_in_flight=settings.admission_max_in_flight,
+        command_share=settings.admission_command_share,
+        latency_target=settings.admission_latency_target_ms / 1000,
+        deadline=settings.admission_deadline_ms / 1000,
+    )
+    app.include_router(slack_router)
+    app.include_router(run_router)
+    app.include_router(audit_router)
+    app.include_router(export_router)
+    app.include_router(admin_router)
+
+    if settings.stage_timing_enabled:
+
+        @app.middleware("http")
+        async def time_stages(request: Request, call_next: Callable) -> Response:
+            # Only added when enabled; otherwise handlers see the no-op timer and nothing is recorded
+            # Routing stores the matched route in the shared scope before any handler stage runs
+            timer = StageTimer(partial(route_label, request.scope))
+            token = stage_timer_var.set(timer)
+            started = time.perf_counter()
+            try:
+                response = await call_next(request)
+            finally:
+                stage_timer_var.reset(token)
+            stages = timer.server_timing()
+            total = f"total;dur={(time.perf_counter() - started) * 1000:.2f}"
+            response.headers["Server-Timing"] = f"{stages}, {total}" if stages else total
+            return response
+
+    @app.middleware("http")
+    async def bind_correlation_id(request: Request, call_next: Callable) -> Response:
+        # Handlers, the Kafka producer and log records all read the id from this contextvar
+        with correlation_scope(request.headers.get("X-Correlation-ID")):
+            return await call_next(request)
+
+    return app
@@ -0,0 +1,78 @@
+"""
+FastAPI routes for compliance audit queries.
+
+Audit entries can hold personal data, so the route requires the admin bearer
+token (see admin_routes). Queries are bounded by storage.audit_queries: at
+most 90 days per request, keyset pagination and a statement timeout.
+"""
+import logging
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from storage.audit_queries import MAX_PAGE_SIZE, AuditFilter, parse_payload_filters, query_audit_logs
+from storage.database import DatabaseManager
+from storage.read_models import AuditRow
+
+from .admin_routes import require_admin
+from .run_routes import get_db_manager
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1", tags=["audit"], dependencies=[Depends(require_admin)])
+
+
+def serialize_audit_row(row: AuditRow) -> dict[str, Any]:
+    """Render an audit entry as JSON-ready data."""
+    return {
+        "log_id": str(row.log_id),
+        "event_type": row.event_type,
+        "user_id": row.user_id,
+        "run_id": str(row.run_id) if row.run_id else None,
+        "payload": row.payload,
+        "timestamp": row.timestamp.isoformat(),
+    }
+
+
+@router.get("/audit")
+async def get_audit_logs(
+    event_type: list[str] = Query(default=[]),
+    user_id: str | None = None,
+    run_id: UUID | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    payload: list[str] = Query(default=[]),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db_manager: DatabaseManager = Depends(get_db_manager),
+) -> dict:
+    """
+    Query audit entries, newest first.
+
+    `event_type` and `payload` may repeat; payload filters are `key=value`
+    (dotted keys for nested objects) and match by JSONB containment. The
+    range defaults to the last 7 days and may span at most 90.
+
+    Returns:
+        The matching entries and the cursor for the next page (null on the last page)
+
+    Raises:
+        HTTPException: 400 on an invalid range, payload filter or cursor
+    """
+    try:
+        filters = AuditFilter(
+            event_types=event_type,
+            user_id=user_id,
+            run_id=run_id,
+            start=start,
+            end=end,
+            payload=parse_payload_filters(payload),
+        )
+        async with db_manager.session() as session:
+            page = await query_audit_logs(session, filters, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    logger.info("Audit query served", extra={"rows": len(page.items), "paged": cursor is not None})
+    return {"items": [serialize_audit_row(row) for row in page.items], "next_cursor": page.next_cursor}
@@ -0,0 +1,144 @@
+"""
+FastAPI routes for bulk exports of audit logs and run history.
+
+Exports stream from a server-side cursor straight into the response, one
+batch at a time, so memory stays flat however many rows match (see
+storage.export). Rows come oldest first; to resume a broken download, pass
+the timestamp (`created_at` for runs) and id of the last complete line as
+`after_timestamp`/`after_id` and append the response to what you have.
+Like the audit query API, exports require the admin token.
+"""
+import logging
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from typing import Literal
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import ColumnElement
+
+from storage.audit_queries import AuditFilter, parse_payload_filters
+from storage.database import DatabaseManager
+from storage.export import (
+    AUDIT_SOURCE,
+    DEFAULT_BATCH_SIZE,
+    MEDIA_TYPES,
+    RUNS_SOURCE,
+    ExportSource,
+    Position,
+    audit_clauses,
+    export_stream,
+    run_clauses,
+)
+
+from .admin_routes import require_admin
+from .run_routes import get_db_manager
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1/export", tags=["export"], dependencies=[Depends(require_admin)])
+
+ExportFormat = Literal["ndjson", "csv"]
+
+
+def resume_position(after_timestamp: datetime | None, after_id: UUID | None) -> Position | None:
+    """
+    Combine the resume parameters.
+
+    Raises:
+        HTTPException: 400 if only one of them is given
+    """
+    if (after_timestamp is None) != (after_id is None):
+        raise HTTPException(status_code=400, detail="after_timestamp and after_id must be given together")
+    return (after_timestamp, after_id) if after_timestamp is not None else None
+
+
+def stream_export(
+    db_manager: DatabaseManager,
+    source: ExportSource,
+    fmt: ExportFormat,
+    clauses: Sequence[ColumnElement[bool]],
+    after: Position | None,
+    compress: bool,
+) -> StreamingResponse:
+    """Build a streaming response whose body reads the export in its own session."""
+
+    async def body() -> AsyncIterator[bytes]:
+        rows_sent = False
+        try:
+            async with db_manager.session() as session:
+                async for chunk in export_stream(session, source, fmt, clauses, after, compress, DEFAULT_BATCH_SIZE):
+                    rows_sent = True
+                    yield chunk
+        except Exception:
+            # Headers are already sent; the client sees a truncated body and resumes from its last line
+            logger.exception("Export aborted", extra={"source": source.name, "started": rows_sent})
+            raise
+        logger.info("Export finished", extra={"source": source.name, "format": fmt, "resumed": after is not None})
+
+    filename = f"{source.name}.{fmt}" + (".gz" if compress else "")
+    return StreamingResponse(
+        body(),
+        media_type="application/gzip" if compress else MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/audit")
+async def export_audit_logs(
+    format: ExportFormat = "ndjson",
+    gzip: bool = False,
+    event_type: list[str] = Query(default=[]),
+    user_id: str | None = None,
+    run_id: UUID | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    payload: list[str] = Query(default=[]),
+    after_timestamp: datetime | None = None,
+    after_id: UUID | None = None,
+    db_manager: DatabaseManager = Depends(get_db_manager),
+) -> StreamingResponse:
+    """
+    Stream audit log entries as NDJSON or CSV.
+
+    Filters match GET /api/v1/audit, except that the time range is optional
+    and unbounded.
+
+    Raises:
+        HTTPException: 400 on an invalid payload filter or resume position
+    """
+    try:
+        filters = AuditFilter(
+            event_types=event_type,
+            user_id=user_id,
+            run_id=run_id,
+            start=start,
+            end=end,
+            payload=parse_payload_filters(payload),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    after = resume_position(after_timestamp, after_id)
+    return stream_export(db_manager, AUDIT_SOURCE, format, audit_clauses(filters), after, gzip)
+
+
+@router.get("/runs")
+async def export_run_history(
+    workspace_id: str,
+    format: ExportFormat = "ndjson",
+    gzip: bool = False,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    after_timestamp: datetime | None = None,
+    after_id: UUID | None = None,
+    db_manager: DatabaseManager = Depends(get_db_manager),
+) -> StreamingResponse:
+    """
+    Stream a workspace's run history with order counts as NDJSON or CSV.
+
+    Raises:
+        HTTPException: 400 on an invalid resume position
+    """
+    after = resume_position(after_timestamp, after_id)
+    return stream_export(db_manager, RUNS_SOURCE, format, run_clauses(workspace_id, start, end), after, gzip)
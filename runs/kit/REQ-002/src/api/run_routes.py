@@ -0,0 +1,99 @@
+"""
+FastAPI routes for reading coffee runs.
+
+Read-only endpoints use storage.read_models: column projections into
+NamedTuples, with no ORM entity hydration and a fixed number of queries per
+request no matter how many orders a run has. With the user directory
+enabled, display names come from it instead of joins on `users`.
+"""
+import logging
+from typing import Any
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from storage.database import DatabaseManager
+from storage.read_models import RunDetails, get_run_details
+
+from ..services.user_directory import UserDirectory
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1", tags=["runs"])
+
+
+def get_db_manager(request: Request) -> DatabaseManager:
+    """Return the current worker's DatabaseManager."""
+    return request.app.state.db_manager
+
+
+def get_user_directory(request: Request) -> UserDirectory | None:
+    """Return the current worker's user directory, or None when it is disabled."""
+    return request.app.state.user_directory
+
+
+def serialize_run(details: RunDetails, directory: UserDirectory | None = None) -> dict[str, Any]:
+    """
+    Render run details as JSON-ready data.
+
+    Args:
+        details: Run and orders, loaded without names when a directory is given
+        directory: Resolves all display names in one lookup; users it does not
+            know yet are shown by their user ID
+    """
+    run = details.run
+    if directory is not None:
+        people = [run.initiator_user_id, *([run.runner_user_id] if run.runner_user_id else [])]
+        names = directory.get_many([*people, *(order.user_id for order in details.orders)])
+        run = run._replace(
+            initiator_name=names.get(run.initiator_user_id, run.initiator_user_id),
+            runner_name=names.get(run.runner_user_id, run.runner_user_id) if run.runner_user_id else None,
+        )
+        details = RunDetails(
+            run=run,
+            orders=[order._replace(display_name=names.get(order.user_id, order.user_id)) for order in details.orders],
+        )
+    return {
+        "run_id": str(run.run_id),
+        "workspace_id": run.workspace_id,
+        "channel_id": run.channel_id,
+        "status": run.status,
+        "created_at": run.created_at.isoformat(),
+        "completed_at": run.completed_at.isoformat() if run.completed_at else None,
+        "initiator": {"user_id": run.initiator_user_id, "display_name": run.initiator_name},
+        "runner": {"user_id": run.runner_user_id, "display_name": run.runner_name} if run.runner_user_id else None,
+        "orders": [
+            {
+                "order_id": str(order.order_id),
+                "user_id": order.user_id,
+                "display_name": order.display_name,
+                "drink_type": order.drink_type,
+                "size": order.size,
+                "customizations": order.customizations,
+                "created_at": order.created_at.isoformat(),
+            }
+            for order in details.orders
+        ],
+    }
+
+
+@router.get("/runs/{run_id}")
+async def get_run(
+    run_id: UUID,
+    db_manager: DatabaseManager = Depends(get_db_manager),
+    directory: UserDirectory | None = Depends(get_user_directory),
+) -> dict:
+    """
+    Fetch run details and orders.
+
+    Returns:
+        The run with its initiator, runner and orders
+
+    Raises:
+        HTTPException: 404 if the run does not exist
+    """
+    async with db_manager.session() as session:
+        details = await get_run_details(session, run_id, with_names=directory is None)
+    if details is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return serialize_run(details, directory)
@@ -1,38 +1,82 @@
 """
-FastAPI routes for Slack slash commands.
+FastAPI routes for Slack slash commands and interactions.
 
-Wires up the /coffee command handler with dependency injection.
+Wires up the /coffee command and interactions handlers with dependency
+injection. The handlers, their Kafka producer and the order pipeline are
+created per worker process by the application lifespan (see api.app) and
+read from app.state, never at import time.
+
+Both routes sit behind the worker's AdmissionController: under overload a
+/coffee command gets an immediate ephemeral "busy" reply, and an
+interaction gets a 503 (Slack shows the user an error to retry), rather
+than every request missing Slack's 3-second deadline.
 """
 import logging
-import os
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 
-from ..handlers.coffee_command import CoffeeCommandHandler, create_coffee_command_handler
-from ..services.kafka_producer import create_kafka_producer
+from ..handlers.coffee_command import CoffeeCommandHandler
+from ..handlers.interactions import BUSY_MESSAGE, InteractionsHandler
+from ..services.admission import COMMAND, INTERACTION, AdmissionController
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/slack", tags=["slack"])
 
-# Initialize dependencies from environment
-SLACK_SIGNING_SECRET = os.getenv("SLACK_SIGNING_SECRET", "")
-KAFKA_BROKERS = os.getenv("KAFKA_BROKERS", "localhost:9092")
 
-# Create handler instance (singleton pattern for this module)
-_kafka_producer = create_kafka_producer(KAFKA_BROKERS)
-_coffee_handler = create_coffee_command_handler(SLACK_SIGNING_SECRET, _kafka_producer)
+def get_coffee_handler(request: Request) -> CoffeeCommandHandler:
+    """Return the current worker's /coffee handler."""
+    return request.app.state.coffee_handler
+
+
+def get_interactions_handler(request: Request) -> InteractionsHandler:
+    """Return the current worker's interactions handler."""
+    return request.app.state.interactions_handler
+
+
+def get_admission(request: Request) -> AdmissionController:
+    """Return the current worker's admission controller."""
+    return request.app.state.admission
 
 
 @router.post("/commands/coffee")
-async def coffee_command(request: Request) -> dict:
+async def coffee_command(
+    request: Request,
+    handler: CoffeeCommandHandler = Depends(get_coffee_handler),
+    admission: AdmissionController = Depends(get_admission),
+) -> dict:
     """
     Handle /coffee slash command.
 
     Returns:
-        Slack modal view response
+        Slack modal view response, or an ephemeral busy message when shed
     """
-    return await _coffee_handler.handle(request)
-```
+    ticket = admission.admit(COMMAND)
+    if ticket is None:
+        logger.warning("Shedding /coffee command", extra={"in_flight": admission.total_in_flight})
+        return {"response_type": "ephemeral", "text": BUSY_MESSAGE}
+    with ticket:
+        return await handler.handle(request)
+
 
-```markdown
\ No newline at end of file
+@router.post("/interactions")
+async def interactions(
+    request: Request,
+    handler: InteractionsHandler = Depends(get_interactions_handler),
+    admission: AdmissionController = Depends(get_admission),
+) -> dict:
+    """
+    Handle modal submissions and button presses.
+
+    Returns:
+        Immediate acknowledgement; persistence happens in the background
+
+    Raises:
+        HTTPException: 503 when shed
+    """
+    ticket = admission.admit(INTERACTION)
+    if ticket is None:
+        logger.warning("Shedding interaction", extra={"in_flight": admission.total_in_flight})
+        raise HTTPException(status_code=503, detail=BUSY_MESSAGE)
+    with ticket:
+        return await handler.handle(request)
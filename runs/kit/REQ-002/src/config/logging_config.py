@@ -0,0 +1,284 @@
+"""
+Structured, non-blocking logging.
+
+Records are handed from the event loop to a bounded in-memory queue and
+written as JSON lines by a background QueueListener thread, so stdout or
+Fluentd backpressure never stalls request handling. When the queue is full
+records are dropped rather than waiting, and the drop count is reported both
+as a Prometheus counter and as a log line once the queue drains. The
+correlation_id of the current request or event travels in a contextvar, and
+high-volume lines can be sampled per level or per logger.
+"""
+import atexit
+import json
+import logging
+import logging.config
+import queue
+import random
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Iterator, TextIO
+
+from prometheus_client import Counter
+
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+LOG_RECORDS_SAMPLED_OUT = Counter("log_records_sampled_out_total", "Log records skipped by sampling", ["level"])
+
+correlation_id_var: ContextVar[str | None] = ContextVar("correlation_id", default=None)
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_RESERVED_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None)).keys() | {"message", "asctime", "correlation_id"}
+)
+
+
+def get_correlation_id() -> str | None:
+    """Return the correlation_id of the current request or event, if any."""
+    return correlation_id_var.get()
+
+
+@contextmanager
+def correlation_scope(correlation_id: str | None) -> Iterator[None]:
+    """
+    Bind a correlation_id for the duration of a block.
+
+    Contextvars are copied into tasks created inside the block, so the id
+    follows the request into everything it awaits or spawns.
+
+    Usage:
+        with correlation_scope(headers.get("correlation_id")):
+            await handler(...)
+    """
+    token = correlation_id_var.set(correlation_id)
+    try:
+        yield
+    finally:
+        correlation_id_var.reset(token)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects including extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Format a record as JSON.
+
+        Args:
+            record: Log record; attributes passed via extra={...} become top-level keys
+
+        Returns:
+            JSON string without trailing newline
+        """
+        entry: dict[str, Any] = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        correlation_id = getattr(record, "correlation_id", None)
+        if correlation_id:
+            entry["correlation_id"] = correlation_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class CorrelationFilter(logging.Filter):
+    """Stamps records with the correlation_id from the calling context."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Attach correlation_id; must run in the logging thread, not the listener."""
+        if not hasattr(record, "correlation_id"):
+            record.correlation_id = correlation_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of records for noisy levels or loggers."""
+
+    def __init__(self, level_rates: dict[str, float] | None = None, logger_rates: dict[str, float] | None = None):
+        """
+        Initialize sampling filter.
+
+        Args:
+            level_rates: Fraction of records kept per level name (e.g. {"DEBUG": 0.1})
+            logger_rates: Fraction kept per logger name prefix (e.g. {"aiokafka": 0.05});
+                takes precedence over level_rates. WARNING and above are never sampled.
+        """
+        super().__init__()
+        self.level_rates = {level.upper(): rate for level, rate in (level_rates or {}).items()}
+        self.logger_rates = sorted((logger_rates or {}).items(), key=lambda item: -len(item[0]))
+
+    def _rate(self, record: logging.LogRecord) -> float:
+        for prefix, rate in self.logger_rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return rate
+        return self.level_rates.get(record.levelname, 1.0)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Return False for records that are sampled out."""
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        LOG_RECORDS_SAMPLED_OUT.labels(level=record.levelname).inc()
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: records are dropped and counted when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        """
+        Initialize handler.
+
+        Args:
+            log_queue: Bounded queue drained by a QueueListener
+        """
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Make a record safe to hand to another thread, leaving formatting to the listener.
+
+        Only the message is merged with its args (they may be mutated after
+        the call); JSON formatting and traceback rendering happen off-loop.
+        """
+        prepared = logging.makeLogRecord(record.__dict__)
+        prepared.msg = record.getMessage()
+        prepared.args = None
+        return prepared
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Put a record on the queue without waiting."""
+        try:
+            if self._unreported:
+                self.queue.put_nowait(self._drop_report())
+                self._unreported = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+            LOG_RECORDS_DROPPED.inc()
+
+    def _drop_report(self) -> logging.LogRecord:
+        record = logging.makeLogRecord(
+            {
+                "name": __name__,
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": f"Dropped {self._unreported} log record(s): log queue full",
+                "dropped": self._unreported,
+                "dropped_total": self.dropped,
+            }
+        )
+        return record
+
+
+def create_queue_handler(
+    queue_size: int = 10000,
+    level_rates: dict[str, float] | None = None,
+    logger_rates: dict[str, float] | None = None,
+    stream: TextIO | None = None,
+) -> DroppingQueueHandler:
+    """
+    Factory function to create the queue handler and start its JSON listener thread.
+
+    Usable as a logging.config.dictConfig handler factory ("()" key), which is
+    how uvicorn configures logging inside each worker process.
+
+    Args:
+        queue_size: Maximum records buffered before new ones are dropped
+        level_rates: Sampling rates per level (see SamplingFilter)
+        logger_rates: Sampling rates per logger prefix (see SamplingFilter)
+        stream: Output stream (default: stdout)
+
+    Returns:
+        DroppingQueueHandler feeding a started QueueListener
+    """
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(level_rates, logger_rates))
+    handler.addFilter(CorrelationFilter())
+    handler.listener = QueueListener(log_queue, output, respect_handler_level=False)
+    handler.listener.start()
+    atexit.register(_stop_listener, handler.listener)
+    return handler
+
+
+def _stop_listener(listener: QueueListener) -> None:
+    # Flushes queued records; QueueListener.stop() fails if it was already stopped
+    if listener._thread is not None:
+        listener.stop()
+
+
+def parse_sample_rates(spec: str) -> tuple[dict[str, float], dict[str, float]]:
+    """
+    Parse a sampling spec such as "DEBUG=0.1,aiokafka=0.05".
+
+    Args:
+        spec: Comma-separated name=rate pairs; level names set level rates,
+            anything else is a logger prefix
+
+    Returns:
+        (level_rates, logger_rates)
+    """
+    level_rates: dict[str, float] = {}
+    logger_rates: dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        name = name.strip()
+        target = level_rates if name.upper() in logging.getLevelNamesMapping() else logger_rates
+        target[name.upper() if target is level_rates else name] = float(rate)
+    return level_rates, logger_rates
+
+
+def build_log_config(level: str = "INFO", queue_size: int = 10000, sample_rates: str = "") -> dict[str, Any]:
+    """
+    Build a dictConfig routing the root logger (and uvicorn's loggers) through the queue handler.
+
+    Args:
+        level: Root log level
+        queue_size: Maximum buffered records
+        sample_rates: Sampling spec, see parse_sample_rates
+
+    Returns:
+        logging.config.dictConfig dictionary
+    """
+    level_rates, logger_rates = parse_sample_rates(sample_rates)
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "handlers": {
+            "queue": {
+                "()": f"{__name__}.create_queue_handler",
+                "queue_size": queue_size,
+                "level_rates": level_rates,
+                "logger_rates": logger_rates,
+            }
+        },
+        "root": {"level": level.upper(), "handlers": ["queue"]},
+        "loggers": {
+            name: {"handlers": [], "propagate": True} for name in ("uvicorn", "uvicorn.error", "uvicorn.access")
+        },
+    }
+
+
+def setup_logging(level: str = "INFO", **kwargs: Any) -> None:
+    """Configure structured, non-blocking logging for the current process (CLIs and workers)."""
+    logging.config.dictConfig(build_log_config(level, **kwargs))
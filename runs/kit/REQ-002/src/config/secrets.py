@@ -0,0 +1,318 @@
+"""
+Secret providers with in-memory caching and refresh-ahead.
+
+Secrets such as the Slack signing secret rotate (every 90 days), so they
+are not read once at startup. A SecretProvider fetches a secret's current
+value, plus the previous values still accepted during a rotation window,
+from one backend:
+
+- EnvSecretProvider: Settings, i.e. SLACK_SIGNING_SECRET and
+  SLACK_SIGNING_SECRET_PREVIOUS as read at startup (rotating needs a restart)
+- FileSecretProvider: <dir>/<name> and <dir>/<name>.previous, e.g. a mounted
+  Kubernetes secret that is updated in place
+- VaultSecretProvider: a Vault KV v2 secret; the previous version stays
+  valid for `grace` after the current one was written
+
+CachedSecret keeps the last fetched value in memory, so reading it on the
+request path is an attribute access, and refreshes it in the background
+before its TTL runs out. A failed refresh keeps serving the cached value
+and is retried; only the initial fetch at startup is fatal.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Protocol
+
+import httpx
+from prometheus_client import Counter
+
+from .settings import Settings
+
+logger = logging.getLogger(__name__)
+
+SECRET_REFRESHES = Counter("secret_refreshes_total", "Background secret refreshes", ["name", "outcome"])
+
+
+class SecretNotFoundError(Exception):
+    """The backend has no value for the requested secret."""
+
+
+@dataclass(frozen=True)
+class Secret:
+    """A secret's current value and any previous values still accepted."""
+
+    current: str
+    previous: tuple[str, ...] = ()
+
+    @property
+    def values(self) -> tuple[str, ...]:
+        """All accepted values, current first."""
+        return (self.current, *self.previous)
+
+
+class SecretProvider(Protocol):
+    """A backend that secrets are fetched from."""
+
+    async def fetch(self, name: str) -> Secret:
+        """
+        Fetch a secret.
+
+        Raises:
+            SecretNotFoundError: If the backend has no such secret
+        """
+        ...
+
+    async def close(self) -> None:
+        """Release the backend's connections."""
+        ...
+
+
+class SecretSource(Protocol):
+    """Anything that hands out a secret without I/O (a CachedSecret or StaticSecret)."""
+
+    def get(self) -> Secret:
+        """Return the secret."""
+        ...
+
+
+class StaticSecret:
+    """A fixed secret, e.g. in tests or for a plain signing-secret string."""
+
+    def __init__(self, current: str, previous: tuple[str, ...] = ()):
+        """
+        Initialize static secret.
+
+        Args:
+            current: The value
+            previous: Other accepted values
+        """
+        self._secret = Secret(current, previous)
+
+    def get(self) -> Secret:
+        """Return the secret."""
+        return self._secret
+
+
+class EnvSecretProvider:
+    """Serves the settings attribute `name`, plus `<name>_previous` (comma-separated)."""
+
+    def __init__(self, settings: Settings):
+        """
+        Initialize environment provider.
+
+        Args:
+            settings: Settings holding the secrets (required ones are checked by Settings.validate)
+        """
+        self.settings = settings
+
+    async def fetch(self, name: str) -> Secret:
+        """Fetch a secret from the settings."""
+        previous = getattr(self.settings, f"{name}_previous", "")
+        return Secret(getattr(self.settings, name, ""), tuple(v for v in previous.split(",") if v))
+
+    async def close(self) -> None:
+        """Nothing to release."""
+
+
+class FileSecretProvider:
+    """Reads <directory>/<name> and, during a rotation, <directory>/<name>.previous (one value per line)."""
+
+    def __init__(self, directory: str):
+        """
+        Initialize file provider.
+
+        Args:
+            directory: Directory holding one file per secret
+        """
+        self.directory = directory
+
+    def _read(self, filename: str) -> str | None:
+        try:
+            with open(os.path.join(self.directory, filename)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    async def fetch(self, name: str) -> Secret:
+        """Fetch a secret from its file."""
+        current = (await asyncio.to_thread(self._read, name) or "").strip()
+        if not current:
+            raise SecretNotFoundError(f"No secret file {name!r} in {self.directory}")
+        previous = await asyncio.to_thread(self._read, f"{name}.previous") or ""
+        return Secret(current, tuple(line.strip() for line in previous.splitlines() if line.strip()))
+
+    async def close(self) -> None:
+        """Nothing to release."""
+
+
+class VaultSecretProvider:
+    """Reads secrets from a Vault KV v2 engine over HTTP."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        token: str,
+        mount: str = "secret",
+        path_prefix: str = "coffeebuddy",
+        field: str = "value",
+        grace: timedelta = timedelta(hours=24),
+    ):
+        """
+        Initialize Vault provider.
+
+        Args:
+            client: HTTP client whose base_url is the Vault address
+            token: Vault token sent as X-Vault-Token
+            mount: KV v2 mount point
+            path_prefix: Secrets live at <mount>/data/<path_prefix>/<name>
+            field: Key holding the value inside the secret's data
+            grace: How long the previous version stays valid after a new one is written
+        """
+        self.client = client
+        self.token = token
+        self.mount = mount
+        self.path_prefix = path_prefix
+        self.field = field
+        self.grace = grace
+
+    async def _read(self, name: str, version: int | None = None) -> dict:
+        response = await self.client.get(
+            f"/v1/{self.mount}/data/{self.path_prefix}/{name}",
+            params={"version": version} if version is not None else None,
+            headers={"X-Vault-Token": self.token},
+        )
+        if response.status_code == 404:
+            raise SecretNotFoundError(f"Vault has no secret {self.path_prefix}/{name}")
+        response.raise_for_status()
+        return response.json()["data"]
+
+    async def fetch(self, name: str) -> Secret:
+        """Fetch the current version, and the previous one while it is within the grace period."""
+        data = await self._read(name)
+        current = (data.get("data") or {}).get(self.field)
+        if not current:
+            raise SecretNotFoundError(f"Vault secret {self.path_prefix}/{name} has no {self.field!r}")
+
+        metadata = data["metadata"]
+        written = datetime.fromisoformat(metadata["created_time"].replace("Z", "+00:00"))
+        if metadata["version"] <= 1 or datetime.now(timezone.utc) - written > self.grace:
+            return Secret(current)
+        try:
+            before = await self._read(name, metadata["version"] - 1)
+        except SecretNotFoundError:
+            return Secret(current)
+        previous = (before.get("data") or {}).get(self.field)
+        return Secret(current, (previous,) if previous and previous != current else ())
+
+    async def close(self) -> None:
+        """Close the HTTP client."""
+        await self.client.aclose()
+
+
+class CachedSecret:
+    """Serves a secret from memory and refreshes it ahead of expiry."""
+
+    def __init__(
+        self,
+        provider: SecretProvider,
+        name: str,
+        ttl: float = 300.0,
+        refresh_ahead: float = 0.2,
+        retry_interval: float = 5.0,
+    ):
+        """
+        Initialize cached secret.
+
+        Args:
+            provider: Backend to fetch from
+            name: Secret name
+            ttl: Seconds a fetched value is considered fresh
+            refresh_ahead: Fraction of the TTL before expiry at which the refresh starts
+            retry_interval: Seconds between attempts after a failed refresh
+        """
+        self.provider = provider
+        self.name = name
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.retry_interval = retry_interval
+        self._secret: Secret | None = None
+        self._fetched_at = 0.0
+        self._task: asyncio.Task | None = None
+
+    def get(self) -> Secret:
+        """
+        Return the cached secret (no I/O).
+
+        Raises:
+            RuntimeError: If start() has not fetched it yet
+        """
+        if self._secret is None:
+            raise RuntimeError(f"Secret {self.name!r} has not been loaded")
+        return self._secret
+
+    @property
+    def age(self) -> float:
+        """Seconds since the cached value was fetched."""
+        return time.monotonic() - self._fetched_at
+
+    async def refresh(self) -> Secret:
+        """Fetch the secret now and cache it."""
+        secret = await self.provider.fetch(self.name)
+        if self._secret is not None and secret.current != self._secret.current:
+            logger.info("Secret rotated", extra={"secret": self.name, "accepted_values": len(secret.values)})
+        self._secret = secret
+        self._fetched_at = time.monotonic()
+        return secret
+
+    async def start(self) -> None:
+        """Fetch the secret (failing if the backend cannot provide it) and start refreshing."""
+        await self.refresh()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Stop refreshing."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(0.0, self.ttl * (1 - self.refresh_ahead) - self.age))
+            try:
+                await self.refresh()
+                SECRET_REFRESHES.labels(name=self.name, outcome="success").inc()
+            except Exception as e:
+                # Keep serving the cached value; a rotation grace period covers short outages
+                SECRET_REFRESHES.labels(name=self.name, outcome="error").inc()
+                logger.warning(
+                    "Secret refresh failed; serving cached value",
+                    extra={"secret": self.name, "error": str(e), "age_seconds": round(self.age)},
+                )
+                await asyncio.sleep(self.retry_interval)
+
+
+def create_secret_provider(settings: Settings) -> SecretProvider:
+    """
+    Build the provider selected by SECRET_PROVIDER.
+
+    Raises:
+        ValueError: On an unknown provider name
+    """
+    if settings.secret_provider == "env":
+        return EnvSecretProvider(settings)
+    if settings.secret_provider == "file":
+        return FileSecretProvider(settings.secret_dir)
+    if settings.secret_provider == "vault":
+        client = httpx.AsyncClient(base_url=settings.vault_addr, timeout=5.0)
+        return VaultSecretProvider(
+            client,
+            settings.vault_token,
+            mount=settings.vault_mount,
+            path_prefix=settings.vault_path_prefix,
+            grace=timedelta(hours=settings.secret_rotation_grace_hours),
+        )
+    raise ValueError(f"Unknown SECRET_PROVIDER {settings.secret_provider!r}")
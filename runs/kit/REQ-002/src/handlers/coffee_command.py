@@ -17,6 +17,10 @@ from typing import Protocol
 
 from fastapi import HTTPException, Request
 
+from ..config.logging_config import correlation_scope, get_correlation_id
+from ..config.secrets import Secret, SecretSource, StaticSecret
+from ..services.stage_timing import current_stage_timer
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,16 +33,33 @@ class KafkaProducerProtocol(Protocol):
 
 
 class SlackSignatureValidator:
-    """Validates Slack request signatures using HMAC-SHA256."""
+    """
+    Validates Slack request signatures using HMAC-SHA256.
+
+    Accepts the current signing secret and, during a rotation, the previous
+    ones. The keyed HMAC state for each secret is prepared once per secret
+    version and copied per request, and the current secret is tried first,
+    so outside a rotation a request costs one HMAC as before.
+    """
 
-    def __init__(self, signing_secret: str):
+    def __init__(self, signing_secret: str | SecretSource):
         """
         Initialize validator with Slack signing secret.
 
         Args:
-            signing_secret: Slack app signing secret from environment
+            signing_secret: Slack app signing secret, or a source (e.g. CachedSecret) that may rotate
         """
-        self.signing_secret = signing_secret.encode()
+        self.secret_source = StaticSecret(signing_secret) if isinstance(signing_secret, str) else signing_secret
+        self._secret: Secret | None = None
+        self._macs: tuple = ()
+
+    def _keyed_macs(self) -> tuple:
+        """HMAC states keyed with every accepted secret, rebuilt when the secret changes."""
+        secret = self.secret_source.get()
+        if secret is not self._secret:
+            self._macs = tuple(hmac.new(value.encode(), digestmod=hashlib.sha256) for value in secret.values)
+            self._secret = secret
+        return self._macs
 
     def validate(self, timestamp: str, body: bytes, signature: str) -> bool:
         """
@@ -60,14 +81,14 @@ class SlackSignatureValidator:
         if abs(current_time - int(timestamp)) > 300:
             raise HTTPException(status_code=401, detail="Request timestamp too old")
 
-        # Compute expected signature
-        sig_basestring = f"v0:{timestamp}:{body.decode('utf-8')}"
-        expected_signature = (
-            "v0=" + hmac.new(self.signing_secret, sig_basestring.encode(), hashlib.sha256).hexdigest()
-        )
-
-        # Constant-time comparison to prevent timing attacks
-        return hmac.compare_digest(expected_signature, signature)
+        sig_basestring = b"v0:" + timestamp.encode() + b":" + body
+        for keyed in self._keyed_macs():
+            mac = keyed.copy()
+            mac.update(sig_basestring)
+            # Constant-time comparison to prevent timing attacks
+            if hmac.compare_digest("v0=" + mac.hexdigest(), signature):
+                return True
+        return False
 
 
 class CoffeeCommandHandler:
@@ -104,20 +125,26 @@ class CoffeeCommandHandler:
         Raises:
             HTTPException: If signature validation fails
         """
+        timer = current_stage_timer()
+
         # Extract headers
         timestamp = request.headers.get("X-Slack-Request-Timestamp", "")
         signature = request.headers.get("X-Slack-Signature", "")
 
         # Read raw body for signature validation
-        body = await request.body()
+        with timer.stage("read_body"):
+            body = await request.body()
 
         # Validate signature
-        if not self.signature_validator.validate(timestamp, body, signature):
+        with timer.stage("verify_signature"):
+            valid = self.signature_validator.validate(timestamp, body, signature)
+        if not valid:
             logger.warning("Invalid Slack signature", extra={"timestamp": timestamp})
             raise HTTPException(status_code=401, detail="Invalid signature")
 
         # Parse form data
-        form_data = await request.form()
+        with timer.stage("parse_form"):
+            form_data = await request.form()
         trigger_id = form_data.get("trigger_id")
         user_id = form_data.get("user_id")
         channel_id = form_data.get("channel_id")
@@ -135,23 +162,24 @@ class CoffeeCommandHandler:
             "timestamp": timestamp,
         }
 
-        correlation_id = f"{user_id}_{int(time.time() * 1000)}"
+        # Reuse the request's correlation_id (bound by the app middleware) when there is one
+        correlation_id = get_correlation_id() or f"{user_id}_{int(time.time() * 1000)}"
         headers = {"correlation_id": correlation_id}
 
-        try:
-            await self.kafka_producer.publish(
-                topic=self.kafka_topic, key=user_id, value=event_payload, headers=headers
-            )
-            logger.info(
-                "Published slash command event",
-                extra={"correlation_id": correlation_id, "user_id": user_id, "command": command},
-            )
-        except Exception as e:
-            logger.error("Failed to publish event to Kafka", extra={"error": str(e)}, exc_info=True)
-            # Continue to return modal even if Kafka publish fails (graceful degradation)
+        with correlation_scope(correlation_id):
+            try:
+                with timer.stage("kafka_publish"):
+                    await self.kafka_producer.publish(
+                        topic=self.kafka_topic, key=user_id, value=event_payload, headers=headers
+                    )
+                logger.info("Published slash command event", extra={"user_id": user_id, "command": command})
+            except Exception as e:
+                logger.error("Failed to publish event to Kafka", extra={"error": str(e)}, exc_info=True)
+                # Continue to return modal even if Kafka publish fails (graceful degradation)
 
         # Return modal view response
-        return self._build_modal_response(trigger_id)
+        with timer.stage("render_modal"):
+            return self._build_modal_response(trigger_id)
 
     def _build_modal_response(self, trigger_id: str) -> dict:
         """
@@ -224,13 +252,13 @@ class CoffeeCommandHandler:
 
 
 def create_coffee_command_handler(
-    signing_secret: str, kafka_producer: KafkaProducerProtocol
+    signing_secret: str | SecretSource, kafka_producer: KafkaProducerProtocol
 ) -> CoffeeCommandHandler:
     """
     Factory function to create CoffeeCommandHandler with dependencies.
 
     Args:
-        signing_secret: Slack app signing secret
+        signing_secret: Slack app signing secret, or a source that may rotate
         kafka_producer: Kafka producer instance
 
     Returns:
@@ -238,6 +266,3 @@ def create_coffee_command_handler(
     """
     validator = SlackSignatureValidator(signing_secret)
     return CoffeeCommandHandler(validator, kafka_producer)
-```
-
-```markdown
\ No newline at end of file
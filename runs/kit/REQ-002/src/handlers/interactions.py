@@ -0,0 +1,182 @@
+"""
+Slack Interactions Handler
+
+Handles modal submissions and button presses posted to /slack/interactions by:
+1. Validating Slack request signature
+2. Validating the payload (field errors go straight back to the modal)
+3. Queueing the work on the OrderPipeline and acknowledging immediately
+
+Persistence and event publishing happen in the pipeline's background
+workers, keeping the response well inside Slack's 3-second limit.
+"""
+import json
+import logging
+import time
+import uuid
+from typing import Any
+
+from fastapi import HTTPException, Request
+
+from ..config.logging_config import get_correlation_id
+from ..config.secrets import SecretSource
+from ..services.order_pipeline import OrderPipeline, OrderSubmission, RunCompletion
+from ..services.stage_timing import current_stage_timer
+from .coffee_command import SlackSignatureValidator
+
+logger = logging.getLogger(__name__)
+
+ORDER_MODAL_CALLBACK_ID = "coffee_order_modal"
+MARK_COMPLETE_ACTION_ID = "mark_complete"
+
+# Must match the options offered by CoffeeCommandHandler's order modal
+DRINK_TYPES = frozenset({"espresso", "latte", "cappuccino", "americano", "mocha"})
+SIZES = frozenset({"small", "medium", "large"})
+MAX_CUSTOMIZATIONS_LENGTH = 500
+
+BUSY_MESSAGE = "CoffeeBuddy is busy right now, please submit again in a moment."
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+    except (TypeError, ValueError, AttributeError):
+        return False
+    return True
+
+
+def _selected(values: dict, block_id: str, action_id: str) -> str | None:
+    element = values.get(block_id, {}).get(action_id, {})
+    option = element.get("selected_option")
+    return option.get("value") if option else element.get("value")
+
+
+class InteractionsHandler:
+    """Validates Slack interactions and hands them to the order pipeline."""
+
+    def __init__(self, signature_validator: SlackSignatureValidator, pipeline: OrderPipeline):
+        """
+        Initialize handler with injected dependencies.
+
+        Args:
+            signature_validator: Slack signature validator
+            pipeline: Background pipeline that persists accepted interactions
+        """
+        self.signature_validator = signature_validator
+        self.pipeline = pipeline
+
+    async def handle(self, request: Request) -> dict:
+        """
+        Handle a Slack interaction request.
+
+        Args:
+            request: FastAPI request object
+
+        Returns:
+            Slack acknowledgement (a response_action for modal submissions)
+
+        Raises:
+            HTTPException: If signature validation fails or the payload is malformed
+        """
+        timer = current_stage_timer()
+
+        timestamp = request.headers.get("X-Slack-Request-Timestamp", "")
+        signature = request.headers.get("X-Slack-Signature", "")
+
+        with timer.stage("read_body"):
+            body = await request.body()
+
+        with timer.stage("verify_signature"):
+            valid = self.signature_validator.validate(timestamp, body, signature)
+        if not valid:
+            logger.warning("Invalid Slack signature", extra={"timestamp": timestamp})
+            raise HTTPException(status_code=401, detail="Invalid signature")
+
+        with timer.stage("parse_form"):
+            form_data = await request.form()
+            try:
+                payload = json.loads(form_data.get("payload", ""))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid interaction payload")
+
+        with timer.stage("enqueue"):
+            interaction_type = payload.get("type")
+            if interaction_type == "view_submission":
+                return self._handle_view_submission(payload)
+            if interaction_type == "block_actions":
+                return self._handle_block_actions(payload)
+        logger.info("Ignoring unsupported interaction", extra={"interaction_type": interaction_type})
+        return {}
+
+    def _handle_view_submission(self, payload: dict[str, Any]) -> dict:
+        view = payload.get("view", {})
+        if view.get("callback_id") != ORDER_MODAL_CALLBACK_ID:
+            logger.info("Ignoring unknown view submission", extra={"callback_id": view.get("callback_id")})
+            return {}
+
+        values = view.get("state", {}).get("values", {})
+        drink_type = _selected(values, "drink_type_block", "drink_type")
+        size = _selected(values, "size_block", "size")
+        customizations = (_selected(values, "customizations_block", "customizations") or "").strip() or None
+        run_id = view.get("private_metadata", "")
+
+        errors = {}
+        if drink_type not in DRINK_TYPES:
+            errors["drink_type_block"] = "Please choose a drink."
+        if size not in SIZES:
+            errors["size_block"] = "Please choose a size."
+        if customizations and len(customizations) > MAX_CUSTOMIZATIONS_LENGTH:
+            errors["customizations_block"] = f"Please keep it under {MAX_CUSTOMIZATIONS_LENGTH} characters."
+        if not _is_uuid(run_id):
+            errors["drink_type_block"] = "This order form is not attached to a coffee run."
+        if errors:
+            return {"response_action": "errors", "errors": errors}
+
+        user = payload.get("user", {})
+        job = OrderSubmission(
+            order_id=str(uuid.uuid4()),
+            run_id=run_id,
+            user_id=user.get("id", ""),
+            user_name=user.get("name", ""),
+            drink_type=drink_type,
+            size=size,
+            customizations=customizations,
+            correlation_id=get_correlation_id() or f"{user.get('id')}_{int(time.time() * 1000)}",
+        )
+        if not self.pipeline.submit(job):
+            return {"response_action": "errors", "errors": {"drink_type_block": BUSY_MESSAGE}}
+
+        logger.info("Order accepted", extra={"order_id": job.order_id, "run_id": run_id, "user_id": job.user_id})
+        return {"response_action": "clear"}
+
+    def _handle_block_actions(self, payload: dict[str, Any]) -> dict:
+        user_id = payload.get("user", {}).get("id", "")
+        for action in payload.get("actions", []):
+            if action.get("action_id") != MARK_COMPLETE_ACTION_ID:
+                continue
+            run_id = action.get("value", "")
+            if not _is_uuid(run_id):
+                raise HTTPException(status_code=400, detail="Invalid run_id")
+            job = RunCompletion(
+                run_id=run_id,
+                user_id=user_id,
+                correlation_id=get_correlation_id() or f"{user_id}_{int(time.time() * 1000)}",
+            )
+            if not self.pipeline.submit(job):
+                # Buttons have no error surface; a 503 makes Slack show a failure so the user can retry
+                raise HTTPException(status_code=503, detail=BUSY_MESSAGE)
+            logger.info("Run completion accepted", extra={"run_id": run_id, "user_id": user_id})
+        return {}
+
+
+def create_interactions_handler(signing_secret: str | SecretSource, pipeline: OrderPipeline) -> InteractionsHandler:
+    """
+    Factory function to create InteractionsHandler with dependencies.
+
+    Args:
+        signing_secret: Slack app signing secret, or a source that may rotate
+        pipeline: Started OrderPipeline for this worker
+
+    Returns:
+        Configured InteractionsHandler instance
+    """
+    return InteractionsHandler(SlackSignatureValidator(signing_secret), pipeline)
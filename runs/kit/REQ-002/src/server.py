@@ -0,0 +1,57 @@
+"""
+CoffeeBuddy server entry point.
+
+Runs the app factory under uvicorn with N worker processes per pod. Each
+worker builds its own producer and connection pool (see api.app), and the
+pod's Postgres budget is divided between them.
+
+Usage:
+    python -m src.server --workers 4 --port 8080
+"""
+import argparse
+import logging
+import logging.config
+import os
+
+import uvicorn
+
+from .config.logging_config import build_log_config
+from .config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """Parse arguments and run the server."""
+    parser = argparse.ArgumentParser(description="Run the CoffeeBuddy API server")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8080")))
+    parser.add_argument("--workers", type=int, help="Worker processes (default: WEB_CONCURRENCY or 1)")
+    args = parser.parse_args()
+
+    # Workers are separate processes that read settings from the environment
+    if args.workers is not None:
+        os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    settings = Settings()
+    settings.validate()
+    log_config = build_log_config(settings.log_level, settings.log_queue_size, settings.log_sample_rates)
+    logging.config.dictConfig(log_config)
+
+    pool_size, max_overflow = settings.worker_pool_limits()
+    logger.info(
+        f"Starting {settings.web_concurrency} worker(s), "
+        f"{pool_size}+{max_overflow} database connections each"
+    )
+    uvicorn.run(
+        f"{__package__}.api.app:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=settings.web_concurrency,
+        timeout_graceful_shutdown=settings.graceful_shutdown_timeout,
+        log_config=log_config,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Admission control for the Slack endpoints.
+
+Slack gives up on a request after 3 seconds. Under overload, accepting
+every request makes all of them queue behind each other and miss that
+deadline together. The AdmissionController tracks in-flight requests and
+their recent latency, and it refuses work early: a shed request gets a
+fast "busy, try again" answer instead of a slow timeout.
+
+Each kind of request has a concurrency limit. The limit shrinks in
+proportion once the recent p90 latency exceeds that kind's budget, so the
+backlog drains while a trickle of requests still produces fresh latency
+samples. Interactions (order submissions and button presses, which finish
+work already started) get the whole in-flight limit and the looser
+deadline budget. New /coffee commands are capped at `command_share` of
+the limit and use the tighter target budget, so they are shed first.
+"""
+import time
+from collections import deque
+from typing import Any
+
+from prometheus_client import Counter, Gauge
+
+ADMISSION_SHED = Counter("slack_admission_shed_total", "Slack requests refused by admission control", ["kind"])
+ADMISSION_IN_FLIGHT = Gauge("slack_admission_in_flight", "Slack requests being handled", ["kind"])
+ADMISSION_LATENCY_P90 = Gauge("slack_admission_latency_p90_seconds", "Recent p90 latency of admitted Slack requests")
+
+INTERACTION = "interaction"
+COMMAND = "command"
+
+
+class _Ticket:
+    __slots__ = ("controller", "kind", "started")
+
+    def __init__(self, controller: "AdmissionController", kind: str):
+        self.controller = controller
+        self.kind = kind
+        self.started = time.monotonic()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.controller.release(self.kind, time.monotonic() - self.started)
+
+
+class AdmissionController:
+    """Admits or sheds Slack requests based on in-flight count and recent latency."""
+
+    def __init__(
+        self,
+        max_in_flight: int = 64,
+        command_share: float = 0.75,
+        latency_target: float = 1.5,
+        deadline: float = 2.5,
+        window: float = 5.0,
+        max_samples: int = 1000,
+    ):
+        """
+        Initialize admission controller for one worker.
+
+        Args:
+            max_in_flight: Requests handled concurrently, of any kind
+            command_share: Fraction of max_in_flight that /coffee commands may use
+            latency_target: p90 latency (seconds) above which commands are throttled
+            deadline: p90 latency (seconds) above which interactions are throttled too
+            window: Seconds of latency history considered
+            max_samples: Most recent samples kept within the window
+        """
+        self.limits = {
+            INTERACTION: max(1, max_in_flight),
+            COMMAND: max(1, int(max_in_flight * command_share)),
+        }
+        self.budgets = {INTERACTION: deadline, COMMAND: latency_target}
+        self.window = window
+        self.in_flight = {INTERACTION: 0, COMMAND: 0}
+        self._samples: deque[tuple[float, float]] = deque(maxlen=max_samples)
+        self._p90 = 0.0
+        self._p90_at = 0.0
+
+    @property
+    def total_in_flight(self) -> int:
+        """Requests of all kinds being handled."""
+        return self.in_flight[INTERACTION] + self.in_flight[COMMAND]
+
+    def recent_p90(self) -> float:
+        """p90 latency over the window (0 without samples), recomputed at most every 100ms."""
+        now = time.monotonic()
+        if now - self._p90_at >= 0.1:
+            while self._samples and self._samples[0][0] < now - self.window:
+                self._samples.popleft()
+            latencies = sorted(seconds for _, seconds in self._samples)
+            self._p90 = latencies[int(len(latencies) * 0.9)] if latencies else 0.0
+            self._p90_at = now
+            ADMISSION_LATENCY_P90.set(self._p90)
+        return self._p90
+
+    def limit(self, kind: str) -> int:
+        """Current concurrency limit for a kind, scaled down while its latency budget is exceeded."""
+        p90 = self.recent_p90()
+        limit = self.limits[kind]
+        if p90 > self.budgets[kind]:
+            limit = max(1, int(limit * self.budgets[kind] / p90))
+        return limit
+
+    def admit(self, kind: str) -> _Ticket | None:
+        """
+        Try to admit a request.
+
+        Usage:
+            ticket = admission.admit(COMMAND)
+            if ticket is None:
+                return busy_response
+            with ticket:
+                return await handler.handle(request)
+
+        Returns:
+            A ticket to hold while handling the request, or None if it is shed
+        """
+        if self.total_in_flight >= self.limits[INTERACTION] or self.in_flight[kind] >= self.limit(kind):
+            ADMISSION_SHED.labels(kind=kind).inc()
+            return None
+        self.in_flight[kind] += 1
+        ADMISSION_IN_FLIGHT.labels(kind=kind).inc()
+        return _Ticket(self, kind)
+
+    def release(self, kind: str, seconds: float) -> None:
+        """Record a finished request's latency and free its slot."""
+        self.in_flight[kind] -= 1
+        ADMISSION_IN_FLIGHT.labels(kind=kind).dec()
+        self._samples.append((time.monotonic(), seconds))
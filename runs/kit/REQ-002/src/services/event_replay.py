@@ -0,0 +1,484 @@
+"""
+Parallel Kafka replay that rebuilds database state after a restore.
+
+Reads coffee.orders, coffee.assignments and coffee.completions from a start
+point (explicit offsets, a timestamp, or the beginning of the log) up to the
+end offsets seen when the replay starts, so it always terminates. One
+consumer fetches every partition; each partition has its own worker that
+applies batches in offset order through storage.replay's idempotent
+upserts, one transaction per batch, so partitions load the database in
+parallel while per-key ordering (events are keyed by run) is kept. Runs are
+created from coffee.orders, so assignments and completions, which only
+update a run, are fetched alongside but applied once every coffee.orders
+partition has reached its end; otherwise a completion could overtake the
+order that creates its run and be dropped as orphaned. Events whose run
+still does not exist at the end are reported as an error. A
+partition whose worker falls behind is paused rather than buffered without
+bound. Nothing is committed to Kafka: the final report, and the log line on
+failure, carry the offsets to resume from with --from-offset.
+
+Throughput is logged while the replay runs, with an ETA checked against
+the recovery time objective, and summarized per partition at the end.
+
+Usage:
+    python -m src.services.event_replay --from-timestamp 2024-05-01T02:00:00Z [--rto-hours 4] [--report report.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from contextlib import AbstractAsyncContextManager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Sequence
+
+from aiokafka import AIOKafkaConsumer, TopicPartition
+from prometheus_client import Counter, Gauge
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage.audit_queries import naive_utc
+from storage.database import DatabaseManager, to_async_url
+from storage.replay import ApplyResult, ReplayEvent, apply_events
+
+from ..config.logging_config import setup_logging
+from ..config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+REPLAY_TOPICS = ("coffee.orders", "coffee.assignments", "coffee.completions")
+# Topics whose events create runs; the other topics are applied after them
+RUN_SOURCE_TOPICS = ("coffee.orders",)
+
+REPLAYED = Counter("event_replay_events_total", "Events replayed into the database", ["topic", "outcome"])
+REMAINING = Gauge("event_replay_remaining_events", "Events left before the replay reaches its end offsets")
+
+SessionFactory = Callable[[], AbstractAsyncContextManager[AsyncSession]]
+ApplyFunction = Callable[[AsyncSession, Sequence[ReplayEvent]], Awaitable[ApplyResult]]
+
+
+@dataclass
+class PartitionProgress:
+    """Replay range and counters for one partition."""
+
+    topic: str
+    partition: int
+    start: int
+    end: int
+    position: int = -1
+    applied: int = 0
+    orphaned: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+
+    def __post_init__(self) -> None:
+        """Start at the beginning of the range."""
+        if self.position < 0:
+            self.position = self.start
+
+    @property
+    def remaining(self) -> int:
+        """Offsets left to replay (an upper bound on compacted topics)."""
+        return max(0, self.end - self.position)
+
+    @property
+    def events(self) -> int:
+        """Events consumed so far, whatever their outcome."""
+        return self.applied + self.orphaned + self.skipped
+
+
+@dataclass
+class ReplayReport:
+    """Outcome of a replay."""
+
+    partitions: list[PartitionProgress]
+    seconds: float = 0.0
+    completed: bool = False
+
+    @property
+    def events(self) -> int:
+        """Events consumed across all partitions."""
+        return sum(p.events for p in self.partitions)
+
+    @property
+    def orphaned(self) -> int:
+        """Events dropped because their run exists neither in the database nor in the replay."""
+        return sum(p.orphaned for p in self.partitions)
+
+    @property
+    def events_per_second(self) -> float:
+        """Overall throughput."""
+        return self.events / self.seconds if self.seconds > 0 else 0.0
+
+    def resume_offsets(self) -> list[str]:
+        """--from-offset arguments that continue an interrupted replay."""
+        return [f"{p.topic}:{p.partition}={p.position}" for p in self.partitions if p.remaining]
+
+    def as_dict(self) -> dict[str, Any]:
+        """JSON-serializable summary."""
+        by_topic: dict[str, dict[str, int]] = {}
+        for p in self.partitions:
+            totals = by_topic.setdefault(p.topic, {"applied": 0, "orphaned": 0, "skipped": 0})
+            totals["applied"] += p.applied
+            totals["orphaned"] += p.orphaned
+            totals["skipped"] += p.skipped
+        return {
+            "completed": self.completed,
+            "events": self.events,
+            "seconds": round(self.seconds, 3),
+            "events_per_second": round(self.events_per_second, 1),
+            "by_topic": by_topic,
+            "partitions": [asdict(p) for p in self.partitions],
+            "resume_offsets": self.resume_offsets(),
+        }
+
+
+def parse_offsets(items: Sequence[str]) -> dict[TopicPartition, int]:
+    """
+    Parse "topic:partition=offset" start points.
+
+    Raises:
+        ValueError: If an item is malformed
+    """
+    offsets: dict[TopicPartition, int] = {}
+    for item in items:
+        try:
+            where, offset = item.rsplit("=", 1)
+            topic, partition = where.rsplit(":", 1)
+            offsets[TopicPartition(topic, int(partition))] = int(offset)
+        except ValueError as e:
+            raise ValueError(f"Invalid offset {item!r}; expected topic:partition=offset") from e
+    return offsets
+
+
+def record_time(record: Any) -> datetime:
+    """Kafka record timestamp (epoch ms) as naive UTC, like the stored timestamps."""
+    return naive_utc(datetime.fromtimestamp(record.timestamp / 1000, tz=timezone.utc))
+
+
+class EventReplayer:
+    """Replays topic partitions into the database in parallel."""
+
+    def __init__(
+        self,
+        consumer: AIOKafkaConsumer,
+        session_factory: SessionFactory,
+        apply: ApplyFunction = apply_events,
+        batch_size: int = 500,
+        queue_depth: int = 4,
+        poll_timeout_ms: int = 1000,
+        progress_interval: float = 30.0,
+        rto_seconds: float | None = None,
+    ):
+        """
+        Initialize replayer with injected dependencies.
+
+        Args:
+            consumer: Started consumer without a group; the replayer assigns partitions
+            session_factory: Context manager factory yielding one session per batch
+            apply: Writes a batch of events (caller commits)
+            batch_size: Records fetched per poll
+            queue_depth: Fetched batches a partition may hold before it is paused
+            poll_timeout_ms: Fetch wait per poll
+            progress_interval: Seconds between progress log lines
+            rto_seconds: Recovery time objective; a projected finish past it is logged as a warning
+        """
+        self.consumer = consumer
+        self.session_factory = session_factory
+        self.apply = apply
+        self.batch_size = batch_size
+        self.queue_depth = queue_depth
+        self.poll_timeout_ms = poll_timeout_ms
+        self.progress_interval = progress_interval
+        self.rto_seconds = rto_seconds
+
+    async def plan(
+        self,
+        topics: Sequence[str],
+        start_offsets: dict[TopicPartition, int] | None = None,
+        since: datetime | None = None,
+    ) -> dict[TopicPartition, PartitionProgress]:
+        """
+        Assign every partition of `topics` and seek to its start.
+
+        A partition starts at its explicit offset, else at the first record at
+        or after `since`, else at the beginning of the log, and ends at the
+        end offset seen now.
+        """
+        await self.consumer.topics()
+        partitions = []
+        for topic in topics:
+            numbers = self.consumer.partitions_for_topic(topic)
+            if not numbers:
+                raise ValueError(f"Unknown topic {topic!r}")
+            partitions.extend(TopicPartition(topic, number) for number in sorted(numbers))
+        self.consumer.assign(partitions)
+
+        beginning = await self.consumer.beginning_offsets(partitions)
+        end = await self.consumer.end_offsets(partitions)
+        starts = dict(beginning)
+        if since is not None:
+            millis = int(since.replace(tzinfo=since.tzinfo or timezone.utc).timestamp() * 1000)
+            found = await self.consumer.offsets_for_times({tp: millis for tp in partitions})
+            # No record at or after `since`: nothing to replay
+            starts.update({tp: end[tp] if hit is None else hit.offset for tp, hit in found.items()})
+        starts.update(start_offsets or {})
+
+        plan = {}
+        for tp in partitions:
+            start = min(max(starts[tp], beginning[tp]), end[tp])
+            plan[tp] = PartitionProgress(tp.topic, tp.partition, start, end[tp])
+            self.consumer.seek(tp, start)
+        return plan
+
+    async def run(
+        self,
+        topics: Sequence[str] = REPLAY_TOPICS,
+        start_offsets: dict[TopicPartition, int] | None = None,
+        since: datetime | None = None,
+    ) -> ReplayReport:
+        """
+        Replay `topics` up to their current end offsets.
+
+        Returns:
+            The report; `completed` is False if a worker failed, in which
+            case the exception is re-raised after the report is logged
+        """
+        plan = await self.plan(topics, start_offsets, since)
+        report = ReplayReport(list(plan.values()))
+        total = sum(p.remaining for p in plan.values())
+        logger.info(
+            "Replay planned",
+            extra={"partitions": len(plan), "events": total, "topics": list(topics)},
+        )
+
+        queues: dict[TopicPartition, asyncio.Queue] = {tp: asyncio.Queue() for tp in plan}
+        drained = asyncio.Event()
+        runs_loaded = asyncio.Event()
+        sources = [
+            asyncio.create_task(self._work(tp, plan[tp], queues[tp], drained))
+            for tp in plan
+            if tp.topic in RUN_SOURCE_TOPICS
+        ]
+        dependants = [
+            asyncio.create_task(self._work(tp, plan[tp], queues[tp], drained, after=runs_loaded))
+            for tp in plan
+            if tp.topic not in RUN_SOURCE_TOPICS
+        ]
+        workers = sources + dependants
+        gate = asyncio.create_task(self._open_after(sources, runs_loaded))
+        fetcher = asyncio.create_task(self._fetch(plan, queues, drained))
+        reporter = asyncio.create_task(self._report_progress(report, total))
+        started = time.monotonic()
+        try:
+            await asyncio.gather(fetcher, gate, *workers)
+            report.completed = True
+        except BaseException:
+            resume = " ".join(f"--from-offset {offset}" for offset in report.resume_offsets())
+            logger.error(f"Replay stopped; resume with {resume}")
+            raise
+        finally:
+            for task in (fetcher, gate, reporter, *workers):
+                task.cancel()
+            await asyncio.gather(fetcher, gate, reporter, *workers, return_exceptions=True)
+            report.seconds = time.monotonic() - started
+            REMAINING.set(sum(p.remaining for p in plan.values()))
+            logger.info(
+                "Replay finished" if report.completed else "Replay failed",
+                extra={
+                    "events": report.events,
+                    "seconds": round(report.seconds, 1),
+                    "events_per_second": round(report.events_per_second, 1),
+                },
+            )
+        if report.completed and report.orphaned:
+            logger.error(
+                "Replay dropped orphaned events: their runs exist neither in the database nor in the replayed range; "
+                "replay from an earlier --from-timestamp",
+                extra={"orphaned": report.orphaned, "by_topic": report.as_dict()["by_topic"]},
+            )
+        return report
+
+    @staticmethod
+    async def _open_after(tasks: list[asyncio.Task], event: asyncio.Event) -> None:
+        """Set `event` once all `tasks` have finished."""
+        await asyncio.gather(*tasks)
+        event.set()
+
+    async def _fetch(
+        self,
+        plan: dict[TopicPartition, PartitionProgress],
+        queues: dict[TopicPartition, asyncio.Queue],
+        drained: asyncio.Event,
+    ) -> None:
+        """Poll all partitions and hand records below each end offset to its worker."""
+        active = set()
+        for tp, progress in plan.items():
+            if progress.start >= progress.end:
+                queues[tp].put_nowait(None)
+            else:
+                active.add(tp)
+        self.consumer.pause(*(set(plan) - active))
+
+        while active:
+            for tp in active & self.consumer.paused():
+                if queues[tp].qsize() < self.queue_depth:
+                    self.consumer.resume(tp)
+            if active <= self.consumer.paused():
+                # Every partition is waiting on its worker
+                drained.clear()
+                await drained.wait()
+                continue
+
+            batches = await self.consumer.getmany(
+                *active, timeout_ms=self.poll_timeout_ms, max_records=self.batch_size
+            )
+            for tp, records in batches.items():
+                records = [r for r in records if r.offset < plan[tp].end]
+                if records:
+                    queues[tp].put_nowait(records)
+                if queues[tp].qsize() >= self.queue_depth:
+                    self.consumer.pause(tp)
+            # The position, not the last record, tells whether the end was reached:
+            # compaction and transaction markers leave offset gaps
+            for tp in list(active):
+                if await self.consumer.position(tp) >= plan[tp].end:
+                    active.discard(tp)
+                    self.consumer.pause(tp)
+                    queues[tp].put_nowait(None)
+
+    async def _work(
+        self,
+        tp: TopicPartition,
+        progress: PartitionProgress,
+        queue: asyncio.Queue,
+        drained: asyncio.Event,
+        after: asyncio.Event | None = None,
+    ) -> None:
+        """Apply one partition's batches in offset order, one transaction each, once `after` is set."""
+        if after is not None:
+            await after.wait()
+        while (records := await queue.get()) is not None:
+            started = time.monotonic()
+            events = [ReplayEvent(r.value, record_time(r)) for r in records if isinstance(r.value, dict)]
+            undecodable = len(records) - len(events)
+            async with self.session_factory() as session:
+                result = await self.apply(session, events)
+                await session.commit()
+            result.skipped += undecodable
+
+            progress.applied += result.applied
+            progress.orphaned += result.orphaned
+            progress.skipped += result.skipped
+            progress.position = records[-1].offset + 1
+            progress.seconds += time.monotonic() - started
+            drained.set()
+            for outcome in ("applied", "orphaned", "skipped"):
+                if count := getattr(result, outcome):
+                    REPLAYED.labels(topic=tp.topic, outcome=outcome).inc(count)
+        progress.position = max(progress.position, progress.end)
+
+    async def _report_progress(self, report: ReplayReport, total: int) -> None:
+        """Log throughput and ETA every progress_interval seconds."""
+        started = time.monotonic()
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            elapsed = time.monotonic() - started
+            remaining = sum(p.remaining for p in report.partitions)
+            REMAINING.set(remaining)
+            rate = (total - remaining) / elapsed
+            eta = remaining / rate if rate > 0 else float("inf")
+            extra = {
+                "events": report.events,
+                "remaining": remaining,
+                "events_per_second": round(rate, 1),
+                "eta_seconds": round(eta),
+            }
+            if self.rto_seconds is not None and elapsed + eta > self.rto_seconds:
+                logger.warning(
+                    "Replay projected to overrun the RTO", extra={**extra, "rto_seconds": self.rto_seconds}
+                )
+            else:
+                logger.info("Replay progress", extra=extra)
+
+
+def create_replay_consumer(bootstrap_servers: str, batch_size: int) -> AIOKafkaConsumer:
+    """
+    Factory function to create a group-less JSON consumer for replays.
+
+    Undecodable values come back as None and are counted as skipped.
+
+    Args:
+        bootstrap_servers: Comma-separated Kafka broker addresses
+        batch_size: Maximum records per poll
+
+    Returns:
+        AIOKafkaConsumer without a group or commits (not yet started)
+    """
+    def deserialize(value: bytes | None) -> Any:
+        try:
+            return json.loads(value.decode("utf-8")) if value is not None else None
+        except ValueError:
+            return None
+
+    return AIOKafkaConsumer(
+        bootstrap_servers=bootstrap_servers,
+        group_id=None,
+        enable_auto_commit=False,
+        isolation_level="read_committed",
+        max_poll_records=batch_size,
+        value_deserializer=deserialize,
+        key_deserializer=lambda k: k.decode("utf-8") if k else None,
+    )
+
+
+async def _replay_main(args: argparse.Namespace) -> ReplayReport:
+    settings = Settings()
+    consumer = create_replay_consumer(settings.kafka_brokers, args.batch_size)
+    db = DatabaseManager(to_async_url(settings.database_url), pool_size=args.connections)
+    await consumer.start()
+    try:
+        replayer = EventReplayer(
+            consumer,
+            db.session,
+            batch_size=args.batch_size,
+            progress_interval=args.progress_interval,
+            rto_seconds=args.rto_hours * 3600 if args.rto_hours else None,
+        )
+        report = await replayer.run(args.topics, parse_offsets(args.from_offset), args.from_timestamp)
+    finally:
+        await consumer.stop()
+        await db.close()
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report.as_dict(), f, indent=2)
+    return report
+
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Rebuild CoffeeBuddy tables by replaying Kafka events")
+    parser.add_argument("--topics", nargs="+", default=list(REPLAY_TOPICS))
+    parser.add_argument(
+        "--from-timestamp", type=datetime.fromisoformat, help="ISO timestamp, e.g. of the restored backup"
+    )
+    parser.add_argument(
+        "--from-offset", action="append", default=[], help="topic:partition=offset; overrides --from-timestamp"
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--connections", type=int, default=8, help="Database connections shared by the partitions")
+    parser.add_argument("--progress-interval", type=float, default=30.0)
+    parser.add_argument("--rto-hours", type=float, default=4.0)
+    parser.add_argument("--report", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    setup_logging("INFO")
+    report = asyncio.run(_replay_main(args))
+    print(json.dumps(report.as_dict(), indent=2))
+    if report.orphaned:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,24 @@
 """
 Kafka producer service for event publishing.
 
-Provides async Kafka producer with retry logic and schema validation.
+Provides async Kafka producer with retry logic and schema validation. With a
+spill journal configured, events the brokers do not take within
+spill_after seconds are written to the local journal instead of failing,
+and a background JournalReplayer sends them back in order once Kafka
+recovers. While the journal holds events, new ones are appended behind them
+rather than overtaking them. An event that times out may still reach Kafka
+later, so a spilled event can be delivered twice; consumers are idempotent.
 """
+import asyncio
 import json
 import logging
 from typing import Any
 
 from aiokafka import AIOKafkaProducer
-from aiokafka.errors import KafkaError
+from aiokafka.errors import KafkaConnectionError, KafkaError
+
+from ..config.logging_config import get_correlation_id
+from .spill_journal import SPILL_DROPPED, SPILLED, JournalFullError, JournalReplayer, SpillJournal, claim_journal
 
 logger = logging.getLogger(__name__)
 
@@ -16,32 +26,115 @@ logger = logging.getLogger(__name__)
 class KafkaProducer:
     """Async Kafka producer with retry and error handling."""
 
-    def __init__(self, bootstrap_servers: str):
+    def __init__(
+        self,
+        bootstrap_servers: str,
+        spill_dir: str | None = None,
+        spill_max_bytes: int = 512 * 1024 * 1024,
+        spill_segment_bytes: int = 16 * 1024 * 1024,
+        spill_after: float = 2.0,
+    ):
         """
         Initialize Kafka producer.
 
         Args:
             bootstrap_servers: Comma-separated Kafka broker addresses
+            spill_dir: Base directory for spill journals; None disables spilling
+            spill_max_bytes: Disk budget of this process's journal
+            spill_segment_bytes: Journal segment size
+            spill_after: Seconds to wait for the brokers before spilling an event
         """
         self.bootstrap_servers = bootstrap_servers
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self.spill_segment_bytes = spill_segment_bytes
+        self.spill_after = spill_after
         self._producer: AIOKafkaProducer | None = None
+        self.journal: SpillJournal | None = None
+        self._replayer_task: asyncio.Task | None = None
+        # Set while the initial connection is being retried in the background
+        self._connect_task: asyncio.Task | None = None
 
-    async def start(self) -> None:
-        """Start Kafka producer connection."""
-        self._producer = AIOKafkaProducer(
+    def _create_producer(self) -> AIOKafkaProducer:
+        return AIOKafkaProducer(
             bootstrap_servers=self.bootstrap_servers,
             value_serializer=lambda v: json.dumps(v).encode("utf-8"),
             key_serializer=lambda k: k.encode("utf-8") if k else None,
         )
-        await self._producer.start()
+
+    async def start(self) -> None:
+        """
+        Start Kafka producer connection.
+
+        With spilling enabled, unreachable brokers do not fail startup: events
+        are spilled while the connection is retried in the background.
+        """
+        self._producer = self._create_producer()
+        if self.spill_dir:
+            self.journal = claim_journal(
+                self.spill_dir, segment_bytes=self.spill_segment_bytes, max_bytes=self.spill_max_bytes
+            )
+            self._replayer_task = asyncio.create_task(JournalReplayer(self.journal, self._send).run())
+        try:
+            await self._producer.start()
+        except KafkaError as e:
+            # A client that failed to start still holds connections and tasks. With spilling,
+            # the closed client stays in place (publish() checks it) until a retry connects.
+            await self._producer.stop()
+            if self.journal is None:
+                self._producer = None
+                raise
+            logger.error("Kafka unavailable at startup; spilling events", extra={"error": str(e)})
+            self._connect_task = asyncio.create_task(self._connect_until_up())
         logger.info("Kafka producer started", extra={"bootstrap_servers": self.bootstrap_servers})
 
+    async def _connect_until_up(self, delay: float = 1.0, max_delay: float = 30.0) -> None:
+        """Retry the initial connection with a fresh client, backing off up to max_delay."""
+        while True:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+            producer = self._create_producer()
+            try:
+                await producer.start()
+            except KafkaError as e:
+                await producer.stop()
+                logger.warning("Kafka still unavailable", extra={"error": str(e), "retry_in": delay})
+                continue
+            except asyncio.CancelledError:
+                # stop() cancelled the retry while this client was connecting
+                await producer.stop()
+                raise
+            self._producer = producer
+            self._connect_task = None
+            logger.info("Kafka producer connected", extra={"bootstrap_servers": self.bootstrap_servers})
+            return
+
     async def stop(self) -> None:
-        """Stop Kafka producer connection."""
+        """Stop the replayer, close the journal and stop the Kafka connection."""
+        for task in (self._connect_task, self._replayer_task):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._connect_task = self._replayer_task = None
+        if self.journal:
+            self.journal.close()
+            self.journal = None
         if self._producer:
             await self._producer.stop()
+            self._producer = None
             logger.info("Kafka producer stopped")
 
+    async def _send(self, topic: str, key: str | None, value: dict, headers: dict[str, str]) -> None:
+        """Send straight to Kafka, waiting at most spill_after when spilling is enabled."""
+        if self._connect_task is not None:
+            raise KafkaConnectionError("Kafka producer not connected")
+        kafka_headers = [(k, v.encode("utf-8")) for k, v in headers.items()]
+        send = self._producer.send_and_wait(topic, value=value, key=key, headers=kafka_headers)
+        if self.journal is None:
+            await send
+        else:
+            await asyncio.wait_for(send, self.spill_after)
+
     async def publish(self, topic: str, key: str, value: dict, headers: dict[str, str] | None = None) -> None:
         """
         Publish event to Kafka topic.
@@ -53,33 +146,54 @@ class KafkaProducer:
             headers: Optional message headers
 
         Raises:
-            KafkaError: If publish fails after retries
+            KafkaError: If publish fails after retries (and the event could not be spilled)
         """
         if not self._producer:
             raise RuntimeError("Kafka producer not started")
 
-        # Convert headers to bytes
-        kafka_headers = [(k, v.encode("utf-8")) for k, v in (headers or {}).items()]
+        # Carry the current correlation_id to consumers unless the caller set one
+        headers = dict(headers or {})
+        correlation_id = get_correlation_id()
+        if correlation_id:
+            headers.setdefault("correlation_id", correlation_id)
+
+        if self.journal is not None and self.journal.pending:
+            # Older events are still spilled; going to Kafka directly would reorder them
+            await self._spill(topic, key, value, headers, error=None)
+            return
 
         try:
-            await self._producer.send_and_wait(topic, value=value, key=key, headers=kafka_headers)
+            await self._send(topic, key, value, headers)
             logger.debug("Published message to Kafka", extra={"topic": topic, "key": key})
-        except KafkaError as e:
-            logger.error("Failed to publish to Kafka", extra={"topic": topic, "error": str(e)}, exc_info=True)
-            raise
+        except (KafkaError, asyncio.TimeoutError) as e:
+            if self.journal is None:
+                logger.error("Failed to publish to Kafka", extra={"topic": topic, "error": str(e)}, exc_info=True)
+                raise
+            logger.warning("Kafka publish failed; spilling event", extra={"topic": topic, "error": str(e)})
+            await self._spill(topic, key, value, headers, error=e)
+
+    async def _spill(
+        self, topic: str, key: str, value: dict, headers: dict[str, str], error: Exception | None
+    ) -> None:
+        """Append an event to the journal, re-raising the Kafka failure if the journal is full."""
+        try:
+            await self.journal.append({"topic": topic, "key": key, "value": value, "headers": headers})
+        except JournalFullError as e:
+            SPILL_DROPPED.labels(topic=topic).inc()
+            logger.error("Spill journal full; event lost", extra={"topic": topic, "error": str(e)})
+            raise (error or KafkaError("Kafka backlog in spill journal")) from e
+        SPILLED.labels(topic=topic).inc()
 
 
-def create_kafka_producer(bootstrap_servers: str) -> KafkaProducer:
+def create_kafka_producer(bootstrap_servers: str, **spill_options: Any) -> KafkaProducer:
     """
     Factory function to create KafkaProducer instance.
 
     Args:
         bootstrap_servers: Comma-separated Kafka broker addresses
+        **spill_options: spill_dir and friends (see KafkaProducer); no spilling by default
 
     Returns:
         KafkaProducer instance
     """
-    return KafkaProducer(bootstrap_servers)
-```
-
-```markdown
\ No newline at end of file
+    return KafkaProducer(bootstrap_servers, **spill_options)
@@ -0,0 +1,343 @@
+"""
+Background pipeline for acknowledged Slack interactions.
+
+Slack needs an answer within 3 seconds, so the interactions handler only
+validates a submission, puts a job on this pipeline's bounded queue and
+acknowledges. Worker tasks then do the slow part:
+
+- OrderSubmission: handed to the OrderWriter, which commits the Order
+  (idempotent on the order_id minted at ack time), the UserPreference bump
+  and the audit row together with other workers' orders in one
+  transaction; the worker then publishes an `order_placed` event to
+  `coffee.orders`, and `coffee.users` for a user the replicated
+  UserDirectory does not know yet.
+- RunCompletion: mark the run completed (only by its initiator or runner),
+  audit, commit, then publish a `run_completed` event to `coffee.completions`.
+
+Published events carry the run context (workspace_id, channel_id,
+initiator_user_id), so a replay after a restore can recreate runs the
+backup does not have.
+
+Events are published only after commit, so consumers never see an order the
+database does not have. Jobs that keep failing after a few attempts go to the
+`slack.interactions.dlq` topic instead of being lost. The time from ack to
+commit is recorded per job kind.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, AsyncContextManager, Callable, Protocol
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage.models import AuditLog, CoffeeRun, User
+from storage.order_writer import OrderWrite, OrderWriter
+from storage.replay import RUN_CONTEXT
+
+from ..config.logging_config import correlation_scope
+from .retry import HEADER_ERROR, HEADER_SOURCE_TOPIC, backoff_delay, dlq_topic
+from .user_directory import USERS_TOPIC, UserDirectory, user_event
+
+logger = logging.getLogger(__name__)
+
+ORDERS_TOPIC = "coffee.orders"
+COMPLETIONS_TOPIC = "coffee.completions"
+INTERACTIONS_TOPIC = "slack.interactions"
+
+ACK_TO_COMMIT = Histogram(
+    "interaction_ack_to_commit_seconds",
+    "Time from acknowledging a Slack interaction to committing its effects",
+    ["kind"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+JOBS = Counter("interaction_jobs_total", "Background interaction jobs by outcome", ["kind", "outcome"])
+QUEUE_DEPTH = Gauge("interaction_queue_depth", "Interaction jobs waiting for a worker")
+
+SessionFactory = Callable[[], AsyncContextManager[AsyncSession]]
+
+
+class KafkaProducerProtocol(Protocol):
+    """Protocol for Kafka producer dependency."""
+
+    async def publish(self, topic: str, key: str, value: dict, headers: dict | None = None) -> None:
+        """Publish event to Kafka topic."""
+        ...
+
+
+@dataclass
+class OrderSubmission:
+    """A validated order modal submission."""
+
+    order_id: str
+    run_id: str
+    user_id: str
+    user_name: str
+    drink_type: str
+    size: str
+    customizations: str | None = None
+    correlation_id: str | None = None
+    acked_at: float = field(default_factory=time.monotonic)
+
+    kind = "order_submission"
+
+
+@dataclass
+class RunCompletion:
+    """A "Mark Complete" button press."""
+
+    run_id: str
+    user_id: str
+    correlation_id: str | None = None
+    acked_at: float = field(default_factory=time.monotonic)
+
+    kind = "run_completion"
+
+
+Job = OrderSubmission | RunCompletion
+
+
+def order_placed_event(job: OrderSubmission) -> dict[str, Any]:
+    """Build the `order_placed` event (also stored as the order's audit payload)."""
+    return {
+        "event_type": "order_placed",
+        "order_id": job.order_id,
+        "run_id": job.run_id,
+        "user_id": job.user_id,
+        "drink_type": job.drink_type,
+        "size": job.size,
+        "customizations": job.customizations,
+    }
+
+
+async def complete_run(session: AsyncSession, job: RunCompletion) -> dict[str, Any] | None:
+    """
+    Mark a run completed and audit it (caller commits).
+
+    Returns:
+        The `run_completed` event with the run context, or None if the run
+        is no longer active or the user is neither its initiator nor its runner
+    """
+    completed = await session.execute(
+        update(CoffeeRun)
+        .where(
+            CoffeeRun.run_id == job.run_id,
+            CoffeeRun.status == "active",
+            or_(CoffeeRun.initiator_user_id == job.user_id, CoffeeRun.runner_user_id == job.user_id),
+        )
+        .values(status="completed", completed_at=datetime.utcnow())
+        .returning(CoffeeRun.workspace_id, CoffeeRun.channel_id, CoffeeRun.initiator_user_id)
+    )
+    row = completed.one_or_none()
+    if row is None:
+        return None
+
+    event = {
+        "event_type": "run_completed",
+        "run_id": job.run_id,
+        "user_id": job.user_id,
+        **dict(zip(RUN_CONTEXT, row)),
+    }
+    session.add(AuditLog(event_type="run_completed", user_id=job.user_id, run_id=job.run_id, payload=event))
+    return event
+
+
+class OrderPipeline:
+    """Bounded queue plus worker tasks that persist acknowledged interactions."""
+
+    def __init__(
+        self,
+        session_factory: SessionFactory,
+        order_writer: OrderWriter,
+        kafka_producer: KafkaProducerProtocol,
+        queue_size: int = 1000,
+        workers: int = 4,
+        max_attempts: int = 3,
+        user_directory: UserDirectory | None = None,
+    ):
+        """
+        Initialize pipeline.
+
+        Args:
+            session_factory: Returns a session context manager (e.g. DatabaseManager.session)
+            order_writer: Coalesces order writes from all workers into shared transactions
+            kafka_producer: Kafka producer for domain events and the DLQ
+            queue_size: Jobs buffered before submit() starts refusing work
+            workers: Concurrent worker tasks; orders from concurrent workers share a batch
+            max_attempts: Attempts per job before it is dead-lettered
+            user_directory: Replicated directory; first-time orderers are announced on coffee.users
+        """
+        self.session_factory = session_factory
+        self.order_writer = order_writer
+        self.kafka_producer = kafka_producer
+        self.queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=queue_size)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.user_directory = user_directory
+        self._tasks: list[asyncio.Task] = []
+        # Runs never change workspace, channel or initiator, so their context is cached
+        self._run_contexts: OrderedDict[str, dict[str, str]] = OrderedDict()
+
+    def submit(self, job: Job) -> bool:
+        """
+        Queue a job without waiting.
+
+        Returns:
+            False if the queue is full; the caller should tell the user to retry
+        """
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            JOBS.labels(kind=job.kind, outcome="rejected").inc()
+            logger.warning("Interaction queue full", extra={"kind": job.kind, "run_id": job.run_id})
+            return False
+        QUEUE_DEPTH.set(self.queue.qsize())
+        return True
+
+    async def start(self) -> None:
+        """Start the worker tasks."""
+        self._tasks = [asyncio.create_task(self._worker(), name=f"order-pipeline-{i}") for i in range(self.workers)]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Drain queued jobs (up to timeout), then stop the workers.
+
+        Args:
+            timeout: Seconds to wait for the queue to drain
+        """
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("Interaction queue not drained on shutdown", extra={"pending": self.queue.qsize()})
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.queue.get()
+            QUEUE_DEPTH.set(self.queue.qsize())
+            try:
+                await self.process(job)
+            finally:
+                self.queue.task_done()
+
+    async def process(self, job: Job) -> None:
+        """Persist one job, retrying with backoff, then publish its event."""
+        with correlation_scope(job.correlation_id):
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    event = await self._commit(job)
+                    break
+                except Exception as e:
+                    if attempt == self.max_attempts:
+                        await self._dead_letter(job, e)
+                        return
+                    logger.warning(
+                        "Interaction job failed, retrying",
+                        extra={"kind": job.kind, "run_id": job.run_id, "attempt": attempt, "error": str(e)},
+                    )
+                    await asyncio.sleep(backoff_delay(attempt))
+
+            ACK_TO_COMMIT.labels(kind=job.kind).observe(time.monotonic() - job.acked_at)
+            if event is None:
+                JOBS.labels(kind=job.kind, outcome="skipped").inc()
+                return
+            JOBS.labels(kind=job.kind, outcome="committed").inc()
+
+            topic = ORDERS_TOPIC if isinstance(job, OrderSubmission) else COMPLETIONS_TOPIC
+            headers = {"correlation_id": job.correlation_id} if job.correlation_id else None
+            try:
+                await self.kafka_producer.publish(topic=topic, key=job.run_id, value=event, headers=headers)
+            except Exception as e:
+                # The database is the source of truth; a missing event is repaired by consumers' reloads
+                logger.error("Failed to publish interaction event", extra={"topic": topic, "error": str(e)})
+            if isinstance(job, OrderSubmission):
+                await self._announce_user(job)
+
+    async def _announce_user(self, job: OrderSubmission) -> None:
+        """Publish a user the directory has not seen, so every replica learns their name."""
+        if self.user_directory is None or job.user_id in self.user_directory:
+            return
+        # Publish the stored row, not the submitted name stamped now: while the directory is
+        # still catching up, the user may exist with a newer name that this must not overwrite
+        try:
+            async with self.session_factory() as session:
+                row = (
+                    await session.execute(
+                        select(User.display_name, User.updated_at).where(User.user_id == job.user_id)
+                    )
+                ).one_or_none()
+            if row is None:
+                return
+            value = user_event(job.user_id, *row)
+            self.user_directory.apply_record(job.user_id, value)
+            await self.kafka_producer.publish(topic=USERS_TOPIC, key=job.user_id, value=value)
+        except Exception as e:
+            # The users row is committed; other replicas pick the name up from their next backfill
+            logger.error("Failed to publish user", extra={"user_id": job.user_id, "error": str(e)})
+
+    async def _commit(self, job: Job) -> dict[str, Any] | None:
+        if isinstance(job, OrderSubmission):
+            event = order_placed_event(job)
+            created = await self.order_writer.write(
+                OrderWrite(
+                    order_id=job.order_id,
+                    run_id=job.run_id,
+                    user_id=job.user_id,
+                    drink_type=job.drink_type,
+                    size=job.size,
+                    customizations=job.customizations,
+                    display_name=job.user_name,
+                    audit_payload=event,
+                )
+            )
+            if not created:
+                # Redelivered, or retried after a commit whose acknowledgement was lost: the order
+                # exists either way, so it is still published (consumers upsert by order_id)
+                logger.info("Order already written", extra={"order_id": job.order_id, "run_id": job.run_id})
+            return {**event, "user_name": job.user_name, **await self._run_context(job.run_id)}
+        async with self.session_factory() as session:
+            event = await complete_run(session, job)
+            await session.commit()
+            return event
+
+    async def _run_context(self, run_id: str) -> dict[str, str]:
+        """workspace_id, channel_id and initiator_user_id of a run, for published events."""
+        context = self._run_contexts.get(run_id)
+        if context is None:
+            async with self.session_factory() as session:
+                row = (
+                    await session.execute(
+                        select(CoffeeRun.workspace_id, CoffeeRun.channel_id, CoffeeRun.initiator_user_id).where(
+                            CoffeeRun.run_id == run_id
+                        )
+                    )
+                ).one()
+            context = self._run_contexts[run_id] = dict(zip(RUN_CONTEXT, row))
+            while len(self._run_contexts) > 1024:
+                self._run_contexts.popitem(last=False)
+        return context
+
+    async def _dead_letter(self, job: Job, error: Exception) -> None:
+        JOBS.labels(kind=job.kind, outcome="dead_lettered").inc()
+        logger.error(
+            "Interaction job dead-lettered",
+            extra={"kind": job.kind, "run_id": job.run_id, "error": str(error)},
+            exc_info=error,
+        )
+        value = {"kind": job.kind, **{k: v for k, v in asdict(job).items() if k != "acked_at"}}
+        headers = {HEADER_SOURCE_TOPIC: INTERACTIONS_TOPIC, HEADER_ERROR: f"{type(error).__name__}: {error}"[:500]}
+        if job.correlation_id:
+            headers["correlation_id"] = job.correlation_id
+        try:
+            await self.kafka_producer.publish(
+                topic=dlq_topic(INTERACTIONS_TOPIC), key=job.run_id, value=value, headers=headers
+            )
+        except Exception as e:
+            logger.error("Failed to dead-letter interaction job", extra={"value": value, "error": str(e)})
@@ -0,0 +1,200 @@
+"""
+On-demand CPU profiling of the running worker process.
+
+Two modes, both bounded in duration and limited to one run at a time:
+
+- sampling: a CPU-time interval timer (SIGPROF) samples the event-loop
+  thread's stack and aggregates collapsed stacks ("frame;frame;frame count"),
+  ready for flamegraph.pl or speedscope. Each sample is rooted at the asyncio
+  task that was running, so coroutine work is attributed per task. Overhead
+  is a few microseconds per sample.
+- deterministic: cProfile is enabled on the event-loop thread, which every
+  task runs on, and the result is returned as a pstats-loadable dump. Much
+  more expensive, so it gets a shorter maximum duration.
+"""
+import asyncio
+import cProfile
+import marshal
+import os
+import signal
+import threading
+from collections import Counter
+from types import FrameType
+from typing import Any
+
+from prometheus_client import Counter as PromCounter
+
+PROFILES_RUN = PromCounter("admin_profiles_total", "Profiles taken through the admin endpoint", ["mode"])
+
+MAX_SAMPLING_SECONDS = 60.0
+MAX_DETERMINISTIC_SECONDS = 10.0
+MIN_INTERVAL_SECONDS = 0.005
+MAX_STACK_DEPTH = 64
+MAX_DISTINCT_STACKS = 10000
+OVERFLOW_STACK = "[profiler: distinct stack limit reached]"
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another one is running."""
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame: FrameType | None, max_depth: int = MAX_STACK_DEPTH) -> list[str]:
+    """
+    Turn a frame into a root-first list of frame labels.
+
+    Args:
+        frame: Innermost frame
+        max_depth: Frames kept from the innermost end; deeper stacks are truncated at the root
+
+    Returns:
+        Frame labels, outermost first
+    """
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class SamplingProfiler:
+    """
+    Samples the main thread's stack on a CPU-time interval timer.
+
+    Uses ITIMER_PROF/SIGPROF: the handler runs on the main thread (where the
+    event loop runs) between bytecodes and is given the frame that was
+    executing, so samples are not biased towards GIL release points the way
+    a sampler thread reading sys._current_frames() would be. Idle time in
+    the selector consumes no CPU and therefore is not sampled.
+    """
+
+    def __init__(self, interval: float):
+        """
+        Initialize profiler.
+
+        Args:
+            interval: CPU seconds between samples (at least MIN_INTERVAL_SECONDS)
+        """
+        self.interval = max(interval, MIN_INTERVAL_SECONDS)
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._previous_handler: Any = None
+
+    def sample(self, frame: FrameType | None) -> None:
+        """Record one sample of the given frame."""
+        if frame is None:
+            return
+        labels = collapse_stack(frame)
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is not None:
+            labels.insert(0, f"task:{task.get_name()}")
+        key = ";".join(labels)
+        if key not in self.stacks and len(self.stacks) >= MAX_DISTINCT_STACKS:
+            key = OVERFLOW_STACK
+        self.stacks[key] += 1
+        self.samples += 1
+
+    def _on_signal(self, signum: int, frame: FrameType | None) -> None:
+        self.sample(frame)
+
+    def start(self) -> None:
+        """
+        Start sampling.
+
+        Raises:
+            RuntimeError: If not called from the main thread
+        """
+        if threading.current_thread() is not threading.main_thread():
+            raise RuntimeError("The sampling profiler must run on the main thread")
+        self._previous_handler = signal.signal(signal.SIGPROF, self._on_signal)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self) -> None:
+        """Stop sampling and restore the previous SIGPROF handler."""
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler)
+
+    def collapsed(self) -> str:
+        """Return samples in collapsed-stack format, most frequent first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProcessProfiler:
+    """Runs bounded profiles of the current process, one at a time."""
+
+    def __init__(
+        self,
+        max_sampling_seconds: float = MAX_SAMPLING_SECONDS,
+        max_deterministic_seconds: float = MAX_DETERMINISTIC_SECONDS,
+    ):
+        """
+        Initialize profiler.
+
+        Args:
+            max_sampling_seconds: Upper bound for sampling profiles
+            max_deterministic_seconds: Upper bound for cProfile runs
+        """
+        self.max_sampling_seconds = max_sampling_seconds
+        self.max_deterministic_seconds = max_deterministic_seconds
+        self._lock = asyncio.Lock()
+
+    async def sample(self, seconds: float, interval: float = 0.01) -> str:
+        """
+        Sample the event-loop thread for a bounded time.
+
+        Args:
+            seconds: Requested duration, clamped to max_sampling_seconds
+            interval: Seconds between samples, at least MIN_INTERVAL_SECONDS
+
+        Returns:
+            Collapsed stacks
+
+        Raises:
+            ProfilerBusyError: If another profile is running
+        """
+        async with self._exclusive():
+            profiler = SamplingProfiler(interval)
+            profiler.start()
+            try:
+                await asyncio.sleep(min(seconds, self.max_sampling_seconds))
+            finally:
+                profiler.stop()
+            PROFILES_RUN.labels(mode="sampling").inc()
+            return profiler.collapsed()
+
+    async def trace(self, seconds: float) -> bytes:
+        """
+        Run cProfile on the event-loop thread for a bounded time.
+
+        Args:
+            seconds: Requested duration, clamped to max_deterministic_seconds
+
+        Returns:
+            Marshalled stats, loadable with pstats.Stats(path)
+
+        Raises:
+            ProfilerBusyError: If another profile is running
+        """
+        async with self._exclusive():
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                await asyncio.sleep(min(seconds, self.max_deterministic_seconds))
+            finally:
+                profile.disable()
+            profile.create_stats()
+            PROFILES_RUN.labels(mode="deterministic").inc()
+            return marshal.dumps(profile.stats)
+
+    def _exclusive(self) -> asyncio.Lock:
+        if self._lock.locked():
+            raise ProfilerBusyError("A profile is already running")
+        return self._lock
@@ -0,0 +1,422 @@
+"""
+Tiered Kafka retry subsystem.
+
+Failed deliveries (e.g. Slack 429s) are not retried in place, which would
+block fresh events behind them. Instead they are republished to a delay tier
+of their source topic (<topic>.retry.1s, .retry.10s, .retry.60s) with attempt
+metadata in the headers, and a per-tier worker re-delivers each event once
+it is due, sleeping until then rather than polling. Events that exhaust
+their attempts, or fail permanently, land in <topic>.dlq, from where the
+replay command republishes them to their source topic.
+
+Usage:
+    python -m src.services.retry replay --dlq coffee.assignments.dlq [--max-messages N] [--dry-run]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Protocol
+
+from aiokafka import AIOKafkaConsumer, TopicPartition
+from prometheus_client import Counter
+
+from ..config.logging_config import correlation_scope, setup_logging
+from ..config.settings import Settings
+from .kafka_producer import create_kafka_producer
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 10
+BACKOFF_CAP_SECONDS = 60.0
+
+HEADER_ATTEMPT = "retry_attempt"
+HEADER_NOT_BEFORE = "retry_not_before"
+HEADER_SOURCE_TOPIC = "retry_source_topic"
+HEADER_ERROR = "retry_error"
+RETRY_HEADERS = (HEADER_ATTEMPT, HEADER_NOT_BEFORE, HEADER_SOURCE_TOPIC, HEADER_ERROR)
+
+RETRIES_SCHEDULED = Counter("event_retries_scheduled_total", "Events republished to a retry tier", ["tier"])
+DEAD_LETTERED = Counter("event_retries_dead_lettered_total", "Events moved to a dead-letter topic", ["source_topic"])
+RETRY_DELIVERIES = Counter(
+    "event_retry_deliveries_total", "Re-delivery attempts made by retry workers", ["tier", "outcome"]
+)
+DLQ_REPLAYED = Counter("event_dlq_replayed_total", "Dead-lettered events republished to their source topic")
+
+# (source_topic, key, value, headers) -> None; raising schedules a retry
+EventHandler = Callable[[str, str | None, dict[str, Any], dict[str, str]], Awaitable[None]]
+
+
+class PermanentError(Exception):
+    """Delivery failure that retrying cannot fix; the event goes straight to the DLQ."""
+
+
+class KafkaProducerProtocol(Protocol):
+    """Protocol for Kafka producer dependency."""
+
+    async def publish(self, topic: str, key: str, value: dict, headers: dict | None = None) -> None:
+        """Publish event to Kafka topic."""
+        ...
+
+
+@dataclass(frozen=True)
+class RetryTier:
+    """A fixed-delay retry topic."""
+
+    name: str
+    delay: float
+
+    def topic(self, source_topic: str) -> str:
+        """Return this tier's topic for a source topic."""
+        return f"{source_topic}.retry.{self.name}"
+
+
+DEFAULT_TIERS = (RetryTier("1s", 1.0), RetryTier("10s", 10.0), RetryTier("60s", 60.0))
+
+
+def dlq_topic(source_topic: str) -> str:
+    """Return the dead-letter topic for a source topic."""
+    return f"{source_topic}.dlq"
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff for a retry attempt: 1s, 2s, 4s, ... capped at 60s."""
+    return min(2.0 ** (attempt - 1), BACKOFF_CAP_SECONDS)
+
+
+def decode_headers(headers: Any) -> dict[str, str]:
+    """Convert Kafka record headers (sequence of (str, bytes)) to a dict."""
+    return {k: v.decode("utf-8") if isinstance(v, bytes) else str(v) for k, v in headers or ()}
+
+
+class RetryPolicy:
+    """Maps attempt numbers onto retry tiers."""
+
+    def __init__(self, tiers: tuple[RetryTier, ...] = DEFAULT_TIERS, max_attempts: int = MAX_ATTEMPTS):
+        """
+        Initialize retry policy.
+
+        Args:
+            tiers: Available tiers, ordered by increasing delay
+            max_attempts: Retries allowed before an event is dead-lettered
+        """
+        self.tiers = tiers
+        self.max_attempts = max_attempts
+
+    def tier_for(self, attempt: int) -> RetryTier | None:
+        """
+        Pick the shortest tier that honours the backoff for an attempt.
+
+        Args:
+            attempt: 1-based retry attempt number
+
+        Returns:
+            RetryTier, or None once attempts are exhausted
+        """
+        if attempt > self.max_attempts:
+            return None
+        wanted = backoff_delay(attempt)
+        for tier in self.tiers:
+            if tier.delay >= wanted:
+                return tier
+        return self.tiers[-1]
+
+
+class RetryScheduler:
+    """Publishes failed events to their next retry tier or the DLQ."""
+
+    def __init__(self, kafka_producer: KafkaProducerProtocol, policy: RetryPolicy | None = None):
+        """
+        Initialize scheduler with injected producer.
+
+        Args:
+            kafka_producer: Kafka producer for retry and DLQ topics
+            policy: Retry policy (default: 1s/10s/60s tiers, 10 attempts)
+        """
+        self.kafka_producer = kafka_producer
+        self.policy = policy or RetryPolicy()
+
+    async def schedule(
+        self,
+        source_topic: str,
+        key: str | None,
+        value: dict[str, Any],
+        headers: dict[str, str],
+        attempt: int,
+        error: Exception,
+    ) -> str:
+        """
+        Republish a failed event for retry attempt `attempt`.
+
+        Args:
+            source_topic: Topic the event was originally consumed from
+            key: Message key (kept so partitioning is unchanged)
+            value: Event payload
+            headers: Original headers; correlation_id and friends are preserved
+            attempt: 1-based number of the retry being scheduled
+            error: The failure that triggered the retry
+
+        Returns:
+            Topic the event was published to
+        """
+        tier = None if isinstance(error, PermanentError) else self.policy.tier_for(attempt)
+        retry_headers = {k: v for k, v in headers.items() if k not in RETRY_HEADERS}
+        retry_headers.update(
+            {
+                HEADER_ATTEMPT: str(attempt),
+                HEADER_SOURCE_TOPIC: source_topic,
+                HEADER_ERROR: f"{type(error).__name__}: {error}"[:500],
+            }
+        )
+
+        if tier is None:
+            topic = dlq_topic(source_topic)
+            DEAD_LETTERED.labels(source_topic=source_topic).inc()
+            logger.warning(
+                "Event dead-lettered", extra={"source_topic": source_topic, "key": key, "attempt": attempt}
+            )
+        else:
+            topic = tier.topic(source_topic)
+            retry_headers[HEADER_NOT_BEFORE] = str(int((time.time() + tier.delay) * 1000))
+            RETRIES_SCHEDULED.labels(tier=tier.name).inc()
+            logger.info(
+                "Event scheduled for retry",
+                extra={"source_topic": source_topic, "key": key, "attempt": attempt, "tier": tier.name},
+            )
+
+        await self.kafka_producer.publish(topic=topic, key=key, value=value, headers=retry_headers)
+        return topic
+
+    async def deliver(
+        self,
+        handler: EventHandler,
+        source_topic: str,
+        key: str | None,
+        value: dict[str, Any],
+        headers: dict[str, str],
+    ) -> bool:
+        """
+        Deliver a fresh event, handing it to the retry tiers if the handler fails.
+
+        Used by main-topic consumers so a failing event never blocks the ones behind it.
+
+        Returns:
+            True if the handler succeeded, False if the event was scheduled for retry
+        """
+        with correlation_scope(headers.get("correlation_id")):
+            try:
+                await handler(source_topic, key, value, headers)
+                return True
+            except Exception as e:
+                await self.schedule(source_topic, key, value, headers, attempt=1, error=e)
+                return False
+
+
+class RateLimiter:
+    """Token-bucket limiter pacing re-deliveries to a downstream budget (e.g. Slack 50 req/min)."""
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        """
+        Initialize rate limiter.
+
+        Args:
+            rate_per_minute: Sustained calls allowed per minute
+            burst: Calls allowed back to back before pacing starts
+        """
+        self.interval = 60.0 / rate_per_minute
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a call is allowed."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.interval)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.interval)
+
+
+class RetryTierWorker:
+    """Consumes one retry tier topic and re-delivers events once they are due."""
+
+    def __init__(
+        self,
+        consumer: AIOKafkaConsumer,
+        scheduler: RetryScheduler,
+        handler: EventHandler,
+        tier: RetryTier,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        """
+        Initialize worker with injected dependencies.
+
+        Args:
+            consumer: Consumer subscribed to the tier topic, with auto-commit disabled
+            scheduler: Scheduler for events that fail again
+            handler: Delivery function, shared with the main-topic consumer
+            tier: The tier this worker drains
+            rate_limiter: Optional limiter shared by all workers calling the same API
+        """
+        self.consumer = consumer
+        self.scheduler = scheduler
+        self.handler = handler
+        self.tier = tier
+        self.rate_limiter = rate_limiter
+
+    async def process(self, record: Any) -> None:
+        """
+        Re-deliver one tier record, sleeping until it is due.
+
+        A tier has a single fixed delay, so records become due in the order
+        they were written and the head of the partition is always the next
+        one due: sleeping on it never delays an event that is already due.
+        """
+        headers = decode_headers(record.headers)
+        due_in = int(headers.get(HEADER_NOT_BEFORE, "0")) / 1000 - time.time()
+        if due_in > 0:
+            await asyncio.sleep(due_in)
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+
+        attempt = int(headers.get(HEADER_ATTEMPT, "1"))
+        source_topic = headers.get(HEADER_SOURCE_TOPIC) or record.topic.rsplit(".retry.", 1)[0]
+        with correlation_scope(headers.get("correlation_id")):
+            try:
+                await self.handler(source_topic, record.key, record.value, headers)
+                RETRY_DELIVERIES.labels(tier=self.tier.name, outcome="delivered").inc()
+            except Exception as e:
+                RETRY_DELIVERIES.labels(tier=self.tier.name, outcome="failed").inc()
+                await self.scheduler.schedule(source_topic, record.key, record.value, headers, attempt + 1, e)
+
+    async def run(self) -> None:
+        """Process records until cancelled, committing after each one."""
+        async for record in self.consumer:
+            await self.process(record)
+            await self.consumer.commit()
+
+
+def create_retry_consumer(bootstrap_servers: str, topic: str, group_id: str) -> AIOKafkaConsumer:
+    """
+    Factory function to create a JSON consumer for retry and DLQ topics.
+
+    Args:
+        bootstrap_servers: Comma-separated Kafka broker addresses
+        topic: Topic to subscribe to
+        group_id: Consumer group
+
+    Returns:
+        AIOKafkaConsumer with manual commits (not yet started)
+    """
+    return AIOKafkaConsumer(
+        topic,
+        bootstrap_servers=bootstrap_servers,
+        group_id=group_id,
+        enable_auto_commit=False,
+        auto_offset_reset="earliest",
+        value_deserializer=lambda v: json.loads(v.decode("utf-8")),
+        key_deserializer=lambda k: k.decode("utf-8") if k else None,
+    )
+
+
+async def replay_dlq(
+    consumer: AIOKafkaConsumer,
+    kafka_producer: KafkaProducerProtocol,
+    max_messages: int | None = None,
+    dry_run: bool = False,
+    assignment_timeout: float = 60.0,
+) -> int:
+    """
+    Republish dead-lettered events to their source topic with a fresh attempt count.
+
+    Waits for the group to assign the DLQ partitions, takes their end offsets
+    and stops once every partition's position has reached them (or
+    max_messages have been replayed). Empty polls do not end the replay:
+    they are normal while the group is joining or a fetch is slow. Offsets
+    are committed per batch, so an interrupted replay resumes where it
+    stopped.
+
+    Args:
+        consumer: Started consumer subscribed to the DLQ
+        kafka_producer: Producer for the source topics
+        max_messages: Optional cap on replayed events
+        dry_run: Log what would be replayed without publishing or committing
+        assignment_timeout: Seconds to wait for the partition assignment
+
+    Returns:
+        Number of events replayed
+
+    Raises:
+        TimeoutError: If no partitions were assigned within assignment_timeout
+    """
+    replayed = 0
+    end: dict[TopicPartition, int] | None = None
+    deadline = time.monotonic() + assignment_timeout
+    while max_messages is None or replayed < max_messages:
+        if end is None and consumer.assignment():
+            # Records produced after this snapshot are left for the next replay
+            end = await consumer.end_offsets(list(consumer.assignment()))
+        if end is not None:
+            if all([await consumer.position(tp) >= offset for tp, offset in end.items()]):
+                break
+        elif time.monotonic() >= deadline:
+            raise TimeoutError(f"No DLQ partitions assigned within {assignment_timeout:.0f}s")
+        batches = await consumer.getmany(timeout_ms=1000, max_records=max_messages and max_messages - replayed)
+        for records in batches.values():
+            for record in records:
+                headers = decode_headers(record.headers)
+                source_topic = headers.get(HEADER_SOURCE_TOPIC) or record.topic.removesuffix(".dlq")
+                logger.info(
+                    "Replaying dead-lettered event",
+                    extra={"source_topic": source_topic, "key": record.key, "error": headers.get(HEADER_ERROR)},
+                )
+                if not dry_run:
+                    clean_headers = {k: v for k, v in headers.items() if k not in RETRY_HEADERS}
+                    await kafka_producer.publish(
+                        topic=source_topic, key=record.key, value=record.value, headers=clean_headers
+                    )
+                    DLQ_REPLAYED.inc()
+                replayed += 1
+        if batches and not dry_run:
+            await consumer.commit()
+    return replayed
+
+
+async def _replay_main(args: argparse.Namespace) -> None:
+    settings = Settings()
+    consumer = create_retry_consumer(settings.kafka_brokers, args.dlq, args.group_id)
+    producer = create_kafka_producer(settings.kafka_brokers)
+    await consumer.start()
+    await producer.start()
+    try:
+        replayed = await replay_dlq(consumer, producer, args.max_messages, args.dry_run)
+        logger.info(f"{'Would replay' if args.dry_run else 'Replayed'} {replayed} event(s) from {args.dlq}")
+    finally:
+        await producer.stop()
+        await consumer.stop()
+
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="CoffeeBuddy retry tooling")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    replay = subparsers.add_parser("replay", help="Republish dead-lettered events to their source topic")
+    replay.add_argument("--dlq", required=True, help="Dead-letter topic, e.g. coffee.assignments.dlq")
+    replay.add_argument("--group-id", default="coffeebuddy-dlq-replay")
+    replay.add_argument("--max-messages", type=int)
+    replay.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    setup_logging("INFO")
+    asyncio.run(_replay_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Run summary service for coffee run threads.
+
+Keeps a per-run aggregate (participants, drink/size histogram, order count)
+up to date from coffee.orders events and renders the Slack summary blocks
+from it, so a new order never re-queries every order of the run. An update
+is only emitted when the rendered blocks actually change.
+"""
+import hashlib
+import json
+import logging
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+ORDER_PLACED = "order_placed"
+ORDER_UPDATED = "order_updated"
+ORDER_CANCELLED = "order_cancelled"
+
+# Loads the current orders of a run (as order event payloads) when its aggregate is not in memory
+OrderLoader = Callable[[str], Awaitable[list[dict[str, Any]]]]
+
+
+@dataclass(frozen=True)
+class OrderLine:
+    """The part of an order that contributes to the run summary."""
+
+    user_id: str
+    drink_type: str
+    size: str
+
+
+@dataclass
+class SummaryUpdate:
+    """Rendered summary to push to the run's Slack thread."""
+
+    run_id: str
+    channel_id: str | None
+    message_ts: str | None
+    text: str
+    blocks: list[dict[str, Any]]
+
+
+@dataclass
+class RunSummary:
+    """Incrementally maintained aggregate of one coffee run's orders."""
+
+    run_id: str
+    channel_id: str | None = None
+    message_ts: str | None = None
+    orders: dict[str, OrderLine] = field(default_factory=dict)
+    participants: Counter = field(default_factory=Counter)
+    histogram: Counter = field(default_factory=Counter)
+    rendered_digest: str | None = None
+
+    @property
+    def order_count(self) -> int:
+        """Number of active orders in the run."""
+        return len(self.orders)
+
+    def apply(self, event: dict[str, Any]) -> bool:
+        """
+        Fold one coffee.orders event into the aggregate.
+
+        Redelivered events are harmless: orders are keyed by order_id, so
+        placing a known order or cancelling an unknown one is a no-op.
+
+        Args:
+            event: Order event payload (event_type, order_id, user_id, drink_type, size)
+
+        Returns:
+            True if the aggregate changed, False otherwise
+        """
+        self.channel_id = event.get("channel_id") or self.channel_id
+        self.message_ts = event.get("message_ts") or self.message_ts
+
+        event_type = event.get("event_type", ORDER_PLACED)
+        order_id = str(event["order_id"])
+        current = self.orders.get(order_id)
+
+        if event_type == ORDER_CANCELLED:
+            if current is None:
+                return False
+            self._remove(order_id, current)
+            return True
+
+        line = OrderLine(user_id=event["user_id"], drink_type=event["drink_type"], size=event["size"])
+        if current == line or (current is not None and event_type == ORDER_PLACED):
+            return False
+        if current is not None:
+            self._remove(order_id, current)
+        self.orders[order_id] = line
+        self.participants[line.user_id] += 1
+        self.histogram[(line.drink_type, line.size)] += 1
+        return True
+
+    def _remove(self, order_id: str, line: OrderLine) -> None:
+        del self.orders[order_id]
+        self.participants[line.user_id] -= 1
+        if self.participants[line.user_id] <= 0:
+            del self.participants[line.user_id]
+        self.histogram[(line.drink_type, line.size)] -= 1
+        if self.histogram[(line.drink_type, line.size)] <= 0:
+            del self.histogram[(line.drink_type, line.size)]
+
+    def headline(self) -> str:
+        """Plain-text summary, used as the chat.update fallback text."""
+        orders = "order" if self.order_count == 1 else "orders"
+        people = "person" if len(self.participants) == 1 else "people"
+        return f"Coffee run: {self.order_count} {orders} from {len(self.participants)} {people}"
+
+    def render(self) -> list[dict[str, Any]]:
+        """
+        Render the Slack blocks for the run summary.
+
+        Output is deterministic for a given aggregate (sorted histogram and
+        participants), so equal aggregates always render identical blocks.
+
+        Returns:
+            Slack Block Kit blocks
+        """
+        blocks: list[dict[str, Any]] = [
+            {"type": "section", "text": {"type": "mrkdwn", "text": f"*{self.headline()}*"}}
+        ]
+        if self.histogram:
+            lines = [
+                f"• {count}× {size.title()} {drink.title()}"
+                for (drink, size), count in sorted(self.histogram.items(), key=lambda kv: (-kv[1], kv[0]))
+            ]
+            blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": "\n".join(lines)}})
+            mentions = ", ".join(f"<@{user_id}>" for user_id in sorted(self.participants))
+            blocks.append({"type": "context", "elements": [{"type": "mrkdwn", "text": f"Participants: {mentions}"}]})
+        return blocks
+
+
+def _digest(blocks: list[dict[str, Any]]) -> str:
+    return hashlib.sha256(json.dumps(blocks, sort_keys=True).encode()).hexdigest()
+
+
+class RunSummaryService:
+    """Maintains run summaries from coffee.orders events and emits changed renders."""
+
+    def __init__(self, order_loader: OrderLoader | None = None, max_runs: int = 1024):
+        """
+        Initialize run summary service.
+
+        Args:
+            order_loader: Optional loader used once per run to seed an aggregate
+                that is not in memory (e.g. after a restart or eviction)
+            max_runs: Maximum number of run aggregates kept in memory (LRU)
+        """
+        self.order_loader = order_loader
+        self.max_runs = max_runs
+        self._summaries: OrderedDict[str, RunSummary] = OrderedDict()
+
+    def get(self, run_id: str) -> RunSummary | None:
+        """Return the in-memory aggregate for a run, if any."""
+        return self._summaries.get(run_id)
+
+    def forget(self, run_id: str) -> None:
+        """Drop a run's aggregate, e.g. once the run is completed or cancelled."""
+        self._summaries.pop(run_id, None)
+
+    async def _summary_for(self, run_id: str) -> RunSummary:
+        summary = self._summaries.get(run_id)
+        if summary is not None:
+            self._summaries.move_to_end(run_id)
+            return summary
+
+        summary = RunSummary(run_id=run_id)
+        if self.order_loader is not None:
+            for order in await self.order_loader(run_id):
+                summary.apply({**order, "event_type": ORDER_PLACED})
+            logger.debug("Seeded run summary", extra={"run_id": run_id, "orders": summary.order_count})
+
+        self._summaries[run_id] = summary
+        while len(self._summaries) > self.max_runs:
+            evicted, _ = self._summaries.popitem(last=False)
+            logger.debug("Evicted run summary", extra={"run_id": evicted})
+        return summary
+
+    async def handle_event(self, event: dict[str, Any]) -> SummaryUpdate | None:
+        """
+        Apply a coffee.orders event and return the new summary if it changed.
+
+        Args:
+            event: Order event payload; must include run_id and order_id
+
+        Returns:
+            SummaryUpdate when the rendered blocks differ from the last emitted
+            ones, None otherwise
+        """
+        run_id = str(event["run_id"])
+        summary = await self._summary_for(run_id)
+        if not summary.apply(event) and summary.rendered_digest is not None:
+            return None
+
+        blocks = summary.render()
+        digest = _digest(blocks)
+        if digest == summary.rendered_digest:
+            return None
+        summary.rendered_digest = digest
+
+        logger.info(
+            "Run summary changed",
+            extra={"run_id": run_id, "orders": summary.order_count, "participants": len(summary.participants)},
+        )
+        return SummaryUpdate(
+            run_id=run_id,
+            channel_id=summary.channel_id,
+            message_ts=summary.message_ts,
+            text=summary.headline(),
+            blocks=blocks,
+        )
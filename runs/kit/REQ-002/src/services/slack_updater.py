@@ -0,0 +1,148 @@
+"""
+Debounced, coalescing Slack message updater.
+
+Sits between order processing (e.g. RunSummaryService) and the Slack client.
+Updates for the same (channel, message_ts) that arrive within the debounce
+window are coalesced and only the latest state is sent with chat.update,
+while max_staleness bounds how long a pending update can be held back.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+UPDATES_SUBMITTED = Counter(
+    "slack_message_updates_submitted_total", "Message updates handed to the coalescer"
+)
+UPDATES_SENT = Counter("slack_message_updates_sent_total", "chat.update calls made by the coalescer")
+UPDATES_COALESCED = Counter(
+    "slack_message_updates_coalesced_total", "Message updates superseded before being sent (calls saved)"
+)
+UPDATES_FAILED = Counter("slack_message_updates_failed_total", "chat.update calls that raised")
+UPDATE_DELAY = Histogram(
+    "slack_message_update_delay_seconds",
+    "Time from the first pending update of a message to its chat.update",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0),
+)
+
+
+class SlackClientProtocol(Protocol):
+    """Protocol for the Slack Web API client dependency."""
+
+    async def chat_update(self, *, channel: str, ts: str, text: str, blocks: list[dict[str, Any]]) -> Any:
+        """Update an existing Slack message."""
+        ...
+
+
+@dataclass
+class _PendingUpdate:
+    text: str
+    blocks: list[dict[str, Any]]
+    first_submitted_at: float
+    deadline: float
+
+
+class SlackMessageCoalescer:
+    """Coalesces chat.update calls per (channel, message_ts) within a debounce window."""
+
+    def __init__(self, slack_client: SlackClientProtocol, window: float = 2.0, max_staleness: float = 10.0):
+        """
+        Initialize coalescer with injected Slack client.
+
+        Args:
+            slack_client: Client exposing chat_update (e.g. slack_sdk AsyncWebClient)
+            window: Seconds to wait after the latest update before sending it
+            max_staleness: Maximum seconds an update may stay pending, however
+                often it is superseded
+
+        Raises:
+            ValueError: If window is negative or max_staleness is below window
+        """
+        if window < 0 or max_staleness < window:
+            raise ValueError("window must be >= 0 and max_staleness >= window")
+        self.slack_client = slack_client
+        self.window = window
+        self.max_staleness = max_staleness
+        self._pending: dict[tuple[str, str], _PendingUpdate] = {}
+        self._workers: dict[tuple[str, str], asyncio.Task] = {}
+        self._flushing = asyncio.Event()
+
+    @property
+    def pending_count(self) -> int:
+        """Number of messages with an update waiting to be sent."""
+        return len(self._pending)
+
+    def submit(self, channel_id: str, message_ts: str, text: str, blocks: list[dict[str, Any]]) -> None:
+        """
+        Queue the latest state of a message; supersedes any pending state.
+
+        Must be called from a running event loop. Returns immediately; the
+        update is sent by a per-message worker once the message has been quiet
+        for `window` seconds, or `max_staleness` after its first pending update.
+
+        Args:
+            channel_id: Slack channel of the message
+            message_ts: Slack timestamp identifying the message
+            text: Fallback text
+            blocks: Block Kit blocks
+        """
+        key = (channel_id, message_ts)
+        now = asyncio.get_running_loop().time()
+        UPDATES_SUBMITTED.inc()
+
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = _PendingUpdate(text, blocks, first_submitted_at=now, deadline=now + self.window)
+        else:
+            UPDATES_COALESCED.inc()
+            pending.text, pending.blocks = text, blocks
+            pending.deadline = min(now + self.window, pending.first_submitted_at + self.max_staleness)
+
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._run(key))
+
+    async def _run(self, key: tuple[str, str]) -> None:
+        # One worker per message keeps its chat.update calls ordered and non-overlapping
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = self._pending.get(key)
+            if pending is None:
+                del self._workers[key]
+                return
+            delay = pending.deadline - loop.time()
+            if delay > 0 and not self._flushing.is_set():
+                try:
+                    await asyncio.wait_for(self._flushing.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            del self._pending[key]
+            UPDATE_DELAY.observe(loop.time() - pending.first_submitted_at)
+            channel_id, message_ts = key
+            try:
+                await self.slack_client.chat_update(
+                    channel=channel_id, ts=message_ts, text=pending.text, blocks=pending.blocks
+                )
+                UPDATES_SENT.inc()
+            except Exception as e:
+                UPDATES_FAILED.inc()
+                logger.error(
+                    "Failed to update Slack message",
+                    extra={"channel_id": channel_id, "message_ts": message_ts, "error": str(e)},
+                    exc_info=True,
+                )
+
+    async def flush(self) -> None:
+        """Send every pending update now and wait for the workers to finish (e.g. on shutdown)."""
+        self._flushing.set()
+        try:
+            workers = list(self._workers.values())
+            if workers:
+                await asyncio.gather(*workers)
+        finally:
+            self._flushing.clear()
@@ -0,0 +1,425 @@
+"""
+Durable local spill journal for events Kafka could not take.
+
+When the brokers are down, KafkaProducer appends events here instead of
+losing them, and a JournalReplayer sends them back to Kafka in append order
+once the brokers recover.
+
+The journal is a directory of fixed-size, memory-mapped segment files
+(<seq>.seg, preallocated). Each record is a length + CRC32 header followed by
+the JSON event; a zero length marks the end of the written part of a
+segment, so a record that does not fit closes the segment and the next one
+is started. Appends are group-committed: every append waits for the next
+msync, issued fsync_interval after the first unsynced append, so a burst of
+spills costs one flush. The replay position lives in a `cursor` file
+(written atomically after each acknowledged batch) and segments behind it
+are deleted, which with max_bytes bounds disk use: once the journal is full,
+appends fail and the caller is back to its no-journal behaviour.
+
+Delivery is at-least-once: a crash between sending a batch and writing the
+cursor re-sends that batch. A torn tail left by a crash fails its CRC and is
+discarded on open.
+
+Each journal is owned by one process through a flock on its `lock` file;
+claim_journal() picks the first free slot under a base directory, so every
+worker of a pod gets its own journal and a restarted worker adopts (and
+drains) whatever a previous one left behind.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct("<II")  # payload length, CRC32 of payload
+SEGMENT_SUFFIX = ".seg"
+MAX_SLOTS = 64
+
+SPILLED = Counter("kafka_spill_events_total", "Events written to the local spill journal", ["topic"])
+SPILL_REPLAYED = Counter(
+    "kafka_spill_replayed_events_total", "Spilled events sent to Kafka by the replayer", ["topic"]
+)
+SPILL_DROPPED = Counter(
+    "kafka_spill_dropped_events_total", "Events lost because the spill journal was full", ["topic"]
+)
+SPILL_PENDING = Gauge("kafka_spill_pending_events", "Spilled events not yet replayed")
+SPILL_DISK_BYTES = Gauge("kafka_spill_disk_bytes", "Disk space held by spill journal segments")
+
+
+class JournalFullError(Exception):
+    """The journal has reached max_bytes, or the record is larger than a segment."""
+
+
+@dataclass(frozen=True, order=True)
+class JournalPosition:
+    """A point in the journal: segment sequence number and byte offset."""
+
+    segment: int
+    offset: int
+
+
+class SpillJournal:
+    """Append-only, memory-mapped, segmented event journal with a replay cursor."""
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 16 * 1024 * 1024,
+        max_bytes: int = 512 * 1024 * 1024,
+        fsync_interval: float = 0.005,
+    ):
+        """
+        Initialize journal (nothing is opened until open()).
+
+        Args:
+            directory: Directory holding this journal's segments, cursor and lock
+            segment_bytes: Size of each preallocated segment file
+            max_bytes: Disk budget; at least two segments
+            fsync_interval: Group-commit window for appends, in seconds
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max(2, max_bytes // segment_bytes)
+        self.fsync_interval = fsync_interval
+        self.pending = 0
+        # Records handed out by read() and not yet acknowledged
+        self._in_flight = 0
+        self._lock_fd: int | None = None
+        self._segments: list[int] = []
+        self._mm: mmap.mmap | None = None
+        self._write_at = JournalPosition(0, 0)
+        self._cursor = JournalPosition(0, 0)
+        self._read_at = JournalPosition(0, 0)
+        self._sync_task: asyncio.Task | None = None
+        self._appended = asyncio.Event()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _segment_path(self, segment: int) -> str:
+        return self._path(f"{segment:016d}{SEGMENT_SUFFIX}")
+
+    @property
+    def disk_bytes(self) -> int:
+        """Disk space held by segment files."""
+        return len(self._segments) * self.segment_bytes
+
+    def open(self) -> None:
+        """
+        Lock the directory, recover the write position and the cursor.
+
+        Raises:
+            BlockingIOError: If another process owns this journal
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(self._path("lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            raise
+        self._lock_fd = fd
+
+        self._segments = sorted(
+            int(name.removesuffix(SEGMENT_SUFFIX))
+            for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+        if not self._segments:
+            self._create_segment(0)
+        last = self._segments[-1]
+        end = self._scan_end(last)
+        self._map(last)
+        # Zero whatever follows the recovered end, so a torn tail can never resurface
+        self._mm[end:] = bytes(self.segment_bytes - end)
+        self._mm.flush()
+        self._write_at = JournalPosition(last, end)
+
+        self._cursor = self._load_cursor()
+        self._read_at = self._cursor
+        self.pending = sum(1 for _ in self._records(self._cursor, None))
+        SPILL_PENDING.set(self.pending)
+        SPILL_DISK_BYTES.set(self.disk_bytes)
+        if self.pending:
+            logger.warning(
+                "Spill journal has events to replay", extra={"directory": self.directory, "pending": self.pending}
+            )
+
+    def close(self) -> None:
+        """Flush and unmap the current segment and release the lock."""
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def append(self, record: dict[str, Any]) -> None:
+        """
+        Append a record; returns once it has been flushed to disk.
+
+        Raises:
+            JournalFullError: If the journal is full or the record exceeds a segment
+        """
+        payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        size = HEADER.size + len(payload)
+        if size + HEADER.size > self.segment_bytes:
+            raise JournalFullError(f"Record of {size} bytes does not fit a {self.segment_bytes}-byte segment")
+
+        # Keep room for the zero header that ends a segment
+        if self._write_at.offset + size + HEADER.size > self.segment_bytes:
+            if len(self._segments) >= self.max_segments:
+                raise JournalFullError(f"Spill journal full ({self.disk_bytes} bytes)")
+            self._mm.flush()
+            self._mm.close()
+            next_segment = self._write_at.segment + 1
+            self._create_segment(next_segment)
+            self._map(next_segment)
+            self._write_at = JournalPosition(next_segment, 0)
+
+        offset = self._write_at.offset
+        self._mm[offset + HEADER.size:offset + size] = payload
+        HEADER.pack_into(self._mm, offset, len(payload), zlib.crc32(payload))
+        self._write_at = JournalPosition(self._write_at.segment, offset + size)
+        self.pending += 1
+        SPILL_PENDING.set(self.pending)
+        self._appended.set()
+
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_later())
+        await asyncio.shield(self._sync_task)
+
+    async def _sync_later(self) -> None:
+        """Flush every append made during the group-commit window."""
+        await asyncio.sleep(self.fsync_interval)
+        self._sync_task = None
+        if self._mm is not None:
+            self._mm.flush()
+
+    def read(self, max_records: int) -> list[tuple[JournalPosition, dict[str, Any]]]:
+        """
+        Return up to max_records unacknowledged records after the last read.
+
+        Each record comes with the position just past it, to pass to ack().
+        """
+        batch = []
+        for position, payload in self._records(self._read_at, max_records):
+            batch.append((position, json.loads(payload)))
+            self._read_at = position
+        self._in_flight += len(batch)
+        return batch
+
+    def rewind(self) -> None:
+        """Read again from the cursor (after a failed send)."""
+        self._read_at = self._cursor
+        self._in_flight = 0
+
+    def ack(self, position: JournalPosition, count: int) -> None:
+        """
+        Mark records up to `position` as replayed and persist the cursor.
+
+        Args:
+            position: Position returned with the last replayed record
+            count: Records acknowledged since the previous ack
+        """
+        self._cursor = position
+        self._read_at = max(self._read_at, position)
+        tmp = self._path("cursor.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"segment": position.segment, "offset": position.offset}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path("cursor"))
+
+        while len(self._segments) > 1 and self._segments[0] < position.segment:
+            os.unlink(self._segment_path(self._segments.pop(0)))
+        self.pending = max(0, self.pending - count)
+        self._in_flight = max(0, self._in_flight - count)
+        SPILL_PENDING.set(self.pending)
+        SPILL_DISK_BYTES.set(self.disk_bytes)
+
+    async def wait_for_records(self) -> None:
+        """Wait until there are records that have not been read yet."""
+        while self.pending <= self._in_flight:
+            self._appended.clear()
+            await self._appended.wait()
+
+    def _create_segment(self, segment: int) -> None:
+        fd = os.open(self._segment_path(segment), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            os.ftruncate(fd, self.segment_bytes)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        dir_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        self._segments.append(segment)
+        SPILL_DISK_BYTES.set(self.disk_bytes)
+
+    def _map(self, segment: int) -> None:
+        with open(self._segment_path(segment), "r+b") as f:
+            self._mm = mmap.mmap(f.fileno(), self.segment_bytes)
+
+    def _load_cursor(self) -> JournalPosition:
+        try:
+            with open(self._path("cursor")) as f:
+                data = json.load(f)
+            cursor = JournalPosition(data["segment"], data["offset"])
+        except FileNotFoundError:
+            cursor = JournalPosition(self._segments[0], 0)
+        # Segments behind the cursor may not have been deleted before a crash
+        first = self._segments[0]
+        return cursor if cursor.segment >= first else JournalPosition(first, 0)
+
+    def _scan_end(self, segment: int) -> int:
+        """Offset just past the last intact record of a segment."""
+        end = 0
+        for position, _ in self._segment_records(segment, 0):
+            end = position.offset
+        return end
+
+    def _segment_records(self, segment: int, offset: int):
+        """Yield (position after, payload) for intact records of one segment from offset."""
+        with open(self._segment_path(segment), "rb") as f:
+            fd = f.fileno()
+            while offset + HEADER.size <= self.segment_bytes:
+                length, crc = HEADER.unpack(os.pread(fd, HEADER.size, offset))
+                if length == 0:
+                    return
+                payload = os.pread(fd, length, offset + HEADER.size)
+                if len(payload) != length or zlib.crc32(payload) != crc:
+                    logger.warning(
+                        "Spill journal record failed its checksum; ignoring the rest of the segment",
+                        extra={"segment": segment, "offset": offset},
+                    )
+                    return
+                offset += HEADER.size + length
+                yield JournalPosition(segment, offset), payload
+
+    def _records(self, start: JournalPosition, limit: int | None):
+        """Yield (position after, payload) from start across segments, up to the write position."""
+        count = 0
+        for segment in self._segments:
+            if segment < start.segment:
+                continue
+            offset = start.offset if segment == start.segment else 0
+            for position, payload in self._segment_records(segment, offset):
+                if position > self._write_at:
+                    return
+                yield position, payload
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+
+
+def claim_journal(base_dir: str, **kwargs: Any) -> SpillJournal:
+    """
+    Open the first journal slot under base_dir that no other process holds.
+
+    Args:
+        base_dir: Directory holding the slot-N journals
+        **kwargs: SpillJournal options
+
+    Returns:
+        Opened SpillJournal
+
+    Raises:
+        RuntimeError: If all MAX_SLOTS slots are taken
+    """
+    for slot in range(MAX_SLOTS):
+        journal = SpillJournal(os.path.join(base_dir, f"slot-{slot}"), **kwargs)
+        try:
+            journal.open()
+        except BlockingIOError:
+            continue
+        logger.info("Spill journal opened", extra={"directory": journal.directory, "pending": journal.pending})
+        return journal
+    raise RuntimeError(f"No free spill journal slot under {base_dir}")
+
+
+# (topic, key, value, headers) -> None; raising leaves the record in the journal
+SendFunction = Callable[[str, str | None, dict[str, Any], dict[str, str]], Awaitable[None]]
+
+
+class JournalReplayer:
+    """Drains a spill journal back to Kafka, in order, whenever the brokers accept writes."""
+
+    def __init__(
+        self,
+        journal: SpillJournal,
+        send: SendFunction,
+        batch_size: int = 100,
+        retry_interval: float = 1.0,
+        max_retry_interval: float = 30.0,
+    ):
+        """
+        Initialize replayer with injected dependencies.
+
+        Args:
+            journal: Opened journal to drain
+            send: Publishes one record straight to Kafka (never back into the journal)
+            batch_size: Records sent between cursor writes
+            retry_interval: First wait after a failed send; doubles up to max_retry_interval
+            max_retry_interval: Longest wait between attempts while Kafka is down
+        """
+        self.journal = journal
+        self.send = send
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+
+    async def drain_once(self) -> int:
+        """
+        Send one batch, acknowledging what was sent even if a send fails.
+
+        Returns:
+            Records sent
+
+        Raises:
+            Exception: The send failure, after the records before it were acknowledged
+        """
+        batch = self.journal.read(self.batch_size)
+        sent = 0
+        try:
+            for position, record in batch:
+                await self.send(record["topic"], record["key"], record["value"], record["headers"])
+                SPILL_REPLAYED.labels(topic=record["topic"]).inc()
+                sent += 1
+        finally:
+            if sent:
+                self.journal.ack(batch[sent - 1][0], sent)
+            if sent < len(batch):
+                self.journal.rewind()
+        return sent
+
+    async def run(self) -> None:
+        """Replay until cancelled, backing off while Kafka keeps failing."""
+        delay = self.retry_interval
+        while True:
+            await self.journal.wait_for_records()
+            try:
+                sent = await self.drain_once()
+            except Exception as e:
+                logger.warning(
+                    "Spill replay failed; will retry",
+                    extra={"error": str(e), "retry_in": delay, "pending": self.journal.pending},
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_interval)
+                continue
+            delay = self.retry_interval
+            if sent and not self.journal.pending:
+                logger.info("Spill journal drained", extra={"directory": self.journal.directory})
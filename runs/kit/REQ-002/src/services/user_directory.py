@@ -0,0 +1,325 @@
+"""
+Replicated in-process directory of users' display names.
+
+Rendering run history, summaries and DMs needs display names for many user
+IDs. Instead of joining `users` or looking each ID up, every replica keeps
+the whole directory in memory and answers `get_many(user_ids)` without I/O.
+
+The directory is filled in two steps at startup. First it is backfilled
+from the `users` table, in keyset pages. Then it reads the compacted
+`coffee.users` topic from the beginning up to the end offsets seen at
+start. After that it follows the topic for live updates. There is no
+consumer group: every replica reads every partition. Records are keyed by
+user_id. A value carries the display name and its updated_at, and a null
+value (tombstone) removes the user. The newer updated_at wins, so the
+backfill and a replay of old records cannot overwrite a fresher name.
+
+If Kafka is unreachable at startup, the app serves the backfilled
+directory and the feed keeps retrying in the background.
+"""
+import asyncio
+import json
+import logging
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Iterable, NamedTuple
+
+from aiokafka import AIOKafkaConsumer, TopicPartition
+from prometheus_client import Counter, Gauge
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage.audit_queries import naive_utc
+from storage.read_models import UserNameRow, user_names
+
+from .retry import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+USERS_TOPIC = "coffee.users"
+
+DIRECTORY_ENTRIES = Gauge("user_directory_entries", "Users held in the in-process directory")
+DIRECTORY_UPDATES = Counter(
+    "user_directory_updates_total", "Directory updates by source and outcome", ["source", "outcome"]
+)
+DIRECTORY_LOOKUPS = Counter("user_directory_lookups_total", "Directory lookups", ["outcome"])
+
+SessionFactory = Callable[[], AbstractAsyncContextManager[AsyncSession]]
+UserPageLoader = Callable[[AsyncSession, str | None, int], Awaitable[list[UserNameRow]]]
+
+
+class DirectoryEntry(NamedTuple):
+    """A user's display name and when it last changed (naive UTC)."""
+
+    display_name: str
+    updated_at: datetime
+
+
+def user_event(user_id: str, display_name: str, updated_at: datetime | None = None) -> dict[str, Any]:
+    """
+    Build a coffee.users record value; publish it keyed by user_id.
+
+    Args:
+        user_id: Slack user ID
+        display_name: Name to show
+        updated_at: When the name changed (default: now)
+
+    Returns:
+        JSON-serializable record value
+    """
+    updated_at = updated_at or datetime.now(timezone.utc)
+    return {"user_id": user_id, "display_name": display_name, "updated_at": updated_at.isoformat()}
+
+
+class UserDirectory:
+    """In-memory map of user_id to display name, last writer wins by updated_at."""
+
+    def __init__(self) -> None:
+        """Initialize an empty directory."""
+        self._entries: dict[str, DirectoryEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._entries
+
+    def apply(self, user_id: str, display_name: str, updated_at: datetime) -> bool:
+        """
+        Set a user's display name unless a newer one is already known.
+
+        Returns:
+            True if the entry changed, False if it was stale or unchanged
+        """
+        updated_at = naive_utc(updated_at)
+        current = self._entries.get(user_id)
+        if current is not None and current.updated_at > updated_at:
+            return False
+        self._entries[user_id] = DirectoryEntry(display_name, updated_at)
+        return current is None or current.display_name != display_name
+
+    def remove(self, user_id: str) -> bool:
+        """Drop a user; True if it was known."""
+        return self._entries.pop(user_id, None) is not None
+
+    def get(self, user_id: str, default: str | None = None) -> str | None:
+        """Return one user's display name, or `default` if unknown."""
+        entry = self._entries.get(user_id)
+        DIRECTORY_LOOKUPS.labels(outcome="miss" if entry is None else "hit").inc()
+        return default if entry is None else entry.display_name
+
+    def get_many(self, user_ids: Iterable[str]) -> dict[str, str]:
+        """
+        Resolve many user IDs at once, without I/O.
+
+        Args:
+            user_ids: IDs to resolve; duplicates are fine
+
+        Returns:
+            Display name per known ID; unknown IDs are left out, so callers
+            choose their own fallback (e.g. a `<@user_id>` mention)
+        """
+        entries = self._entries
+        names = {}
+        misses = 0
+        for user_id in set(user_ids):
+            entry = entries.get(user_id)
+            if entry is None:
+                misses += 1
+            else:
+                names[user_id] = entry.display_name
+        DIRECTORY_LOOKUPS.labels(outcome="hit").inc(len(names))
+        DIRECTORY_LOOKUPS.labels(outcome="miss").inc(misses)
+        return names
+
+    async def backfill(
+        self, session_factory: SessionFactory, load: UserPageLoader = user_names, page_size: int = 5000
+    ) -> int:
+        """
+        Load every user from the database, one keyset page per session.
+
+        Returns:
+            Number of entries that changed
+        """
+        changed = 0
+        after = None
+        while True:
+            async with session_factory() as session:
+                rows = await load(session, after, page_size)
+            if not rows:
+                break
+            for row in rows:
+                changed += self.apply(row.user_id, row.display_name, row.updated_at)
+            after = rows[-1].user_id
+        DIRECTORY_UPDATES.labels(source="backfill", outcome="applied").inc(changed)
+        DIRECTORY_ENTRIES.set(len(self))
+        logger.info("User directory backfilled", extra={"users": len(self), "changed": changed})
+        return changed
+
+    def apply_record(self, key: str | None, value: Any) -> str:
+        """
+        Apply one coffee.users record.
+
+        Returns:
+            The outcome: applied, stale, deleted or invalid
+        """
+        if value is None and key:
+            outcome = "deleted" if self.remove(key) else "stale"
+        else:
+            try:
+                user_id = key or value["user_id"]
+                updated_at = datetime.fromisoformat(value["updated_at"].replace("Z", "+00:00"))
+                outcome = "applied" if self.apply(user_id, str(value["display_name"]), updated_at) else "stale"
+            except (TypeError, KeyError, ValueError, AttributeError):
+                outcome = "invalid"
+        DIRECTORY_UPDATES.labels(source="topic", outcome=outcome).inc()
+        return outcome
+
+
+class UserDirectoryFeed:
+    """Keeps a UserDirectory in sync with the compacted coffee.users topic."""
+
+    def __init__(
+        self,
+        directory: UserDirectory,
+        consumer: AIOKafkaConsumer,
+        topic: str = USERS_TOPIC,
+        batch_size: int = 500,
+        poll_timeout_ms: int = 1000,
+    ):
+        """
+        Initialize feed with injected dependencies.
+
+        Args:
+            directory: Directory to update
+            consumer: Unstarted consumer without a group; the feed assigns every partition
+            topic: Compacted topic keyed by user_id
+            batch_size: Records fetched per poll
+            poll_timeout_ms: Fetch wait per poll
+        """
+        self.directory = directory
+        self.consumer = consumer
+        self.topic = topic
+        self.batch_size = batch_size
+        self.poll_timeout_ms = poll_timeout_ms
+        self.caught_up = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self, timeout: float = 10.0) -> bool:
+        """
+        Start following the topic and wait up to `timeout` for the catch-up read.
+
+        Returns:
+            True if the directory caught up with the topic in time; otherwise
+            the catch-up carries on in the background
+        """
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(asyncio.shield(self.caught_up.wait()), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "User directory not caught up with Kafka; serving the database backfill",
+                extra={"topic": self.topic, "users": len(self.directory)},
+            )
+            return False
+        return True
+
+    async def stop(self) -> None:
+        """Stop following the topic and close the consumer."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.consumer.stop()
+
+    async def catch_up(self) -> int:
+        """
+        Assign every partition and read from the beginning up to the end offsets seen now.
+
+        Returns:
+            Number of records read
+        """
+        await self.consumer.topics()
+        numbers = self.consumer.partitions_for_topic(self.topic)
+        if not numbers:
+            raise ValueError(f"Unknown topic {self.topic!r}")
+        partitions = [TopicPartition(self.topic, number) for number in sorted(numbers)]
+        self.consumer.assign(partitions)
+        await self.consumer.seek_to_beginning(*partitions)
+        end = await self.consumer.end_offsets(partitions)
+
+        records = 0
+        pending = {tp for tp in partitions if await self.consumer.position(tp) < end[tp]}
+        while pending:
+            records += await self.poll()
+            # Compaction leaves offset gaps, so the position tells whether the end was reached
+            pending = {tp for tp in pending if await self.consumer.position(tp) < end[tp]}
+        return records
+
+    async def poll(self) -> int:
+        """Fetch one batch from every partition and apply it; returns the number of records."""
+        batches = await self.consumer.getmany(timeout_ms=self.poll_timeout_ms, max_records=self.batch_size)
+        records = 0
+        for batch in batches.values():
+            for record in batch:
+                self.directory.apply_record(record.key, record.value)
+            records += len(batch)
+        if records:
+            DIRECTORY_ENTRIES.set(len(self.directory))
+        return records
+
+    async def _run(self) -> None:
+        attempt = 0
+        started = False
+        while True:
+            try:
+                if not started:
+                    await self.consumer.start()
+                    started = True
+                if not self.caught_up.is_set():
+                    records = await self.catch_up()
+                    self.caught_up.set()
+                    logger.info(
+                        "User directory caught up",
+                        extra={"topic": self.topic, "records": records, "users": len(self.directory)},
+                    )
+                while True:
+                    await self.poll()
+                    attempt = 0
+            except Exception as e:
+                attempt += 1
+                logger.warning(
+                    "User directory feed failed, retrying",
+                    extra={"topic": self.topic, "attempt": attempt, "error": str(e)},
+                )
+                await asyncio.sleep(backoff_delay(attempt))
+
+
+def create_user_directory_consumer(bootstrap_servers: str, batch_size: int = 500) -> AIOKafkaConsumer:
+    """
+    Factory function to create the group-less consumer behind a UserDirectoryFeed.
+
+    Undecodable values come back as invalid records rather than tombstones.
+
+    Args:
+        bootstrap_servers: Comma-separated Kafka broker addresses
+        batch_size: Maximum records per poll
+
+    Returns:
+        AIOKafkaConsumer without a group or commits (not yet started)
+    """
+    def deserialize(value: bytes | None) -> Any:
+        if value is None:
+            return None
+        try:
+            return json.loads(value.decode("utf-8"))
+        except ValueError:
+            return {}
+
+    return AIOKafkaConsumer(
+        bootstrap_servers=bootstrap_servers,
+        group_id=None,
+        enable_auto_commit=False,
+        max_poll_records=batch_size,
+        key_deserializer=lambda key: key.decode("utf-8") if key is not None else None,
+        value_deserializer=deserialize,
+    )
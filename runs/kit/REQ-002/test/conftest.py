@@ -8,6 +8,9 @@ from pathlib import Path
 # Add src to Python path for imports
 src_path = Path(__file__).parent.parent / "src"
 sys.path.insert(0, str(src_path))
-```
 
-```markdown
\ No newline at end of file
+# Kit root, so the application package imports as src.* (it uses relative imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Repository src for the shared storage package
+sys.path.insert(0, str(Path(__file__).parents[4] / "src"))
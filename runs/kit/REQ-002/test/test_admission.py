@@ -0,0 +1,94 @@
+"""
+Unit tests for Slack admission control.
+
+Tests the in-flight limits and the interaction reserve, latency-based
+throttling and its recovery, and the busy responses of the Slack routes.
+"""
+import time
+from typing import AsyncGenerator
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.api.app import create_app
+from src.config.settings import Settings
+from src.handlers.interactions import BUSY_MESSAGE
+from src.services.admission import ADMISSION_SHED, COMMAND, INTERACTION, AdmissionController
+
+
+def record(admission: AdmissionController, seconds: float, count: int) -> None:
+    for _ in range(count):
+        admission.in_flight[COMMAND] += 1
+        admission.release(COMMAND, seconds)
+    admission._p90_at = 0.0
+
+
+def test_commands_leave_room_for_interactions() -> None:
+    """Test that commands are capped at their share while interactions can use the rest."""
+    admission = AdmissionController(max_in_flight=4, command_share=0.5)
+
+    commands = [admission.admit(COMMAND) for _ in range(3)]
+    assert [ticket is not None for ticket in commands] == [True, True, False]
+    interactions = [admission.admit(INTERACTION) for _ in range(3)]
+    assert [ticket is not None for ticket in interactions] == [True, True, False]
+
+    with commands[0]:
+        pass
+    assert admission.in_flight == {INTERACTION: 2, COMMAND: 1}
+    assert admission.admit(INTERACTION) is not None
+
+
+def test_slow_requests_throttle_commands_before_interactions() -> None:
+    """Test that a p90 over the target throttles commands, and over the deadline interactions too."""
+    admission = AdmissionController(max_in_flight=40, command_share=0.5, latency_target=1.0, deadline=2.0)
+
+    record(admission, 0.1, 10)
+    assert admission.limit(COMMAND) == 20
+
+    record(admission, 1.6, 10)
+    assert admission.recent_p90() == 1.6
+    assert admission.limit(COMMAND) == 12
+    assert admission.limit(INTERACTION) == 40
+
+    record(admission, 8.0, 20)
+    assert admission.limit(COMMAND) == 2
+    assert admission.limit(INTERACTION) == 10
+
+
+def test_throttling_recovers_once_slow_samples_age_out() -> None:
+    """Test that the limits return to normal when the latency window no longer holds slow requests."""
+    admission = AdmissionController(max_in_flight=8, latency_target=0.5, window=0.05)
+    record(admission, 5.0, 1)
+    assert admission.limit(COMMAND) == 1
+
+    time.sleep(0.06)
+    admission._p90_at = 0.0
+    assert admission.limit(COMMAND) == 6
+
+
+@pytest_asyncio.fixture
+async def app() -> AsyncGenerator[FastAPI, None]:
+    """Create the app with a worker whose admission controller has no spare capacity."""
+    app = create_app(Settings(), producer_factory=lambda _: AsyncMock(), database_factory=Mock(return_value=AsyncMock()))
+    async with app.router.lifespan_context(app):
+        app.state.admission = AdmissionController(max_in_flight=1)
+        assert app.state.admission.admit(INTERACTION) is not None
+        yield app
+
+
+@pytest.mark.asyncio
+async def test_routes_answer_busy_when_shed(app: FastAPI) -> None:
+    """Test that shed commands get an ephemeral busy message and shed interactions a 503."""
+    shed = ADMISSION_SHED.labels(kind=COMMAND)._value.get()
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://localhost") as client:
+        command = await client.post("/slack/commands/coffee", content=b"command=/coffee")
+        interaction = await client.post("/slack/interactions", content=b"payload={}")
+
+    assert command.status_code == 200
+    assert command.json() == {"response_type": "ephemeral", "text": BUSY_MESSAGE}
+    assert interaction.status_code == 503
+    assert ADMISSION_SHED.labels(kind=COMMAND)._value.get() == shed + 1
@@ -0,0 +1,79 @@
+"""
+Unit tests for the application factory and multi-worker settings.
+
+Tests that per-worker resources are created in the lifespan (not at import
+or factory time), the Postgres budget split, shutdown ordering, and cleanup
+after a failed startup.
+"""
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from src.api.app import create_app
+from src.config.settings import Settings
+
+
+@pytest.fixture
+def settings(monkeypatch: pytest.MonkeyPatch) -> Settings:
+    monkeypatch.setenv("SLACK_SIGNING_SECRET", "secret")
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "5")
+    return Settings()
+
+
+def test_pool_budget_is_divided_across_workers(settings: Settings) -> None:
+    """Test that all workers together stay within the pod's connection budget."""
+    pool_size, max_overflow = settings.worker_pool_limits()
+
+    assert (pool_size, max_overflow) == (5, 1)
+    assert (pool_size + max_overflow) * settings.web_concurrency <= 25
+
+
+def test_validate_rejects_more_workers_than_connections(settings: Settings) -> None:
+    """Test that every worker must get at least one pooled connection."""
+    settings.web_concurrency = 30
+
+    with pytest.raises(ValueError, match="DB_POOL_SIZE"):
+        settings.validate()
+
+
+@pytest.mark.asyncio
+async def test_resources_are_created_per_worker_in_lifespan(settings: Settings) -> None:
+    """Test that nothing connects at factory time and shutdown flushes Kafka before closing the pool."""
+    calls: list[str] = []
+    producer = AsyncMock()
+    producer.stop.side_effect = lambda: calls.append("producer.stop")
+    db_manager = AsyncMock()
+    db_manager.close.side_effect = lambda: calls.append("db.close")
+    producer_factory = Mock(return_value=producer)
+    database_factory = Mock(return_value=db_manager)
+
+    app = create_app(settings, producer_factory=producer_factory, database_factory=database_factory)
+    producer_factory.assert_not_called()
+    database_factory.assert_not_called()
+
+    async with app.router.lifespan_context(app):
+        producer.start.assert_awaited_once()
+        assert database_factory.call_args.kwargs == {"pool_size": 5, "max_overflow": 1}
+        assert database_factory.call_args.args[0].startswith("postgresql+asyncpg://")
+        assert app.state.coffee_handler.kafka_producer is producer
+
+    assert calls == ["producer.stop", "db.close"]
+
+
+@pytest.mark.asyncio
+async def test_failed_startup_releases_what_was_already_created(settings: Settings) -> None:
+    """Test that a startup failure after the pool and secret exist still closes them."""
+    db_manager = AsyncMock()
+    producer = AsyncMock()
+    producer.start.side_effect = ConnectionError("no brokers")
+    database_factory = Mock(return_value=db_manager)
+    app = create_app(settings, producer_factory=Mock(return_value=producer), database_factory=database_factory)
+
+    with pytest.raises(ConnectionError):
+        async with app.router.lifespan_context(app):
+            pass
+
+    db_manager.close.assert_awaited_once()
+    producer.stop.assert_not_awaited()
@@ -0,0 +1,75 @@
+"""
+Unit tests for the audit query API.
+
+Tests authentication, query-parameter mapping and error handling of
+GET /api/v1/audit, with the storage query replaced by a mock.
+"""
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.api.app import create_app
+from src.config.settings import Settings
+from storage.audit_queries import AuditPage
+from storage.read_models import AuditRow
+
+TOKEN = "s3cret"
+ROW = AuditRow(uuid.uuid4(), "order_placed", "U1", None, {"order": {"size": "large"}}, datetime(2024, 6, 1, 12, 0))
+
+
+async def get_audit(query: AsyncMock, params: dict | None = None, token: str | None = TOKEN) -> tuple[int, dict]:
+    @asynccontextmanager
+    async def session():
+        yield Mock()
+
+    database = AsyncMock()
+    database.session = session
+    settings = Settings()
+    settings.admin_token = TOKEN
+    app = create_app(settings, producer_factory=lambda _: AsyncMock(), database_factory=Mock(return_value=database))
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    with patch("src.api.audit_routes.query_audit_logs", query):
+        async with app.router.lifespan_context(app):
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://localhost:8080") as client:
+                response = await client.get("/api/v1/audit", params=params, headers=headers)
+    return response.status_code, response.json()
+
+
+@pytest.mark.asyncio
+async def test_audit_query_maps_filters_and_serializes_page() -> None:
+    """Test that repeated filters reach the query and rows come back as JSON."""
+    query = AsyncMock(return_value=AuditPage(items=[ROW], next_cursor="abc"))
+
+    status, body = await get_audit(
+        query,
+        {"event_type": ["order_placed", "run_completed"], "payload": "order.size=large", "limit": 50, "cursor": "xyz"},
+    )
+
+    assert status == 200
+    assert body["next_cursor"] == "abc"
+    assert body["items"][0]["log_id"] == str(ROW.log_id)
+    assert body["items"][0]["timestamp"] == "2024-06-01T12:00:00"
+    filters = query.await_args.args[1]
+    assert list(filters.event_types) == ["order_placed", "run_completed"]
+    assert filters.payload == {"order": {"size": "large"}}
+    assert query.await_args.kwargs == {"limit": 50, "cursor": "xyz"}
+
+
+@pytest.mark.asyncio
+async def test_audit_query_requires_admin_token() -> None:
+    """Test that the audit API is closed without the admin token."""
+    status, _ = await get_audit(AsyncMock(), token="wrong")
+
+    assert status == 401
+
+
+@pytest.mark.asyncio
+async def test_audit_query_rejects_invalid_input() -> None:
+    """Test that bad payload filters, ranges and page sizes are client errors."""
+    assert (await get_audit(AsyncMock(), {"payload": "size"}))[0] == 400
+    assert (await get_audit(AsyncMock(side_effect=ValueError("Time range may span at most 90 days"))))[0] == 400
+    assert (await get_audit(AsyncMock(), {"limit": 10000}))[0] == 422
@@ -12,7 +12,7 @@ from unittest.mock import AsyncMock, Mock
 import pytest
 from fastapi import HTTPException
 
-from ..src.handlers.coffee_command import CoffeeCommandHandler, SlackSignatureValidator
+from src.handlers.coffee_command import CoffeeCommandHandler, SlackSignatureValidator
 
 
 class TestSlackSignatureValidator:
@@ -184,6 +184,3 @@ class TestCoffeeCommandHandler:
         assert custom_block["block_id"] == "customizations_block"
         assert custom_block["element"]["type"] == "plain_text_input"
         assert custom_block["optional"] is True
-```
-
-```markdown
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""
+Unit tests for the parallel Kafka replay.
+
+Tests range planning, per-partition ordering, end-offset termination over
+compaction gaps, backpressure, run-creating topics going first, and the report, with Kafka replaced by an
+in-memory consumer and the database writes by a recording apply function.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from aiokafka import TopicPartition
+
+from src.services.event_replay import EventReplayer, parse_offsets
+from storage.replay import ApplyResult
+
+BASE_MS = 1_700_000_000_000
+EVENT_TYPES = {"coffee.orders": "order_placed", "coffee.completions": "run_completed"}
+
+
+class FakeConsumer:
+    """In-memory stand-in for a group-less AIOKafkaConsumer."""
+
+    def __init__(self, logs: dict[TopicPartition, list[int]]):
+        # Offsets present per partition; missing offsets model compaction gaps
+        self.logs = logs
+        self.positions: dict[TopicPartition, int] = {}
+        self._paused: set[TopicPartition] = set()
+        self.pause_calls = 0
+
+    async def topics(self) -> set[str]:
+        return {tp.topic for tp in self.logs}
+
+    def partitions_for_topic(self, topic: str) -> set[int]:
+        return {tp.partition for tp in self.logs if tp.topic == topic}
+
+    def assign(self, partitions: list[TopicPartition]) -> None:
+        self.assigned = partitions
+
+    async def beginning_offsets(self, partitions: list[TopicPartition]) -> dict[TopicPartition, int]:
+        return {tp: self.logs[tp][0] if self.logs[tp] else 0 for tp in partitions}
+
+    async def end_offsets(self, partitions: list[TopicPartition]) -> dict[TopicPartition, int]:
+        return {tp: self.logs[tp][-1] + 1 if self.logs[tp] else 0 for tp in partitions}
+
+    async def offsets_for_times(self, timestamps: dict[TopicPartition, int]) -> dict:
+        return {
+            tp: next((SimpleNamespace(offset=o) for o in self.logs[tp] if BASE_MS + o * 1000 >= ms), None)
+            for tp, ms in timestamps.items()
+        }
+
+    def seek(self, tp: TopicPartition, offset: int) -> None:
+        self.positions[tp] = offset
+
+    def pause(self, *partitions: TopicPartition) -> None:
+        self._paused.update(partitions)
+        self.pause_calls += 1
+
+    def resume(self, *partitions: TopicPartition) -> None:
+        self._paused.difference_update(partitions)
+
+    def paused(self) -> set[TopicPartition]:
+        return set(self._paused)
+
+    async def position(self, tp: TopicPartition) -> int:
+        return self.positions[tp]
+
+    async def getmany(self, *partitions: TopicPartition, timeout_ms: int, max_records: int) -> dict:
+        await asyncio.sleep(0)
+        batches = {}
+        for tp in partitions:
+            if tp in self._paused:
+                continue
+            offsets = [o for o in self.logs[tp] if o >= self.positions[tp]][:max_records]
+            if offsets:
+                batches[tp] = [
+                    SimpleNamespace(
+                        offset=o,
+                        timestamp=BASE_MS + o * 1000,
+                        value={"event_type": EVENT_TYPES[tp.topic], "run_id": f"r{o}", "seq": o}
+                        if o % 7
+                        else b"not json",
+                    )
+                    for o in offsets
+                ]
+                self.positions[tp] = offsets[-1] + 1
+            elif self.logs[tp]:
+                # Past a trailing gap the fetch position still reaches the end
+                self.positions[tp] = max(self.positions[tp], self.logs[tp][-1] + 1)
+        return batches
+
+
+def recording_apply(delay: float = 0.0) -> tuple:
+    applied: dict[str, list] = {}
+
+    async def apply(session, events):
+        await asyncio.sleep(delay)
+        for event in events:
+            applied.setdefault(session, []).append(event)
+        return ApplyResult(applied=len(events))
+
+    return apply, applied
+
+
+def session_factory(sessions: list) -> object:
+    @asynccontextmanager
+    async def factory():
+        session = AsyncMock()
+        sessions.append(session)
+        yield session
+
+    return factory
+
+
+ORDERS_0 = TopicPartition("coffee.orders", 0)
+ORDERS_1 = TopicPartition("coffee.orders", 1)
+COMPLETIONS_0 = TopicPartition("coffee.completions", 0)
+
+
+@pytest.mark.asyncio
+async def test_replays_every_partition_in_order_to_end_offsets() -> None:
+    """Test that each partition is applied in offset order, one commit per batch, with gaps skipped."""
+    consumer = FakeConsumer({ORDERS_0: list(range(10)), ORDERS_1: [0, 1, 5, 9], COMPLETIONS_0: []})
+    sessions: list = []
+    apply, applied = recording_apply()
+    replayer = EventReplayer(consumer, session_factory(sessions), apply=apply, batch_size=3, progress_interval=60)
+
+    report = await replayer.run(["coffee.orders", "coffee.completions"])
+
+    assert report.completed
+    assert all(session.commit.await_count == 1 for session in sessions)
+    seqs = [[e.payload["seq"] for e in events] for events in applied.values()]
+    assert sorted(sum(seqs, [])) == sorted([o for o in range(10) if o % 7] + [1, 5, 9])
+    assert all(len(batch) <= 3 and batch == sorted(batch) for batch in seqs)
+    by_partition = {(p.topic, p.partition): p for p in report.partitions}
+    assert by_partition[("coffee.orders", 0)].position == 10
+    assert by_partition[("coffee.orders", 0)].skipped == 2
+    assert by_partition[("coffee.orders", 1)].applied == 3
+    assert by_partition[("coffee.completions", 0)].events == 0
+    assert report.as_dict()["by_topic"]["coffee.orders"] == {"applied": 11, "orphaned": 0, "skipped": 3}
+    assert report.resume_offsets() == []
+
+
+@pytest.mark.asyncio
+async def test_start_points_from_offsets_and_timestamp() -> None:
+    """Test that explicit offsets override the timestamp, which overrides the beginning of the log."""
+    consumer = FakeConsumer({ORDERS_0: list(range(10)), ORDERS_1: list(range(10))})
+    replayer = EventReplayer(consumer, session_factory([]), apply=recording_apply()[0])
+
+    plan = await replayer.plan(
+        ["coffee.orders"],
+        start_offsets={ORDERS_1: 8},
+        since=datetime.fromtimestamp((BASE_MS + 4000) / 1000, tz=timezone.utc),
+    )
+
+    assert [(p.start, p.end) for p in plan.values()] == [(4, 10), (8, 10)]
+    assert consumer.positions == {ORDERS_0: 4, ORDERS_1: 8}
+
+
+@pytest.mark.asyncio
+async def test_slow_worker_pauses_its_partition() -> None:
+    """Test that a partition whose queue is full is paused, and still finishes."""
+    consumer = FakeConsumer({ORDERS_0: list(range(40))})
+    apply, _ = recording_apply(delay=0.01)
+    replayer = EventReplayer(consumer, session_factory([]), apply=apply, batch_size=2, queue_depth=2)
+
+    report = await replayer.run(["coffee.orders"])
+
+    assert report.completed and report.partitions[0].events == 40
+    # Paused for backpressure at least once before the final pause at the end offset
+    assert consumer.pause_calls > 1
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_logs_resume_offsets(caplog: pytest.LogCaptureFixture) -> None:
+    """Test that a failing apply stops the replay and leaves the failed batch to resume from."""
+    consumer = FakeConsumer({ORDERS_0: list(range(6))})
+
+    async def apply(session, events):
+        if events[0].payload["seq"] >= 3:
+            raise RuntimeError("database down")
+        return ApplyResult(applied=len(events))
+
+    replayer = EventReplayer(consumer, session_factory([]), apply=apply, batch_size=3)
+
+    with pytest.raises(RuntimeError):
+        await replayer.run(["coffee.orders"])
+
+    assert "resume with --from-offset coffee.orders:0=3" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_completions_wait_for_the_orders_that_create_their_runs(caplog: pytest.LogCaptureFixture) -> None:
+    """Test that a completion fetched before its order is held back, and leftover orphans are reported."""
+    consumer = FakeConsumer({ORDERS_0: list(range(1, 7)), COMPLETIONS_0: [*range(1, 7), 8]})
+    runs: set[str] = set()
+
+    async def apply(session, events):
+        result = ApplyResult()
+        for event in events:
+            if event.payload["event_type"] == "order_placed":
+                # Orders are slow to write, so without ordering the completions would overtake them
+                await asyncio.sleep(0.01)
+                runs.add(event.payload["run_id"])
+                result.applied += 1
+            elif event.payload["run_id"] in runs:
+                result.applied += 1
+            else:
+                result.orphaned += 1
+        return result
+
+    replayer = EventReplayer(consumer, session_factory([]), apply=apply, batch_size=2)
+
+    report = await replayer.run(["coffee.orders", "coffee.completions"])
+
+    assert report.completed
+    # r8 has a completion but no order in the log
+    assert report.as_dict()["by_topic"]["coffee.completions"] == {"applied": 6, "orphaned": 1, "skipped": 0}
+    assert report.orphaned == 1
+    assert "Replay dropped orphaned events" in caplog.text
+
+
+def test_parse_offsets() -> None:
+    """Test that topic:partition=offset arguments parse, and malformed ones are rejected."""
+    assert parse_offsets(["coffee.orders:1=120"]) == {ORDERS_1: 120}
+    with pytest.raises(ValueError):
+        parse_offsets(["coffee.orders=120"])
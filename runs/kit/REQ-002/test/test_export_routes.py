@@ -0,0 +1,82 @@
+"""
+Unit tests for the export API.
+
+Tests parameter mapping, streaming headers and resume validation of
+/api/v1/export, with the storage stream replaced by a fake.
+"""
+import uuid
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.api.app import create_app
+from src.config.settings import Settings
+
+TOKEN = "s3cret"
+
+
+async def export(path: str, params: dict) -> tuple[int, dict, bytes, list]:
+    calls = []
+
+    async def fake_stream(session, source, fmt, clauses, after, compress, batch_size):
+        calls.append({"source": source.name, "format": fmt, "after": after, "compress": compress})
+        for chunk in (b'{"a":1}\n', b'{"a":2}\n'):
+            yield chunk
+
+    @asynccontextmanager
+    async def session():
+        yield Mock()
+
+    database = AsyncMock()
+    database.session = session
+    settings = Settings()
+    settings.admin_token = TOKEN
+    app = create_app(settings, producer_factory=lambda _: AsyncMock(), database_factory=Mock(return_value=database))
+    with patch("src.api.export_routes.export_stream", fake_stream):
+        async with app.router.lifespan_context(app):
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://localhost:8080") as client:
+                response = await client.get(path, params=params, headers={"Authorization": f"Bearer {TOKEN}"})
+    return response.status_code, response.headers, response.content, calls
+
+
+@pytest.mark.asyncio
+async def test_audit_export_streams_chunks() -> None:
+    """Test that the audit export streams the body with download headers."""
+    status, headers, body, calls = await export("/api/v1/export/audit", {"event_type": "order_placed"})
+
+    assert status == 200
+    assert body == b'{"a":1}\n{"a":2}\n'
+    assert headers["content-type"] == "application/x-ndjson"
+    assert headers["content-disposition"] == 'attachment; filename="audit.ndjson"'
+    assert calls == [{"source": "audit", "format": "ndjson", "after": None, "compress": False}]
+
+
+@pytest.mark.asyncio
+async def test_runs_export_resume_and_gzip() -> None:
+    """Test that resume parameters and compression reach the stream."""
+    run_id = uuid.uuid4()
+    status, headers, _, calls = await export(
+        "/api/v1/export/runs",
+        {
+            "workspace_id": "W1",
+            "format": "csv",
+            "gzip": "true",
+            "after_timestamp": "2024-01-01T00:00:00",
+            "after_id": str(run_id),
+        },
+    )
+
+    assert status == 200
+    assert headers["content-type"] == "application/gzip"
+    assert headers["content-disposition"] == 'attachment; filename="runs.csv.gz"'
+    assert calls[0]["after"][1] == run_id and calls[0]["compress"] is True
+
+
+@pytest.mark.asyncio
+async def test_export_rejects_invalid_parameters() -> None:
+    """Test that half a resume position, bad payload filters and missing workspaces are client errors."""
+    assert (await export("/api/v1/export/audit", {"after_id": str(uuid.uuid4())}))[0] == 400
+    assert (await export("/api/v1/export/audit", {"payload": "size"}))[0] == 400
+    assert (await export("/api/v1/export/runs", {}))[0] == 422
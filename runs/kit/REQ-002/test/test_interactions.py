@@ -0,0 +1,238 @@
+"""
+Unit tests for the /slack/interactions endpoint and the order pipeline.
+
+Tests payload validation, immediate acknowledgement, backpressure, the
+commit-then-publish order, retries and dead-lettering.
+"""
+import asyncio
+import json
+import time
+import uuid
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from fastapi import FastAPI, Request
+from httpx import ASGITransport, AsyncClient
+
+from src.handlers.interactions import InteractionsHandler
+from src.services.order_pipeline import (
+    COMPLETIONS_TOPIC,
+    ORDERS_TOPIC,
+    OrderPipeline,
+    OrderSubmission,
+    RunCompletion,
+)
+
+RUN_ID = str(uuid.uuid4())
+
+
+def submission_payload(drink: str = "latte", size: str = "large", run_id: str = RUN_ID) -> dict:
+    return {
+        "type": "view_submission",
+        "user": {"id": "U1", "name": "ada"},
+        "view": {
+            "callback_id": "coffee_order_modal",
+            "private_metadata": run_id,
+            "state": {
+                "values": {
+                    "drink_type_block": {"drink_type": {"selected_option": {"value": drink}}},
+                    "size_block": {"size": {"selected_option": {"value": size}}},
+                    "customizations_block": {"customizations": {"value": " oat milk "}},
+                }
+            },
+        },
+    }
+
+
+async def post_interaction(pipeline: Mock, payload: dict) -> tuple[int, dict]:
+    app = FastAPI()
+    handler = InteractionsHandler(Mock(validate=Mock(return_value=True)), pipeline)
+
+    @app.post("/slack/interactions")
+    async def route(request: Request) -> dict:
+        return await handler.handle(request)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://localhost:8080") as client:
+        response = await client.post(
+            "/slack/interactions",
+            data={"payload": json.dumps(payload)},
+            headers={"X-Slack-Request-Timestamp": str(int(time.time())), "X-Slack-Signature": "v0=x"},
+        )
+    return response.status_code, response.json()
+
+
+@pytest.mark.asyncio
+async def test_valid_submission_is_queued_and_acknowledged() -> None:
+    """Test that a valid order is queued with a fresh order_id and the modal is cleared."""
+    pipeline = Mock(submit=Mock(return_value=True))
+
+    status, body = await post_interaction(pipeline, submission_payload())
+
+    assert (status, body) == (200, {"response_action": "clear"})
+    job = pipeline.submit.call_args.args[0]
+    assert isinstance(job, OrderSubmission)
+    assert (job.run_id, job.user_id, job.drink_type, job.size, job.customizations) == (
+        RUN_ID, "U1", "latte", "large", "oat milk"
+    )
+    uuid.UUID(job.order_id)
+
+
+@pytest.mark.asyncio
+async def test_invalid_submission_returns_field_errors() -> None:
+    """Test that validation errors go back to the modal and nothing is queued."""
+    pipeline = Mock(submit=Mock(return_value=True))
+
+    status, body = await post_interaction(pipeline, submission_payload(drink="tea", size="huge"))
+
+    assert status == 200
+    assert body["response_action"] == "errors"
+    assert set(body["errors"]) == {"drink_type_block", "size_block"}
+    pipeline.submit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_full_pipeline_asks_user_to_retry() -> None:
+    """Test that backpressure surfaces as a modal error rather than a lost order."""
+    status, body = await post_interaction(Mock(submit=Mock(return_value=False)), submission_payload())
+
+    assert status == 200
+    assert body["response_action"] == "errors"
+
+
+@pytest.mark.asyncio
+async def test_mark_complete_button_is_queued() -> None:
+    """Test that the Mark Complete button queues a run completion."""
+    pipeline = Mock(submit=Mock(return_value=True))
+    payload = {
+        "type": "block_actions",
+        "user": {"id": "U2"},
+        "actions": [{"action_id": "mark_complete", "value": RUN_ID}],
+    }
+
+    status, body = await post_interaction(pipeline, payload)
+
+    assert (status, body) == (200, {})
+    job = pipeline.submit.call_args.args[0]
+    assert isinstance(job, RunCompletion)
+    assert (job.run_id, job.user_id) == (RUN_ID, "U2")
+
+
+def fake_session_factory(session: AsyncMock):
+    @asynccontextmanager
+    async def factory():
+        yield session
+
+    return factory
+
+
+def run_session(*rows: tuple | None) -> AsyncMock:
+    """Session whose queries return the given (workspace_id, channel_id, initiator_user_id) rows in turn."""
+    session = AsyncMock(add=Mock())
+    session.execute.side_effect = [Mock(one=Mock(return_value=row), one_or_none=Mock(return_value=row)) for row in rows]
+    return session
+
+
+@pytest.mark.asyncio
+async def test_pipeline_publishes_after_commit() -> None:
+    """Test that the event is published only once the transaction has committed."""
+    calls = []
+
+    async def write(item):
+        calls.append("commit")
+        return True
+
+    producer = AsyncMock()
+    producer.publish.side_effect = lambda **kwargs: calls.append(kwargs["topic"])
+    writer = Mock(write=write)
+    pipeline = OrderPipeline(fake_session_factory(run_session(("W1", "C1", "U9"))), writer, producer, workers=1)
+    job = OrderSubmission("o1", RUN_ID, "U1", "ada", "latte", "large", correlation_id="c1")
+
+    await pipeline.start()
+    assert pipeline.submit(job)
+    await pipeline.stop()
+
+    assert calls == ["commit", ORDERS_TOPIC]
+    publish = producer.publish.await_args.kwargs
+    assert publish["headers"] == {"correlation_id": "c1"}
+    assert publish["value"]["event_type"] == "order_placed"
+    assert publish["value"]["order_id"] == "o1"
+    assert {k: publish["value"][k] for k in ("workspace_id", "channel_id", "initiator_user_id")} == {
+        "workspace_id": "W1",
+        "channel_id": "C1",
+        "initiator_user_id": "U9",
+    }
+
+
+@pytest.mark.asyncio
+async def test_pipeline_publishes_completions_with_run_context() -> None:
+    """Test that a completed run is published to coffee.completions, and a refused one not at all."""
+    producer = AsyncMock()
+    session = run_session(("W1", "C1", "U9"), None)
+    pipeline = OrderPipeline(fake_session_factory(session), Mock(), producer)
+
+    await pipeline.process(RunCompletion(run_id=RUN_ID, user_id="U9"))
+    await pipeline.process(RunCompletion(run_id=RUN_ID, user_id="U9"))
+
+    producer.publish.assert_awaited_once()
+    publish = producer.publish.await_args.kwargs
+    assert (publish["topic"], publish["key"]) == (COMPLETIONS_TOPIC, RUN_ID)
+    assert publish["value"] == {
+        "event_type": "run_completed",
+        "run_id": RUN_ID,
+        "user_id": "U9",
+        "workspace_id": "W1",
+        "channel_id": "C1",
+        "initiator_user_id": "U9",
+    }
+
+
+@pytest.mark.asyncio
+async def test_pipeline_publishes_order_written_by_an_earlier_attempt(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a retry finding the order already committed still publishes it."""
+    monkeypatch.setattr("src.services.order_pipeline.backoff_delay", lambda attempt: 0)
+    producer = AsyncMock()
+    # The first commit succeeds but its acknowledgement is lost, so the retry finds the order
+    writer = Mock(write=AsyncMock(side_effect=[ConnectionError("connection reset"), False]))
+    pipeline = OrderPipeline(fake_session_factory(run_session(("W1", "C1", "U9"))), writer, producer)
+
+    await pipeline.process(OrderSubmission("o1", RUN_ID, "U1", "ada", "latte", "large"))
+
+    assert writer.write.await_count == 2
+    publish = producer.publish.await_args.kwargs
+    assert (publish["topic"], publish["value"]["order_id"]) == (ORDERS_TOPIC, "o1")
+
+
+@pytest.mark.asyncio
+async def test_pipeline_dead_letters_after_repeated_failures(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a job failing every attempt is sent to the DLQ, not dropped."""
+    monkeypatch.setattr("src.services.order_pipeline.backoff_delay", lambda attempt: 0)
+    producer = AsyncMock()
+    failing = AsyncMock(side_effect=RuntimeError("db down"))
+    pipeline = OrderPipeline(fake_session_factory(AsyncMock()), Mock(write=failing), producer, max_attempts=2)
+
+    await pipeline.process(OrderSubmission("o1", RUN_ID, "U1", "ada", "latte", "large"))
+
+    assert failing.await_count == 2
+    publish = producer.publish.await_args.kwargs
+    assert publish["topic"] == "slack.interactions.dlq"
+    assert publish["value"]["order_id"] == "o1"
+
+
+@pytest.mark.asyncio
+async def test_pipeline_stop_drains_queue() -> None:
+    """Test that shutdown waits for queued jobs to be processed."""
+    pipeline = OrderPipeline(fake_session_factory(AsyncMock()), Mock(), AsyncMock(), workers=1)
+    processed = []
+
+    async def slow_process(job):
+        await asyncio.sleep(0.01)
+        processed.append(job.run_id)
+
+    pipeline.process = slow_process
+    await pipeline.start()
+    for i in range(3):
+        pipeline.submit(RunCompletion(run_id=str(i), user_id="U1"))
+    await pipeline.stop()
+
+    assert processed == ["0", "1", "2"]
@@ -0,0 +1,116 @@
+"""
+Unit tests for structured, non-blocking logging.
+
+Tests JSON formatting, correlation_id propagation, sampling, drop
+accounting and Kafka header propagation.
+"""
+import io
+import json
+import logging
+import queue
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.config.logging_config import (
+    CorrelationFilter,
+    DroppingQueueHandler,
+    JsonFormatter,
+    SamplingFilter,
+    correlation_scope,
+    create_queue_handler,
+    get_correlation_id,
+    parse_sample_rates,
+)
+from src.services.kafka_producer import KafkaProducer
+
+
+def make_record(level: int = logging.INFO, name: str = "coffee", msg: str = "hello %s", args: tuple = ("world",)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_json_formatter_includes_extra_and_correlation_id() -> None:
+    """Test that extra fields and the correlation_id become top-level JSON keys."""
+    record = make_record()
+    record.user_id = "U123"
+    with correlation_scope("corr-1"):
+        CorrelationFilter().filter(record)
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "hello world"
+    assert entry["level"] == "INFO"
+    assert entry["user_id"] == "U123"
+    assert entry["correlation_id"] == "corr-1"
+
+
+def test_correlation_scope_restores_previous_value() -> None:
+    """Test that nested scopes unwind correctly."""
+    with correlation_scope("outer"):
+        with correlation_scope("inner"):
+            assert get_correlation_id() == "inner"
+        assert get_correlation_id() == "outer"
+    assert get_correlation_id() is None
+
+
+def test_sampling_never_drops_warnings(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that sampled levels and loggers are thinned while warnings always pass."""
+    monkeypatch.setattr("src.config.logging_config.random.random", lambda: 0.5)
+    sampler = SamplingFilter({"DEBUG": 0.1}, {"aiokafka": 0.9})
+
+    assert sampler.filter(make_record(logging.DEBUG)) is False
+    assert sampler.filter(make_record(logging.DEBUG, name="aiokafka.conn")) is True
+    assert sampler.filter(make_record(logging.INFO)) is True
+    assert sampler.filter(make_record(logging.WARNING, name="coffee")) is True
+
+
+def test_parse_sample_rates_splits_levels_and_loggers() -> None:
+    """Test that level names and logger prefixes are told apart."""
+    assert parse_sample_rates("debug=0.1, aiokafka=0.05") == ({"DEBUG": 0.1}, {"aiokafka": 0.05})
+
+
+def test_full_queue_drops_without_blocking_and_reports() -> None:
+    """Test that overflow is counted, then reported once space frees up."""
+    log_queue: queue.Queue = queue.Queue(maxsize=1)
+    handler = DroppingQueueHandler(log_queue)
+
+    for _ in range(3):
+        handler.handle(make_record())
+    assert handler.dropped == 2
+
+    log_queue.get_nowait()
+    handler.handle(make_record())
+
+    report = log_queue.get_nowait()
+    assert report.levelno == logging.WARNING
+    assert report.dropped == 2
+
+
+def test_listener_writes_json_lines_off_the_calling_thread() -> None:
+    """Test the end-to-end path from logger call to JSON output."""
+    stream = io.StringIO()
+    handler = create_queue_handler(stream=stream)
+    test_logger = logging.getLogger("coffee.test_listener")
+    test_logger.addHandler(handler)
+    test_logger.propagate = False
+    try:
+        with correlation_scope("corr-2"):
+            test_logger.warning("order %s placed", "o1", extra={"run_id": "r1"})
+    finally:
+        handler.listener.stop()
+        test_logger.removeHandler(handler)
+
+    entry = json.loads(stream.getvalue().strip())
+    assert entry == {**entry, "message": "order o1 placed", "run_id": "r1", "correlation_id": "corr-2"}
+
+
+@pytest.mark.asyncio
+async def test_kafka_producer_forwards_correlation_id() -> None:
+    """Test that publish adds the current correlation_id to the message headers."""
+    producer = KafkaProducer("localhost:9092")
+    producer._producer = AsyncMock()
+
+    with correlation_scope("corr-3"):
+        await producer.publish("coffee.orders", "U1", {"a": 1})
+
+    assert ("correlation_id", b"corr-3") in producer._producer.send_and_wait.await_args.kwargs["headers"]
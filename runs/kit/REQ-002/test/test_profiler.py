@@ -0,0 +1,92 @@
+"""
+Unit tests for the admin profiler endpoint.
+
+Tests stack collapsing, sampling of asyncio tasks, the single-run limit
+and the admin token check.
+"""
+import asyncio
+import marshal
+import sys
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.api.app import create_app
+from src.config.settings import Settings
+from src.services.profiler import ProcessProfiler, ProfilerBusyError, collapse_stack
+
+
+def test_collapse_stack_is_root_first_and_bounded() -> None:
+    """Test that frames are ordered outermost first and truncated at the root."""
+    def inner():
+        return sys._getframe()
+
+    labels = collapse_stack(inner())
+    assert labels[-1].startswith("inner (test_profiler.py:")
+    assert labels[-2].startswith("test_collapse_stack_is_root_first_and_bounded ")
+    assert len(collapse_stack(inner(), max_depth=2)) == 2
+
+
+async def busy_work(deadline: float) -> None:
+    loop = asyncio.get_running_loop()
+    while loop.time() < deadline:
+        sum(range(2000))
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_sampling_attributes_stacks_to_asyncio_tasks() -> None:
+    """Test that samples of the loop thread are rooted at the running task."""
+    profiler = ProcessProfiler()
+    loop = asyncio.get_running_loop()
+    worker = asyncio.create_task(busy_work(loop.time() + 0.3), name="busy")
+
+    collapsed = await profiler.sample(0.2, interval=0.005)
+    await worker
+
+    lines = collapsed.splitlines()
+    assert lines
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any(line.startswith("task:busy;") and "busy_work" in line for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_only_one_profile_runs_at_a_time() -> None:
+    """Test that a concurrent request is rejected instead of queued."""
+    profiler = ProcessProfiler()
+    first = asyncio.create_task(profiler.sample(0.1))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(ProfilerBusyError):
+        await profiler.trace(0.1)
+    await first
+
+
+@pytest.mark.asyncio
+async def test_duration_is_clamped() -> None:
+    """Test that a long request is cut to the configured maximum."""
+    profiler = ProcessProfiler(max_deterministic_seconds=0.05)
+
+    stats = await asyncio.wait_for(profiler.trace(3600), timeout=5)
+
+    assert isinstance(marshal.loads(stats), dict)
+
+
+async def request_profile(admin_token: str, headers: dict) -> int:
+    settings = Settings()
+    settings.admin_token = admin_token
+    app = create_app(settings, producer_factory=lambda _: AsyncMock(), database_factory=Mock(return_value=AsyncMock()))
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://localhost:8080") as client:
+            response = await client.post("/admin/profile?seconds=0.05", headers=headers)
+    return response.status_code
+
+
+@pytest.mark.asyncio
+async def test_admin_token_is_required() -> None:
+    """Test that the endpoint is hidden without a token and rejects wrong ones."""
+    assert await request_profile("", {"Authorization": "Bearer s3cret"}) == 404
+    assert await request_profile("s3cret", {}) == 401
+    assert await request_profile("s3cret", {"Authorization": "Bearer wrong"}) == 401
+    assert await request_profile("s3cret", {"Authorization": "Bearer s3cret"}) == 200
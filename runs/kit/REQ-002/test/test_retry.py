@@ -0,0 +1,211 @@
+"""
+Unit tests for the tiered retry subsystem.
+
+Tests tier selection, retry/DLQ publishing, delay-aware re-delivery and
+DLQ replay, with Kafka replaced by mocks.
+"""
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from aiokafka import TopicPartition
+
+from src.services.retry import (
+    DEFAULT_TIERS,
+    HEADER_ATTEMPT,
+    HEADER_NOT_BEFORE,
+    HEADER_SOURCE_TOPIC,
+    PermanentError,
+    RateLimiter,
+    RetryPolicy,
+    RetryScheduler,
+    RetryTierWorker,
+    replay_dlq,
+)
+
+
+def record(topic: str, headers: dict[str, str], value: dict | None = None) -> SimpleNamespace:
+    return SimpleNamespace(
+        topic=topic,
+        key="U123",
+        value=value or {"event_type": "runner_assigned"},
+        headers=[(k, v.encode()) for k, v in headers.items()],
+    )
+
+
+@pytest.fixture
+def producer() -> AsyncMock:
+    return AsyncMock()
+
+
+@pytest.fixture
+def scheduler(producer: AsyncMock) -> RetryScheduler:
+    return RetryScheduler(producer)
+
+
+def test_policy_maps_backoff_onto_tiers() -> None:
+    """Test that 1s, 2-8s and 16-60s backoffs use the 1s, 10s and 60s tiers."""
+    policy = RetryPolicy()
+
+    assert [policy.tier_for(attempt).name for attempt in range(1, 11)] == [
+        "1s", "10s", "10s", "10s", "60s", "60s", "60s", "60s", "60s", "60s"
+    ]
+    assert policy.tier_for(11) is None
+
+
+@pytest.mark.asyncio
+async def test_schedule_publishes_to_tier_with_attempt_headers(
+    scheduler: RetryScheduler, producer: AsyncMock
+) -> None:
+    """Test that a retry carries attempt, source and due-time headers and keeps existing ones."""
+    topic = await scheduler.schedule(
+        "coffee.assignments", "U123", {"a": 1}, {"correlation_id": "c-1"}, attempt=2, error=RuntimeError("429")
+    )
+
+    assert topic == "coffee.assignments.retry.10s"
+    headers = producer.publish.await_args.kwargs["headers"]
+    assert headers["correlation_id"] == "c-1"
+    assert headers[HEADER_ATTEMPT] == "2"
+    assert headers[HEADER_SOURCE_TOPIC] == "coffee.assignments"
+    assert int(headers[HEADER_NOT_BEFORE]) >= int((time.time() + 9) * 1000)
+
+
+@pytest.mark.asyncio
+async def test_exhausted_or_permanent_failures_are_dead_lettered(scheduler: RetryScheduler) -> None:
+    """Test that the DLQ receives events past max attempts and permanent errors."""
+    exhausted = await scheduler.schedule("coffee.orders", "U1", {}, {}, attempt=11, error=RuntimeError())
+    permanent = await scheduler.schedule("coffee.orders", "U1", {}, {}, attempt=1, error=PermanentError())
+
+    assert exhausted == permanent == "coffee.orders.dlq"
+
+
+@pytest.mark.asyncio
+async def test_deliver_hands_failures_to_first_tier(scheduler: RetryScheduler, producer: AsyncMock) -> None:
+    """Test that a failing fresh event is scheduled instead of blocking the consumer."""
+    handler = AsyncMock(side_effect=RuntimeError("ratelimited"))
+
+    assert await scheduler.deliver(handler, "coffee.orders", "U1", {}, {}) is False
+    assert producer.publish.await_args.kwargs["topic"] == "coffee.orders.retry.1s"
+
+
+@pytest.mark.asyncio
+async def test_worker_waits_until_due_then_delivers(scheduler: RetryScheduler, producer: AsyncMock) -> None:
+    """Test that the worker sleeps until not_before instead of delivering early."""
+    handler = AsyncMock()
+    worker = RetryTierWorker(AsyncMock(), scheduler, handler, DEFAULT_TIERS[0])
+    due = time.time() + 0.1
+    headers = {HEADER_ATTEMPT: "1", HEADER_SOURCE_TOPIC: "coffee.orders", HEADER_NOT_BEFORE: str(int(due * 1000))}
+
+    await worker.process(record("coffee.orders.retry.1s", headers))
+
+    assert time.time() >= due - 0.01
+    assert handler.await_args.args[0] == "coffee.orders"
+    producer.publish.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_worker_escalates_failed_redelivery(scheduler: RetryScheduler, producer: AsyncMock) -> None:
+    """Test that a failed re-delivery is scheduled with the next attempt number."""
+    worker = RetryTierWorker(AsyncMock(), scheduler, AsyncMock(side_effect=RuntimeError()), DEFAULT_TIERS[0])
+    headers = {HEADER_ATTEMPT: "1", HEADER_SOURCE_TOPIC: "coffee.orders", HEADER_NOT_BEFORE: "0"}
+
+    await worker.process(record("coffee.orders.retry.1s", headers))
+
+    assert producer.publish.await_args.kwargs["topic"] == "coffee.orders.retry.10s"
+    assert producer.publish.await_args.kwargs["headers"][HEADER_ATTEMPT] == "2"
+
+
+class FakeDlqConsumer:
+    """Subscribed consumer whose partitions are assigned after `join_polls` empty polls."""
+
+    def __init__(self, logs: dict[TopicPartition, list[SimpleNamespace]], join_polls: int = 0, empty_polls: int = 0):
+        self.logs = logs
+        self.join_polls = join_polls
+        # Empty fetches after the assignment, as when the broker is slow to answer
+        self.empty_polls = empty_polls
+        self.positions: dict[TopicPartition, int] = {}
+        self.commit = AsyncMock()
+
+    def assignment(self) -> set[TopicPartition]:
+        return set(self.positions)
+
+    async def end_offsets(self, partitions: list[TopicPartition]) -> dict[TopicPartition, int]:
+        return {tp: len(self.logs[tp]) for tp in partitions}
+
+    async def position(self, tp: TopicPartition) -> int:
+        return self.positions[tp]
+
+    async def getmany(self, timeout_ms: int, max_records: int | None) -> dict:
+        if self.join_polls:
+            self.join_polls -= 1
+            if not self.join_polls:
+                self.positions = {tp: 0 for tp in self.logs}
+            return {}
+        if self.empty_polls:
+            self.empty_polls -= 1
+            return {}
+        batches = {}
+        for tp, position in self.positions.items():
+            records = self.logs[tp][position:position + 1]
+            if records:
+                batches[tp] = records
+                self.positions[tp] += len(records)
+        return batches
+
+
+@pytest.mark.asyncio
+async def test_replay_republishes_to_source_without_retry_headers(producer: AsyncMock) -> None:
+    """Test that DLQ replay restores the original topic and headers, then commits."""
+    headers = {HEADER_ATTEMPT: "11", HEADER_SOURCE_TOPIC: "coffee.orders", "correlation_id": "c"}
+    dead = record("coffee.orders.dlq", headers)
+    consumer = FakeDlqConsumer({TopicPartition("coffee.orders.dlq", 0): [dead, dead]})
+    consumer.positions = {tp: 0 for tp in consumer.logs}
+
+    assert await replay_dlq(consumer, producer) == 2
+    assert producer.publish.await_args.kwargs["topic"] == "coffee.orders"
+    assert producer.publish.await_args.kwargs["headers"] == {"correlation_id": "c"}
+    assert consumer.commit.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_replay_waits_for_assignment_and_drains_to_end_offsets(producer: AsyncMock) -> None:
+    """Test that empty polls while joining the group or fetching do not end the replay early."""
+    dead = record("coffee.orders.dlq", {HEADER_SOURCE_TOPIC: "coffee.orders"})
+    logs = {TopicPartition("coffee.orders.dlq", 0): [dead] * 2, TopicPartition("coffee.orders.dlq", 1): [dead] * 3}
+    consumer = FakeDlqConsumer(logs, join_polls=3, empty_polls=2)
+
+    assert await replay_dlq(consumer, producer) == 5
+    assert producer.publish.await_count == 5
+
+
+@pytest.mark.asyncio
+async def test_replay_gives_up_without_assignment(producer: AsyncMock) -> None:
+    """Test that a replay whose group never assigns partitions fails instead of reporting an empty DLQ."""
+    consumer = FakeDlqConsumer({TopicPartition("coffee.orders.dlq", 0): []}, join_polls=10**6)
+
+    with pytest.raises(TimeoutError):
+        await replay_dlq(consumer, producer, assignment_timeout=0.0)
+
+
+@pytest.mark.asyncio
+async def test_replay_dry_run_publishes_nothing(producer: AsyncMock) -> None:
+    """Test that a dry run neither publishes nor commits."""
+    consumer = FakeDlqConsumer({TopicPartition("coffee.orders.dlq", 0): [record("coffee.orders.dlq", {})]})
+    consumer.positions = {tp: 0 for tp in consumer.logs}
+
+    assert await replay_dlq(consumer, producer, dry_run=True) == 1
+    producer.publish.assert_not_awaited()
+    consumer.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_paces_calls() -> None:
+    """Test that calls beyond the burst are spaced by the configured rate."""
+    limiter = RateLimiter(rate_per_minute=1200)  # one call every 50ms
+    start = time.monotonic()
+
+    for _ in range(3):
+        await limiter.acquire()
+
+    assert time.monotonic() - start >= 0.09
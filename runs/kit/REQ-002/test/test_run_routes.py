@@ -0,0 +1,91 @@
+"""
+Unit tests for the run read API.
+
+Tests the JSON shape of GET /api/v1/runs/{run_id}, names from the user
+directory, and the 404/422 paths, with the read-model query replaced by a
+mock.
+"""
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.api.app import create_app
+from src.config.settings import Settings
+from src.services.user_directory import UserDirectory
+from storage.read_models import OrderRow, RunDetails, RunRow
+
+RUN_ID = uuid.uuid4()
+
+
+def run_details() -> RunDetails:
+    created = datetime(2024, 1, 1, 9, 0)
+    return RunDetails(
+        run=RunRow(RUN_ID, "W1", "C1", "active", created, None, "U1", "Ada", None, None),
+        orders=[OrderRow(uuid.uuid4(), RUN_ID, "U1", "Ada", "latte", "large", None, created)],
+    )
+
+
+async def get_run(
+    path: str, details: RunDetails | None, directory: UserDirectory | None = None
+) -> tuple[int, dict, AsyncMock]:
+    @asynccontextmanager
+    async def session():
+        yield Mock()
+
+    database = AsyncMock()
+    database.session = session
+    app = create_app(Settings(), producer_factory=lambda _: AsyncMock(), database_factory=Mock(return_value=database))
+    load = AsyncMock(return_value=details)
+    with patch("src.api.run_routes.get_run_details", load):
+        async with app.router.lifespan_context(app):
+            app.state.user_directory = directory
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://localhost:8080") as client:
+                response = await client.get(path)
+    return response.status_code, response.json(), load
+
+
+@pytest.mark.asyncio
+async def test_get_run_returns_details_and_orders() -> None:
+    """Test that the run, its people and its orders are serialized."""
+    status, body, load = await get_run(f"/api/v1/runs/{RUN_ID}", run_details())
+
+    assert status == 200
+    assert body["run_id"] == str(RUN_ID)
+    assert body["initiator"] == {"user_id": "U1", "display_name": "Ada"}
+    assert body["runner"] is None
+    assert [(o["display_name"], o["drink_type"]) for o in body["orders"]] == [("Ada", "latte")]
+    assert load.await_args.kwargs == {"with_names": True}
+
+
+@pytest.mark.asyncio
+async def test_get_run_takes_names_from_the_user_directory() -> None:
+    """Test that with the directory enabled names are not joined, and unknown users show their ID."""
+    created = datetime(2024, 1, 1, 9, 0)
+    details = RunDetails(
+        run=RunRow(RUN_ID, "W1", "C1", "completed", created, created, "U1", None, "U2", None),
+        orders=[
+            OrderRow(uuid.uuid4(), RUN_ID, "U1", None, "latte", "large", None, created),
+            OrderRow(uuid.uuid4(), RUN_ID, "U3", None, "mocha", "small", None, created),
+        ],
+    )
+    directory = UserDirectory()
+    directory.apply("U1", "Ada", created)
+    directory.apply("U2", "Grace", created)
+
+    status, body, load = await get_run(f"/api/v1/runs/{RUN_ID}", details, directory)
+
+    assert status == 200
+    assert load.await_args.kwargs == {"with_names": False}
+    assert (body["initiator"]["display_name"], body["runner"]["display_name"]) == ("Ada", "Grace")
+    assert [o["display_name"] for o in body["orders"]] == ["Ada", "U3"]
+
+
+@pytest.mark.asyncio
+async def test_get_run_missing_and_malformed_ids() -> None:
+    """Test that unknown runs are 404 and non-UUID ids are rejected by validation."""
+    assert (await get_run(f"/api/v1/runs/{uuid.uuid4()}", None))[0] == 404
+    assert (await get_run("/api/v1/runs/not-a-uuid", None))[0] == 422
@@ -0,0 +1,114 @@
+"""
+Unit tests for the incrementally maintained run summary.
+
+Tests aggregate maintenance, idempotent redelivery, change-only emission
+and cold-start seeding.
+"""
+from unittest.mock import AsyncMock
+
+import pytest
+
+from services.run_summary import ORDER_CANCELLED, ORDER_UPDATED, RunSummary, RunSummaryService
+
+
+def order_event(order_id: str, user_id: str, drink_type: str = "latte", size: str = "large", **extra) -> dict:
+    return {
+        "event_type": "order_placed",
+        "run_id": "run-1",
+        "order_id": order_id,
+        "user_id": user_id,
+        "drink_type": drink_type,
+        "size": size,
+        **extra,
+    }
+
+
+class TestRunSummary:
+    """Test suite for the per-run aggregate."""
+
+    def test_aggregates_orders(self) -> None:
+        """Test that participants, histogram and count track placed orders."""
+        summary = RunSummary(run_id="run-1")
+        summary.apply(order_event("o1", "U1"))
+        summary.apply(order_event("o2", "U2"))
+        summary.apply(order_event("o3", "U1", drink_type="espresso", size="small"))
+
+        assert summary.order_count == 3
+        assert summary.participants == {"U1": 2, "U2": 1}
+        assert summary.histogram == {("latte", "large"): 2, ("espresso", "small"): 1}
+
+    def test_redelivered_order_is_ignored(self) -> None:
+        """Test that the same order_id is only counted once."""
+        summary = RunSummary(run_id="run-1")
+
+        assert summary.apply(order_event("o1", "U1")) is True
+        assert summary.apply(order_event("o1", "U1")) is False
+        assert summary.order_count == 1
+
+    def test_update_and_cancel_adjust_histogram(self) -> None:
+        """Test that updates move an order between buckets and cancels remove it."""
+        summary = RunSummary(run_id="run-1")
+        summary.apply(order_event("o1", "U1"))
+        summary.apply(order_event("o1", "U1", drink_type="mocha", event_type=ORDER_UPDATED))
+
+        assert summary.histogram == {("mocha", "large"): 1}
+
+        summary.apply({"event_type": ORDER_CANCELLED, "run_id": "run-1", "order_id": "o1"})
+
+        assert summary.order_count == 0
+        assert not summary.participants
+        assert not summary.histogram
+
+    def test_render_is_order_independent(self) -> None:
+        """Test that equal aggregates render identical blocks."""
+        first, second = RunSummary(run_id="run-1"), RunSummary(run_id="run-1")
+        events = [order_event("o1", "U2"), order_event("o2", "U1", drink_type="americano")]
+        for event in events:
+            first.apply(event)
+        for event in reversed(events):
+            second.apply(event)
+
+        assert first.render() == second.render()
+        assert "<@U1>, <@U2>" in first.render()[-1]["elements"][0]["text"]
+
+
+class TestRunSummaryService:
+    """Test suite for change-only summary emission."""
+
+    @pytest.mark.asyncio
+    async def test_emits_only_on_rendered_change(self) -> None:
+        """Test that updates are emitted only when the blocks change."""
+        service = RunSummaryService()
+
+        first = await service.handle_event(order_event("o1", "U1", channel_id="C1", message_ts="111.222"))
+        duplicate = await service.handle_event(order_event("o1", "U1"))
+        second = await service.handle_event(order_event("o2", "U2"))
+
+        assert first is not None
+        assert first.channel_id == "C1" and first.message_ts == "111.222"
+        assert duplicate is None
+        assert second is not None
+        assert second.text == "Coffee run: 2 orders from 2 people"
+
+    @pytest.mark.asyncio
+    async def test_seeds_cold_run_from_loader_once(self) -> None:
+        """Test that an unknown run is seeded from the loader, then maintained in memory."""
+        loader = AsyncMock(return_value=[order_event("o1", "U1"), order_event("o2", "U2")])
+        service = RunSummaryService(order_loader=loader)
+
+        update = await service.handle_event(order_event("o2", "U2"))
+        await service.handle_event(order_event("o3", "U3"))
+
+        loader.assert_awaited_once_with("run-1")
+        assert update is not None
+        assert service.get("run-1").order_count == 3
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used_runs(self) -> None:
+        """Test that at most max_runs aggregates are kept."""
+        service = RunSummaryService(max_runs=2)
+        for run_id in ("run-1", "run-2", "run-3"):
+            await service.handle_event({**order_event("o1", "U1"), "run_id": run_id})
+
+        assert service.get("run-1") is None
+        assert service.get("run-3") is not None
@@ -0,0 +1,170 @@
+"""
+Unit tests for secret providers, the refresh-ahead cache and multi-secret
+signature validation.
+
+The Vault backend is exercised against a local KV v2 stand-in served over
+httpx's ASGI transport.
+"""
+import asyncio
+import hashlib
+import hmac
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+from fastapi import FastAPI, Header, HTTPException
+
+from src.config.secrets import (
+    SECRET_REFRESHES,
+    CachedSecret,
+    EnvSecretProvider,
+    FileSecretProvider,
+    Secret,
+    SecretNotFoundError,
+    StaticSecret,
+    VaultSecretProvider,
+)
+from src.config.settings import Settings
+from src.handlers.coffee_command import SlackSignatureValidator
+
+TOKEN = "vault-token"
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    return "v0=" + hmac.new(secret.encode(), f"v0:{timestamp}:".encode() + body, hashlib.sha256).hexdigest()
+
+
+class RotatingSource:
+    def __init__(self, secret: Secret):
+        self.secret = secret
+
+    def get(self) -> Secret:
+        return self.secret
+
+
+def test_validator_accepts_current_and_previous_secrets() -> None:
+    """Test that both rotation secrets validate, others do not, and a rotation is picked up."""
+    source = RotatingSource(Secret("new", ("old",)))
+    validator = SlackSignatureValidator(source)
+    timestamp, body = str(int(time.time())), b"command=/coffee"
+
+    assert validator.validate(timestamp, body, sign("new", timestamp, body))
+    assert validator.validate(timestamp, body, sign("old", timestamp, body))
+    assert not validator.validate(timestamp, body, sign("other", timestamp, body))
+
+    source.secret = Secret("newer")
+    assert validator.validate(timestamp, body, sign("newer", timestamp, body))
+    assert not validator.validate(timestamp, body, sign("old", timestamp, body))
+
+
+def test_validator_prepares_keys_once_per_secret_version() -> None:
+    """Test that the keyed HMAC states are reused across requests until the secret changes."""
+    validator = SlackSignatureValidator("secret")
+    timestamp = str(int(time.time()))
+
+    validator.validate(timestamp, b"a", sign("secret", timestamp, b"a"))
+    macs = validator._macs
+    validator.validate(timestamp, b"b", sign("secret", timestamp, b"b"))
+
+    assert validator._macs is macs and len(macs) == 1
+
+
+@pytest.mark.asyncio
+async def test_env_and_file_providers(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that env secrets come from Settings and file secrets from <name> and <name>.previous."""
+    monkeypatch.setenv("SLACK_SIGNING_SECRET", "from-env")
+    monkeypatch.setenv("SLACK_SIGNING_SECRET_PREVIOUS", "older,oldest")
+    assert await EnvSecretProvider(Settings()).fetch("slack_signing_secret") == Secret("from-env", ("older", "oldest"))
+
+    provider = FileSecretProvider(str(tmp_path))
+    with pytest.raises(SecretNotFoundError):
+        await provider.fetch("slack_signing_secret")
+    (tmp_path / "slack_signing_secret").write_text("current\n")
+    assert await provider.fetch("slack_signing_secret") == Secret("current")
+    (tmp_path / "slack_signing_secret.previous").write_text("before\n")
+    assert await provider.fetch("slack_signing_secret") == Secret("current", ("before",))
+
+
+def vault_stand_in(versions: list[tuple[str, datetime]]) -> FastAPI:
+    """KV v2 read endpoint serving the given (value, created_time) versions."""
+    app = FastAPI()
+
+    @app.get("/v1/secret/data/coffeebuddy/{name}")
+    async def read(name: str, version: int | None = None, x_vault_token: str = Header(None)) -> dict:
+        if x_vault_token != TOKEN:
+            raise HTTPException(status_code=403)
+        if name != "slack_signing_secret" or not versions:
+            raise HTTPException(status_code=404)
+        number = version or len(versions)
+        value, created = versions[number - 1]
+        return {
+            "data": {
+                "data": {"value": value},
+                "metadata": {"version": number, "created_time": created.isoformat().replace("+00:00", "Z")},
+            }
+        }
+
+    return app
+
+
+def vault(versions: list[tuple[str, datetime]], token: str = TOKEN) -> VaultSecretProvider:
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=vault_stand_in(versions)), base_url="http://vault")
+    return VaultSecretProvider(client, token, grace=timedelta(hours=24))
+
+
+@pytest.mark.asyncio
+async def test_vault_provider_keeps_previous_version_during_grace() -> None:
+    """Test that the previous KV version is accepted only within the grace period after a rotation."""
+    now = datetime.now(timezone.utc)
+
+    assert await vault([("v1", now)]).fetch("slack_signing_secret") == Secret("v1")
+    assert await vault([("v1", now - timedelta(days=90)), ("v2", now - timedelta(hours=1))]).fetch(
+        "slack_signing_secret"
+    ) == Secret("v2", ("v1",))
+    assert await vault([("v1", now - timedelta(days=90)), ("v2", now - timedelta(days=2))]).fetch(
+        "slack_signing_secret"
+    ) == Secret("v2")
+    with pytest.raises(SecretNotFoundError):
+        await vault([("v1", now)]).fetch("missing")
+    with pytest.raises(httpx.HTTPStatusError):
+        await vault([("v1", now)], token="wrong").fetch("slack_signing_secret")
+
+
+@pytest.mark.asyncio
+async def test_cached_secret_refreshes_ahead_and_survives_backend_errors() -> None:
+    """Test that the cache refreshes before expiry and keeps serving the last value when a refresh fails."""
+    responses = [Secret("one"), Secret("two"), RuntimeError("vault down")]
+
+    async def fetch(name: str) -> Secret:
+        response = responses.pop(0) if responses else Secret("three")
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    provider = AsyncMock()
+    provider.fetch.side_effect = fetch
+    # Refreshes at 0.1s (two), 0.2s (fails), 0.4s (three)
+    cached = CachedSecret(provider, "slack_signing_secret", ttl=0.2, refresh_ahead=0.5, retry_interval=0.2)
+    errors = SECRET_REFRESHES.labels(name="slack_signing_secret", outcome="error")._value.get()
+
+    with pytest.raises(RuntimeError):
+        cached.get()
+    await cached.start()
+    assert cached.get() == Secret("one")
+    await asyncio.sleep(0.15)
+    assert cached.get() == Secret("two")
+    await asyncio.sleep(0.15)
+    assert cached.get() == Secret("two")
+    await asyncio.sleep(0.2)
+    assert cached.get() == Secret("three")
+    await cached.stop()
+
+    assert SECRET_REFRESHES.labels(name="slack_signing_secret", outcome="error")._value.get() == errors + 1
+
+
+def test_static_secret() -> None:
+    """Test that a plain string behaves as a single, never-rotating secret."""
+    assert StaticSecret("s").get().values == ("s",)
@@ -0,0 +1,98 @@
+"""
+Unit tests for the debounced Slack message coalescer.
+
+Tests latest-state coalescing, per-message isolation, the staleness bound,
+flushing and the calls-saved metric.
+"""
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from prometheus_client import REGISTRY
+
+from services.slack_updater import SlackMessageCoalescer
+
+
+def blocks(text: str) -> list[dict]:
+    return [{"type": "section", "text": {"type": "mrkdwn", "text": text}}]
+
+
+@pytest.fixture
+def slack_client() -> AsyncMock:
+    return AsyncMock()
+
+
+@pytest.mark.asyncio
+async def test_burst_is_coalesced_to_latest_state(slack_client: AsyncMock) -> None:
+    """Test that a burst of updates for one message produces a single call with the last state."""
+    coalesced_before = REGISTRY.get_sample_value("slack_message_updates_coalesced_total")
+    coalescer = SlackMessageCoalescer(slack_client, window=0.05, max_staleness=1.0)
+
+    for i in range(10):
+        coalescer.submit("C1", "111.222", f"{i + 1} orders", blocks(f"{i + 1} orders"))
+    await asyncio.sleep(0.15)
+
+    slack_client.chat_update.assert_awaited_once_with(
+        channel="C1", ts="111.222", text="10 orders", blocks=blocks("10 orders")
+    )
+    assert REGISTRY.get_sample_value("slack_message_updates_coalesced_total") - coalesced_before == 9
+    assert coalescer.pending_count == 0
+
+
+@pytest.mark.asyncio
+async def test_messages_are_debounced_independently(slack_client: AsyncMock) -> None:
+    """Test that different (channel, message_ts) keys never coalesce."""
+    coalescer = SlackMessageCoalescer(slack_client, window=0.05, max_staleness=1.0)
+
+    coalescer.submit("C1", "1.0", "a", blocks("a"))
+    coalescer.submit("C2", "1.0", "b", blocks("b"))
+    coalescer.submit("C1", "2.0", "c", blocks("c"))
+    await asyncio.sleep(0.15)
+
+    assert slack_client.chat_update.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_max_staleness_bounds_a_continuous_stream(slack_client: AsyncMock) -> None:
+    """Test that updates arriving faster than the window are still sent within max_staleness."""
+    coalescer = SlackMessageCoalescer(slack_client, window=0.05, max_staleness=0.12)
+
+    for i in range(10):
+        coalescer.submit("C1", "1.0", str(i), blocks(str(i)))
+        await asyncio.sleep(0.03)
+    await coalescer.flush()
+
+    # Without the bound this stream would only produce the final flush
+    assert slack_client.chat_update.await_count >= 2
+    assert slack_client.chat_update.await_args.kwargs["text"] == "9"
+
+
+@pytest.mark.asyncio
+async def test_flush_sends_pending_immediately(slack_client: AsyncMock) -> None:
+    """Test that flush does not wait for the debounce window."""
+    coalescer = SlackMessageCoalescer(slack_client, window=10.0, max_staleness=10.0)
+    coalescer.submit("C1", "1.0", "a", blocks("a"))
+
+    await asyncio.wait_for(coalescer.flush(), timeout=1.0)
+
+    slack_client.chat_update.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_update_does_not_stop_later_updates(slack_client: AsyncMock) -> None:
+    """Test that a Slack error is logged and the message keeps accepting updates."""
+    slack_client.chat_update.side_effect = [RuntimeError("ratelimited"), None]
+    coalescer = SlackMessageCoalescer(slack_client, window=0.0, max_staleness=0.0)
+
+    coalescer.submit("C1", "1.0", "a", blocks("a"))
+    await coalescer.flush()
+    coalescer.submit("C1", "1.0", "b", blocks("b"))
+    await coalescer.flush()
+
+    assert slack_client.chat_update.await_count == 2
+
+
+def test_rejects_staleness_below_window(slack_client: AsyncMock) -> None:
+    """Test that max_staleness must cover the debounce window."""
+    with pytest.raises(ValueError):
+        SlackMessageCoalescer(slack_client, window=2.0, max_staleness=1.0)
@@ -0,0 +1,230 @@
+"""
+Unit tests for the Kafka spill journal.
+
+Tests durability across reopen, segment rotation and the disk bound,
+torn-tail recovery, slot locking, in-order replay, the producer's
+fallback to the journal, and closing clients that failed to connect, with
+Kafka replaced by mocks.
+"""
+import asyncio
+import os
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+from aiokafka.errors import KafkaConnectionError, KafkaError
+
+from src.services.kafka_producer import KafkaProducer
+from src.services.spill_journal import (
+    SPILL_DROPPED,
+    JournalFullError,
+    JournalReplayer,
+    SpillJournal,
+    claim_journal,
+)
+
+SEGMENT = 4096
+
+
+def event(n: int, size: int = 10) -> dict:
+    return {"topic": "slack.events", "key": f"U{n}", "value": {"n": n, "pad": "x" * size}, "headers": {}}
+
+
+def open_journal(path: Path, **kwargs) -> SpillJournal:
+    journal = SpillJournal(str(path), segment_bytes=SEGMENT, fsync_interval=0, **kwargs)
+    journal.open()
+    return journal
+
+
+@pytest.mark.asyncio
+async def test_records_survive_reopen_and_cursor_is_kept(tmp_path: Path) -> None:
+    """Test that appended records and the acknowledged position survive closing the journal."""
+    journal = open_journal(tmp_path)
+    for n in range(5):
+        await journal.append(event(n))
+    batch = journal.read(2)
+    journal.ack(batch[-1][0], len(batch))
+    journal.close()
+
+    journal = open_journal(tmp_path)
+
+    assert journal.pending == 3
+    assert [record["value"]["n"] for _, record in journal.read(10)] == [2, 3, 4]
+    journal.close()
+
+
+@pytest.mark.asyncio
+async def test_segments_rotate_are_deleted_once_replayed_and_disk_is_bounded(tmp_path: Path) -> None:
+    """Test that full segments rotate, the disk budget rejects appends, and acks free segments."""
+    journal = open_journal(tmp_path, max_bytes=3 * SEGMENT)
+
+    with pytest.raises(JournalFullError):
+        for n in range(1000):
+            await journal.append(event(n, size=500))
+    written = journal.pending
+    assert journal.disk_bytes == 3 * SEGMENT
+    assert len(list(tmp_path.glob("*.seg"))) == 3
+
+    batch = journal.read(written)
+    assert [record["value"]["n"] for _, record in batch] == list(range(written))
+    journal.ack(batch[-1][0], len(batch))
+
+    assert journal.pending == 0
+    assert len(list(tmp_path.glob("*.seg"))) == 1
+    await journal.append(event(written))
+    assert journal.pending == 1
+    journal.close()
+
+
+@pytest.mark.asyncio
+async def test_torn_tail_is_discarded_on_open(tmp_path: Path) -> None:
+    """Test that a record failing its checksum ends the log and is overwritten by the next append."""
+    journal = open_journal(tmp_path)
+    await journal.append(event(1))
+    await journal.append(event(2))
+    journal.close()
+
+    segment = next(tmp_path.glob("*.seg"))
+    data = bytearray(segment.read_bytes())
+    second = data.index(b'"n":2')
+    data[second] = ord("X")
+    segment.write_bytes(bytes(data))
+
+    journal = open_journal(tmp_path)
+    assert journal.pending == 1
+    await journal.append(event(3))
+    assert [record["value"]["n"] for _, record in journal.read(10)] == [1, 3]
+    journal.close()
+
+
+def test_each_process_claims_its_own_slot(tmp_path: Path) -> None:
+    """Test that a locked journal cannot be opened twice and claim_journal moves to the next slot."""
+    first = claim_journal(str(tmp_path), segment_bytes=SEGMENT)
+    try:
+        with pytest.raises(BlockingIOError):
+            SpillJournal(first.directory, segment_bytes=SEGMENT).open()
+        second = claim_journal(str(tmp_path), segment_bytes=SEGMENT)
+        assert [os.path.basename(j.directory) for j in (first, second)] == ["slot-0", "slot-1"]
+        second.close()
+    finally:
+        first.close()
+
+
+@pytest.mark.asyncio
+async def test_replayer_acknowledges_sent_records_and_retries_the_rest(tmp_path: Path) -> None:
+    """Test that a failed send leaves it and later records in the journal, in order."""
+    journal = open_journal(tmp_path)
+    for n in range(3):
+        await journal.append(event(n))
+    send = AsyncMock(side_effect=[None, KafkaConnectionError("down"), None, None])
+    replayer = JournalReplayer(journal, send)
+
+    with pytest.raises(KafkaConnectionError):
+        await replayer.drain_once()
+    assert journal.pending == 2
+    assert await replayer.drain_once() == 2
+
+    assert [call.args[2]["n"] for call in send.await_args_list] == [0, 1, 1, 2]
+    assert journal.pending == 0
+    journal.close()
+
+
+@pytest.fixture
+def producer(tmp_path: Path):
+    producer = KafkaProducer("localhost:9092", spill_dir=str(tmp_path))
+    producer._producer = AsyncMock()
+    producer.journal = claim_journal(str(tmp_path), segment_bytes=SEGMENT, max_bytes=2 * SEGMENT)
+    yield producer
+    producer.journal.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_publish_spills_and_later_events_queue_behind(producer: KafkaProducer) -> None:
+    """Test that a Kafka failure spills the event and keeps later events in order behind it."""
+    send = producer._producer.send_and_wait
+    send.side_effect = [KafkaConnectionError("down"), None, None, None]
+
+    await producer.publish("slack.events", "U1", {"n": 1})
+    await producer.publish("slack.events", "U2", {"n": 2})
+    assert send.await_count == 1
+    assert producer.journal.pending == 2
+
+    await JournalReplayer(producer.journal, producer._send).drain_once()
+    await producer.publish("slack.events", "U3", {"n": 3})
+
+    assert [call.kwargs["value"]["n"] for call in send.await_args_list] == [1, 1, 2, 3]
+    assert producer.journal.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_full_journal_raises_the_kafka_error(producer: KafkaProducer) -> None:
+    """Test that once the journal is full publishes fail with a KafkaError, as without a journal."""
+    producer._producer.send_and_wait.side_effect = KafkaConnectionError("down")
+    dropped = SPILL_DROPPED.labels(topic="slack.events")._value.get()
+
+    with pytest.raises(KafkaError):
+        for n in range(100):
+            await producer.publish("slack.events", f"U{n}", {"pad": "x" * 500})
+
+    assert SPILL_DROPPED.labels(topic="slack.events")._value.get() == dropped + 1
+
+
+def failing_clients(*outcomes: Exception | None) -> list[AsyncMock]:
+    """Fake AIOKafkaProducers whose start() raises (or succeeds, for None) in turn."""
+    return [AsyncMock(start=AsyncMock(side_effect=outcome)) for outcome in outcomes]
+
+
+async def retry_without_delay(producer: KafkaProducer) -> None:
+    """Replace the background connection retry with one that does not back off."""
+    producer._connect_task.cancel()
+    await asyncio.gather(producer._connect_task, return_exceptions=True)
+    producer._connect_task = asyncio.create_task(producer._connect_until_up(delay=0))
+
+
+@pytest.mark.asyncio
+async def test_failed_start_stops_the_client_without_a_journal() -> None:
+    """Test that a client that cannot connect is stopped before the error propagates."""
+    producer = KafkaProducer("localhost:9092")
+    [client] = failing_clients(KafkaConnectionError("down"))
+    producer._create_producer = lambda: client
+
+    with pytest.raises(KafkaError):
+        await producer.start()
+
+    client.stop.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_connection_retries_stop_every_failed_client(tmp_path: Path) -> None:
+    """Test that each failed attempt's client is stopped and stop() closes the one that connected."""
+    producer = KafkaProducer("localhost:9092", spill_dir=str(tmp_path))
+    clients = failing_clients(KafkaConnectionError("down"), KafkaConnectionError("down"), None)
+    producer._create_producer = iter(clients).__next__
+
+    await producer.start()
+    await retry_without_delay(producer)
+    await asyncio.wait_for(asyncio.shield(producer._connect_task), 1.0)
+    await producer.stop()
+
+    assert [client.stop.await_count for client in clients] == [1, 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_stop_while_reconnecting_closes_the_pending_client(tmp_path: Path) -> None:
+    """Test that stopping during the background retry leaves no client open."""
+    producer = KafkaProducer("localhost:9092", spill_dir=str(tmp_path))
+    started = asyncio.Event()
+
+    async def hang() -> None:
+        started.set()
+        await asyncio.sleep(60)
+
+    clients = [*failing_clients(KafkaConnectionError("down")), AsyncMock(start=AsyncMock(side_effect=hang))]
+    producer._create_producer = iter(clients).__next__
+
+    await producer.start()
+    await retry_without_delay(producer)
+    await started.wait()
+    await producer.stop()
+
+    assert all(client.stop.await_count >= 1 for client in clients)
@@ -0,0 +1,102 @@
+"""
+Unit tests for per-stage request timing.
+
+Tests stage recording, the Server-Timing header, histogram observations
+labelled by route template, and the disabled (no-op) path.
+"""
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+
+from src.api.app import create_app
+from src.config.settings import Settings
+from src.services.stage_timing import NULL_STAGE_TIMER, StageTimer, current_stage_timer, route_label
+
+
+def test_stage_timer_records_stages_and_histogram() -> None:
+    """Test that stages are kept in order and observed in Prometheus."""
+    labels = {"handler": "/test", "stage": "work"}
+    before = REGISTRY.get_sample_value("http_handler_stage_duration_seconds_count", labels) or 0
+    timer = StageTimer("/test")
+
+    with timer.stage("work"):
+        pass
+    timer.record("other", 0.0015)
+
+    assert [name for name, _ in timer.stages] == ["work", "other"]
+    assert timer.server_timing().endswith("other;dur=1.50")
+    assert REGISTRY.get_sample_value("http_handler_stage_duration_seconds_count", labels) == before + 1
+
+
+def test_disabled_timer_is_a_shared_no_op() -> None:
+    """Test that outside an enabled request the no-op timer is returned."""
+    timer = current_stage_timer()
+
+    assert timer is NULL_STAGE_TIMER
+    assert timer.stage("a") is timer.stage("b")
+    with timer.stage("a"):
+        pass
+    assert timer.server_timing() == ""
+
+
+async def post_coffee(settings: Settings) -> dict:
+    app = create_app(settings, producer_factory=lambda _: AsyncMock(), database_factory=Mock(return_value=AsyncMock()))
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://localhost:8080") as client:
+            with patch("src.handlers.coffee_command.SlackSignatureValidator.validate", return_value=True):
+                response = await client.post(
+                    "/slack/commands/coffee",
+                    data={"trigger_id": "t1", "user_id": "U1", "command": "/coffee"},
+                    headers={"X-Slack-Request-Timestamp": str(int(time.time())), "X-Slack-Signature": "v0=x"},
+                )
+    assert response.status_code == 200
+    return dict(response.headers)
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header_lists_handler_stages(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the /coffee response reports each stage plus the total."""
+    monkeypatch.setenv("STAGE_TIMING_ENABLED", "true")
+
+    headers = await post_coffee(Settings())
+
+    stages = [entry.split(";")[0] for entry in headers["server-timing"].split(", ")]
+    assert stages == ["read_body", "verify_signature", "parse_form", "kafka_publish", "render_modal", "total"]
+
+
+@pytest.mark.asyncio
+async def test_no_server_timing_header_when_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that disabling timing removes the middleware entirely."""
+    monkeypatch.setenv("STAGE_TIMING_ENABLED", "false")
+
+    headers = await post_coffee(Settings())
+
+    assert "server-timing" not in headers
+
+
+@pytest.mark.asyncio
+async def test_histogram_is_labelled_by_route_template(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that requests to one parametrized route share a single handler label."""
+    monkeypatch.setenv("STAGE_TIMING_ENABLED", "true")
+    app = create_app(Settings(), producer_factory=lambda _: AsyncMock(), database_factory=Mock(return_value=AsyncMock()))
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str) -> dict:
+        with current_stage_timer().stage("lookup"):
+            return {"item_id": item_id}
+
+    labels = {"handler": "/items/{item_id}", "stage": "lookup"}
+    before = REGISTRY.get_sample_value("http_handler_stage_duration_seconds_count", labels) or 0
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://localhost:8080") as client:
+            for item_id in ("a", "b", "c"):
+                assert (await client.get(f"/items/{item_id}")).status_code == 200
+
+    assert REGISTRY.get_sample_value("http_handler_stage_duration_seconds_count", labels) == before + 3
+    assert REGISTRY.get_sample_value(
+        "http_handler_stage_duration_seconds_count", {"handler": "/items/a", "stage": "lookup"}
+    ) is None
+    assert route_label({"path": "/nowhere"}) == "unmatched"
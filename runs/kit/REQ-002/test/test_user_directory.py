@@ -0,0 +1,180 @@
+"""
+Unit tests for the replicated user directory.
+
+Tests the database backfill, catching up with the compacted topic over
+offset gaps, tombstones and last-writer-wins ordering, live updates, and
+first-time orderers being announced by the order pipeline, with Kafka
+replaced by an in-memory consumer.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from aiokafka import TopicPartition
+
+from src.services.order_pipeline import ORDERS_TOPIC, OrderPipeline, OrderSubmission
+from src.services.user_directory import (
+    DIRECTORY_LOOKUPS,
+    USERS_TOPIC,
+    UserDirectory,
+    UserDirectoryFeed,
+    user_event,
+)
+from storage.read_models import UserNameRow
+
+NOW = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+P0, P1 = TopicPartition(USERS_TOPIC, 0), TopicPartition(USERS_TOPIC, 1)
+
+
+class FakeConsumer:
+    """In-memory stand-in for a group-less AIOKafkaConsumer over a compacted topic."""
+
+    def __init__(self, logs: dict[TopicPartition, dict[int, tuple[str, dict | None]]]):
+        # offset -> (key, value) per partition; missing offsets model compaction
+        self.logs = logs
+        self.positions: dict[TopicPartition, int] = {}
+        self.started = False
+
+    async def start(self) -> None:
+        self.started = True
+
+    async def stop(self) -> None:
+        self.started = False
+
+    async def topics(self) -> set[str]:
+        return {tp.topic for tp in self.logs}
+
+    def partitions_for_topic(self, topic: str) -> set[int]:
+        return {tp.partition for tp in self.logs if tp.topic == topic}
+
+    def assign(self, partitions: list[TopicPartition]) -> None:
+        self.positions = {tp: 0 for tp in partitions}
+
+    async def seek_to_beginning(self, *partitions: TopicPartition) -> None:
+        for tp in partitions:
+            self.positions[tp] = 0
+
+    async def end_offsets(self, partitions: list[TopicPartition]) -> dict[TopicPartition, int]:
+        return {tp: max(self.logs[tp], default=-1) + 1 for tp in partitions}
+
+    async def position(self, tp: TopicPartition) -> int:
+        return self.positions[tp]
+
+    async def getmany(self, timeout_ms: int, max_records: int) -> dict:
+        await asyncio.sleep(0.001)
+        batches = {}
+        for tp, position in self.positions.items():
+            offsets = sorted(o for o in self.logs[tp] if o >= position)[:max_records]
+            if offsets:
+                batches[tp] = [SimpleNamespace(key=self.logs[tp][o][0], value=self.logs[tp][o][1]) for o in offsets]
+            self.positions[tp] = max(self.logs[tp], default=-1) + 1 if not offsets else offsets[-1] + 1
+        return batches
+
+
+def record(user_id: str, name: str | None, minutes: int = 0) -> tuple[str, dict | None]:
+    return user_id, None if name is None else user_event(user_id, name, NOW + timedelta(minutes=minutes))
+
+
+def fake_session_factory(user_row: tuple | None = None):
+    session = AsyncMock()
+    # Run context and stored user lookups by the order pipeline
+    session.execute.return_value = Mock(
+        one=Mock(return_value=("W1", "C1", "U2")), one_or_none=Mock(return_value=user_row)
+    )
+
+    @asynccontextmanager
+    async def factory():
+        yield session
+
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_backfill_pages_through_users_and_get_many_skips_unknown_ids() -> None:
+    """Test that the backfill loads every page and get_many resolves known IDs only."""
+    rows = [UserNameRow(f"U{n}", f"User {n}", datetime(2024, 1, 1)) for n in range(5)]
+    pages = []
+
+    async def load(session, after, limit):
+        pages.append(after)
+        start = 0 if after is None else next(i for i, row in enumerate(rows) if row.user_id == after) + 1
+        return rows[start:start + limit]
+
+    directory = UserDirectory()
+    misses = DIRECTORY_LOOKUPS.labels(outcome="miss")._value.get()
+
+    assert await directory.backfill(fake_session_factory(), load=load, page_size=2) == 5
+    assert pages == [None, "U1", "U3", "U4"]
+    assert directory.get_many(["U0", "U4", "U4", "U9"]) == {"U0": "User 0", "U4": "User 4"}
+    assert directory.get("U9", "U9") == "U9"
+    assert DIRECTORY_LOOKUPS.labels(outcome="miss")._value.get() == misses + 2
+
+
+@pytest.mark.asyncio
+async def test_catch_up_applies_tombstones_and_keeps_newer_names() -> None:
+    """Test that catch-up reads past compaction gaps, honours tombstones, and never regresses a name."""
+    consumer = FakeConsumer(
+        {
+            P0: {0: record("U1", "Ada"), 3: record("U2", "Grace"), 7: record("U2", None)},
+            P1: {2: record("U3", "Old name", minutes=-60), 5: ("U4", {"display_name": "no timestamp"})},
+        }
+    )
+    directory = UserDirectory()
+    directory.apply("U3", "New name", NOW)
+    feed = UserDirectoryFeed(directory, consumer, batch_size=2)
+
+    await consumer.start()
+    assert await feed.catch_up() == 5
+
+    assert directory.get_many(["U1", "U2", "U3", "U4"]) == {"U1": "Ada", "U3": "New name"}
+    assert [directory.apply_record(*record("U1", "Ada L.", minutes=1)), directory.apply_record("U9", None)] == [
+        "applied",
+        "stale",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_feed_catches_up_on_start_then_follows_live_updates() -> None:
+    """Test that start() waits for the catch-up and later records are applied as they arrive."""
+    consumer = FakeConsumer({P0: {0: record("U1", "Ada")}, P1: {}})
+    directory = UserDirectory()
+    feed = UserDirectoryFeed(directory, consumer, poll_timeout_ms=1)
+
+    assert await feed.start(timeout=1.0)
+    assert directory.get("U1") == "Ada"
+
+    consumer.logs[P1][0] = record("U2", "Grace", minutes=5)
+    for _ in range(100):
+        if "U2" in directory:
+            break
+        await asyncio.sleep(0.005)
+    await feed.stop()
+
+    assert directory.get("U2") == "Grace"
+    assert not consumer.started
+
+
+@pytest.mark.asyncio
+async def test_pipeline_announces_first_time_orderers() -> None:
+    """Test that a committed order from an unknown user publishes the stored user to coffee.users once."""
+    producer = AsyncMock()
+    directory = UserDirectory()
+    directory.apply("U2", "Grace", NOW)
+    writer = Mock(write=AsyncMock(return_value=True))
+    # The users row already holds a newer name than the Slack handle submitted with the order
+    stored = ("Ada Lovelace", NOW.replace(tzinfo=None) - timedelta(minutes=5))
+    pipeline = OrderPipeline(fake_session_factory(stored), writer, producer, user_directory=directory)
+
+    await pipeline.process(OrderSubmission("o1", "run", "U1", "ada", "latte", "large"))
+    await pipeline.process(OrderSubmission("o2", "run", "U1", "ada", "mocha", "large"))
+    await pipeline.process(OrderSubmission("o3", "run", "U2", "grace", "latte", "small"))
+
+    topics = [call.kwargs["topic"] for call in producer.publish.await_args_list]
+    assert topics == [ORDERS_TOPIC, USERS_TOPIC, ORDERS_TOPIC, ORDERS_TOPIC]
+    announced = producer.publish.await_args_list[1].kwargs
+    assert announced["key"] == "U1"
+    assert announced["value"] == user_event("U1", *stored)
+    assert directory.get("U1") == "Ada Lovelace"
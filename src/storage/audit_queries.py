@@ -0,0 +1,183 @@
+"""
+CoffeeBuddy Audit Queries
+Filtered, keyset-paginated reads of audit_logs for the compliance API
+
+Every query is bounded: the time range may span at most the 90-day retention
+window, pages hold at most MAX_PAGE_SIZE rows, and the statement runs under a
+local statement_timeout. Results are ordered newest first by
+(timestamp, log_id); the cursor is the last row's key, so page N costs the
+same as page 1 (no OFFSET). The V0003 indexes serve each filter:
+(event_type | user_id | run_id, timestamp DESC, log_id DESC) composites and
+a jsonb_path_ops GIN index for payload containment.
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import ColumnElement, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import AuditLog
+from .read_models import AUDIT_COLUMNS, AuditRow
+
+MAX_RANGE = timedelta(days=90)
+DEFAULT_RANGE = timedelta(days=7)
+MAX_PAGE_SIZE = 500
+STATEMENT_TIMEOUT_MS = 2000
+
+
+@dataclass(frozen=True)
+class AuditFilter:
+    """Audit query criteria; unset fields do not filter"""
+
+    event_types: Sequence[str] = ()
+    user_id: Optional[str] = None
+    run_id: Optional[UUID] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class AuditPage:
+    """One page of results and the cursor for the next one"""
+
+    items: List[AuditRow]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(row: AuditRow) -> str:
+    """Opaque cursor pointing just past a row"""
+    raw = json.dumps([row.timestamp.isoformat(), str(row.log_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    Parse a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, log_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), UUID(log_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor {cursor!r}") from e
+
+
+def parse_payload_filters(items: Sequence[str]) -> Dict[str, Any]:
+    """
+    Turn "key=value" strings into a containment document
+
+    Dotted keys address nested objects ("order.size=large" becomes
+    {"order": {"size": "large"}}); values are parsed as JSON when possible,
+    so "count=2" matches the number and "count=\"2\"" the string.
+
+    Raises:
+        ValueError: If an item has no "="
+    """
+    document: Dict[str, Any] = {}
+    for item in items:
+        key, sep, raw = item.partition("=")
+        if not sep or not key:
+            raise ValueError(f"Invalid payload filter {item!r}; expected key=value")
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw
+        *parents, leaf = key.split(".")
+        node = document
+        for parent in parents:
+            node = node.setdefault(parent, {})
+            if not isinstance(node, dict):
+                raise ValueError(f"Conflicting payload filters for {key!r}")
+        node[leaf] = value
+    return document
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Convert an aware datetime to naive UTC, like the stored timestamps; naive ones pass through"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def filter_clauses(filters: AuditFilter) -> List[ColumnElement[bool]]:
+    """WHERE clauses for every set filter except the time range"""
+    clauses: List[ColumnElement[bool]] = []
+    if filters.event_types:
+        clauses.append(AuditLog.event_type.in_(list(filters.event_types)))
+    if filters.user_id is not None:
+        clauses.append(AuditLog.user_id == filters.user_id)
+    if filters.run_id is not None:
+        clauses.append(AuditLog.run_id == filters.run_id)
+    if filters.payload:
+        clauses.append(AuditLog.payload.contains(filters.payload))
+    return clauses
+
+
+def resolve_range(
+    start: Optional[datetime], end: Optional[datetime], now: Optional[datetime] = None
+) -> Tuple[datetime, datetime]:
+    """
+    Fill in and validate the time range
+
+    Defaults to the DEFAULT_RANGE before `end` (itself defaulting to now).
+    Timezone-aware bounds are converted to naive UTC, like the stored timestamps.
+
+    Raises:
+        ValueError: If the range is inverted or longer than MAX_RANGE
+    """
+    end = naive_utc(end or now or datetime.utcnow())
+    start = naive_utc(start) if start else end - DEFAULT_RANGE
+    if start >= end:
+        raise ValueError("start must be before end")
+    if end - start > MAX_RANGE:
+        raise ValueError(f"Time range may span at most {MAX_RANGE.days} days")
+    return start, end
+
+
+async def query_audit_logs(
+    session: AsyncSession,
+    filters: AuditFilter,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> AuditPage:
+    """
+    Fetch one page of audit entries, newest first
+
+    Args:
+        session: Session to query in (the statement_timeout is local to its transaction)
+        filters: Criteria
+        limit: Page size, capped at MAX_PAGE_SIZE
+        cursor: next_cursor of the previous page
+
+    Returns:
+        The page; next_cursor is None on the last page
+
+    Raises:
+        ValueError: On an invalid cursor or time range
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    start, end = resolve_range(filters.start, filters.end)
+
+    query = select(*AUDIT_COLUMNS).where(
+        AuditLog.timestamp >= start, AuditLog.timestamp < end, *filter_clauses(filters)
+    )
+    if cursor is not None:
+        query = query.where(tuple_(AuditLog.timestamp, AuditLog.log_id) < tuple_(*decode_cursor(cursor)))
+    # One extra row tells whether another page exists without a COUNT
+    query = query.order_by(AuditLog.timestamp.desc(), AuditLog.log_id.desc()).limit(limit + 1)
+
+    await session.execute(text(f"SET LOCAL statement_timeout = {STATEMENT_TIMEOUT_MS}"))
+    result = await session.execute(query)
+    items = list(map(AuditRow._make, result))
+    if len(items) <= limit:
+        return AuditPage(items=items, next_cursor=None)
+    items = items[:limit]
+    return AuditPage(items=items, next_cursor=encode_cursor(items[-1]))
@@ -0,0 +1,88 @@
+"""
+CoffeeBuddy Query Benchmark CLI
+Generates synthetic data, runs the hot queries and diffs against a stored baseline
+
+Usage:
+    PYTHONPATH=src python -m storage.bench --preset small --database-url postgresql://... [--save-baseline]
+
+Point it at a dedicated, already migrated database: generated rows are real rows.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+
+from ..database import DatabaseManager, to_async_url
+from .loader import load, scale_from_args
+from .queries import HOT_QUERIES
+from .runner import compare_to_baseline, run_benchmark
+from .synthetic import PRESETS
+
+logger = logging.getLogger(__name__)
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m storage.bench", description="Run the CoffeeBuddy query benchmark")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", ""))
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--workspaces", type=int)
+    parser.add_argument("--orders", type=int)
+    parser.add_argument("--audit-logs", type=int)
+    parser.add_argument("--workers", type=int, help="Loader worker processes (default: CPU count)")
+    parser.add_argument("--skip-generate", action="store_true", help="Reuse data from a previous run")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    parser.add_argument("--baseline", type=Path, help="Baseline file (default: baselines/<preset>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative p95 regression")
+    return parser.parse_args(argv)
+
+
+async def main(argv: list[str]) -> int:
+    args = parse_args(argv)
+    if not args.database_url:
+        logger.error("DATABASE_URL not set. Provide --database-url or the environment variable.")
+        return 2
+
+    scale = scale_from_args(args)
+    baseline_path = args.baseline or BASELINE_DIR / f"{args.preset}.json"
+    database_url = to_async_url(args.database_url)
+
+    if not args.skip_generate:
+        await load(database_url, scale, args.workers)
+
+    db = DatabaseManager(database_url, pool_size=2)
+    try:
+        report = await run_benchmark(db, HOT_QUERIES, scale, iterations=args.iterations, warmup=args.warmup)
+    finally:
+        await db.close()
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, default=str))
+        logger.info(f"Report written to {args.output}")
+
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2, default=str))
+        logger.info(f"Baseline saved to {baseline_path}")
+        return 0
+
+    if not baseline_path.exists():
+        logger.warning(f"No baseline at {baseline_path}; run with --save-baseline to record one")
+        return 0
+
+    regressions = compare_to_baseline(report, json.loads(baseline_path.read_text()), tolerance=args.tolerance)
+    for regression in regressions:
+        logger.warning(f"[{regression.kind}] {regression.query}: {regression.message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sys.exit(asyncio.run(main(sys.argv[1:])))
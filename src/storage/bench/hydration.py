@@ -0,0 +1,158 @@
+"""
+CoffeeBuddy Hydration Benchmark
+Compares CPU and memory per 10k rows for ORM entities versus read-model tuples
+
+Usage:
+    PYTHONPATH=src python -m storage.bench.hydration --database-url postgresql://... [--rows 10000]
+
+Reads existing rows (e.g. generated by python -m storage.bench); nothing is written.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from ..database import DatabaseManager, to_async_url
+from ..models import AuditLog, Order
+from ..read_models import AUDIT_COLUMNS, AuditRow, OrderRow, order_rows_query
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[AsyncSession, int], Awaitable[List[Any]]]
+
+
+@dataclass
+class HydrationResult:
+    """Cost of loading one batch of rows one way"""
+
+    name: str
+    rows: int
+    cpu_ms_per_10k: float
+    peak_kib_per_10k: float
+    retained_kib_per_10k: float
+
+
+async def _orm_orders(session: AsyncSession, rows: int) -> List[Any]:
+    result = await session.execute(select(Order).options(joinedload(Order.user)).limit(rows))
+    return list(result.scalars())
+
+
+async def _read_model_orders(session: AsyncSession, rows: int) -> List[Any]:
+    result = await session.execute(order_rows_query().limit(rows))
+    return list(map(OrderRow._make, result))
+
+
+async def _orm_audit(session: AsyncSession, rows: int) -> List[Any]:
+    result = await session.execute(select(AuditLog).limit(rows))
+    return list(result.scalars())
+
+
+async def _read_model_audit(session: AsyncSession, rows: int) -> List[Any]:
+    result = await session.execute(select(*AUDIT_COLUMNS).limit(rows))
+    return list(map(AuditRow._make, result))
+
+
+LOADERS = {
+    "orders_orm": _orm_orders,
+    "orders_read_model": _read_model_orders,
+    "audit_orm": _orm_audit,
+    "audit_read_model": _read_model_audit,
+}
+
+
+async def measure(db: DatabaseManager, name: str, loader: Loader, rows: int, repeat: int = 5) -> HydrationResult:
+    """
+    Measure one loader
+
+    CPU is the best of `repeat` untraced runs (process time, so driver decoding
+    counts but waiting on Postgres does not). Memory comes from one extra run
+    under tracemalloc: peak during the load, and what the returned objects
+    (plus, for entities, the session's identity map) still hold afterwards.
+
+    Args:
+        db: Database to read from
+        name: Label for the report
+        loader: Coroutine loading up to `rows` objects in a session
+        rows: Rows requested
+        repeat: Timed runs
+
+    Returns:
+        Costs scaled to 10k rows
+    """
+    cpu_samples = []
+    loaded = 0
+    for _ in range(repeat):
+        gc.collect()
+        async with db.session() as session:
+            started = time.process_time()
+            objects = await loader(session, rows)
+            cpu_samples.append(time.process_time() - started)
+            loaded = len(objects)
+        del objects
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        async with db.session() as session:
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            objects = await loader(session, rows)
+            gc.collect()
+            retained, peak = tracemalloc.get_traced_memory()
+            del objects
+    finally:
+        tracemalloc.stop()
+
+    scale = 10000 / max(loaded, 1)
+    return HydrationResult(
+        name=name,
+        rows=loaded,
+        cpu_ms_per_10k=round(min(cpu_samples) * 1000 * scale, 2),
+        peak_kib_per_10k=round((peak - baseline) / 1024 * scale, 1),
+        retained_kib_per_10k=round((retained - baseline) / 1024 * scale, 1),
+    )
+
+
+async def run(database_url: str, rows: int, repeat: int) -> List[HydrationResult]:
+    """Measure every loader against one database"""
+    db = DatabaseManager(database_url, pool_size=1)
+    try:
+        return [await measure(db, name, loader, rows, repeat) for name, loader in LOADERS.items()]
+    finally:
+        await db.close()
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m storage.bench.hydration", description="Compare ORM entities with read models"
+    )
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", ""))
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    return parser.parse_args(argv)
+
+
+async def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    if not args.database_url:
+        logger.error("DATABASE_URL not set. Provide --database-url or the environment variable.")
+        return 2
+    results = await run(to_async_url(args.database_url), args.rows, args.repeat)
+    print(json.dumps([asdict(result) for result in results], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sys.exit(asyncio.run(main(sys.argv[1:])))
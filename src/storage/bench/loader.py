@@ -0,0 +1,220 @@
+"""
+CoffeeBuddy COPY Data Loader
+Streams synthetic rows into PostgreSQL with binary COPY, in parallel worker processes
+
+Secondary indexes and foreign keys are dropped for the duration of the load and
+rebuilt afterwards, so every table can be loaded concurrently and each index is
+built once from sorted data instead of being maintained row by row.
+
+Usage:
+    PYTHONPATH=src python -m storage.bench.loader --preset large --workers 8 --database-url postgresql://...
+"""
+import argparse
+import asyncio
+import dataclasses
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import text
+
+from ..database import DatabaseManager, to_async_url
+from .synthetic import PRESETS, TABLES, BenchmarkScale, TableSpec
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAMES = tuple(spec.name for spec in TABLES)
+
+
+@dataclass(frozen=True)
+class DeferredDDL:
+    """Index and constraint definitions removed before a bulk load"""
+
+    indexes: list[tuple[str, str]]
+    foreign_keys: list[tuple[str, str, str]]
+
+
+def plan_chunks(scale: BenchmarkScale) -> list[tuple[str, int, int]]:
+    """
+    Split every table into [lo, hi) row ranges of at most scale.chunk_size
+
+    Largest tables come first so the slowest work starts as early as possible.
+    """
+    chunks = []
+    for spec in sorted(TABLES, key=lambda s: s.count(scale), reverse=True):
+        total = spec.count(scale)
+        chunks.extend((spec.name, lo, min(lo + scale.chunk_size, total)) for lo in range(0, total, scale.chunk_size))
+    return chunks
+
+
+async def drop_deferred_ddl(db: DatabaseManager) -> DeferredDDL:
+    """Drop secondary indexes and foreign keys on the loaded tables, returning their definitions"""
+    async with db.engine.begin() as conn:
+        indexes = (
+            await conn.execute(
+                text(
+                    """
+                    SELECT i.indexname, i.indexdef
+                    FROM pg_indexes i
+                    JOIN pg_class c ON c.relname = i.indexname
+                    JOIN pg_index x ON x.indexrelid = c.oid
+                    WHERE i.schemaname = 'public' AND i.tablename = ANY(:tables)
+                      AND NOT x.indisprimary AND NOT x.indisunique
+                    """
+                ),
+                {"tables": list(TABLE_NAMES)},
+            )
+        ).all()
+        foreign_keys = (
+            await conn.execute(
+                text(
+                    """
+                    SELECT c.conrelid::regclass::text, c.conname, pg_get_constraintdef(c.oid)
+                    FROM pg_constraint c
+                    WHERE c.contype = 'f' AND c.conrelid::regclass::text = ANY(:tables)
+                    """
+                ),
+                {"tables": list(TABLE_NAMES)},
+            )
+        ).all()
+
+        for table, name, _ in foreign_keys:
+            await conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"'))
+        for name, _ in indexes:
+            await conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+
+    logger.info(f"Deferred {len(indexes)} indexes and {len(foreign_keys)} foreign keys until after load")
+    return DeferredDDL(indexes=[tuple(row) for row in indexes], foreign_keys=[tuple(row) for row in foreign_keys])
+
+
+async def restore_deferred_ddl(db: DatabaseManager, ddl: DeferredDDL, workers: int) -> None:
+    """Rebuild dropped indexes concurrently, then re-add and validate foreign keys"""
+    semaphore = asyncio.Semaphore(workers)
+
+    async def build(name: str, definition: str) -> None:
+        async with semaphore, db.engine.begin() as conn:
+            started = time.perf_counter()
+            await conn.execute(text("SET LOCAL maintenance_work_mem = '512MB'"))
+            await conn.execute(text(definition.replace("CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ", 1)))
+            logger.info(f"Built {name} in {time.perf_counter() - started:.1f}s")
+
+    await asyncio.gather(*(build(name, definition) for name, definition in ddl.indexes))
+
+    async with db.engine.begin() as conn:
+        for table, name, definition in ddl.foreign_keys:
+            await conn.execute(text(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition} NOT VALID'))
+    # Validation only takes SHARE UPDATE EXCLUSIVE locks and scans each table once
+    for table, name, _ in ddl.foreign_keys:
+        async with db.engine.begin() as conn:
+            await conn.execute(text(f'ALTER TABLE {table} VALIDATE CONSTRAINT "{name}"'))
+
+
+async def _copy_chunk(database_url: str, spec: TableSpec, scale: BenchmarkScale, lo: int, hi: int, now: datetime) -> None:
+    db = DatabaseManager(database_url, pool_size=1)
+    try:
+        async with db.engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                spec.name, records=spec.rows(scale, lo, hi, now), columns=list(spec.columns)
+            )
+            await conn.commit()
+    finally:
+        await db.close()
+
+
+def copy_chunk(database_url: str, table: str, scale: BenchmarkScale, lo: int, hi: int, now: datetime) -> tuple[str, int]:
+    """Worker process entry point: generate rows [lo, hi) of a table and COPY them in"""
+    spec = next(spec for spec in TABLES if spec.name == table)
+    asyncio.run(_copy_chunk(database_url, spec, scale, lo, hi, now))
+    return table, hi - lo
+
+
+async def load(database_url: str, scale: BenchmarkScale, workers: int | None = None) -> dict[str, int]:
+    """
+    Bulk load synthetic data at the requested scale
+
+    The target tables must exist and should be empty: identifiers are
+    deterministic, so loading twice fails on the primary keys.
+
+    Args:
+        database_url: asyncpg-dialect URL of a dedicated, migrated database
+        scale: Volumes to generate
+        workers: Worker processes (default: CPU count)
+
+    Returns:
+        Rows loaded per table
+    """
+    workers = workers or os.cpu_count() or 1
+    now = datetime.utcnow()
+    loaded = dict.fromkeys(TABLE_NAMES, 0)
+    started = time.perf_counter()
+
+    db = DatabaseManager(database_url, pool_size=max(1, workers))
+    try:
+        ddl = await drop_deferred_ddl(db)
+        try:
+            loop = asyncio.get_running_loop()
+            # spawn, not fork: children must not inherit the parent's open connections
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = [
+                    loop.run_in_executor(pool, copy_chunk, database_url, table, scale, lo, hi, now)
+                    for table, lo, hi in plan_chunks(scale)
+                ]
+                for future in asyncio.as_completed(futures):
+                    table, rows = await future
+                    loaded[table] += rows
+                    total = sum(loaded.values())
+                    elapsed = time.perf_counter() - started
+                    logger.info(f"Loaded {total:,} rows in {elapsed:.0f}s ({total / elapsed * 60:,.0f} rows/min)")
+        finally:
+            await restore_deferred_ddl(db, ddl, workers)
+
+        async with db.engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for table in TABLE_NAMES:
+                await conn.execute(text(f"VACUUM ANALYZE {table}"))
+    finally:
+        await db.close()
+
+    logger.info(f"Load finished in {time.perf_counter() - started:.0f}s: {loaded}")
+    return loaded
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m storage.bench.loader", description="Bulk load synthetic data")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", ""))
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--workspaces", type=int)
+    parser.add_argument("--orders", type=int)
+    parser.add_argument("--audit-logs", type=int)
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    return parser.parse_args(argv)
+
+
+def scale_from_args(args: argparse.Namespace) -> BenchmarkScale:
+    overrides = {
+        key: value
+        for key, value in (("workspaces", args.workspaces), ("orders", args.orders), ("audit_logs", args.audit_logs))
+        if value is not None
+    }
+    return dataclasses.replace(PRESETS[args.preset], **overrides)
+
+
+def main(argv: list[str]) -> int:
+    args = parse_args(argv)
+    if not args.database_url:
+        logger.error("DATABASE_URL not set. Provide --database-url or the environment variable.")
+        return 2
+    asyncio.run(load(to_async_url(args.database_url), scale_from_args(args), args.workers))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,132 @@
+"""
+CoffeeBuddy Hot Query Catalogue
+Read paths exercised by the benchmark, with parameter samplers for synthetic data
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from .synthetic import (
+    AUDIT_EVENT_TYPES,
+    CHANNELS_PER_WORKSPACE,
+    BenchmarkScale,
+    channel_id,
+    run_id,
+    user_id,
+    workspace_id,
+)
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    """A named query and a sampler producing bind parameters for it"""
+
+    name: str
+    sql: str
+    params: Callable[[random.Random, BenchmarkScale], dict[str, Any]]
+
+
+def _workspace(rng: random.Random, scale: BenchmarkScale) -> int:
+    # Mirror the generator's skew so the busiest workspaces are sampled most
+    return int(scale.workspaces * rng.random() ** 2)
+
+
+def _history_params(rng: random.Random, scale: BenchmarkScale) -> dict[str, Any]:
+    ws = _workspace(rng, scale)
+    return {
+        "workspace_id": workspace_id(ws),
+        "channel_id": channel_id(ws, rng.randrange(CHANNELS_PER_WORKSPACE)),
+        "offset": 10 * rng.choice((0, 0, 0, 1, 2)),
+    }
+
+
+def _fairness_params(rng: random.Random, scale: BenchmarkScale) -> dict[str, Any]:
+    now = datetime.utcnow()
+    return {
+        "workspace_id": workspace_id(_workspace(rng, scale)),
+        "runs_since": now - timedelta(days=30),
+        "orders_since": now - timedelta(days=14),
+    }
+
+
+def _preference_params(rng: random.Random, scale: BenchmarkScale) -> dict[str, Any]:
+    return {"user_id": user_id(rng.randrange(scale.workspaces), rng.randrange(scale.users_per_workspace))}
+
+
+def _run_details_params(rng: random.Random, scale: BenchmarkScale) -> dict[str, Any]:
+    return {"run_id": run_id(rng.randrange(scale.runs))}
+
+
+def _audit_params(rng: random.Random, scale: BenchmarkScale) -> dict[str, Any]:
+    return {
+        "event_type": rng.choice(AUDIT_EVENT_TYPES),
+        "since": datetime.utcnow() - timedelta(days=rng.choice((1, 7, 30, 90))),
+    }
+
+
+HOT_QUERIES: tuple[HotQuery, ...] = (
+    HotQuery(
+        name="run_history",
+        sql="""
+            SELECT r.run_id, r.created_at, r.status, u.display_name AS runner_name, COUNT(o.order_id) AS order_count
+            FROM coffee_runs r
+            LEFT JOIN users u ON u.user_id = r.runner_user_id
+            LEFT JOIN orders o ON o.run_id = r.run_id
+            WHERE r.workspace_id = :workspace_id AND r.channel_id = :channel_id
+            GROUP BY r.run_id, u.display_name
+            ORDER BY r.created_at DESC
+            LIMIT 10 OFFSET :offset
+        """,
+        params=_history_params,
+    ),
+    HotQuery(
+        name="runner_fairness",
+        sql="""
+            SELECT r.runner_user_id, COUNT(*) AS run_count
+            FROM coffee_runs r
+            WHERE r.workspace_id = :workspace_id
+              AND r.status <> 'cancelled'
+              AND r.created_at >= :runs_since
+              AND r.runner_user_id IN (
+                  SELECT o.user_id FROM orders o WHERE o.created_at >= :orders_since
+              )
+            GROUP BY r.runner_user_id
+            ORDER BY run_count, r.runner_user_id
+        """,
+        params=_fairness_params,
+    ),
+    HotQuery(
+        name="preference_lookup",
+        sql="""
+            SELECT drink_type, size, customizations, order_count, last_ordered_at
+            FROM user_preferences
+            WHERE user_id = :user_id
+            ORDER BY order_count DESC, last_ordered_at DESC
+            LIMIT 3
+        """,
+        params=_preference_params,
+    ),
+    HotQuery(
+        name="run_details",
+        sql="""
+            SELECT o.order_id, o.user_id, u.display_name, o.drink_type, o.size, o.customizations, o.created_at
+            FROM orders o
+            JOIN users u ON u.user_id = o.user_id
+            WHERE o.run_id = :run_id
+            ORDER BY o.created_at
+        """,
+        params=_run_details_params,
+    ),
+    HotQuery(
+        name="audit_by_event_type",
+        sql="""
+            SELECT log_id, event_type, user_id, run_id, payload, timestamp
+            FROM audit_logs
+            WHERE event_type = :event_type AND timestamp >= :since
+            ORDER BY timestamp DESC
+            LIMIT 100
+        """,
+        params=_audit_params,
+    ),
+)
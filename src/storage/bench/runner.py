@@ -0,0 +1,227 @@
+"""
+CoffeeBuddy Query Benchmark Runner
+Measures latency percentiles, captures EXPLAIN plans and diffs against baselines
+"""
+import json
+import logging
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Iterable
+
+from sqlalchemy import text
+
+from ..database import DatabaseManager
+from .queries import HotQuery
+from .synthetic import BenchmarkScale
+
+logger = logging.getLogger(__name__)
+
+# Latency differences below this are treated as noise when diffing baselines
+NOISE_FLOOR_MS = 1.0
+
+
+@dataclass
+class QueryResult:
+    """Latency distribution and plan summary for one hot query"""
+
+    name: str
+    iterations: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    plan: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Regression:
+    """A difference between the current run and the stored baseline"""
+
+    query: str
+    kind: str
+    message: str
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """
+    Nearest-rank percentile
+
+    Args:
+        samples: Measurements (unsorted)
+        pct: Percentile in the range (0, 100]
+
+    Returns:
+        The smallest sample such that pct% of samples are <= it
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def _plan_nodes(node: dict[str, Any]) -> Iterable[str]:
+    label = node["Node Type"]
+    if "Index Name" in node:
+        label += f" using {node['Index Name']}"
+    if "Relation Name" in node:
+        label += f" on {node['Relation Name']}"
+    yield label
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def summarize_plan(explain: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Reduce EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) output to comparable figures
+
+    Args:
+        explain: Parsed JSON document returned by EXPLAIN
+
+    Returns:
+        Dict with timings, buffer counts, total cost and the node sequence
+    """
+    root = explain[0]
+    plan = root["Plan"]
+    return {
+        "planning_ms": root.get("Planning Time"),
+        "execution_ms": root.get("Execution Time"),
+        "total_cost": plan.get("Total Cost"),
+        "shared_hit_blocks": plan.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": plan.get("Shared Read Blocks", 0),
+        "nodes": list(_plan_nodes(plan)),
+    }
+
+
+async def run_query(
+    db: DatabaseManager,
+    query: HotQuery,
+    scale: BenchmarkScale,
+    rng: random.Random,
+    iterations: int = 50,
+    warmup: int = 5,
+) -> QueryResult:
+    """
+    Time a hot query with sampled parameters and capture its plan
+
+    Args:
+        db: Database manager connected to the benchmark database
+        query: Query to measure
+        scale: Scale the data was generated with (drives parameter sampling)
+        rng: Seeded random source for reproducible parameters
+        iterations: Number of timed executions
+        warmup: Untimed executions before measuring
+
+    Returns:
+        Latency percentiles and a plan summary
+    """
+    statement = text(query.sql)
+    samples: list[float] = []
+    async with db.engine.connect() as conn:
+        for i in range(warmup + iterations):
+            params = query.params(rng, scale)
+            started = time.perf_counter()
+            result = await conn.execute(statement, params)
+            result.fetchall()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if i >= warmup:
+                samples.append(elapsed_ms)
+
+        explain = await conn.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query.sql}"), query.params(rng, scale)
+        )
+        document = explain.scalar_one()
+        await conn.rollback()
+
+    if isinstance(document, str):
+        document = json.loads(document)
+
+    return QueryResult(
+        name=query.name,
+        iterations=iterations,
+        mean_ms=sum(samples) / len(samples) if samples else 0.0,
+        p50_ms=percentile(samples, 50),
+        p95_ms=percentile(samples, 95),
+        p99_ms=percentile(samples, 99),
+        max_ms=max(samples, default=0.0),
+        plan=summarize_plan(document),
+    )
+
+
+async def run_benchmark(
+    db: DatabaseManager,
+    queries: Iterable[HotQuery],
+    scale: BenchmarkScale,
+    iterations: int = 50,
+    warmup: int = 5,
+    seed: int = 42,
+) -> dict[str, Any]:
+    """
+    Run every query in the catalogue and build a report
+
+    Returns:
+        JSON-serializable report keyed by query name
+    """
+    rng = random.Random(seed)
+    async with db.engine.connect() as conn:
+        server_version = (await conn.execute(text("SHOW server_version"))).scalar_one()
+
+    report: dict[str, Any] = {
+        "scale": asdict(scale),
+        "server_version": server_version,
+        "iterations": iterations,
+        "queries": {},
+    }
+    for query in queries:
+        result = await run_query(db, query, scale, rng, iterations=iterations, warmup=warmup)
+        logger.info(f"{query.name}: p50={result.p50_ms:.2f}ms p95={result.p95_ms:.2f}ms p99={result.p99_ms:.2f}ms")
+        report["queries"][query.name] = asdict(result)
+    return report
+
+
+def compare_to_baseline(
+    report: dict[str, Any], baseline: dict[str, Any], tolerance: float = 0.25
+) -> list[Regression]:
+    """
+    Diff a benchmark report against a stored baseline
+
+    Args:
+        report: Report produced by run_benchmark
+        baseline: Previously saved report
+        tolerance: Allowed relative p95 growth before flagging (0.25 = +25%)
+
+    Returns:
+        Regressions found; empty when the run matches the baseline
+    """
+    regressions: list[Regression] = []
+    if report.get("scale") != baseline.get("scale"):
+        regressions.append(Regression("*", "scale", "Baseline was recorded at a different scale"))
+
+    for name, current in report["queries"].items():
+        previous = baseline.get("queries", {}).get(name)
+        if previous is None:
+            regressions.append(Regression(name, "missing", "No baseline recorded for this query"))
+            continue
+
+        limit = previous["p95_ms"] * (1 + tolerance)
+        if current["p95_ms"] > limit and current["p95_ms"] - previous["p95_ms"] > NOISE_FLOOR_MS:
+            regressions.append(
+                Regression(
+                    name,
+                    "latency",
+                    f"p95 {current['p95_ms']:.2f}ms exceeds baseline {previous['p95_ms']:.2f}ms "
+                    f"(+{tolerance:.0%} allowed)",
+                )
+            )
+
+        if current["plan"].get("nodes") != previous["plan"].get("nodes"):
+            regressions.append(
+                Regression(
+                    name,
+                    "plan",
+                    f"Plan changed: {previous['plan'].get('nodes')} -> {current['plan'].get('nodes')}",
+                )
+            )
+    return regressions
@@ -0,0 +1,234 @@
+"""
+CoffeeBuddy Synthetic Benchmark Data
+Deterministic, skewed row generators for users, runs, orders, preferences and audit logs
+"""
+import hashlib
+import json
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterator
+from uuid import UUID
+
+DRINK_TYPES = ("Latte", "Cappuccino", "Americano", "Espresso", "Mocha", "Flat White", "Cortado")
+SIZES = ("Medium", "Large", "Small")
+CUSTOMIZATIONS = ('[]', '[]', '[]', '["Oat milk"]', '["Extra shot"]', '["Extra shot", "Oat milk"]', '["Decaf"]')
+AUDIT_EVENT_TYPES = (
+    "order_placed",
+    "order_placed",
+    "order_placed",
+    "runner_assigned",
+    "run_completed",
+    "run_cancelled",
+)
+CHANNELS_PER_WORKSPACE = 3
+
+Row = tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class BenchmarkScale:
+    """Data volumes for a benchmark run"""
+
+    workspaces: int = 100
+    users_per_workspace: int = 30
+    orders: int = 10_000_000
+    orders_per_run: int = 6
+    audit_logs: int = 50_000_000
+    history_days: int = 3 * 365
+    chunk_size: int = 500_000
+
+    @property
+    def users(self) -> int:
+        return self.workspaces * self.users_per_workspace
+
+    @property
+    def runs(self) -> int:
+        return max(1, self.orders // self.orders_per_run)
+
+    @property
+    def preferences(self) -> int:
+        return self.users * 3
+
+
+PRESETS: dict[str, BenchmarkScale] = {
+    "small": BenchmarkScale(workspaces=5, users_per_workspace=20, orders=50_000, audit_logs=200_000, history_days=365),
+    "medium": BenchmarkScale(workspaces=20, users_per_workspace=30, orders=1_000_000, audit_logs=5_000_000),
+    "large": BenchmarkScale(),
+}
+
+
+# Identifiers are derived from integer sequence numbers so the query catalogue can
+# pick parameters that exist without reading them back from the database.
+def workspace_id(workspace: int) -> str:
+    return f"BW{workspace:04d}"
+
+
+def channel_id(workspace: int, channel: int) -> str:
+    return f"BC{workspace:04d}_{channel}"
+
+
+def user_id(workspace: int, index: int) -> str:
+    return f"BU{workspace:04d}_{index:03d}"
+
+
+def run_id(sequence: int) -> UUID:
+    return UUID(bytes=hashlib.md5(f"run:{sequence}".encode()).digest())
+
+
+def _row_id(kind: str, sequence: int) -> UUID:
+    return UUID(bytes=hashlib.md5(f"{kind}:{sequence}".encode()).digest())
+
+
+def _hash_unit(sequence: int) -> float:
+    """Cheap deterministic value in [0, 1) for a sequence number (Knuth multiplicative hash)"""
+    return ((sequence * 2654435761) % 4294967296) / 4294967296
+
+
+def workspace_of_run(scale: BenchmarkScale, run: int) -> int:
+    # Squaring skews runs towards low workspace numbers (a few noisy workspaces);
+    # it must be a pure function of the run so orders and audit rows agree with it.
+    return int(scale.workspaces * _hash_unit(run) ** 2)
+
+
+def run_created_at(scale: BenchmarkScale, run: int, now: datetime) -> datetime:
+    return now - timedelta(days=scale.history_days * (1 - (run + 1) / scale.runs))
+
+
+def _skewed_index(rng: random.Random, size: int, exponent: float = 2.0) -> int:
+    return int(size * rng.random() ** exponent)
+
+
+def users_rows(scale: BenchmarkScale, lo: int, hi: int, now: datetime) -> Iterator[Row]:
+    upw = scale.users_per_workspace
+    created_at = now - timedelta(days=scale.history_days)
+    for g in range(lo, hi):
+        yield (
+            user_id(g // upw, g % upw),
+            f"Bench User {g}",
+            f"bench.user{g}@example.com",
+            created_at,
+            now,
+        )
+
+
+def runs_rows(scale: BenchmarkScale, lo: int, hi: int, now: datetime) -> Iterator[Row]:
+    rng = random.Random(f"coffee_runs:{lo}")
+    upw = scale.users_per_workspace
+    # The most recent 0.1% of runs are still active and unassigned
+    active_from = scale.runs - max(1, scale.runs // 1000)
+    for r in range(lo, hi):
+        ws = workspace_of_run(scale, r)
+        created_at = run_created_at(scale, r, now)
+        initiator = user_id(ws, _skewed_index(rng, upw, 1.5))
+        if r >= active_from:
+            yield (run_id(r), workspace_id(ws), channel_id(ws, rng.randrange(CHANNELS_PER_WORKSPACE)),
+                   initiator, None, "active", created_at, None, None)
+            continue
+        status = "cancelled" if rng.random() < 0.05 else "completed"
+        yield (
+            run_id(r),
+            workspace_id(ws),
+            channel_id(ws, rng.randrange(CHANNELS_PER_WORKSPACE)),
+            initiator,
+            user_id(ws, rng.randrange(upw)),
+            status,
+            created_at,
+            created_at + timedelta(minutes=30),
+            created_at + timedelta(minutes=5),
+        )
+
+
+def orders_rows(scale: BenchmarkScale, lo: int, hi: int, now: datetime) -> Iterator[Row]:
+    rng = random.Random(f"orders:{lo}")
+    upw = scale.users_per_workspace
+    for g in range(lo, hi):
+        r = rng.randrange(scale.runs)
+        ws = workspace_of_run(scale, r)
+        yield (
+            _row_id("order", g),
+            run_id(r),
+            user_id(ws, _skewed_index(rng, upw)),
+            DRINK_TYPES[_skewed_index(rng, len(DRINK_TYPES))],
+            SIZES[_skewed_index(rng, len(SIZES))],
+            rng.choice(CUSTOMIZATIONS),
+            run_created_at(scale, r, now) + timedelta(seconds=900 * rng.random()),
+        )
+
+
+def preferences_rows(scale: BenchmarkScale, lo: int, hi: int, now: datetime) -> Iterator[Row]:
+    rng = random.Random(f"user_preferences:{lo}")
+    upw = scale.users_per_workspace
+    for g in range(lo, hi):
+        user = g // 3
+        yield (
+            _row_id("pref", g),
+            user_id(user // upw, user % upw),
+            DRINK_TYPES[g % 3 + rng.randrange(4)],
+            SIZES[rng.randrange(len(SIZES))],
+            rng.choice(CUSTOMIZATIONS),
+            1 + _skewed_index(rng, 40, 3.0),
+            now - timedelta(days=scale.history_days * rng.random() ** 4),
+        )
+
+
+def audit_logs_rows(scale: BenchmarkScale, lo: int, hi: int, now: datetime) -> Iterator[Row]:
+    rng = random.Random(f"audit_logs:{lo}")
+    upw = scale.users_per_workspace
+    for g in range(lo, hi):
+        r = rng.randrange(scale.runs)
+        ws = workspace_of_run(scale, r)
+        event_type = rng.choice(AUDIT_EVENT_TYPES)
+        yield (
+            _row_id("audit", g),
+            event_type,
+            user_id(ws, rng.randrange(upw)),
+            run_id(r),
+            json.dumps({"source": "bench", "seq": g, "event_type": event_type, "workspace_id": workspace_id(ws)}),
+            run_created_at(scale, r, now) + timedelta(seconds=1800 * rng.random()),
+        )
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """How to generate one table: its COPY column list, row generator and row count"""
+
+    name: str
+    columns: tuple[str, ...]
+    rows: Callable[[BenchmarkScale, int, int, datetime], Iterator[Row]]
+    count: Callable[[BenchmarkScale], int]
+
+
+TABLES: tuple[TableSpec, ...] = (
+    TableSpec(
+        "users",
+        ("user_id", "display_name", "email", "created_at", "updated_at"),
+        users_rows,
+        lambda scale: scale.users,
+    ),
+    TableSpec(
+        "coffee_runs",
+        ("run_id", "workspace_id", "channel_id", "initiator_user_id", "runner_user_id",
+         "status", "created_at", "completed_at", "reminder_sent_at"),
+        runs_rows,
+        lambda scale: scale.runs,
+    ),
+    TableSpec(
+        "orders",
+        ("order_id", "run_id", "user_id", "drink_type", "size", "customizations", "created_at"),
+        orders_rows,
+        lambda scale: scale.orders,
+    ),
+    TableSpec(
+        "user_preferences",
+        ("preference_id", "user_id", "drink_type", "size", "customizations", "order_count", "last_ordered_at"),
+        preferences_rows,
+        lambda scale: scale.preferences,
+    ),
+    TableSpec(
+        "audit_logs",
+        ("log_id", "event_type", "user_id", "run_id", "payload", "timestamp"),
+        audit_logs_rows,
+        lambda scale: scale.audit_logs,
+    ),
+)
@@ -13,6 +13,22 @@ from .models import Base
 logger = logging.getLogger(__name__)
 
 
+def to_async_url(database_url: str) -> str:
+    """
+    Convert a libpq-style URL (as used by the db_*.sh scripts) to the asyncpg dialect
+
+    Args:
+        database_url: postgresql:// or postgres:// connection string
+
+    Returns:
+        postgresql+asyncpg:// connection string; other URLs are returned unchanged
+    """
+    for prefix in ("postgresql://", "postgres://"):
+        if database_url.startswith(prefix):
+            return "postgresql+asyncpg://" + database_url[len(prefix):]
+    return database_url
+
+
 class DatabaseManager:
     """Manages database connections and sessions with connection pooling"""
 
@@ -103,6 +119,3 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Database health check failed: {e}")
             return False
-```
-
-```bash
\ No newline at end of file
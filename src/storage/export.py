@@ -0,0 +1,337 @@
+"""
+CoffeeBuddy Export
+Streams audit logs and run history as NDJSON or CSV, optionally gzipped, in constant memory
+
+Rows are read through a server-side cursor (AsyncSession.stream with
+yield_per), so only one batch is held at a time however large the export.
+Each export is ordered oldest first by a (timestamp, id) key; passing the
+last exported position as `after` continues just past it, so an interrupted
+export resumes instead of starting over.
+
+File exports checkpoint after every batch: each batch is written (as its own
+gzip member when compressing; concatenated members are a valid gzip file),
+fsynced, and then its end offset and position are recorded in a
+"<output>.checkpoint" file. Resuming truncates the output to the last
+checkpoint, dropping any partially written batch, and continues from there.
+
+Usage:
+    PYTHONPATH=src python -m storage.export audit --database-url postgresql://... --output audit.ndjson.gz --gzip
+    PYTHONPATH=src python -m storage.export runs --workspace-id T123 --format csv --output runs.csv [--resume]
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import sys
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import ColumnElement, Row, Select, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .audit_queries import AuditFilter, filter_clauses, naive_utc, parse_payload_filters
+from .database import DatabaseManager, to_async_url
+from .models import AuditLog, CoffeeRun
+from .read_models import AUDIT_COLUMNS, RUN_HISTORY_COLUMNS, AuditRow, RunHistoryRow
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 2000
+
+Position = Tuple[datetime, UUID]
+
+
+@dataclass(frozen=True)
+class ExportSource:
+    """An exportable projection and the key it is ordered and resumed by"""
+
+    name: str
+    row_type: type
+    columns: Sequence[Any]
+    key: Tuple[Any, Any]
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return self.row_type._fields
+
+
+AUDIT_SOURCE = ExportSource("audit", AuditRow, AUDIT_COLUMNS, (AuditLog.timestamp, AuditLog.log_id))
+RUNS_SOURCE = ExportSource("runs", RunHistoryRow, RUN_HISTORY_COLUMNS, (CoffeeRun.created_at, CoffeeRun.run_id))
+SOURCES = {source.name: source for source in (AUDIT_SOURCE, RUNS_SOURCE)}
+
+
+def audit_clauses(filters: AuditFilter) -> List[ColumnElement[bool]]:
+    """WHERE clauses for an audit export; unlike queries, the range is optional and unbounded"""
+    clauses = filter_clauses(filters)
+    if filters.start is not None:
+        clauses.append(AuditLog.timestamp >= naive_utc(filters.start))
+    if filters.end is not None:
+        clauses.append(AuditLog.timestamp < naive_utc(filters.end))
+    return clauses
+
+
+def run_clauses(
+    workspace_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+) -> List[ColumnElement[bool]]:
+    """WHERE clauses for a workspace's run history export"""
+    clauses = [CoffeeRun.workspace_id == workspace_id]
+    if start is not None:
+        clauses.append(CoffeeRun.created_at >= naive_utc(start))
+    if end is not None:
+        clauses.append(CoffeeRun.created_at < naive_utc(end))
+    return clauses
+
+
+def export_query(
+    source: ExportSource, clauses: Sequence[ColumnElement[bool]] = (), after: Optional[Position] = None
+) -> Select:
+    """Rows of a source matching the clauses, oldest first, strictly after a position"""
+    query = select(*source.columns).where(*clauses)
+    if after is not None:
+        query = query.where(tuple_(*source.key) > tuple_(naive_utc(after[0]), after[1]))
+    return query.order_by(*source.key)
+
+
+async def stream_batches(session: AsyncSession, query: Select, batch_size: int) -> AsyncIterator[List[Row]]:
+    """Run a query on a server-side cursor and yield its rows batch by batch"""
+    result = await session.stream(query.execution_options(yield_per=batch_size))
+    async for batch in result.partitions():
+        yield batch
+
+
+def position_of(source: ExportSource, row: Row) -> Position:
+    """The resume position of a row"""
+    mapping = row._mapping
+    return mapping[source.key[0]], mapping[source.key[1]]
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def encode_ndjson(fields: Sequence[str], rows: Sequence[Row]) -> bytes:
+    """One JSON object per line"""
+    return "".join(
+        json.dumps(dict(zip(fields, map(_jsonable, row))), separators=(",", ":")) + "\n" for row in rows
+    ).encode()
+
+
+def encode_csv(fields: Sequence[str], rows: Sequence[Row]) -> bytes:
+    """CSV lines; JSON columns are embedded as JSON text and NULLs as empty fields"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            [json.dumps(value) if isinstance(value, (dict, list)) else _jsonable(value) for value in row]
+        )
+    return buffer.getvalue().encode()
+
+
+def csv_header(fields: Sequence[str]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(fields)
+    return buffer.getvalue().encode()
+
+
+ENCODERS: Dict[str, Callable[[Sequence[str], Sequence[Row]], bytes]] = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+}
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def export_stream(
+    session: AsyncSession,
+    source: ExportSource,
+    fmt: str,
+    clauses: Sequence[ColumnElement[bool]] = (),
+    after: Optional[Position] = None,
+    compress: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Yield an export as encoded chunks, one per batch, for streaming responses
+
+    The CSV header is only sent on a fresh export; a resumed one (with
+    `after`) is meant to be appended to what was already received. With
+    `compress`, each chunk ends on a gzip sync point.
+
+    Args:
+        session: Session to stream in; it holds one transaction for the whole export
+        source: What to export
+        fmt: "ndjson" or "csv"
+        clauses: Filters (see audit_clauses/run_clauses)
+        after: Resume just past this position
+        compress: Gzip the stream
+        batch_size: Rows per cursor fetch and per chunk
+    """
+    encode = ENCODERS[fmt]
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def emit(data: bytes) -> bytes:
+        # A sync flush per batch lets a client decompress everything it received before a disconnect
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else data
+
+    if fmt == "csv" and after is None:
+        yield emit(csv_header(source.fields))
+    async for batch in stream_batches(session, export_query(source, clauses, after), batch_size):
+        yield emit(encode(source.fields, batch))
+    if compressor:
+        yield compressor.flush()
+
+
+@dataclass
+class ExportResult:
+    """Outcome of a file export"""
+
+    rows: int
+    bytes: int
+    position: Optional[Position]
+    resumed: bool
+
+
+def checkpoint_path(output: Path) -> Path:
+    return output.with_name(output.name + ".checkpoint")
+
+
+def _read_checkpoint(path: Path) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+    state = json.loads(path.read_text())
+    if state["position"] is not None:
+        timestamp, key = state["position"]
+        state["position"] = (datetime.fromisoformat(timestamp), UUID(key))
+    return state
+
+
+def _write_checkpoint(path: Path, offset: int, rows: int, position: Optional[Position]) -> None:
+    """Replace the checkpoint atomically, so a crash leaves either the old or the new one"""
+    tmp = path.with_name(path.name + ".tmp")
+    state = {"offset": offset, "rows": rows, "position": [_jsonable(v) for v in position] if position else None}
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+async def export_to_file(
+    db: DatabaseManager,
+    source: ExportSource,
+    output: Path,
+    fmt: str = "ndjson",
+    clauses: Sequence[ColumnElement[bool]] = (),
+    compress: bool = False,
+    resume: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> ExportResult:
+    """
+    Export to a file with a checkpoint per batch
+
+    Args:
+        db: Database to export from
+        source: What to export
+        output: File to write
+        fmt: "ndjson" or "csv"
+        clauses: Filters; a resumed export must use the same ones
+        compress: Gzip each batch as its own member
+        resume: Continue from output's checkpoint if there is one (otherwise start over)
+        batch_size: Rows per cursor fetch and per checkpoint
+
+    Returns:
+        Rows and bytes in the finished file, and the last exported position
+    """
+    encode = ENCODERS[fmt]
+    checkpoint = checkpoint_path(output)
+    state = _read_checkpoint(checkpoint) if resume else None
+    offset, rows, position = (state["offset"], state["rows"], state["position"]) if state else (0, 0, None)
+
+    with open(output, "r+b" if state else "wb") as f:
+        f.truncate(offset)
+        f.seek(offset)
+        if state is None:
+            header = csv_header(source.fields) if fmt == "csv" else b""
+            offset += f.write(gzip.compress(header, mtime=0) if compress and header else header)
+            _write_checkpoint(checkpoint, offset, rows, position)
+        else:
+            logger.info(f"Resuming {source.name} export to {output} after {rows} rows")
+
+        async with db.session() as session:
+            async for batch in stream_batches(session, export_query(source, clauses, position), batch_size):
+                data = encode(source.fields, batch)
+                offset += f.write(gzip.compress(data, mtime=0) if compress else data)
+                f.flush()
+                os.fsync(f.fileno())
+                rows += len(batch)
+                position = position_of(source, batch[-1])
+                _write_checkpoint(checkpoint, offset, rows, position)
+
+    checkpoint.unlink()
+    logger.info(f"Exported {rows} {source.name} rows to {output} ({offset} bytes)")
+    return ExportResult(rows=rows, bytes=offset, position=position, resumed=state is not None)
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m storage.export", description="Export audit logs or run history")
+    parser.add_argument("source", choices=sorted(SOURCES))
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", ""))
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--format", choices=sorted(ENCODERS), default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--resume", action="store_true", help="Continue from the output's checkpoint")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--start", type=datetime.fromisoformat)
+    parser.add_argument("--end", type=datetime.fromisoformat)
+    parser.add_argument("--event-type", action="append", default=[], help="audit: repeatable")
+    parser.add_argument("--user-id", help="audit")
+    parser.add_argument("--run-id", type=UUID, help="audit")
+    parser.add_argument("--payload", action="append", default=[], help="audit: key=value, repeatable")
+    parser.add_argument("--workspace-id", help="runs: required")
+    return parser.parse_args(argv)
+
+
+async def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    if not args.database_url:
+        logger.error("DATABASE_URL not set. Provide --database-url or the environment variable.")
+        return 2
+    if args.source == "runs":
+        if not args.workspace_id:
+            logger.error("--workspace-id is required for run history exports")
+            return 2
+        clauses = run_clauses(args.workspace_id, args.start, args.end)
+    else:
+        clauses = audit_clauses(
+            AuditFilter(
+                event_types=args.event_type,
+                user_id=args.user_id,
+                run_id=args.run_id,
+                start=args.start,
+                end=args.end,
+                payload=parse_payload_filters(args.payload),
+            )
+        )
+
+    db = DatabaseManager(to_async_url(args.database_url), pool_size=1)
+    try:
+        result = await export_to_file(
+            db, SOURCES[args.source], args.output, args.format, clauses, args.gzip, args.resume, args.batch_size
+        )
+    finally:
+        await db.close()
+    print(json.dumps({"rows": result.rows, "bytes": result.bytes, "resumed": result.resumed}))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -0,0 +1,669 @@
+"""
+CoffeeBuddy Index Advisor
+Reads index, table and statement statistics and drafts an index migration for review
+
+Every index is paid for on each INSERT and UPDATE of its table, so indexes
+that are never scanned, or that duplicate the leading columns of another
+index, are pure cost. The advisor reads, for the application's tables:
+
+- pg_stat_user_indexes: scans per index since the last stats reset;
+- pg_stat_user_tables and pg_stats: table size and write volume, column
+  cardinality and most common values;
+- pg_stat_statements (when the extension is installed): the statements that
+  take the most total time.
+
+It flags unused and redundant indexes, derives a composite index from the
+equality, range and ORDER BY columns of each hot statement (a partial one
+when an equality column is dominated by one value and the rest are rare),
+skips candidates an existing index already serves, and writes
+V<next>.up.sql/V<next>.down.sql in the runner's no-transaction format
+(CONCURRENTLY, IF [NOT] EXISTS). The output is a draft: read it, then move it
+into sql/.
+
+Statistics only mean something after a representative period; the report
+shows when they were last reset.
+
+Usage:
+    PYTHONPATH=src python -m storage.index_advisor --database-url postgresql://... [--output-dir .] [--min-scans 0]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from .database import DatabaseManager, to_async_url
+from .migrations import SQL_DIR, discover_migrations
+from .models import Base
+
+logger = logging.getLogger(__name__)
+
+MAX_INDEX_COLUMNS = 3
+MAX_IDENTIFIER_LENGTH = 63
+
+
+@dataclass(frozen=True)
+class IndexStat:
+    """An existing index and how often it has been scanned"""
+
+    table: str
+    name: str
+    columns: Tuple[str, ...]
+    definition: str
+    method: str
+    scans: int
+    size_bytes: int
+    unique: bool = False
+    constraint: bool = False
+    predicate: Optional[str] = None
+    has_expressions: bool = False
+
+
+@dataclass(frozen=True)
+class TableStat:
+    """Size and access counters of a table"""
+
+    table: str
+    live_rows: int
+    seq_scans: int
+    seq_rows_read: int
+    index_scans: int
+    writes: int
+
+
+@dataclass(frozen=True)
+class ColumnStat:
+    """Planner statistics of a column"""
+
+    table: str
+    column: str
+    n_distinct: float
+    common_values: Tuple[str, ...] = ()
+    common_freqs: Tuple[float, ...] = ()
+
+
+@dataclass(frozen=True)
+class StatementStat:
+    """A normalized statement from pg_stat_statements"""
+
+    query: str
+    calls: int
+    total_ms: float
+    mean_ms: float
+
+
+@dataclass
+class Snapshot:
+    """Everything the advisor reads from the database"""
+
+    indexes: List[IndexStat]
+    tables: List[TableStat]
+    columns: List[ColumnStat]
+    statements: List[StatementStat]
+    statements_available: bool
+    stats_since: Optional[datetime] = None
+
+
+@dataclass(frozen=True)
+class QueryShape:
+    """The columns one statement filters and sorts a table by"""
+
+    table: str
+    equality: Tuple[str, ...]
+    ranges: Tuple[str, ...]
+    order_by: Tuple[str, ...]
+
+
+@dataclass
+class Recommendation:
+    """A proposed index change with its migration SQL"""
+
+    action: str  # "create" or "drop"
+    table: str
+    index_name: str
+    up_sql: str
+    down_sql: str
+    reason: str
+    evidence: List[str] = field(default_factory=list)
+    columns: Tuple[str, ...] = ()
+    predicate: Optional[str] = None
+
+
+def table_columns(tables: Optional[Sequence[str]] = None) -> Dict[str, Set[str]]:
+    """Column names of the application's tables, from the ORM metadata"""
+    return {
+        name: {column.name for column in table.columns}
+        for name, table in Base.metadata.tables.items()
+        if tables is None or name in tables
+    }
+
+
+def foreign_keys(tables: Optional[Sequence[str]] = None) -> Dict[str, List[Tuple[str, ...]]]:
+    """Referencing columns of each foreign key, from the ORM metadata"""
+    return {
+        name: [tuple(column.name for column in constraint.columns) for constraint in table.foreign_key_constraints]
+        for name, table in Base.metadata.tables.items()
+        if tables is None or name in tables
+    }
+
+
+async def collect_snapshot(conn: AsyncConnection, tables: Sequence[str], top_statements: int = 50) -> Snapshot:
+    """
+    Read index, table, column and statement statistics
+
+    Args:
+        conn: Connection to the database to analyse
+        tables: Tables to include
+        top_statements: Statements read from pg_stat_statements, by total time
+
+    Returns:
+        The statistics; statements_available is False when pg_stat_statements cannot be read
+    """
+    params = {"tables": list(tables)}
+    index_rows = await conn.execute(
+        text(
+            """
+            SELECT s.relname AS table_name, s.indexrelname AS index_name, s.idx_scan AS scans,
+                   pg_relation_size(s.indexrelid) AS size_bytes, i.indisunique AS is_unique,
+                   EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = s.indexrelid) AS backs_constraint,
+                   pg_get_expr(i.indpred, i.indrelid) AS predicate, pg_get_indexdef(s.indexrelid) AS definition,
+                   am.amname AS method, i.indnkeyatts AS key_count,
+                   ARRAY(
+                       SELECT a.attname FROM unnest(i.indkey[0:i.indnkeyatts - 1]) WITH ORDINALITY AS k(attnum, n)
+                       JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                       ORDER BY k.n
+                   ) AS columns
+            FROM pg_stat_user_indexes s
+            JOIN pg_index i ON i.indexrelid = s.indexrelid
+            JOIN pg_class ic ON ic.oid = s.indexrelid
+            JOIN pg_am am ON am.oid = ic.relam
+            WHERE s.schemaname = 'public' AND s.relname = ANY(:tables)
+            ORDER BY s.relname, s.indexrelname
+            """
+        ),
+        params,
+    )
+    indexes = [
+        IndexStat(
+            table=row.table_name,
+            name=row.index_name,
+            columns=tuple(row.columns),
+            definition=row.definition,
+            method=row.method,
+            scans=row.scans,
+            size_bytes=row.size_bytes,
+            unique=row.is_unique,
+            constraint=row.backs_constraint,
+            predicate=row.predicate,
+            has_expressions=len(row.columns) < row.key_count,
+        )
+        for row in index_rows
+    ]
+
+    table_rows = await conn.execute(
+        text(
+            """
+            SELECT relname, n_live_tup, seq_scan, seq_tup_read, COALESCE(idx_scan, 0) AS idx_scan,
+                   n_tup_ins + n_tup_upd + n_tup_del AS writes
+            FROM pg_stat_user_tables
+            WHERE schemaname = 'public' AND relname = ANY(:tables)
+            ORDER BY relname
+            """
+        ),
+        params,
+    )
+    table_stats = [TableStat(*row) for row in table_rows]
+
+    column_rows = await conn.execute(
+        text(
+            """
+            SELECT tablename, attname, n_distinct,
+                   COALESCE(most_common_vals::text::text[], '{}') AS common_values,
+                   COALESCE(most_common_freqs, '{}') AS common_freqs
+            FROM pg_stats
+            WHERE schemaname = 'public' AND tablename = ANY(:tables)
+            """
+        ),
+        params,
+    )
+    columns = [
+        ColumnStat(row.tablename, row.attname, row.n_distinct, tuple(row.common_values), tuple(row.common_freqs))
+        for row in column_rows
+    ]
+
+    stats_since = await conn.scalar(
+        text("SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()")
+    )
+    await conn.commit()
+
+    statements: List[StatementStat] = []
+    available = False
+    try:
+        statement_rows = await conn.execute(
+            text(
+                """
+                SELECT query, calls, total_exec_time, mean_exec_time
+                FROM pg_stat_statements
+                WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+                ORDER BY total_exec_time DESC
+                LIMIT :limit
+                """
+            ),
+            {"limit": top_statements},
+        )
+        statements = [StatementStat(*row) for row in statement_rows]
+        available = True
+    except DBAPIError as e:
+        logger.warning(f"pg_stat_statements unavailable; skipping statement analysis ({e.orig})")
+    await conn.rollback()
+
+    return Snapshot(indexes, table_stats, columns, statements, available, stats_since)
+
+
+_TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(?:public\.)?\"?(\w+)\"?", re.IGNORECASE)
+_QUALIFIED = r"(?:\"?(\w+)\"?\.)?\"?(\w+)\"?"
+_EQUALITY = re.compile(_QUALIFIED + r"\s*(?:=\s*\$\d+|IN\s*\(\s*\$\d+|=\s*ANY\s*\(\s*\$\d+)", re.IGNORECASE)
+_RANGE = re.compile(_QUALIFIED + r"\s*(?:<=?|>=?\s*|BETWEEN)\s*\$\d+", re.IGNORECASE)
+_ORDER_BY = re.compile(r"\bORDER\s+BY\s+(.+?)(?:\bLIMIT\b|\bOFFSET\b|\bFOR\b|\)|$)", re.IGNORECASE | re.DOTALL)
+
+
+def parse_statement(query: str, columns_by_table: Dict[str, Set[str]]) -> List[QueryShape]:
+    """
+    Extract per-table filter and sort columns from a normalized statement
+
+    A heuristic, not a SQL parser: it recognises `col = $n`, `col IN ($n...)`,
+    `col = ANY($n)`, range comparisons against parameters and ORDER BY
+    columns, qualified by table name (as SQLAlchemy emits them) or
+    unqualified when the statement references a single table.
+
+    Args:
+        query: Statement text with parameters as $n
+        columns_by_table: Known tables and their columns
+
+    Returns:
+        One shape per referenced table that has at least one filter or sort column
+    """
+    referenced = [t for t in dict.fromkeys(_TABLE_REFERENCE.findall(query)) if t in columns_by_table]
+    if not referenced:
+        return []
+    # Filters come after WHERE (so UPDATE ... SET col = $1 is not one); join conditions
+    # compare columns, not parameters, so they do not show up either
+    parts = re.split(r"\bWHERE\b", query, maxsplit=1, flags=re.IGNORECASE)
+    where_part = re.split(r"\bORDER\s+BY\b", parts[1], flags=re.IGNORECASE)[0] if len(parts) == 2 else ""
+
+    def owner(qualifier: Optional[str], column: str) -> Optional[str]:
+        if qualifier:
+            return qualifier if qualifier in referenced and column in columns_by_table[qualifier] else None
+        if len(referenced) == 1 and column in columns_by_table[referenced[0]]:
+            return referenced[0]
+        return None
+
+    def collect(pattern: re.Pattern, part: str) -> Dict[str, List[str]]:
+        found: Dict[str, List[str]] = {}
+        for qualifier, column in pattern.findall(part):
+            table = owner(qualifier, column)
+            if table and column not in found.setdefault(table, []):
+                found[table].append(column)
+        return found
+
+    equality = collect(_EQUALITY, where_part)
+    ranges = collect(_RANGE, where_part)
+    order_by: Dict[str, List[str]] = {}
+    match = _ORDER_BY.search(query)
+    if match:
+        for item in match.group(1).split(","):
+            parts = re.match(r"\s*" + _QUALIFIED, item)
+            table = owner(*parts.groups()) if parts else None
+            if table:
+                order_by.setdefault(table, []).append(parts.group(2))
+
+    shapes = []
+    for table in referenced:
+        eq = tuple(equality.get(table, ()))
+        rng = tuple(c for c in ranges.get(table, ()) if c not in eq)
+        order = tuple(order_by.get(table, ()))
+        if eq or rng or order:
+            shapes.append(QueryShape(table, eq, rng, order))
+    return shapes
+
+
+def candidate_columns(shape: QueryShape) -> Tuple[str, ...]:
+    """Equality columns first, then one range column or the sort columns"""
+    columns = list(shape.equality)
+    tail = shape.ranges[:1] if shape.ranges else shape.order_by
+    if shape.ranges and shape.order_by and shape.order_by[0] == shape.ranges[0]:
+        tail = shape.order_by
+    columns += [c for c in tail if c not in columns]
+    return tuple(columns)
+
+
+def covers(index: IndexStat, table: str, columns: Sequence[str], predicate: Optional[str] = None) -> bool:
+    """Whether a B-tree index starts with these columns and is at least as general as the predicate"""
+    return (
+        index.table == table
+        and index.method == "btree"
+        and index.columns[: len(columns)] == tuple(columns)
+        and (index.predicate is None or index.predicate == predicate)
+    )
+
+
+def index_name(table: str, columns: Sequence[str], suffix: str = "") -> str:
+    name = "_".join(["idx", table, *columns]) + (f"_{suffix}" if suffix else "")
+    return name[:MAX_IDENTIFIER_LENGTH]
+
+
+def _concurrent(definition: str) -> str:
+    """Turn a pg_get_indexdef() result into idempotent, non-blocking DDL"""
+    return re.sub(r"^CREATE (UNIQUE )?INDEX ", r"CREATE \1INDEX CONCURRENTLY IF NOT EXISTS ", definition) + ";"
+
+
+def _drop(index: IndexStat, reason: str, evidence: List[str]) -> Recommendation:
+    return Recommendation(
+        action="drop",
+        table=index.table,
+        index_name=index.name,
+        up_sql=f"DROP INDEX CONCURRENTLY IF EXISTS {index.name};",
+        down_sql=_concurrent(index.definition),
+        reason=reason,
+        evidence=evidence,
+    )
+
+
+def _droppable(index: IndexStat) -> bool:
+    return not (index.unique or index.constraint)
+
+
+def find_unused(snapshot: Snapshot, min_scans: int = 0) -> List[Recommendation]:
+    """Indexes scanned at most min_scans times that do not enforce a constraint"""
+    return [
+        _drop(
+            index,
+            "unused",
+            [f"{index.scans} scans since stats reset", f"{index.size_bytes // 1024} KiB"],
+        )
+        for index in snapshot.indexes
+        if index.scans <= min_scans and _droppable(index)
+    ]
+
+
+def find_redundant(snapshot: Snapshot, dropped: Optional[Set[str]] = None) -> List[Recommendation]:
+    """
+    B-tree indexes whose columns are a leading prefix of another index on the same table and predicate
+
+    Args:
+        snapshot: Statistics to analyse
+        dropped: Indexes already being dropped; they cannot stand in for another index
+    """
+    dropped = dropped or set()
+    recommendations = []
+    btrees = [i for i in snapshot.indexes if i.method == "btree" and not i.has_expressions]
+    for index in btrees:
+        if not _droppable(index):
+            continue
+        for other in btrees:
+            if other is index or other.table != index.table or other.predicate != index.predicate:
+                continue
+            if other.name in dropped:
+                continue
+            if other.columns[: len(index.columns)] != index.columns:
+                continue
+            # Of two identical indexes keep the one that enforces something, else the first by name
+            if other.columns == index.columns and _droppable(other) and other.name > index.name:
+                continue
+            recommendations.append(
+                _drop(index, "redundant", [f"leading columns of {other.name} ({', '.join(other.columns)})"])
+            )
+            break
+    return recommendations
+
+
+def _partial_predicate(
+    columns: Tuple[str, ...], column_stats: Dict[Tuple[str, str], ColumnStat], table: str, max_share: float
+) -> Optional[Tuple[str, str]]:
+    """A low-cardinality equality column where one value dominates and the others are rare"""
+    for column in columns:
+        stat = column_stats.get((table, column))
+        if stat is None or not stat.common_freqs or not 0 < stat.n_distinct <= 10:
+            continue
+        if max(stat.common_freqs) >= 1 - max_share and min(stat.common_freqs) <= max_share:
+            rare = stat.common_values[stat.common_freqs.index(min(stat.common_freqs))]
+            return column, rare
+    return None
+
+
+def recommend_indexes(
+    snapshot: Snapshot,
+    columns_by_table: Dict[str, Set[str]],
+    min_table_rows: int = 10000,
+    partial_max_share: float = 0.2,
+    existing: Optional[Sequence[IndexStat]] = None,
+) -> List[Recommendation]:
+    """
+    Composite (or partial) indexes for the hot statements' filter and sort columns
+
+    Candidates from statements with the same shape are merged and ranked by
+    the statements' combined total time. A candidate is skipped when its table
+    is small enough for sequential scans, or when an existing B-tree index
+    already starts with its columns.
+
+    Args:
+        snapshot: Statistics to analyse
+        columns_by_table: Known tables and their columns
+        min_table_rows: Ignore tables with fewer live rows
+        partial_max_share: An equality column qualifies for a partial index when
+            its rarest common value covers at most this share of rows and its
+            most common value at least the rest
+        existing: Indexes that will remain (default: all in the snapshot)
+
+    Returns:
+        Create recommendations, most expensive statements first
+    """
+    existing = snapshot.indexes if existing is None else existing
+    live_rows = {t.table: t.live_rows for t in snapshot.tables}
+    column_stats = {(c.table, c.column): c for c in snapshot.columns}
+    candidates: Dict[Tuple[str, Tuple[str, ...]], List[StatementStat]] = {}
+    equality: Dict[Tuple[str, Tuple[str, ...]], Tuple[str, ...]] = {}
+    for statement in snapshot.statements:
+        for shape in parse_statement(statement.query, columns_by_table):
+            columns = candidate_columns(shape)
+            if columns and live_rows.get(shape.table, 0) >= min_table_rows:
+                candidates.setdefault((shape.table, columns), []).append(statement)
+                equality[(shape.table, columns)] = shape.equality
+
+    recommendations = []
+    ranked = sorted(candidates.items(), key=lambda item: -sum(s.total_ms for s in item[1]))
+    for (table, columns), statements in ranked:
+        evidence = [
+            f"{s.calls} calls, {s.total_ms:.0f} ms total, {s.mean_ms:.2f} ms mean: {' '.join(s.query.split())[:160]}"
+            for s in statements
+        ]
+        partial = _partial_predicate(equality[(table, columns)], column_stats, table, partial_max_share)
+        if partial and len(columns) > 1:
+            column, value = partial
+            rest = tuple(c for c in columns if c != column)[:MAX_INDEX_COLUMNS]
+            # As pg_get_expr() renders it for a varchar column
+            predicate = f"(({column})::text = '{value}'::text)"
+            if any(covers(i, table, rest, predicate) for i in existing):
+                continue
+            name = index_name(table, rest, f"{re.sub(r'[^a-z0-9]+', '_', value.lower())}")
+            recommendations.append(
+                Recommendation(
+                    action="create",
+                    table=table,
+                    index_name=name,
+                    up_sql=(
+                        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({', '.join(rest)}) "
+                        f"WHERE {column} = '{value}';"
+                    ),
+                    down_sql=f"DROP INDEX CONCURRENTLY IF EXISTS {name};",
+                    reason="partial",
+                    evidence=evidence
+                    + [f"assumes the hot statements filter {column} = '{value}' (its rarest common value); check"],
+                    columns=rest,
+                    predicate=predicate,
+                )
+            )
+            continue
+        columns = columns[:MAX_INDEX_COLUMNS]
+        if any(covers(i, table, columns) for i in existing):
+            continue
+        name = index_name(table, columns)
+        recommendations.append(
+            Recommendation(
+                action="create",
+                table=table,
+                index_name=name,
+                up_sql=f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({', '.join(columns)});",
+                down_sql=f"DROP INDEX CONCURRENTLY IF EXISTS {name};",
+                reason="composite",
+                evidence=evidence,
+                columns=columns,
+            )
+        )
+    return recommendations
+
+
+def advise(
+    snapshot: Snapshot,
+    columns_by_table: Dict[str, Set[str]],
+    min_scans: int = 0,
+    min_table_rows: int = 10000,
+    fk_columns: Optional[Dict[str, List[Tuple[str, ...]]]] = None,
+) -> List[Recommendation]:
+    """
+    All recommendations: drops (each index once), then creates
+
+    Indexes are not dropped when they are the last ones serving a foreign
+    key (fk_columns, default: from the ORM metadata).
+
+    An index flagged for dropping that would serve a hot statement's
+    candidate is kept instead (it is unused only because the statistics
+    window missed it, or it is the better of two overlapping indexes), and
+    the candidate is dropped from the list.
+    """
+    # Unused indexes first, so an index is only redundant next to one that survives
+    drops = {r.index_name: r for r in find_unused(snapshot, min_scans)}
+    for recommendation in find_redundant(snapshot, dropped=set(drops)):
+        drops.setdefault(recommendation.index_name, recommendation)
+    # Without an index on its referencing columns, every delete or key update on the
+    # referenced table scans the whole referencing table; keep the last such index
+    for table, constraints in (fk_columns if fk_columns is not None else foreign_keys()).items():
+        for columns in constraints:
+            serving = [i for i in snapshot.indexes if covers(i, table, columns)]
+            if serving and all(i.name in drops for i in serving):
+                del drops[max(serving, key=lambda i: i.scans).name]
+    remaining = [i for i in snapshot.indexes if i.name not in drops]
+    creates = []
+    for create in recommend_indexes(snapshot, columns_by_table, min_table_rows, existing=remaining):
+        dropped = [i for i in snapshot.indexes if i.name in drops]
+        keeper = next((i for i in dropped if covers(i, create.table, create.columns, create.predicate)), None)
+        if keeper is None:
+            creates.append(create)
+        else:
+            del drops[keeper.name]
+    return list(drops.values()) + creates
+
+
+def render_migration(recommendations: Sequence[Recommendation], version: str) -> Tuple[str, str]:
+    """
+    Render recommendations as an up/down migration pair for the no-transaction runner mode
+
+    Returns:
+        (up_sql, down_sql); the down file reverses the up file in reverse order
+    """
+    header = [
+        "-- runner: no-transaction",
+        f"-- CoffeeBuddy Database Schema {version}",
+        "-- Description: Index advisor recommendations (generated; review before applying)",
+        "",
+    ]
+    up = list(header)
+    for r in recommendations:
+        up.append(f"-- {r.reason}: {r.table}.{r.index_name}")
+        up.extend(f"--   {line}" for line in r.evidence)
+        up.extend([r.up_sql, ""])
+    down = header[:2] + [f"-- Description: Revert {version} index advisor recommendations", ""]
+    for r in reversed(recommendations):
+        down.extend([r.down_sql, ""])
+    return "\n".join(up), "\n".join(down)
+
+
+def render_report(snapshot: Snapshot, recommendations: Sequence[Recommendation]) -> str:
+    """Human-readable summary of the statistics and recommendations"""
+    lines = [f"Statistics since: {snapshot.stats_since or 'unknown (never reset)'}"]
+    if not snapshot.statements_available:
+        lines.append("pg_stat_statements unavailable: no composite/partial recommendations")
+    lines.append("")
+    lines.append(f"{'table':<20} {'rows':>10} {'seq scans':>10} {'idx scans':>10} {'writes':>10}")
+    for t in snapshot.tables:
+        lines.append(f"{t.table:<20} {t.live_rows:>10} {t.seq_scans:>10} {t.index_scans:>10} {t.writes:>10}")
+    lines.append("")
+    lines.append(f"{'index':<45} {'scans':>10} {'KiB':>8}")
+    for i in snapshot.indexes:
+        lines.append(f"{i.name:<45} {i.scans:>10} {i.size_bytes // 1024:>8}")
+    lines.append("")
+    if not recommendations:
+        lines.append("No recommendations")
+    for r in recommendations:
+        lines.append(f"{r.action.upper()} {r.index_name} ({r.reason})")
+        lines.extend(f"    {line}" for line in r.evidence)
+    return "\n".join(lines)
+
+
+def next_version(sql_dir: Path = SQL_DIR) -> str:
+    migrations = discover_migrations(sql_dir)
+    return f"V{(migrations[-1].number if migrations else 0) + 1:04d}"
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m storage.index_advisor", description="Recommend index changes")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", ""))
+    parser.add_argument("--output-dir", type=Path, default=Path("."), help="Where to write the draft migration")
+    parser.add_argument("--version", help="Migration version (default: next after sql/)")
+    parser.add_argument("--min-scans", type=int, default=0, help="Indexes with at most this many scans are unused")
+    parser.add_argument("--min-table-rows", type=int, default=10000, help="Ignore smaller tables for new indexes")
+    parser.add_argument("--top", type=int, default=50, help="Statements read from pg_stat_statements")
+    return parser.parse_args(argv)
+
+
+async def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    if not args.database_url:
+        logger.error("DATABASE_URL not set. Provide --database-url or the environment variable.")
+        return 2
+
+    columns_by_table = table_columns()
+    db = DatabaseManager(to_async_url(args.database_url), pool_size=1)
+    try:
+        async with db.engine.connect() as conn:
+            snapshot = await collect_snapshot(conn, sorted(columns_by_table), args.top)
+    finally:
+        await db.close()
+
+    recommendations = advise(snapshot, columns_by_table, args.min_scans, args.min_table_rows)
+    print(render_report(snapshot, recommendations))
+    if not recommendations:
+        return 0
+
+    version = args.version or next_version()
+    up_sql, down_sql = render_migration(recommendations, version)
+    up_path = args.output_dir / f"{version}.up.sql"
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    up_path.write_text(up_sql)
+    (args.output_dir / f"{version}.down.sql").write_text(down_sql)
+    logger.info(f"Draft migration written to {up_path}; review it before moving it to sql/")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sys.exit(asyncio.run(main(sys.argv[1:])))
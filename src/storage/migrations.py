@@ -0,0 +1,440 @@
+"""
+CoffeeBuddy Migration Runner
+Applies versioned SQL migrations with checksum tracking under an advisory lock
+
+Migrations live in sql/ as V<NNNN>.up.sql with an optional V<NNNN>.down.sql.
+Each one runs in its own transaction together with its schema_migrations row,
+so a failed migration leaves nothing behind. A file (up or down) whose first
+lines contain
+
+    -- runner: no-transaction
+
+is executed statement by statement in autocommit mode instead, and its
+schema_migrations row is written or deleted in a transaction of its own; use
+this for CREATE/DROP INDEX CONCURRENTLY and keep such files to idempotent
+index DDL (IF [NOT] EXISTS), since a failure part-way cannot be rolled back.
+
+Usage:
+    PYTHONPATH=src python -m storage.migrations [status|upgrade|downgrade|baseline] [--target V0001]
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncGenerator, Optional
+
+from .database import DatabaseManager, to_async_url
+
+logger = logging.getLogger(__name__)
+
+SQL_DIR = Path(__file__).parent / "sql"
+MIGRATION_FILE_PATTERN = re.compile(r"^(V(\d+))\.up\.sql$")
+NO_TRANSACTION_DIRECTIVE = re.compile(r"^--\s*runner:\s*no-transaction\s*$", re.MULTILINE)
+# Arbitrary constant shared by every replica; pg_advisory_lock keys are bigint
+ADVISORY_LOCK_KEY = 0x436F666665654D67  # "CoffeeMg"
+
+
+class MigrationError(Exception):
+    """Raised when migrations cannot be applied safely"""
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A versioned migration discovered on disk"""
+
+    version: str
+    number: int
+    description: str
+    up_sql: str
+    down_sql: Optional[str]
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.up_sql.encode("utf-8")).hexdigest()
+
+    @property
+    def transactional(self) -> bool:
+        return _transactional(self.up_sql)
+
+    @property
+    def down_transactional(self) -> bool:
+        return self.down_sql is None or _transactional(self.down_sql)
+
+
+def _transactional(sql: str) -> bool:
+    """Whether a script may run in one transaction (no no-transaction directive in its header)"""
+    header = "\n".join(sql.splitlines()[:10])
+    return NO_TRANSACTION_DIRECTIVE.search(header) is None
+
+
+@dataclass(frozen=True)
+class AppliedMigration:
+    """A row of the schema_migrations table"""
+
+    version: str
+    checksum: str
+    applied_at: datetime
+    execution_ms: int
+
+
+def discover_migrations(sql_dir: Path = SQL_DIR) -> list[Migration]:
+    """
+    Load all migrations from a directory, ordered by version number
+
+    Args:
+        sql_dir: Directory containing V<NNNN>.up.sql / V<NNNN>.down.sql files
+
+    Returns:
+        Migrations sorted by ascending version number
+    """
+    migrations = []
+    for path in sql_dir.iterdir():
+        match = MIGRATION_FILE_PATTERN.match(path.name)
+        if not match:
+            continue
+        up_sql = path.read_text()
+        down_path = path.with_name(f"{match.group(1)}.down.sql")
+        description = next(
+            (line.split(":", 1)[1].strip() for line in up_sql.splitlines() if line.startswith("-- Description:")),
+            "",
+        )
+        migrations.append(
+            Migration(
+                version=match.group(1),
+                number=int(match.group(2)),
+                description=description,
+                up_sql=up_sql,
+                down_sql=down_path.read_text() if down_path.exists() else None,
+            )
+        )
+    migrations.sort(key=lambda m: m.number)
+    numbers = [m.number for m in migrations]
+    if len(numbers) != len(set(numbers)):
+        raise MigrationError(f"Duplicate migration numbers in {sql_dir}")
+    return migrations
+
+
+def split_statements(sql: str) -> list[str]:
+    """
+    Split a SQL script into individual statements
+
+    Understands single/double quotes, dollar-quoted bodies ($$ ... $$, $tag$ ... $tag$),
+    line comments and block comments, so semicolons inside them do not split.
+
+    Args:
+        sql: SQL script
+
+    Returns:
+        Non-empty statements without their terminating semicolon
+    """
+    statements: list[str] = []
+    current: list[str] = []
+    i, length = 0, len(sql)
+    while i < length:
+        char = sql[i]
+        if char == "-" and sql.startswith("--", i):
+            end = sql.find("\n", i)
+            end = length if end == -1 else end
+            current.append(sql[i:end])
+            i = end
+        elif char == "/" and sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            end = length if end == -1 else end + 2
+            current.append(sql[i:end])
+            i = end
+        elif char in ("'", '"'):
+            end = i + 1
+            while end < length:
+                if sql[end] == char:
+                    # A doubled quote is an escaped quote, not the end of the literal
+                    if end + 1 < length and sql[end + 1] == char:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+        elif char == "$" and (tag := re.match(r"\$[A-Za-z_0-9]*\$", sql[i:])):
+            delimiter = tag.group(0)
+            end = sql.find(delimiter, i + len(delimiter))
+            end = length if end == -1 else end + len(delimiter)
+            current.append(sql[i:end])
+            i = end
+        elif char == ";":
+            statements.append("".join(current))
+            current = []
+            i += 1
+        else:
+            current.append(char)
+            i += 1
+    statements.append("".join(current))
+
+    def has_code(statement: str) -> bool:
+        without_comments = re.sub(r"--[^\n]*|/\*.*?\*/", "", statement, flags=re.DOTALL)
+        return bool(without_comments.strip())
+
+    return [s.strip() for s in statements if has_code(s)]
+
+
+class MigrationRunner:
+    """Applies pending migrations on a single connection, one replica at a time"""
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        sql_dir: Path = SQL_DIR,
+        table_name: str = "schema_migrations",
+        lock_timeout: float = 300.0,
+    ):
+        """
+        Initialize migration runner
+
+        Args:
+            db_manager: Database manager whose engine provides the connection
+            sql_dir: Directory containing the migration files
+            table_name: Version tracking table (default: schema_migrations)
+            lock_timeout: Seconds to wait for another replica's run to finish (default: 300)
+        """
+        self.db_manager = db_manager
+        self.sql_dir = sql_dir
+        self.table_name = table_name
+        self.lock_timeout = lock_timeout
+
+    @asynccontextmanager
+    async def _locked_connection(self) -> AsyncGenerator[Any, None]:
+        """
+        Check out one pooled connection and hold the migration advisory lock on it
+
+        Yields the underlying asyncpg connection: migrations need multi-statement
+        scripts and explicit transaction control, which it exposes directly.
+        """
+        async with self.db_manager.engine.connect() as sa_conn:
+            raw = await sa_conn.get_raw_connection()
+            conn = raw.driver_connection
+            deadline = time.monotonic() + self.lock_timeout
+            while not await conn.fetchval("SELECT pg_try_advisory_lock($1)", ADVISORY_LOCK_KEY):
+                if time.monotonic() >= deadline:
+                    raise MigrationError(f"Timed out after {self.lock_timeout}s waiting for the migration lock")
+                logger.info("Another instance is migrating; waiting for the migration lock")
+                await asyncio.sleep(1.0)
+            try:
+                await conn.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {self.table_name} (
+                        version VARCHAR(32) PRIMARY KEY,
+                        description VARCHAR(255) NOT NULL DEFAULT '',
+                        checksum CHAR(64) NOT NULL,
+                        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                        execution_ms INT NOT NULL DEFAULT 0
+                    )
+                    """
+                )
+                yield conn
+            finally:
+                # Session-level advisory locks survive rollback; release before the pool reuses the connection
+                await conn.execute("SELECT pg_advisory_unlock($1)", ADVISORY_LOCK_KEY)
+
+    async def _applied(self, conn: Any) -> dict[str, AppliedMigration]:
+        rows = await conn.fetch(f"SELECT version, checksum, applied_at, execution_ms FROM {self.table_name}")
+        return {row["version"]: AppliedMigration(**dict(row)) for row in rows}
+
+    def _check_checksums(self, migrations: list[Migration], applied: dict[str, AppliedMigration]) -> None:
+        for migration in migrations:
+            record = applied.get(migration.version)
+            if record is not None and record.checksum != migration.checksum:
+                raise MigrationError(
+                    f"Checksum mismatch for applied migration {migration.version}: "
+                    f"the file was modified after it was applied. Add a new migration instead."
+                )
+
+    async def status(self) -> list[tuple[Migration, Optional[AppliedMigration]]]:
+        """
+        Report every known migration with its applied record, if any
+
+        Returns:
+            (migration, applied record or None) pairs in version order
+        """
+        migrations = discover_migrations(self.sql_dir)
+        async with self._locked_connection() as conn:
+            applied = await self._applied(conn)
+        return [(migration, applied.get(migration.version)) for migration in migrations]
+
+    async def upgrade(self, target: Optional[str] = None) -> list[str]:
+        """
+        Apply pending migrations up to and including target
+
+        Args:
+            target: Last version to apply (default: latest)
+
+        Returns:
+            Versions applied by this call (empty if already up to date)
+
+        Raises:
+            MigrationError: On checksum mismatch, lock timeout or failed migration
+        """
+        migrations = discover_migrations(self.sql_dir)
+        if target is not None:
+            migrations = [m for m in migrations if m.number <= _version_number(target)]
+
+        applied_now: list[str] = []
+        async with self._locked_connection() as conn:
+            applied = await self._applied(conn)
+            self._check_checksums(migrations, applied)
+            for migration in migrations:
+                if migration.version in applied:
+                    continue
+                await self._apply(conn, migration)
+                applied_now.append(migration.version)
+
+        if applied_now:
+            logger.info(f"Applied migrations: {', '.join(applied_now)}")
+        else:
+            logger.info("Database schema is up to date")
+        return applied_now
+
+    async def _apply(self, conn: Any, migration: Migration) -> None:
+        started = time.perf_counter()
+        record_sql = (
+            f"INSERT INTO {self.table_name} (version, description, checksum, execution_ms) "
+            f"VALUES ($1, $2, $3, $4)"
+        )
+        try:
+            if migration.transactional:
+                async with conn.transaction():
+                    await conn.execute(migration.up_sql)
+                    elapsed_ms = int((time.perf_counter() - started) * 1000)
+                    await conn.execute(
+                        record_sql, migration.version, migration.description, migration.checksum, elapsed_ms
+                    )
+            else:
+                for statement in split_statements(migration.up_sql):
+                    await conn.execute(statement)
+                elapsed_ms = int((time.perf_counter() - started) * 1000)
+                await conn.execute(record_sql, migration.version, migration.description, migration.checksum, elapsed_ms)
+        except Exception as e:
+            raise MigrationError(f"Migration {migration.version} failed: {e}") from e
+        logger.info(f"Applied {migration.version} ({migration.description}) in {elapsed_ms}ms")
+
+    async def downgrade(self, target: Optional[str] = None) -> list[str]:
+        """
+        Roll back applied migrations newer than target, newest first
+
+        Args:
+            target: Version to keep (default: roll back everything)
+
+        Returns:
+            Versions rolled back by this call
+        """
+        keep = _version_number(target) if target is not None else -1
+        migrations = [m for m in discover_migrations(self.sql_dir) if m.number > keep]
+
+        rolled_back: list[str] = []
+        async with self._locked_connection() as conn:
+            applied = await self._applied(conn)
+            for migration in reversed(migrations):
+                if migration.version not in applied:
+                    continue
+                if migration.down_sql is None:
+                    raise MigrationError(f"Migration {migration.version} has no down script")
+                delete_sql = f"DELETE FROM {self.table_name} WHERE version = $1"
+                try:
+                    if migration.down_transactional:
+                        async with conn.transaction():
+                            await conn.execute(migration.down_sql)
+                            await conn.execute(delete_sql, migration.version)
+                    else:
+                        for statement in split_statements(migration.down_sql):
+                            await conn.execute(statement)
+                        async with conn.transaction():
+                            await conn.execute(delete_sql, migration.version)
+                except Exception as e:
+                    raise MigrationError(f"Rollback of {migration.version} failed: {e}") from e
+                logger.info(f"Rolled back {migration.version}")
+                rolled_back.append(migration.version)
+        return rolled_back
+
+    async def baseline(self, target: str) -> list[str]:
+        """
+        Mark migrations up to target as applied without running them
+
+        For databases that were migrated by db_upgrade.sh before version
+        tracking existed.
+
+        Args:
+            target: Last version already present in the database
+
+        Returns:
+            Versions recorded by this call
+        """
+        migrations = [m for m in discover_migrations(self.sql_dir) if m.number <= _version_number(target)]
+        recorded: list[str] = []
+        async with self._locked_connection() as conn:
+            applied = await self._applied(conn)
+            for migration in migrations:
+                if migration.version in applied:
+                    continue
+                await conn.execute(
+                    f"INSERT INTO {self.table_name} (version, description, checksum) VALUES ($1, $2, $3)",
+                    migration.version,
+                    migration.description,
+                    migration.checksum,
+                )
+                recorded.append(migration.version)
+        logger.info(f"Baselined migrations: {', '.join(recorded) or 'none'}")
+        return recorded
+
+
+def _version_number(version: str) -> int:
+    match = re.fullmatch(r"V?(\d+)", version)
+    if not match:
+        raise MigrationError(f"Invalid migration version: {version}")
+    return int(match.group(1))
+
+
+async def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m storage.migrations", description="Apply CoffeeBuddy migrations")
+    parser.add_argument("command", choices=("status", "upgrade", "downgrade", "baseline"), nargs="?", default="upgrade")
+    parser.add_argument("--target", help="Version to migrate to (downgrade keeps it; baseline requires it)")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", ""))
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        logger.error("DATABASE_URL not set. Provide --database-url or the environment variable.")
+        return 2
+    if args.command == "baseline" and not args.target:
+        logger.error("baseline requires --target")
+        return 2
+
+    db = DatabaseManager(to_async_url(args.database_url), pool_size=1)
+    runner = MigrationRunner(db)
+    try:
+        if args.command == "status":
+            for migration, record in await runner.status():
+                state = f"applied {record.applied_at:%Y-%m-%d %H:%M:%S}" if record else "pending"
+                print(f"{migration.version}  {state:<28}  {migration.description}")
+        elif args.command == "upgrade":
+            await runner.upgrade(args.target)
+        elif args.command == "downgrade":
+            await runner.downgrade(args.target)
+        else:
+            await runner.baseline(args.target)
+    except MigrationError as e:
+        logger.error(str(e))
+        return 1
+    finally:
+        await db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -1,12 +1,18 @@
 """
 CoffeeBuddy Database Models
 SQLAlchemy ORM models for PostgreSQL schema
+
+Every relationship is lazy="raise": under AsyncSession an implicit lazy load
+fails with MissingGreenlet, and elsewhere it is one query per row. Queries
+that need related rows name them (joinedload/selectinload), and touching
+anything not loaded raises at once instead of issuing queries.
 """
 from datetime import datetime
 from typing import Optional
 from uuid import UUID, uuid4
 
 from sqlalchemy import (
+    BigInteger,
     CheckConstraint,
     Column,
     DateTime,
@@ -16,6 +22,7 @@ from sqlalchemy import (
     String,
     Text,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID as PG_UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
@@ -42,14 +49,14 @@ class User(Base):
 
     # Relationships
     initiated_runs: Mapped[list["CoffeeRun"]] = relationship(
-        "CoffeeRun", foreign_keys="CoffeeRun.initiator_user_id", back_populates="initiator"
+        "CoffeeRun", foreign_keys="CoffeeRun.initiator_user_id", back_populates="initiator", lazy="raise"
     )
     assigned_runs: Mapped[list["CoffeeRun"]] = relationship(
-        "CoffeeRun", foreign_keys="CoffeeRun.runner_user_id", back_populates="runner"
+        "CoffeeRun", foreign_keys="CoffeeRun.runner_user_id", back_populates="runner", lazy="raise"
     )
-    orders: Mapped[list["Order"]] = relationship("Order", back_populates="user")
-    preferences: Mapped[list["UserPreference"]] = relationship("UserPreference", back_populates="user")
-    audit_logs: Mapped[list["AuditLog"]] = relationship("AuditLog", back_populates="user")
+    orders: Mapped[list["Order"]] = relationship("Order", back_populates="user", lazy="raise")
+    preferences: Mapped[list["UserPreference"]] = relationship("UserPreference", back_populates="user", lazy="raise")
+    audit_logs: Mapped[list["AuditLog"]] = relationship("AuditLog", back_populates="user", lazy="raise")
 
     __table_args__ = (
         Index("idx_users_email", "email"),
@@ -72,10 +79,14 @@ class CoffeeRun(Base):
     reminder_sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
     # Relationships
-    initiator: Mapped["User"] = relationship("User", foreign_keys=[initiator_user_id], back_populates="initiated_runs")
-    runner: Mapped[Optional["User"]] = relationship("User", foreign_keys=[runner_user_id], back_populates="assigned_runs")
-    orders: Mapped[list["Order"]] = relationship("Order", back_populates="run")
-    audit_logs: Mapped[list["AuditLog"]] = relationship("AuditLog", back_populates="run")
+    initiator: Mapped["User"] = relationship(
+        "User", foreign_keys=[initiator_user_id], back_populates="initiated_runs", lazy="raise"
+    )
+    runner: Mapped[Optional["User"]] = relationship(
+        "User", foreign_keys=[runner_user_id], back_populates="assigned_runs", lazy="raise"
+    )
+    orders: Mapped[list["Order"]] = relationship("Order", back_populates="run", lazy="raise")
+    audit_logs: Mapped[list["AuditLog"]] = relationship("AuditLog", back_populates="run", lazy="raise")
 
     __table_args__ = (
         CheckConstraint("status IN ('active', 'completed', 'cancelled')", name="check_status"),
@@ -101,8 +112,8 @@ class Order(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.current_timestamp())
 
     # Relationships
-    run: Mapped["CoffeeRun"] = relationship("CoffeeRun", back_populates="orders")
-    user: Mapped["User"] = relationship("User", back_populates="orders")
+    run: Mapped["CoffeeRun"] = relationship("CoffeeRun", back_populates="orders", lazy="raise")
+    user: Mapped["User"] = relationship("User", back_populates="orders", lazy="raise")
 
     __table_args__ = (
         Index("idx_orders_run_id", "run_id"),
@@ -124,7 +135,7 @@ class UserPreference(Base):
     last_ordered_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.current_timestamp())
 
     # Relationships
-    user: Mapped["User"] = relationship("User", back_populates="preferences")
+    user: Mapped["User"] = relationship("User", back_populates="preferences", lazy="raise")
 
     __table_args__ = (
         Index("idx_user_preferences_user_id", "user_id"),
@@ -144,15 +155,45 @@ class AuditLog(Base):
     timestamp: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.current_timestamp())
 
     # Relationships
-    user: Mapped[Optional["User"]] = relationship("User", back_populates="audit_logs")
-    run: Mapped[Optional["CoffeeRun"]] = relationship("CoffeeRun", back_populates="audit_logs")
+    user: Mapped[Optional["User"]] = relationship("User", back_populates="audit_logs", lazy="raise")
+    run: Mapped[Optional["CoffeeRun"]] = relationship("CoffeeRun", back_populates="audit_logs", lazy="raise")
 
     __table_args__ = (
-        Index("idx_audit_logs_event_type", "event_type"),
         Index("idx_audit_logs_timestamp", "timestamp"),
-        Index("idx_audit_logs_user_id", "user_id"),
-        Index("idx_audit_logs_run_id", "run_id"),
+        # Composite filter + keyset indexes and the payload GIN index (V0003)
+        Index("idx_audit_logs_event_type_timestamp", "event_type", text("timestamp DESC"), text("log_id DESC")),
+        Index("idx_audit_logs_user_id_timestamp", "user_id", text("timestamp DESC"), text("log_id DESC")),
+        Index("idx_audit_logs_run_id_timestamp", "run_id", text("timestamp DESC"), text("log_id DESC")),
+        Index(
+            "idx_audit_logs_payload", "payload", postgresql_using="gin", postgresql_ops={"payload": "jsonb_path_ops"}
+        ),
     )
-```
 
-```python
\ No newline at end of file
+
+class WorkspacePlacement(Base):
+    """Explicit workspace-to-shard placement, overriding the hash ring"""
+    __tablename__ = "workspace_placements"
+
+    workspace_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    shard: Mapped[str] = mapped_column(String(64), nullable=False)
+    state: Mapped[str] = mapped_column(String(20), nullable=False, default="active")
+    target_shard: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.current_timestamp())
+
+    __table_args__ = (
+        CheckConstraint("state IN ('active', 'moving')", name="workspace_placements_state_check"),
+    )
+
+
+class RetentionJob(Base):
+    """Progress of a batched retention job (see storage.retention)"""
+    __tablename__ = "retention_jobs"
+
+    job_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    cutoff: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    position_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    position_key: Mapped[Optional[UUID]] = mapped_column(PG_UUID(as_uuid=True), nullable=True)
+    rows_deleted: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.current_timestamp())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.current_timestamp())
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
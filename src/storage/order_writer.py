@@ -0,0 +1,286 @@
+"""
+CoffeeBuddy Order Writer
+Coalesces concurrent order writes into one transaction with multi-row inserts
+
+Writing one order touches users (FK guard), orders, user_preferences and
+audit_logs. Done per submission that is four round trips and a commit each;
+OrderWriter instead gathers the writes arriving within a few milliseconds
+and flushes them together: one multi-row INSERT per table, one executemany
+UPDATE for preference counters and a single commit. Every caller awaits its
+own future. If the batch transaction fails, its items are retried one per
+transaction so a single bad item (e.g. an unknown run_id) only fails itself.
+"""
+import asyncio
+import logging
+from collections import Counter as TallyCounter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncContextManager, Callable, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import AuditLog, Order, User, UserPreference
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = Histogram(
+    "order_writer_batch_size",
+    "Orders written per transaction",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+BATCHES = Counter("order_writer_batches_total", "Order write batches by outcome", ["outcome"])
+ITEMS_FAILED = Counter("order_writer_items_failed_total", "Order writes that failed on their own")
+
+SessionFactory = Callable[[], AsyncContextManager[AsyncSession]]
+PreferenceKey = Tuple[str, str, str, Optional[str]]
+
+
+@dataclass(frozen=True)
+class OrderWrite:
+    """One order plus the side effects written with it"""
+
+    order_id: str
+    run_id: str
+    user_id: str
+    drink_type: str
+    size: str
+    customizations: Optional[str] = None
+    display_name: Optional[str] = None
+    audit_payload: Optional[Dict[str, Any]] = None
+
+    @property
+    def preference_key(self) -> PreferenceKey:
+        return (self.user_id, self.drink_type, self.size, self.customizations)
+
+
+async def write_orders(session: AsyncSession, items: List[OrderWrite]) -> Dict[str, bool]:
+    """
+    Write a batch of orders with one statement per table (caller commits)
+
+    Orders are idempotent on order_id: an order that already exists, or
+    repeats an earlier item of the same batch, gets no preference bump or
+    audit row.
+
+    Args:
+        session: Session whose transaction receives the writes
+        items: Orders to write
+
+    Returns:
+        Mapping of order_id to True if the order was created, False if it already existed
+    """
+    if not items:
+        return {}
+    now = datetime.utcnow()
+
+    # Users normally exist already; this only satisfies the foreign key for first-time orderers
+    users = {item.user_id: item.display_name or item.user_id for item in items}
+    await session.execute(
+        pg_insert(User)
+        .values([{"user_id": user_id, "display_name": name, "email": ""} for user_id, name in users.items()])
+        .on_conflict_do_nothing(index_elements=[User.user_id])
+    )
+
+    inserted = await session.execute(
+        pg_insert(Order)
+        .values(
+            [
+                {
+                    "order_id": item.order_id,
+                    "run_id": item.run_id,
+                    "user_id": item.user_id,
+                    "drink_type": item.drink_type,
+                    "size": item.size,
+                    "customizations": item.customizations,
+                }
+                for item in items
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=[Order.order_id])
+        .returning(Order.order_id)
+    )
+    inserted_ids = {str(order_id) for order_id in inserted.scalars()}
+
+    results: Dict[str, bool] = {}
+    created: List[OrderWrite] = []
+    for item in items:
+        order_id = str(item.order_id)
+        if order_id in results:
+            continue
+        results[order_id] = order_id in inserted_ids
+        if results[order_id]:
+            created.append(item)
+    if not created:
+        return results
+
+    await _bump_preferences(session, created, now)
+    await session.execute(
+        pg_insert(AuditLog).values(
+            [
+                {
+                    "log_id": uuid4(),
+                    "event_type": "order_placed",
+                    "user_id": item.user_id,
+                    "run_id": item.run_id,
+                    "payload": item.audit_payload,
+                    "timestamp": now,
+                }
+                for item in created
+            ]
+        )
+    )
+    return results
+
+
+async def _bump_preferences(session: AsyncSession, created: List[OrderWrite], now: datetime) -> None:
+    tallies = TallyCounter(item.preference_key for item in created)
+    rows = await session.execute(
+        select(
+            UserPreference.preference_id,
+            UserPreference.user_id,
+            UserPreference.drink_type,
+            UserPreference.size,
+            UserPreference.customizations,
+        ).where(UserPreference.user_id.in_({key[0] for key in tallies}))
+    )
+    existing: Dict[PreferenceKey, UUID] = {}
+    for preference_id, *key in rows:
+        existing.setdefault(tuple(key), preference_id)
+
+    updates = [
+        {"b_preference_id": existing[key], "b_count": count, "b_now": now}
+        for key, count in tallies.items()
+        if key in existing
+    ]
+    if updates:
+        table = UserPreference.__table__
+        await session.execute(
+            update(table)
+            .where(table.c.preference_id == bindparam("b_preference_id"))
+            .values(order_count=table.c.order_count + bindparam("b_count"), last_ordered_at=bindparam("b_now")),
+            updates,
+        )
+
+    inserts = [
+        {
+            "preference_id": uuid4(),
+            "user_id": user_id,
+            "drink_type": drink_type,
+            "size": size,
+            "customizations": customizations,
+            "order_count": count,
+            "last_ordered_at": now,
+        }
+        for (user_id, drink_type, size, customizations), count in tallies.items()
+        if (user_id, drink_type, size, customizations) not in existing
+    ]
+    if inserts:
+        await session.execute(pg_insert(UserPreference).values(inserts))
+
+
+class OrderWriter:
+    """Micro-batching front end for write_orders()"""
+
+    def __init__(self, session_factory: SessionFactory, max_batch: int = 200, max_delay: float = 0.005):
+        """
+        Initialize the writer
+
+        Args:
+            session_factory: Returns a session context manager (e.g. DatabaseManager.session)
+            max_batch: Flush as soon as this many writes are waiting
+            max_delay: Seconds the first write of a batch waits for company
+        """
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: List[Tuple[OrderWrite, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_lock = asyncio.Lock()
+        self._flushes: set = set()
+
+    async def write(self, item: OrderWrite) -> bool:
+        """
+        Queue an order for the next batch and wait for its outcome
+
+        Returns:
+            True if the order was created, False if it already existed
+
+        Raises:
+            Exception: Whatever writing this particular order raised
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._schedule_flush)
+        return await future
+
+    def _schedule_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def flush(self) -> None:
+        """Write everything pending now; flushes run one at a time so batches keep growing meanwhile"""
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not batch:
+                return
+            BATCH_SIZE.observe(len(batch))
+            try:
+                results = await self._commit([item for item, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    self._fail(batch[0], e)
+                    return
+                logger.warning(f"Order batch of {len(batch)} failed ({e}); retrying items one by one")
+                BATCHES.labels(outcome="split").inc()
+                await self._write_individually(batch)
+                return
+            BATCHES.labels(outcome="committed").inc()
+            claimed = set()
+            for item, future in batch:
+                # Only the first of several writes with one order_id reports it as created
+                order_id = str(item.order_id)
+                if not future.done():
+                    future.set_result(results[order_id] and order_id not in claimed)
+                claimed.add(order_id)
+
+    async def _commit(self, items: List[OrderWrite]) -> Dict[str, bool]:
+        async with self.session_factory() as session:
+            results = await write_orders(session, items)
+            await session.commit()
+            return results
+
+    async def _write_individually(self, batch: List[Tuple[OrderWrite, asyncio.Future]]) -> None:
+        for item, future in batch:
+            try:
+                result = await self._commit([item])
+                future.set_result(result[str(item.order_id)])
+            except Exception as e:
+                self._fail((item, future), e)
+
+    def _fail(self, entry: Tuple[OrderWrite, asyncio.Future], error: Exception) -> None:
+        item, future = entry
+        ITEMS_FAILED.inc()
+        logger.error(f"Order {item.order_id} for run {item.run_id} could not be written: {error}")
+        if not future.done():
+            future.set_exception(error)
+
+    async def close(self) -> None:
+        """Flush pending writes and wait for in-flight batches"""
+        if self._pending:
+            self._schedule_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
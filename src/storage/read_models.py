@@ -0,0 +1,247 @@
+"""
+CoffeeBuddy Read Models
+Column projections for read-only paths, without ORM hydration
+
+Loading CoffeeRun/Order/AuditLog entities costs, per row, an identity-map
+entry, an InstanceState with attribute tracking and a __dict__; read-only
+views need none of it. The queries here select only the columns a view
+shows and build NamedTuples from the rows: one tuple per row, no session
+bookkeeping, and nothing that can trigger a lazy load. They are safe to
+use after the session has closed. storage.bench.hydration measures the
+difference against entities.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Select, func, null, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from .models import AuditLog, CoffeeRun, Order, User
+
+
+class RunRow(NamedTuple):
+    """A run with its initiator's and runner's display names (None when loaded without names)"""
+
+    run_id: UUID
+    workspace_id: str
+    channel_id: str
+    status: str
+    created_at: datetime
+    completed_at: Optional[datetime]
+    initiator_user_id: str
+    initiator_name: Optional[str]
+    runner_user_id: Optional[str]
+    runner_name: Optional[str]
+
+
+class RunHistoryRow(NamedTuple):
+    """One line of a run history listing"""
+
+    run_id: UUID
+    channel_id: str
+    status: str
+    created_at: datetime
+    completed_at: Optional[datetime]
+    initiator_user_id: str
+    runner_user_id: Optional[str]
+    order_count: int
+
+
+class OrderRow(NamedTuple):
+    """An order with its user's display name (None when loaded without names)"""
+
+    order_id: UUID
+    run_id: UUID
+    user_id: str
+    display_name: Optional[str]
+    drink_type: str
+    size: str
+    customizations: Optional[str]
+    created_at: datetime
+
+
+class AuditRow(NamedTuple):
+    """An audit log entry"""
+
+    log_id: UUID
+    event_type: str
+    user_id: Optional[str]
+    run_id: Optional[UUID]
+    payload: Optional[Dict[str, Any]]
+    timestamp: datetime
+
+
+class UserNameRow(NamedTuple):
+    """A user's display name and when it last changed"""
+
+    user_id: str
+    display_name: str
+    updated_at: datetime
+
+
+@dataclass(slots=True)
+class RunDetails:
+    """A run and all of its orders"""
+
+    run: RunRow
+    orders: List[OrderRow]
+
+
+_initiator = aliased(User, name="initiator")
+_runner = aliased(User, name="runner")
+
+RUN_COLUMNS = (
+    CoffeeRun.run_id,
+    CoffeeRun.workspace_id,
+    CoffeeRun.channel_id,
+    CoffeeRun.status,
+    CoffeeRun.created_at,
+    CoffeeRun.completed_at,
+    CoffeeRun.initiator_user_id,
+    _initiator.display_name,
+    CoffeeRun.runner_user_id,
+    _runner.display_name,
+)
+
+ORDER_COLUMNS = (
+    Order.order_id,
+    Order.run_id,
+    Order.user_id,
+    User.display_name,
+    Order.drink_type,
+    Order.size,
+    Order.customizations,
+    Order.created_at,
+)
+
+# The same projections with the display names left NULL and users not joined,
+# for callers that resolve names from an in-memory directory
+RUN_COLUMNS_WITHOUT_NAMES = (*RUN_COLUMNS[:7], null(), RUN_COLUMNS[8], null())
+ORDER_COLUMNS_WITHOUT_NAMES = (*ORDER_COLUMNS[:3], null(), *ORDER_COLUMNS[4:])
+
+RUN_HISTORY_COLUMNS = (
+    CoffeeRun.run_id,
+    CoffeeRun.channel_id,
+    CoffeeRun.status,
+    CoffeeRun.created_at,
+    CoffeeRun.completed_at,
+    CoffeeRun.initiator_user_id,
+    CoffeeRun.runner_user_id,
+    select(func.count()).where(Order.run_id == CoffeeRun.run_id).correlate(CoffeeRun).scalar_subquery(),
+)
+
+AUDIT_COLUMNS = (
+    AuditLog.log_id,
+    AuditLog.event_type,
+    AuditLog.user_id,
+    AuditLog.run_id,
+    AuditLog.payload,
+    AuditLog.timestamp,
+)
+
+
+def order_rows_query(with_names: bool = True) -> Select:
+    """Projection behind OrderRow; add filters and ordering"""
+    if not with_names:
+        return select(*ORDER_COLUMNS_WITHOUT_NAMES)
+    return select(*ORDER_COLUMNS).join(User, User.user_id == Order.user_id)
+
+
+async def get_run_details(session: AsyncSession, run_id: UUID, with_names: bool = True) -> Optional[RunDetails]:
+    """
+    Load a run and its orders in two queries
+
+    Args:
+        session: Session to query in
+        run_id: Run to load
+        with_names: Join users for display names; pass False when they come from a directory
+
+    Returns:
+        The run details, or None if the run does not exist
+    """
+    if with_names:
+        query = (
+            select(*RUN_COLUMNS)
+            .join(_initiator, _initiator.user_id == CoffeeRun.initiator_user_id)
+            .outerjoin(_runner, _runner.user_id == CoffeeRun.runner_user_id)
+        )
+    else:
+        query = select(*RUN_COLUMNS_WITHOUT_NAMES)
+    result = await session.execute(query.where(CoffeeRun.run_id == run_id))
+    row = result.one_or_none()
+    if row is None:
+        return None
+    return RunDetails(run=RunRow._make(row), orders=await run_orders(session, run_id, with_names))
+
+
+async def run_orders(session: AsyncSession, run_id: UUID, with_names: bool = True) -> List[OrderRow]:
+    """Load a run's orders, oldest first"""
+    result = await session.execute(
+        order_rows_query(with_names).where(Order.run_id == run_id).order_by(Order.created_at, Order.order_id)
+    )
+    return list(map(OrderRow._make, result))
+
+
+async def run_history(
+    session: AsyncSession,
+    workspace_id: str,
+    channel_id: Optional[str] = None,
+    before: Optional[Tuple[datetime, UUID]] = None,
+    limit: int = 20,
+) -> List[RunHistoryRow]:
+    """
+    Load a page of a workspace's runs with their order counts, newest first, in one query
+
+    Args:
+        session: Session to query in
+        workspace_id: Workspace whose runs to list
+        channel_id: Restrict to one channel
+        before: Keyset cursor, the (created_at, run_id) of the previous page's
+            last row; runs sharing its created_at are not skipped
+        limit: Page size
+
+    Returns:
+        Runs ordered by created_at, then run_id, descending
+    """
+    query = (
+        select(*RUN_HISTORY_COLUMNS)
+        .where(CoffeeRun.workspace_id == workspace_id)
+        .order_by(CoffeeRun.created_at.desc(), CoffeeRun.run_id.desc())
+        .limit(limit)
+    )
+    if channel_id is not None:
+        query = query.where(CoffeeRun.channel_id == channel_id)
+    if before is not None:
+        query = query.where(tuple_(CoffeeRun.created_at, CoffeeRun.run_id) < tuple_(*before))
+    result = await session.execute(query)
+    return list(map(RunHistoryRow._make, result))
+
+
+async def user_orders(session: AsyncSession, user_id: str, limit: int = 20) -> List[OrderRow]:
+    """Load a user's most recent orders, newest first, in one query"""
+    result = await session.execute(
+        order_rows_query().where(Order.user_id == user_id).order_by(Order.created_at.desc()).limit(limit)
+    )
+    return list(map(OrderRow._make, result))
+
+
+async def user_names(session: AsyncSession, after: Optional[str] = None, limit: int = 5000) -> List[UserNameRow]:
+    """
+    Load a page of users' display names ordered by user_id, for filling in-memory directories
+
+    Args:
+        session: Session to query in
+        after: Keyset cursor; only users with a greater user_id
+        limit: Page size
+
+    Returns:
+        Users ordered by user_id; an empty list past the last page
+    """
+    query = select(User.user_id, User.display_name, User.updated_at).order_by(User.user_id).limit(limit)
+    if after is not None:
+        query = query.where(User.user_id > after)
+    result = await session.execute(query)
+    return list(map(UserNameRow._make, result))
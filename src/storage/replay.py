@@ -0,0 +1,242 @@
+"""
+CoffeeBuddy Event Replay
+Idempotent, batched application of Kafka events to the relational tables
+
+Rebuilding after a restore means replaying coffee.orders, coffee.assignments
+and coffee.completions from the backup's point in time on top of it. Every
+write here is keyed on a primary key, so re-applying a range, or one that
+overlaps what the backup already holds, converges on the same rows:
+
+- order_placed / order_updated: upsert on order_id (last event wins)
+- order_cancelled: delete by order_id
+- runner_assigned: set runner_user_id (last event wins)
+- run_completed / run_cancelled: move an active run to its final status;
+  finished runs are left alone, as in the live pipeline
+
+Events carrying workspace_id, channel_id and initiator_user_id also create
+their run if it is missing; events for runs that exist neither in the
+database nor in the batch are counted as orphaned and dropped. Each batch is
+folded to one row per key and written with one statement per table, keys in
+sorted order so parallel partitions cannot deadlock on shared users or runs.
+user_preferences is not touched: its counters are not idempotent, so it
+stays as restored.
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Set
+from uuid import UUID
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import CoffeeRun, Order, User
+
+logger = logging.getLogger(__name__)
+
+ORDER_UPSERT_EVENTS = frozenset({"order_placed", "order_updated"})
+ORDER_CANCELLED = "order_cancelled"
+RUNNER_ASSIGNED = "runner_assigned"
+RUN_FINAL_STATUS = {"run_completed": "completed", "run_cancelled": "cancelled"}
+RUN_CONTEXT = ("workspace_id", "channel_id", "initiator_user_id")
+EVENT_TYPES = ORDER_UPSERT_EVENTS | {ORDER_CANCELLED, RUNNER_ASSIGNED, *RUN_FINAL_STATUS}
+
+ASSIGN_RUNNERS = text(
+    """
+    UPDATE coffee_runs AS r
+    SET runner_user_id = v.runner_user_id
+    FROM unnest(CAST(:run_ids AS uuid[]), CAST(:runners AS varchar[])) AS v(run_id, runner_user_id)
+    WHERE r.run_id = v.run_id
+    """
+)
+
+FINISH_RUNS = text(
+    """
+    UPDATE coffee_runs AS r
+    SET status = v.status,
+        completed_at = CASE WHEN v.status = 'completed' THEN COALESCE(r.completed_at, v.at) ELSE r.completed_at END
+    FROM unnest(CAST(:run_ids AS uuid[]), CAST(:statuses AS varchar[]), CAST(:ats AS timestamp[]))
+        AS v(run_id, status, at)
+    WHERE r.run_id = v.run_id AND r.status = 'active'
+    """
+)
+
+
+@dataclass(frozen=True)
+class ReplayEvent:
+    """One consumed event: its JSON payload and the record's timestamp (naive UTC)"""
+
+    payload: Dict[str, Any]
+    timestamp: datetime
+
+
+@dataclass
+class ApplyResult:
+    """What a batch did; every event is counted exactly once"""
+
+    applied: int = 0
+    orphaned: int = 0
+    skipped: int = 0
+
+    def __iadd__(self, other: "ApplyResult") -> "ApplyResult":
+        self.applied += other.applied
+        self.orphaned += other.orphaned
+        self.skipped += other.skipped
+        return self
+
+
+@dataclass
+class _Batch:
+    """A batch folded to the final state per key"""
+
+    users: Dict[str, str] = field(default_factory=dict)
+    runs: Dict[UUID, Dict[str, Any]] = field(default_factory=dict)
+    # order_id -> row to upsert, or None to delete
+    orders: Dict[UUID, Optional[Dict[str, Any]]] = field(default_factory=dict)
+    runners: Dict[UUID, str] = field(default_factory=dict)
+    finishes: Dict[UUID, Dict[str, Any]] = field(default_factory=dict)
+    # run_id each well-formed event depends on (None for cancellations), for orphan accounting
+    dependencies: List[Optional[UUID]] = field(default_factory=list)
+    skipped: int = 0
+
+
+def _fold(events: Sequence[ReplayEvent]) -> _Batch:
+    """Fold events, in offset order, into one write per key"""
+    batch = _Batch()
+    for event in events:
+        payload = event.payload
+        event_type = payload.get("event_type")
+        try:
+            if event_type not in EVENT_TYPES:
+                raise KeyError("event_type")
+            run_id = UUID(str(payload["run_id"])) if payload.get("run_id") else None
+            if run_id is None and event_type != ORDER_CANCELLED:
+                raise KeyError("run_id")
+            if event_type in ORDER_UPSERT_EVENTS:
+                order_id = UUID(str(payload["order_id"]))
+                user_id = payload["user_id"]
+                batch.orders[order_id] = {
+                    "order_id": order_id,
+                    "run_id": run_id,
+                    "user_id": user_id,
+                    "drink_type": payload["drink_type"],
+                    "size": payload["size"],
+                    "customizations": payload.get("customizations"),
+                    "created_at": event.timestamp,
+                }
+                batch.users.setdefault(user_id, payload.get("user_name") or user_id)
+            elif event_type == ORDER_CANCELLED:
+                batch.orders[UUID(str(payload["order_id"]))] = None
+                run_id = None
+            elif event_type == RUNNER_ASSIGNED:
+                runner = payload["runner_user_id"]
+                batch.runners[run_id] = runner
+                batch.users.setdefault(runner, runner)
+            else:
+                batch.finishes.setdefault(
+                    run_id, {"status": RUN_FINAL_STATUS[event_type], "at": event.timestamp}
+                )
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Skipping malformed {event_type or 'untyped'} event ({e}): {payload}")
+            batch.skipped += 1
+            continue
+
+        if run_id is None:
+            batch.dependencies.append(None)
+            continue
+        batch.dependencies.append(run_id)
+        if all(payload.get(key) for key in RUN_CONTEXT) and run_id not in batch.runs:
+            batch.runs[run_id] = {
+                "run_id": run_id,
+                "workspace_id": payload["workspace_id"],
+                "channel_id": payload["channel_id"],
+                "initiator_user_id": payload["initiator_user_id"],
+                "status": "active",
+                "created_at": event.timestamp,
+            }
+            batch.users.setdefault(payload["initiator_user_id"], payload["initiator_user_id"])
+    return batch
+
+
+async def apply_events(session: AsyncSession, events: Sequence[ReplayEvent]) -> ApplyResult:
+    """
+    Apply a batch of events from one partition (caller commits)
+
+    Args:
+        session: Session whose transaction receives the writes
+        events: Events in offset order
+
+    Returns:
+        Counts of applied, orphaned and skipped events
+    """
+    batch = _fold(events)
+    result = ApplyResult(skipped=batch.skipped)
+    if not batch.dependencies:
+        return result
+
+    # Users normally exist already; this only satisfies the foreign keys
+    if batch.users:
+        await session.execute(
+            pg_insert(User)
+            .values(
+                [
+                    {"user_id": user_id, "display_name": batch.users[user_id], "email": ""}
+                    for user_id in sorted(batch.users)
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[User.user_id])
+        )
+    if batch.runs:
+        await session.execute(
+            pg_insert(CoffeeRun)
+            .values([batch.runs[run_id] for run_id in sorted(batch.runs)])
+            .on_conflict_do_nothing(index_elements=[CoffeeRun.run_id])
+        )
+
+    wanted = {run_id for run_id in batch.dependencies if run_id is not None}
+    known: Set[UUID] = set()
+    if wanted:
+        known = set((await session.execute(select(CoffeeRun.run_id).where(CoffeeRun.run_id.in_(wanted)))).scalars())
+
+    upserts = [row for _, row in sorted(batch.orders.items()) if row is not None and row["run_id"] in known]
+    if upserts:
+        stmt = pg_insert(Order).values(upserts)
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[Order.order_id],
+                set_={
+                    "run_id": stmt.excluded.run_id,
+                    "user_id": stmt.excluded.user_id,
+                    "drink_type": stmt.excluded.drink_type,
+                    "size": stmt.excluded.size,
+                    "customizations": stmt.excluded.customizations,
+                },
+            )
+        )
+    cancelled = sorted(order_id for order_id, row in batch.orders.items() if row is None)
+    if cancelled:
+        await session.execute(Order.__table__.delete().where(Order.order_id.in_(cancelled)))
+
+    runners = sorted(run_id for run_id in batch.runners if run_id in known)
+    if runners:
+        await session.execute(
+            ASSIGN_RUNNERS, {"run_ids": runners, "runners": [batch.runners[run_id] for run_id in runners]}
+        )
+    finishes = sorted(run_id for run_id in batch.finishes if run_id in known)
+    if finishes:
+        await session.execute(
+            FINISH_RUNS,
+            {
+                "run_ids": finishes,
+                "statuses": [batch.finishes[run_id]["status"] for run_id in finishes],
+                "ats": [batch.finishes[run_id]["at"] for run_id in finishes],
+            },
+        )
+
+    for run_id in batch.dependencies:
+        if run_id is None or run_id in known:
+            result.applied += 1
+        else:
+            result.orphaned += 1
+    return result
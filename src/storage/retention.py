@@ -0,0 +1,366 @@
+"""
+CoffeeBuddy Retention Jobs
+Deletes rows past the 90-day retention window in small, throttled batches
+
+Replaces prune_old_audit_logs() and prune_old_user_preferences(), which
+deleted everything in one statement: one huge transaction, a burst of WAL
+for the replicas to replay and row locks held for its whole duration. A job
+here instead:
+
+- deletes at most `batch_size` rows per transaction, walking the table in
+  (age column, primary key) order from where the previous batch stopped;
+- records its cutoff and position in retention_jobs in the same transaction
+  as each delete, so a job that is stopped or crashes resumes where it left
+  off, against the same cutoff;
+- pauses between batches in proportion to how long the batch took
+  (`duty_cycle`), which backs off automatically when the database is busy,
+  and waits while replica replay lag exceeds `max_replication_lag`;
+- runs under a per-job advisory lock, so when every replica schedules it
+  only one does the work;
+- stops after `max_duration` if set, to stay out of business hours.
+
+Replication lag is read from pg_stat_replication on the primary, which needs
+superuser or pg_monitor to show lag columns; without them the lag reads as 0.
+
+Usage:
+    PYTHONPATH=src python -m storage.retention [audit_logs user_preferences] [--batch-size 5000] [--max-duration 1800]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from .database import DatabaseManager, to_async_url
+
+logger = logging.getLogger(__name__)
+
+RETENTION_PERIOD = timedelta(days=90)
+# Advisory lock namespace for retention jobs (int4); the job name is hashed into the second key
+ADVISORY_LOCK_CLASS = 0x52657465  # "Rete"
+
+ROWS_DELETED = Counter("retention_rows_deleted_total", "Rows deleted by retention jobs", ["job"])
+BATCH_SECONDS = Histogram("retention_batch_seconds", "Duration of one retention delete batch", ["job"])
+THROTTLE_SECONDS = Counter("retention_throttle_seconds_total", "Time retention jobs spent paused", ["job", "reason"])
+RUNS = Counter("retention_runs_total", "Retention job runs by outcome", ["job", "outcome"])
+
+REPLICATION_LAG_SQL = text("SELECT COALESCE(EXTRACT(EPOCH FROM max(replay_lag)), 0) FROM pg_stat_replication")
+
+Position = Tuple[datetime, UUID]
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """A table whose rows expire once their age column is older than max_age"""
+
+    name: str
+    table: str
+    age_column: str
+    key_column: str
+    max_age: timedelta = RETENTION_PERIOD
+
+
+POLICIES = {
+    policy.name: policy
+    for policy in (
+        RetentionPolicy("audit_logs", "audit_logs", "timestamp", "log_id"),
+        RetentionPolicy("user_preferences", "user_preferences", "last_ordered_at", "preference_id"),
+    )
+}
+
+
+@dataclass
+class RetentionResult:
+    """Outcome of one run of a retention job"""
+
+    name: str
+    rows_deleted: int = 0
+    batches: int = 0
+    duration_seconds: float = 0.0
+    throttled_seconds: float = 0.0
+    resumed: bool = False
+    completed: bool = False
+    skipped: bool = False
+
+    @property
+    def outcome(self) -> str:
+        if self.skipped:
+            return "skipped"
+        return "completed" if self.completed else "paused"
+
+
+class RetentionRunner:
+    """Runs retention jobs batch by batch on one connection"""
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        batch_size: int = 5000,
+        duty_cycle: float = 0.5,
+        min_pause: float = 0.05,
+        max_replication_lag: float = 10.0,
+        lag_poll_interval: float = 5.0,
+        max_duration: Optional[float] = None,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ):
+        """
+        Initialize retention runner
+
+        Args:
+            db_manager: Database manager whose engine provides the connection
+            batch_size: Maximum rows deleted per transaction (default: 5000)
+            duty_cycle: Fraction of wall time spent deleting; 0.5 pauses as long as each batch took
+            min_pause: Minimum pause between batches in seconds
+            max_replication_lag: Replay lag in seconds above which deletion waits
+            lag_poll_interval: Seconds between lag checks while waiting
+            max_duration: Stop (resumably) after this many seconds; None runs to completion
+            sleep: Coroutine used to pause (injectable for tests)
+        """
+        if not 0 < duty_cycle <= 1:
+            raise ValueError("duty_cycle must be in (0, 1]")
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.duty_cycle = duty_cycle
+        self.min_pause = min_pause
+        self.max_replication_lag = max_replication_lag
+        self.lag_poll_interval = lag_poll_interval
+        self.max_duration = max_duration
+        self.sleep = sleep
+
+    async def run_all(self, policies: Sequence[RetentionPolicy]) -> List[RetentionResult]:
+        """Run jobs one after another; max_duration applies to each"""
+        return [await self.run(policy) for policy in policies]
+
+    async def run(self, policy: RetentionPolicy) -> RetentionResult:
+        """
+        Run one job until it is done, max_duration passes, or another replica holds its lock
+
+        Returns:
+            Rows deleted and time spent in this run (an interrupted pass reports only its own share)
+        """
+        result = RetentionResult(name=policy.name)
+        started = time.monotonic()
+        async with self.db_manager.engine.connect() as conn:
+            locked = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(:lock_class, hashtext(:name))"),
+                {"lock_class": ADVISORY_LOCK_CLASS, "name": policy.name},
+            )
+            await conn.commit()
+            if not locked:
+                logger.info(f"Retention job {policy.name} is running elsewhere; skipping")
+                result.skipped = True
+                RUNS.labels(policy.name, result.outcome).inc()
+                return result
+            try:
+                await self._run_locked(conn, policy, result, started)
+            except Exception:
+                RUNS.labels(policy.name, "failed").inc()
+                raise
+            finally:
+                # Session-level advisory locks survive rollback; release before the pool reuses the connection
+                await conn.rollback()
+                await conn.execute(
+                    text("SELECT pg_advisory_unlock(:lock_class, hashtext(:name))"),
+                    {"lock_class": ADVISORY_LOCK_CLASS, "name": policy.name},
+                )
+                await conn.commit()
+
+        result.duration_seconds = round(time.monotonic() - started, 3)
+        RUNS.labels(policy.name, result.outcome).inc()
+        logger.info(
+            f"Retention job {policy.name} {result.outcome}: deleted {result.rows_deleted} rows in "
+            f"{result.batches} batches, {result.duration_seconds:.1f}s ({result.throttled_seconds:.1f}s throttled)"
+        )
+        return result
+
+    async def _run_locked(
+        self, conn: AsyncConnection, policy: RetentionPolicy, result: RetentionResult, started: float
+    ) -> None:
+        cutoff, position = await self._start(conn, policy, result)
+        while True:
+            if self.max_duration is not None and time.monotonic() - started >= self.max_duration:
+                logger.info(f"Retention job {policy.name} reached its time budget; it will resume next run")
+                return
+            await self._wait_for_replicas(conn, policy, result)
+
+            batch_started = time.monotonic()
+            deleted, position = await self._delete_batch(conn, policy, cutoff, position)
+            elapsed = time.monotonic() - batch_started
+            BATCH_SECONDS.labels(policy.name).observe(elapsed)
+            ROWS_DELETED.labels(policy.name).inc(deleted)
+            result.rows_deleted += deleted
+            result.batches += 1
+            if deleted < self.batch_size:
+                result.completed = True
+                return
+
+            pause = max(self.min_pause, elapsed * (1 - self.duty_cycle) / self.duty_cycle)
+            await self._pause(policy, result, pause, "duty_cycle")
+
+    async def _start(
+        self, conn: AsyncConnection, policy: RetentionPolicy, result: RetentionResult
+    ) -> Tuple[datetime, Optional[Position]]:
+        """Resume an unfinished pass, or start a new one with a fresh cutoff"""
+        async with conn.begin():
+            row = (
+                await conn.execute(
+                    text(
+                        "SELECT cutoff, position_at, position_key FROM retention_jobs "
+                        "WHERE job_name = :name AND finished_at IS NULL"
+                    ),
+                    {"name": policy.name},
+                )
+            ).one_or_none()
+            if row is not None:
+                result.resumed = True
+                position = (row.position_at, row.position_key) if row.position_at is not None else None
+                logger.info(f"Resuming retention job {policy.name} (cutoff {row.cutoff:%Y-%m-%d %H:%M:%S})")
+                return row.cutoff, position
+
+            cutoff = await conn.scalar(
+                text(
+                    """
+                    INSERT INTO retention_jobs (job_name, cutoff)
+                    VALUES (:name, LOCALTIMESTAMP - make_interval(secs => :max_age))
+                    ON CONFLICT (job_name) DO UPDATE SET
+                        cutoff = EXCLUDED.cutoff,
+                        position_at = NULL,
+                        position_key = NULL,
+                        rows_deleted = 0,
+                        started_at = LOCALTIMESTAMP,
+                        updated_at = LOCALTIMESTAMP,
+                        finished_at = NULL
+                    RETURNING cutoff
+                    """
+                ),
+                {"name": policy.name, "max_age": policy.max_age.total_seconds()},
+            )
+            return cutoff, None
+
+    async def _delete_batch(
+        self,
+        conn: AsyncConnection,
+        policy: RetentionPolicy,
+        cutoff: datetime,
+        position: Optional[Position],
+    ) -> Tuple[int, Optional[Position]]:
+        """Delete the next batch past `position` and record progress in the same transaction"""
+        age, key = policy.age_column, policy.key_column
+        after = f"AND ({age}, {key}) > (:after_at, :after_key)" if position else ""
+        params: Dict[str, Any] = {"cutoff": cutoff, "limit": self.batch_size}
+        if position:
+            params.update(after_at=position[0], after_key=position[1])
+
+        async with conn.begin():
+            # SKIP LOCKED leaves rows the app is touching for the next pass instead of waiting on them
+            row = (
+                await conn.execute(
+                    text(
+                        f"""
+                        WITH batch AS (
+                            SELECT {key} AS key, {age} AS age FROM {policy.table}
+                            WHERE {age} < :cutoff {after}
+                            ORDER BY {age}, {key}
+                            LIMIT :limit
+                            FOR UPDATE SKIP LOCKED
+                        ), deleted AS (
+                            DELETE FROM {policy.table} t USING batch WHERE t.{key} = batch.key
+                            RETURNING batch.age, batch.key
+                        )
+                        SELECT count(*) OVER () AS deleted, age, key FROM deleted
+                        ORDER BY age DESC, key DESC LIMIT 1
+                        """
+                    ),
+                    params,
+                )
+            ).one_or_none()
+            deleted = row.deleted if row else 0
+            if row:
+                position = (row.age, row.key)
+            await conn.execute(
+                text(
+                    """
+                    UPDATE retention_jobs SET
+                        position_at = :position_at,
+                        position_key = :position_key,
+                        rows_deleted = rows_deleted + :deleted,
+                        updated_at = LOCALTIMESTAMP,
+                        finished_at = CASE WHEN :finished THEN LOCALTIMESTAMP END
+                    WHERE job_name = :name
+                    """
+                ),
+                {
+                    "name": policy.name,
+                    "position_at": position[0] if position else None,
+                    "position_key": position[1] if position else None,
+                    "deleted": deleted,
+                    "finished": deleted < self.batch_size,
+                },
+            )
+        return deleted, position
+
+    async def _wait_for_replicas(self, conn: AsyncConnection, policy: RetentionPolicy, result: RetentionResult) -> None:
+        while True:
+            lag = float(await conn.scalar(REPLICATION_LAG_SQL))
+            await conn.commit()
+            if lag <= self.max_replication_lag:
+                return
+            logger.info(f"Retention job {policy.name} waiting: replication lag {lag:.1f}s")
+            await self._pause(policy, result, self.lag_poll_interval, "replication_lag")
+
+    async def _pause(self, policy: RetentionPolicy, result: RetentionResult, seconds: float, reason: str) -> None:
+        await self.sleep(seconds)
+        result.throttled_seconds += seconds
+        THROTTLE_SECONDS.labels(policy.name, reason).inc(seconds)
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m storage.retention", description="Run CoffeeBuddy retention jobs")
+    parser.add_argument("jobs", nargs="*", help=f"Jobs to run: {', '.join(sorted(POLICIES))} (default: all)")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", ""))
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--duty-cycle", type=float, default=0.5)
+    parser.add_argument("--max-replication-lag", type=float, default=10.0, help="Seconds")
+    parser.add_argument("--max-duration", type=float, help="Seconds per job before pausing until the next run")
+    return parser.parse_args(argv)
+
+
+async def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    if not args.database_url:
+        logger.error("DATABASE_URL not set. Provide --database-url or the environment variable.")
+        return 2
+    unknown = set(args.jobs) - set(POLICIES)
+    if unknown:
+        logger.error(f"Unknown retention jobs: {', '.join(sorted(unknown))}")
+        return 2
+
+    db = DatabaseManager(to_async_url(args.database_url), pool_size=1)
+    runner = RetentionRunner(
+        db,
+        batch_size=args.batch_size,
+        duty_cycle=args.duty_cycle,
+        max_replication_lag=args.max_replication_lag,
+        max_duration=args.max_duration,
+    )
+    try:
+        results = await runner.run_all([POLICIES[name] for name in args.jobs or sorted(POLICIES)])
+    finally:
+        await db.close()
+    print(json.dumps([dict(asdict(result), outcome=result.outcome) for result in results], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -0,0 +1,376 @@
+"""
+CoffeeBuddy Workspace Sharding
+Routes each workspace to one of several databases via a consistent-hash ring
+
+Every shard has its own DatabaseManager (and so its own pool), which keeps a
+noisy workspace from exhausting connections for workspaces on other shards.
+Explicit placements in the directory shard's workspace_placements table
+override the ring; move_workspace() uses them to relocate a workspace online.
+"""
+import asyncio
+import bisect
+import hashlib
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncGenerator, Dict, Iterable, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import delete, func, select, union
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from .database import DatabaseManager, to_async_url
+from .models import AuditLog, CoffeeRun, Order, User, WorkspacePlacement
+
+logger = logging.getLogger(__name__)
+
+SHARD_SESSIONS = Counter("db_shard_sessions_total", "Sessions opened per shard", ["shard"])
+SHARD_SESSIONS_ACTIVE = Gauge("db_shard_sessions_active", "Sessions currently open per shard", ["shard"])
+SHARD_POOL_CHECKED_OUT = Gauge("db_shard_pool_checked_out", "Pooled connections in use per shard", ["shard"])
+WORKSPACE_MOVES = Counter("workspace_moves_total", "Workspace moves between shards", ["outcome"])
+
+
+class WorkspaceMovingError(Exception):
+    """Raised when a workspace stays frozen for a move longer than the caller is willing to wait"""
+
+
+def parse_shard_urls(spec: str) -> Dict[str, str]:
+    """
+    Parse a shard list such as "shard0=postgresql://db0/coffee,shard1=postgresql://db1/coffee"
+
+    Args:
+        spec: Comma-separated name=url pairs (e.g. from DATABASE_SHARDS)
+
+    Returns:
+        Mapping of shard name to database URL
+    """
+    shards = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, url = item.partition("=")
+        if not url:
+            raise ValueError(f"Invalid shard entry {item!r}; expected name=url")
+        shards[name.strip()] = url.strip()
+    return shards
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes"""
+
+    def __init__(self, shards: Iterable[str], vnodes: int = 128):
+        """
+        Build the ring
+
+        Args:
+            shards: Shard names
+            vnodes: Virtual nodes per shard; more nodes give a more even spread
+        """
+        points = sorted((_hash(f"{shard}#{i}"), shard) for shard in shards for i in range(vnodes))
+        if not points:
+            raise ValueError("HashRing needs at least one shard")
+        self._keys = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> str:
+        """Return the shard owning a key"""
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._shards[index]
+
+
+class ShardRouter:
+    """Maps workspace_id to a shard and hands out sessions from that shard's pool"""
+
+    def __init__(
+        self,
+        shard_urls: Dict[str, str],
+        directory_shard: Optional[str] = None,
+        pool_size: int = 20,
+        max_overflow: int = 0,
+        vnodes: int = 128,
+        placement_ttl: float = 30.0,
+        move_wait_timeout: float = 10.0,
+    ):
+        """
+        Initialize shard router with one connection pool per shard
+
+        Args:
+            shard_urls: Shard name to PostgreSQL URL
+            directory_shard: Shard holding the authoritative placements (default: first shard)
+            pool_size: Pool size for each shard
+            max_overflow: Overflow connections for each shard
+            vnodes: Virtual nodes per shard on the hash ring
+            placement_ttl: Seconds between placement refreshes; also the longest a
+                router can take to notice a move starting or finishing
+            move_wait_timeout: Seconds session() waits for a frozen workspace
+        """
+        if not shard_urls:
+            raise ValueError("ShardRouter needs at least one shard")
+        self.ring = HashRing(shard_urls, vnodes=vnodes)
+        self.directory_shard = directory_shard or next(iter(shard_urls))
+        self.placement_ttl = placement_ttl
+        self.move_wait_timeout = move_wait_timeout
+        self.managers: Dict[str, DatabaseManager] = {
+            name: DatabaseManager(to_async_url(url), pool_size=pool_size, max_overflow=max_overflow)
+            for name, url in shard_urls.items()
+        }
+        self._placements: Dict[str, Tuple[str, str]] = {}
+        self._placements_loaded_at = float("-inf")
+        self._refresh_lock = asyncio.Lock()
+
+    @property
+    def directory(self) -> DatabaseManager:
+        """DatabaseManager of the directory shard"""
+        return self.managers[self.directory_shard]
+
+    async def refresh_placements(self, max_age: float = 0.0) -> None:
+        """
+        Reload explicit placements from the directory shard
+
+        Concurrent callers share one reload: whoever waited on the lock skips
+        its own if the placements are now younger than max_age seconds.
+        """
+        async with self._refresh_lock:
+            if time.monotonic() - self._placements_loaded_at < max_age:
+                return
+            async with self.directory.session() as session:
+                rows = await session.execute(
+                    select(WorkspacePlacement.workspace_id, WorkspacePlacement.shard, WorkspacePlacement.state)
+                )
+                self._placements = {workspace_id: (shard, state) for workspace_id, shard, state in rows}
+            self._placements_loaded_at = time.monotonic()
+
+    async def _placement(self, workspace_id: str, max_age: Optional[float] = None) -> Tuple[str, str]:
+        max_age = self.placement_ttl if max_age is None else max_age
+        if time.monotonic() - self._placements_loaded_at > max_age:
+            await self.refresh_placements(max_age)
+        return self._placements.get(workspace_id) or (self.ring.shard_for(workspace_id), "active")
+
+    async def shard_for(self, workspace_id: str) -> str:
+        """
+        Return the shard currently owning a workspace
+
+        Waits while the workspace is frozen for a move, so callers never write
+        to a shard that is about to stop owning it.
+
+        Raises:
+            WorkspaceMovingError: If the move does not finish within move_wait_timeout
+        """
+        shard, state = await self._placement(workspace_id)
+        deadline = time.monotonic() + self.move_wait_timeout
+        # Every session waiting on a frozen workspace shares one reload per poll interval
+        poll = min(0.5, self.placement_ttl)
+        while state == "moving":
+            if time.monotonic() > deadline:
+                raise WorkspaceMovingError(f"Workspace {workspace_id} is being moved off shard {shard}")
+            await asyncio.sleep(poll)
+            shard, state = await self._placement(workspace_id, max_age=poll)
+        return shard
+
+    async def manager_for(self, workspace_id: str) -> DatabaseManager:
+        """Return the DatabaseManager of the shard owning a workspace"""
+        return self.managers[await self.shard_for(workspace_id)]
+
+    @asynccontextmanager
+    async def session(self, workspace_id: str) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Provide a transactional session on the shard owning a workspace
+
+        Usage:
+            async with router.session(workspace_id) as session:
+                session.add(run)
+                await session.commit()
+        """
+        shard = await self.shard_for(workspace_id)
+        manager = self.managers[shard]
+        SHARD_SESSIONS.labels(shard=shard).inc()
+        SHARD_SESSIONS_ACTIVE.labels(shard=shard).inc()
+        try:
+            async with manager.session() as session:
+                yield session
+        finally:
+            SHARD_SESSIONS_ACTIVE.labels(shard=shard).dec()
+            SHARD_POOL_CHECKED_OUT.labels(shard=shard).set(manager.engine.pool.checkedout())
+
+    def pool_status(self) -> Dict[str, str]:
+        """Return each shard's pool status line (size, checked in/out, overflow)"""
+        return {name: manager.engine.pool.status() for name, manager in self.managers.items()}
+
+    async def close(self) -> None:
+        """Close every shard's connection pool"""
+        for manager in self.managers.values():
+            await manager.close()
+
+
+def _workspace_runs(workspace_id: str):
+    return select(CoffeeRun.run_id).where(CoffeeRun.workspace_id == workspace_id)
+
+
+def _workspace_users(workspace_id: str):
+    runs = _workspace_runs(workspace_id)
+    return union(
+        select(CoffeeRun.initiator_user_id).where(CoffeeRun.workspace_id == workspace_id),
+        select(CoffeeRun.runner_user_id).where(
+            CoffeeRun.workspace_id == workspace_id, CoffeeRun.runner_user_id.is_not(None)
+        ),
+        select(Order.user_id).where(Order.run_id.in_(runs)),
+        select(AuditLog.user_id).where(AuditLog.run_id.in_(runs), AuditLog.user_id.is_not(None)),
+    )
+
+
+async def _copy(
+    source: AsyncConnection, target: AsyncConnection, query, table, overwrite: bool, batch_size: int
+) -> int:
+    """Stream rows from source and upsert them into target in batches"""
+    stmt = pg_insert(table)
+    primary_key = [column.name for column in table.primary_key]
+    if overwrite:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=primary_key,
+            set_={c.name: stmt.excluded[c.name] for c in table.columns if c.name not in primary_key},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=primary_key)
+
+    copied = 0
+    result = await source.stream(query)
+    async for rows in result.partitions(batch_size):
+        await target.execute(stmt, [dict(row._mapping) for row in rows])
+        copied += len(rows)
+    return copied
+
+
+async def _copy_workspace(
+    source: AsyncConnection,
+    target: AsyncConnection,
+    workspace_id: str,
+    since: Optional[datetime],
+    batch_size: int,
+) -> int:
+    """
+    Copy a workspace's rows; with `since`, only audit logs written after it
+
+    Orders are always copied in full: they can be edited in place and have
+    no updated timestamp, so created_at cannot tell which ones changed.
+    """
+    runs = _workspace_runs(workspace_id)
+    orders = select(Order.__table__).where(Order.run_id.in_(runs))
+    audit_logs = select(AuditLog.__table__).where(AuditLog.run_id.in_(runs))
+    if since is not None:
+        audit_logs = audit_logs.where(AuditLog.timestamp >= since)
+
+    users = select(User.__table__).where(User.user_id.in_(_workspace_users(workspace_id)))
+    copied = await _copy(source, target, users, User.__table__, False, batch_size)
+    copied += await _copy(
+        source, target, select(CoffeeRun.__table__).where(CoffeeRun.workspace_id == workspace_id),
+        CoffeeRun.__table__, True, batch_size,
+    )
+    copied += await _copy(source, target, orders, Order.__table__, True, batch_size)
+    copied += await _copy(source, target, audit_logs, AuditLog.__table__, False, batch_size)
+    return copied
+
+
+async def _delete_workspace(conn: AsyncConnection, workspace_id: str) -> None:
+    """Delete a workspace's runs, their audit logs and (by cascade) their orders"""
+    await conn.execute(delete(AuditLog).where(AuditLog.run_id.in_(_workspace_runs(workspace_id))))
+    await conn.execute(delete(CoffeeRun).where(CoffeeRun.workspace_id == workspace_id))
+
+
+async def _set_placement(
+    router: ShardRouter, workspace_id: str, shard: str, state: str, target_shard: Optional[str] = None
+) -> None:
+    stmt = pg_insert(WorkspacePlacement).values(
+        workspace_id=workspace_id, shard=shard, state=state, target_shard=target_shard
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["workspace_id"],
+        set_={"shard": shard, "state": state, "target_shard": target_shard, "updated_at": func.current_timestamp()},
+    )
+    async with router.directory.engine.begin() as conn:
+        await conn.execute(stmt)
+    await router.refresh_placements()
+
+
+async def move_workspace(
+    router: ShardRouter,
+    workspace_id: str,
+    target_shard: str,
+    batch_size: int = 5000,
+    freeze_grace: Optional[float] = None,
+) -> int:
+    """
+    Move a workspace to another shard while it stays online
+
+    1. Bulk-copy the workspace's runs, orders, audit logs (and the users they
+       reference) to the target while traffic continues on the source.
+    2. Freeze: mark the placement 'moving' and wait freeze_grace for every
+       router to notice and for in-flight sessions to finish; routers make
+       new sessions for the workspace wait meanwhile.
+    3. Copy what changed since step 1: every run and order again (edits
+       leave no timestamp to go by) plus newer audit logs, and drop orders
+       deleted at the source.
+    4. Flip the placement to the target, then delete the source copy.
+
+    Users and preferences stay on the source too, since other workspaces on
+    it may reference them.
+
+    Args:
+        router: Router owning the shard pools and placements
+        workspace_id: Workspace to move
+        target_shard: Destination shard name
+        batch_size: Rows per copy batch
+        freeze_grace: Seconds to wait after freezing (default: router.placement_ttl + 1)
+
+    Returns:
+        Number of rows copied
+    """
+    if target_shard not in router.managers:
+        raise ValueError(f"Unknown shard {target_shard!r}")
+    await router.refresh_placements()
+    source_shard = await router.shard_for(workspace_id)
+    if source_shard == target_shard:
+        return 0
+
+    source_db, target_db = router.managers[source_shard], router.managers[target_shard]
+    grace = router.placement_ttl + 1.0 if freeze_grace is None else freeze_grace
+    logger.info(f"Moving workspace {workspace_id} from {source_shard} to {target_shard}")
+
+    frozen = False
+    try:
+        async with source_db.engine.connect() as source, target_db.engine.begin() as target:
+            # Audit logs are insert-only; rows written from here on are picked up in step 3
+            copy_started_at = await source.scalar(select(func.localtimestamp())) - timedelta(minutes=5)
+            copied = await _copy_workspace(source, target, workspace_id, None, batch_size)
+
+        await _set_placement(router, workspace_id, source_shard, "moving", target_shard)
+        frozen = True
+        await asyncio.sleep(grace)
+
+        async with source_db.engine.connect() as source, target_db.engine.begin() as target:
+            copied += await _copy_workspace(source, target, workspace_id, copy_started_at, batch_size)
+            order_ids = select(Order.order_id).where(Order.run_id.in_(_workspace_runs(workspace_id)))
+            deleted = set((await target.scalars(order_ids)).all()) - set((await source.scalars(order_ids)).all())
+            if deleted:
+                await target.execute(delete(Order).where(Order.order_id.in_(deleted)))
+
+        await _set_placement(router, workspace_id, target_shard, "active")
+        frozen = False
+    except BaseException:
+        if frozen:
+            await _set_placement(router, workspace_id, source_shard, "active")
+        # The source still owns the workspace; drop the partial copy so a retry starts clean
+        async with target_db.engine.begin() as target:
+            await _delete_workspace(target, workspace_id)
+        WORKSPACE_MOVES.labels(outcome="failed").inc()
+        raise
+
+    async with source_db.engine.begin() as source:
+        await _delete_workspace(source, workspace_id)
+
+    WORKSPACE_MOVES.labels(outcome="completed").inc()
+    logger.info(f"Moved workspace {workspace_id} to {target_shard} ({copied} rows copied)")
+    return copied
@@ -20,6 +20,3 @@ DROP TABLE IF EXISTS users CASCADE;
 
 -- Drop extension
 DROP EXTENSION IF EXISTS "uuid-ossp";
-```
-
-```sql
\ No newline at end of file
@@ -118,6 +118,3 @@ BEGIN
     DELETE FROM user_preferences WHERE last_ordered_at < CURRENT_TIMESTAMP - INTERVAL '90 days';
 END;
 $$ LANGUAGE plpgsql;
-```
-
-```sql
\ No newline at end of file
@@ -0,0 +1,4 @@
+-- CoffeeBuddy Database Schema V0002 Rollback
+-- Description: Drop the workspace placement directory
+
+DROP TABLE IF EXISTS workspace_placements;
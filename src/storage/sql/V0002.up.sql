@@ -0,0 +1,12 @@
+-- CoffeeBuddy Database Schema V0002
+-- Description: Workspace placement directory for the shard router
+
+-- Explicit workspace -> shard placements; workspaces without a row follow the hash ring.
+-- Only the directory shard's copy is authoritative.
+CREATE TABLE IF NOT EXISTS workspace_placements (
+    workspace_id VARCHAR(64) PRIMARY KEY,
+    shard VARCHAR(64) NOT NULL,
+    state VARCHAR(20) NOT NULL DEFAULT 'active' CHECK (state IN ('active', 'moving')),
+    target_shard VARCHAR(64),
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,12 @@
+-- runner: no-transaction
+-- CoffeeBuddy Database Schema V0003 Rollback
+-- Description: Restore the single-column audit indexes and drop the audit query indexes
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_event_type ON audit_logs(event_type);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_user_id ON audit_logs(user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_run_id ON audit_logs(run_id);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_audit_logs_payload;
+DROP INDEX CONCURRENTLY IF EXISTS idx_audit_logs_run_id_timestamp;
+DROP INDEX CONCURRENTLY IF EXISTS idx_audit_logs_user_id_timestamp;
+DROP INDEX CONCURRENTLY IF EXISTS idx_audit_logs_event_type_timestamp;
@@ -0,0 +1,22 @@
+-- runner: no-transaction
+-- CoffeeBuddy Database Schema V0003
+-- Description: Indexes for the compliance audit query API
+--
+-- Built CONCURRENTLY so audit writes are not blocked on large tables. If a build
+-- fails part-way it leaves an INVALID index that IF NOT EXISTS would skip; drop it
+-- (DROP INDEX CONCURRENTLY) and re-run the upgrade.
+
+-- Filter + keyset order (timestamp DESC, log_id DESC) served from one index per filter
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_event_type_timestamp ON audit_logs (event_type, timestamp DESC, log_id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_user_id_timestamp ON audit_logs (user_id, timestamp DESC, log_id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_run_id_timestamp ON audit_logs (run_id, timestamp DESC, log_id DESC);
+
+-- Payload containment filters (payload @> '{"key": "value"}'); jsonb_path_ops is smaller
+-- and faster than the default jsonb_ops but supports only @>, which is all the API uses
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_payload ON audit_logs USING GIN (payload jsonb_path_ops);
+
+-- The single-column indexes are prefixes of the composites above; dropping them saves
+-- a write per insert. idx_audit_logs_timestamp stays for time-only queries and retention.
+DROP INDEX CONCURRENTLY IF EXISTS idx_audit_logs_event_type;
+DROP INDEX CONCURRENTLY IF EXISTS idx_audit_logs_user_id;
+DROP INDEX CONCURRENTLY IF EXISTS idx_audit_logs_run_id;
@@ -0,0 +1,18 @@
+-- CoffeeBuddy Database Schema V0004 Rollback
+-- Description: Restore the prune functions and drop retention job state
+
+CREATE OR REPLACE FUNCTION prune_old_audit_logs()
+RETURNS void AS $$
+BEGIN
+    DELETE FROM audit_logs WHERE timestamp < CURRENT_TIMESTAMP - INTERVAL '90 days';
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION prune_old_user_preferences()
+RETURNS void AS $$
+BEGIN
+    DELETE FROM user_preferences WHERE last_ordered_at < CURRENT_TIMESTAMP - INTERVAL '90 days';
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TABLE IF EXISTS retention_jobs;
@@ -0,0 +1,19 @@
+-- CoffeeBuddy Database Schema V0004
+-- Description: Retention job state; replace the single-statement prune functions
+
+-- One row per retention job: the cutoff of the current (or last) pass and how far it got.
+-- A row with finished_at NULL is an interrupted pass that the next run resumes.
+CREATE TABLE IF NOT EXISTS retention_jobs (
+    job_name VARCHAR(64) PRIMARY KEY,
+    cutoff TIMESTAMP NOT NULL,
+    position_at TIMESTAMP,
+    position_key UUID,
+    rows_deleted BIGINT NOT NULL DEFAULT 0,
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Superseded by storage.retention, which deletes in throttled batches
+DROP FUNCTION IF EXISTS prune_old_audit_logs();
+DROP FUNCTION IF EXISTS prune_old_user_preferences();
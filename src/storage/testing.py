@@ -0,0 +1,173 @@
+"""
+CoffeeBuddy Database Test Support
+Migrated template database, per-test clones and transactional-rollback sessions
+
+Migrations run once into a template database; every test (or pytest-xdist
+worker) then gets its own copy via CREATE DATABASE ... TEMPLATE, which is a
+file-level copy and takes milliseconds instead of re-running the SQL.
+"""
+import asyncio
+import hashlib
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncGenerator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .database import DatabaseManager, to_async_url
+from .migrations import SQL_DIR, MigrationRunner, discover_migrations
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_LOCK_KEY = 0x436F6666656554  # "CoffeeT"
+
+
+class TemplateDatabase:
+    """A migrated template database that test databases are cloned from"""
+
+    def __init__(
+        self,
+        database_url: str,
+        name: str = "coffeebuddy_template",
+        sql_dir: Path = SQL_DIR,
+        maintenance_db: str = "postgres",
+    ):
+        """
+        Initialize template database helper
+
+        Args:
+            database_url: Any URL on the target server; only host and credentials are used
+            name: Template database name (default: coffeebuddy_template)
+            sql_dir: Migrations to apply to the template
+            maintenance_db: Database to connect to for CREATE/DROP DATABASE (default: postgres)
+        """
+        self.url = make_url(to_async_url(database_url))
+        self.name = name
+        self.sql_dir = sql_dir
+        self.maintenance_db = maintenance_db
+
+    def url_for(self, database: str) -> str:
+        """Return the asyncpg URL of a database on the same server"""
+        return self.url.set(database=database).render_as_string(hide_password=False)
+
+    def fingerprint(self) -> str:
+        """Hash of all migration checksums; the template is rebuilt when it changes"""
+        combined = "".join(f"{m.version}:{m.checksum}" for m in discover_migrations(self.sql_dir))
+        return hashlib.sha256(combined.encode()).hexdigest()
+
+    @asynccontextmanager
+    async def _admin(self) -> AsyncGenerator[object, None]:
+        db = DatabaseManager(self.url_for(self.maintenance_db), pool_size=1)
+        try:
+            async with db.engine.connect() as conn:
+                yield await conn.execution_options(isolation_level="AUTOCOMMIT")
+        finally:
+            await db.close()
+
+    async def ensure(self) -> None:
+        """
+        Create and migrate the template unless an up-to-date one already exists
+
+        Safe to call from several xdist workers at once: an advisory lock on the
+        maintenance database lets one build while the others wait.
+        """
+        fingerprint = self.fingerprint()
+        async with self._admin() as conn:
+            await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": TEMPLATE_LOCK_KEY})
+            try:
+                current = (
+                    await conn.execute(
+                        text("SELECT shobj_description(oid, 'pg_database') FROM pg_database WHERE datname = :name"),
+                        {"name": self.name},
+                    )
+                ).first()
+                if current is not None and current[0] == fingerprint:
+                    return
+                if current is not None:
+                    logger.info(f"Migrations changed; rebuilding template {self.name}")
+                    await conn.execute(text(f'ALTER DATABASE "{self.name}" WITH IS_TEMPLATE false'))
+                    await conn.execute(text(f'DROP DATABASE "{self.name}" WITH (FORCE)'))
+
+                await conn.execute(text(f'CREATE DATABASE "{self.name}"'))
+                template_db = DatabaseManager(self.url_for(self.name), pool_size=1)
+                try:
+                    await MigrationRunner(template_db, sql_dir=self.sql_dir).upgrade()
+                finally:
+                    await template_db.close()
+                # Mark as template and refuse connections so clones never fail on "being accessed by other users"
+                await conn.execute(text(f'ALTER DATABASE "{self.name}" WITH IS_TEMPLATE true ALLOW_CONNECTIONS false'))
+                await conn.execute(text(f"COMMENT ON DATABASE \"{self.name}\" IS '{fingerprint}'"))
+                logger.info(f"Template database {self.name} ready")
+            finally:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": TEMPLATE_LOCK_KEY})
+
+    async def clone(self, name: Optional[str] = None) -> str:
+        """
+        Create a fresh database from the template
+
+        Args:
+            name: Database name (default: random coffeebuddy_test_<hex>)
+
+        Returns:
+            asyncpg URL of the new database
+        """
+        name = name or f"coffeebuddy_test_{uuid.uuid4().hex[:12]}"
+        async with self._admin() as conn:
+            await conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+            await conn.execute(text(f'CREATE DATABASE "{name}" TEMPLATE "{self.name}"'))
+        return self.url_for(name)
+
+    async def drop(self, database_url: str) -> None:
+        """Drop a clone, disconnecting any leftover sessions"""
+        name = make_url(database_url).database
+        async with self._admin() as conn:
+            await conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+
+    def ensure_sync(self) -> None:
+        """Blocking ensure() for synchronous (e.g. session-scoped) pytest fixtures"""
+        asyncio.run(self.ensure())
+
+    def clone_sync(self, name: Optional[str] = None) -> str:
+        """Blocking clone() for synchronous pytest fixtures"""
+        return asyncio.run(self.clone(name))
+
+    def drop_sync(self, database_url: str) -> None:
+        """Blocking drop() for synchronous pytest fixtures"""
+        asyncio.run(self.drop(database_url))
+
+
+@asynccontextmanager
+async def rollback_database_manager(database_url: str) -> AsyncGenerator[DatabaseManager, None]:
+    """
+    Provide a DatabaseManager whose sessions all roll back at the end
+
+    Sessions are bound to one connection inside an outer transaction; a
+    session's commit() only releases a savepoint, so code under test can commit
+    normally while nothing outlives the test. Code that uses db.engine directly
+    bypasses this and needs a cloned database instead.
+
+    Usage:
+        async with rollback_database_manager(url) as db_manager:
+            async with db_manager.session() as session:
+                ...
+                await session.commit()
+    """
+    db_manager = DatabaseManager(database_url, pool_size=1)
+    conn = await db_manager.engine.connect()
+    transaction = await conn.begin()
+    db_manager.session_factory = async_sessionmaker(
+        bind=conn,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
+    )
+    try:
+        yield db_manager
+    finally:
+        await transaction.rollback()
+        await conn.close()
+        await db_manager.close()
@@ -0,0 +1,53 @@
+"""
+Pytest configuration and shared fixtures
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import AsyncGenerator, Generator
+
+import pytest
+import pytest_asyncio
+
+# Add src to Python path for imports
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from storage.database import DatabaseManager  # noqa: E402
+from storage.testing import TemplateDatabase, rollback_database_manager  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def template_database() -> TemplateDatabase:
+    """Migrated template database, built once per run (and shared by xdist workers)."""
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        pytest.skip("DATABASE_URL not set; skipping database tests")
+    template = TemplateDatabase(url)
+    template.ensure_sync()
+    return template
+
+
+@pytest.fixture
+def database_url(template_database: TemplateDatabase) -> Generator[str, None, None]:
+    """Fresh, fully migrated database for a single test; dropped afterwards."""
+    url = template_database.clone_sync()
+    yield url
+    template_database.drop_sync(url)
+
+
+@pytest.fixture(scope="session")
+def worker_database_url(template_database: TemplateDatabase) -> Generator[str, None, None]:
+    """One migrated database per xdist worker, shared by that worker's tests."""
+    worker = os.getenv("PYTEST_XDIST_WORKER", "main")
+    url = template_database.clone_sync(f"coffeebuddy_test_{worker}")
+    yield url
+    template_database.drop_sync(url)
+
+
+@pytest_asyncio.fixture
+async def db_manager(worker_database_url: str) -> AsyncGenerator[DatabaseManager, None]:
+    """DatabaseManager whose sessions are rolled back when the test ends."""
+    async with rollback_database_manager(worker_database_url) as manager:
+        yield manager
@@ -0,0 +1,121 @@
+"""
+Tests for the compliance audit queries and their V0003 indexes.
+
+Filters and keyset pages run against the per-worker database in rollback
+mode; index usage is checked with sequential scans disabled, since the
+planner rightly prefers them on tiny test tables.
+"""
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+
+from storage.audit_queries import (
+    AuditFilter,
+    decode_cursor,
+    parse_payload_filters,
+    query_audit_logs,
+    resolve_range,
+)
+from storage.database import DatabaseManager
+from storage.models import AuditLog, CoffeeRun, User
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+async def seed(db_manager: DatabaseManager) -> str:
+    run_id = uuid4()
+    async with db_manager.session() as session:
+        session.add(User(user_id="U1", display_name="Ada", email="ada@example.com"))
+        session.add(CoffeeRun(run_id=run_id, workspace_id="W1", channel_id="C1", initiator_user_id="U1", status="active"))
+        for i in range(25):
+            session.add(
+                AuditLog(
+                    event_type="order_placed" if i % 2 else "run_completed",
+                    user_id="U1" if i % 5 else None,
+                    run_id=run_id if i < 10 else None,
+                    payload={"index": i, "order": {"size": "large" if i % 3 == 0 else "small"}},
+                    timestamp=NOW - timedelta(hours=i),
+                )
+            )
+        await session.commit()
+    return str(run_id)
+
+
+def test_parse_payload_filters_builds_nested_document() -> None:
+    assert parse_payload_filters(["order.size=large", "index=3", "name=ada"]) == {
+        "order": {"size": "large"},
+        "index": 3,
+        "name": "ada",
+    }
+    with pytest.raises(ValueError):
+        parse_payload_filters(["size"])
+
+
+def test_resolve_range_bounds() -> None:
+    assert resolve_range(None, NOW) == (NOW - timedelta(days=7), NOW)
+    assert resolve_range(None, NOW.replace(tzinfo=timezone(timedelta(hours=2))))[1] == NOW - timedelta(hours=2)
+    with pytest.raises(ValueError, match="90 days"):
+        resolve_range(NOW - timedelta(days=91), NOW)
+    with pytest.raises(ValueError):
+        resolve_range(NOW, NOW - timedelta(days=1))
+
+
+def test_invalid_cursor_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_filters_combine(db_manager: DatabaseManager) -> None:
+    run_id = await seed(db_manager)
+    window = {"start": NOW - timedelta(days=2), "end": NOW + timedelta(seconds=1)}
+
+    async with db_manager.session() as session:
+        placed = await query_audit_logs(session, AuditFilter(event_types=["order_placed"], **window), limit=100)
+        for_run = await query_audit_logs(session, AuditFilter(run_id=run_id, user_id="U1", **window))
+        large = await query_audit_logs(session, AuditFilter(payload={"order": {"size": "large"}}, **window))
+
+    assert len(placed.items) == 12 and placed.next_cursor is None
+    assert sorted(row.payload["index"] for row in for_run.items) == [1, 2, 3, 4, 6, 7, 8, 9]
+    assert sorted(row.payload["index"] for row in large.items) == [0, 3, 6, 9, 12, 15, 18, 21, 24]
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_everything_once(db_manager: DatabaseManager) -> None:
+    await seed(db_manager)
+    filters = AuditFilter(start=NOW - timedelta(days=2), end=NOW + timedelta(seconds=1))
+
+    seen, cursor = [], None
+    async with db_manager.session() as session:
+        while True:
+            page = await query_audit_logs(session, filters, limit=10, cursor=cursor)
+            seen.extend(row.payload["index"] for row in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+    assert seen == list(range(25))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "query, index",
+    [
+        (
+            "SELECT * FROM audit_logs WHERE event_type = 'order_placed' AND timestamp >= now() - interval '7 days' "
+            "ORDER BY timestamp DESC, log_id DESC LIMIT 101",
+            "idx_audit_logs_event_type_timestamp",
+        ),
+        ("""SELECT * FROM audit_logs WHERE payload @> '{"order": {"size": "large"}}'""", "idx_audit_logs_payload"),
+    ],
+)
+async def test_filters_are_index_backed(db_manager: DatabaseManager, query: str, index: str) -> None:
+    await seed(db_manager)
+
+    async with db_manager.session() as session:
+        await session.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = "\n".join(row[0] for row in await session.execute(text(f"EXPLAIN {query}")))
+
+    assert index in plan
@@ -0,0 +1,90 @@
+"""
+Unit tests for the query benchmark suite.
+
+Covers percentile maths, EXPLAIN plan summaries and baseline diffing;
+the data generator and query execution need a live PostgreSQL.
+"""
+import hashlib
+import random
+
+from storage.bench.queries import HOT_QUERIES
+from storage.bench.runner import compare_to_baseline, percentile, summarize_plan
+from storage.bench.synthetic import PRESETS, run_id
+
+EXPLAIN_DOCUMENT = [
+    {
+        "Plan": {
+            "Node Type": "Limit",
+            "Total Cost": 12.5,
+            "Shared Hit Blocks": 7,
+            "Shared Read Blocks": 2,
+            "Plans": [
+                {
+                    "Node Type": "Index Scan",
+                    "Index Name": "idx_audit_logs_timestamp",
+                    "Relation Name": "audit_logs",
+                }
+            ],
+        },
+        "Planning Time": 0.1,
+        "Execution Time": 0.8,
+    }
+]
+
+
+def _report(p95_ms: float, nodes: list[str]) -> dict:
+    return {
+        "scale": {"orders": 1},
+        "queries": {"q": {"p95_ms": p95_ms, "plan": {"nodes": nodes}}},
+    }
+
+
+def test_percentile_nearest_rank() -> None:
+    samples = [float(v) for v in range(1, 101)]
+    random.Random(1).shuffle(samples)
+
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 95) == 95.0
+    assert percentile(samples, 100) == 100.0
+    assert percentile([], 95) == 0.0
+
+
+def test_summarize_plan_flattens_nodes() -> None:
+    summary = summarize_plan(EXPLAIN_DOCUMENT)
+
+    assert summary["execution_ms"] == 0.8
+    assert summary["shared_read_blocks"] == 2
+    assert summary["nodes"] == ["Limit", "Index Scan using idx_audit_logs_timestamp on audit_logs"]
+
+
+def test_baseline_within_tolerance_passes() -> None:
+    baseline = _report(10.0, ["Limit", "Index Scan"])
+    assert compare_to_baseline(_report(12.0, ["Limit", "Index Scan"]), baseline, tolerance=0.25) == []
+
+
+def test_baseline_flags_latency_and_plan_changes() -> None:
+    baseline = _report(10.0, ["Limit", "Index Scan"])
+    regressions = compare_to_baseline(_report(20.0, ["Limit", "Seq Scan"]), baseline, tolerance=0.25)
+
+    assert {r.kind for r in regressions} == {"latency", "plan"}
+
+
+def test_baseline_ignores_sub_millisecond_noise() -> None:
+    baseline = _report(0.2, ["Result"])
+    assert compare_to_baseline(_report(0.6, ["Result"]), baseline) == []
+
+
+def test_query_params_reference_generated_rows() -> None:
+    scale = PRESETS["small"]
+    rng = random.Random(7)
+    for query in HOT_QUERIES:
+        params = query.params(rng, scale)
+        for name in params:
+            assert f":{name}" in query.sql
+
+
+def test_run_id_is_deterministic() -> None:
+    # The loader and the query parameters derive run IDs independently (and in other
+    # processes), so the same sequence number must always give the same UUID
+    assert run_id(1) == run_id(1) != run_id(2)
+    assert run_id(1).hex == hashlib.md5(b"run:1").hexdigest()
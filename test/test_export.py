@@ -0,0 +1,131 @@
+"""
+Tests for streaming exports.
+
+Exports run through the per-worker database in rollback mode; resumption is
+checked by failing a file export part way and continuing it from its
+checkpoint.
+"""
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
+
+import pytest
+
+from storage import export
+from storage.audit_queries import AuditFilter
+from storage.database import DatabaseManager
+from storage.export import (
+    AUDIT_SOURCE,
+    RUNS_SOURCE,
+    audit_clauses,
+    checkpoint_path,
+    export_stream,
+    export_to_file,
+    run_clauses,
+)
+from storage.models import AuditLog, CoffeeRun, Order, User
+
+START = datetime(2024, 1, 1)
+
+
+async def seed(db_manager: DatabaseManager, audit_logs: int = 12) -> None:
+    async with db_manager.session() as session:
+        session.add(User(user_id="U1", display_name="Ada", email="ada@example.com"))
+        for i in range(3):
+            run_id = uuid4()
+            session.add(
+                CoffeeRun(
+                    run_id=run_id,
+                    workspace_id="W1",
+                    channel_id="C1",
+                    initiator_user_id="U1",
+                    status="completed",
+                    created_at=START + timedelta(hours=i),
+                )
+            )
+            session.add(Order(run_id=run_id, user_id="U1", drink_type="latte", size="small"))
+        for i in range(audit_logs):
+            session.add(
+                AuditLog(
+                    event_type="order_placed" if i % 2 else "run_completed",
+                    user_id="U1",
+                    payload={"index": i, "note": "a,b \"quoted\""},
+                    timestamp=START + timedelta(minutes=i),
+                )
+            )
+        await session.commit()
+
+
+async def collect(db_manager: DatabaseManager, **kwargs) -> bytes:
+    async with db_manager.session() as session:
+        return b"".join([chunk async for chunk in export_stream(session, **kwargs)])
+
+
+@pytest.mark.asyncio
+async def test_ndjson_stream_filters_and_resumes(db_manager: DatabaseManager) -> None:
+    await seed(db_manager)
+    clauses = audit_clauses(AuditFilter(event_types=["order_placed"]))
+
+    data = await collect(db_manager, source=AUDIT_SOURCE, fmt="ndjson", clauses=clauses, batch_size=2)
+    lines = [json.loads(line) for line in data.decode().splitlines()]
+    last = lines[2]
+    rest = await collect(
+        db_manager,
+        source=AUDIT_SOURCE,
+        fmt="ndjson",
+        clauses=clauses,
+        after=(datetime.fromisoformat(last["timestamp"]), UUID(last["log_id"])),
+    )
+
+    assert [line["payload"]["index"] for line in lines] == [1, 3, 5, 7, 9, 11]
+    assert [json.loads(line)["payload"]["index"] for line in rest.decode().splitlines()] == [7, 9, 11]
+
+
+@pytest.mark.asyncio
+async def test_gzip_csv_stream_round_trips(db_manager: DatabaseManager) -> None:
+    await seed(db_manager)
+
+    data = await collect(
+        db_manager, source=RUNS_SOURCE, fmt="csv", clauses=run_clauses("W1"), compress=True, batch_size=2
+    )
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(data).decode())))
+    audit = await collect(db_manager, source=AUDIT_SOURCE, fmt="csv", batch_size=5)
+    audit_rows = list(csv.DictReader(io.StringIO(audit.decode())))
+
+    assert [(row["created_at"], row["order_count"]) for row in rows] == [
+        ("2024-01-01T00:00:00", "1"), ("2024-01-01T01:00:00", "1"), ("2024-01-01T02:00:00", "1")
+    ]
+    assert rows[0]["runner_user_id"] == ""
+    assert json.loads(audit_rows[0]["payload"]) == {"index": 0, "note": 'a,b "quoted"'}
+
+
+@pytest.mark.asyncio
+async def test_file_export_resumes_from_checkpoint(db_manager: DatabaseManager, tmp_path, monkeypatch) -> None:
+    await seed(db_manager)
+    output = tmp_path / "audit.ndjson.gz"
+    encode = export.ENCODERS["ndjson"]
+    calls = []
+
+    def failing_encode(fields, rows):
+        calls.append(len(rows))
+        if len(calls) == 3:
+            raise ConnectionError("connection lost")
+        return encode(fields, rows)
+
+    monkeypatch.setitem(export.ENCODERS, "ndjson", failing_encode)
+    with pytest.raises(ConnectionError):
+        await export_to_file(db_manager, AUDIT_SOURCE, output, compress=True, batch_size=4)
+    assert json.loads(checkpoint_path(output).read_text())["rows"] == 8
+    with open(output, "ab") as f:
+        f.write(b"partial batch")
+
+    monkeypatch.setitem(export.ENCODERS, "ndjson", encode)
+    result = await export_to_file(db_manager, AUDIT_SOURCE, output, compress=True, resume=True, batch_size=4)
+
+    lines = gzip.decompress(output.read_bytes()).decode().splitlines()
+    assert result.resumed and result.rows == 12
+    assert [json.loads(line)["payload"]["index"] for line in lines] == list(range(12))
+    assert not checkpoint_path(output).exists()
@@ -0,0 +1,177 @@
+"""
+Tests for the index advisor.
+
+The analysis runs on hand-built snapshots (pg_stat_statements is rarely
+preloaded on test servers); statistics collection runs against the
+per-worker database.
+"""
+from pathlib import Path
+
+import pytest
+
+from storage.database import DatabaseManager
+from storage.index_advisor import (
+    ColumnStat,
+    IndexStat,
+    QueryShape,
+    Snapshot,
+    StatementStat,
+    TableStat,
+    advise,
+    collect_snapshot,
+    find_redundant,
+    parse_statement,
+    render_migration,
+    table_columns,
+)
+from storage.migrations import discover_migrations
+
+COLUMNS = table_columns()
+
+HISTORY_SQL = (
+    "SELECT coffee_runs.run_id, coffee_runs.status FROM coffee_runs "
+    "WHERE coffee_runs.workspace_id = $1::VARCHAR AND coffee_runs.channel_id = $2::VARCHAR "
+    "AND coffee_runs.status = $3::VARCHAR ORDER BY coffee_runs.created_at DESC LIMIT $4::INTEGER"
+)
+
+
+def index(table: str, name: str, *columns: str, scans: int = 100, **kwargs) -> IndexStat:
+    definition = f"CREATE INDEX {name} ON public.{table} USING btree ({', '.join(columns)})"
+    return IndexStat(table, name, columns, definition, kwargs.pop("method", "btree"), scans, 8192, **kwargs)
+
+
+def snapshot(indexes, statements=(), columns=(), rows: int = 50000) -> Snapshot:
+    tables = [TableStat(t, rows, 10, rows * 10, 100, 1000) for t in COLUMNS]
+    return Snapshot(list(indexes), tables, list(columns), list(statements), True)
+
+
+def test_parse_statement_extracts_filters_and_sorts() -> None:
+    join = (
+        "SELECT orders.order_id, users.display_name FROM orders JOIN users ON users.user_id = orders.user_id "
+        "WHERE orders.run_id = $1::UUID AND orders.created_at >= $2 ORDER BY orders.created_at, orders.order_id"
+    )
+    update = "UPDATE coffee_runs SET status=$1::VARCHAR, completed_at=$2 WHERE coffee_runs.run_id = $3::UUID"
+    lookup = "SELECT * FROM audit_logs WHERE event_type IN ($1, $2) AND user_id = ANY($3)"
+
+    assert parse_statement(HISTORY_SQL, COLUMNS) == [
+        QueryShape("coffee_runs", ("workspace_id", "channel_id", "status"), (), ("created_at",))
+    ]
+    assert parse_statement(join, COLUMNS) == [
+        QueryShape("orders", ("run_id",), ("created_at",), ("created_at", "order_id"))
+    ]
+    assert parse_statement(update, COLUMNS) == [QueryShape("coffee_runs", ("run_id",), (), ())]
+    assert parse_statement(lookup, COLUMNS) == [QueryShape("audit_logs", ("event_type", "user_id"), (), ())]
+    assert parse_statement("SELECT 1", COLUMNS) == []
+
+
+def test_redundant_indexes_keep_the_widest_and_constraints() -> None:
+    indexes = [
+        index("coffee_runs", "idx_a", "workspace_id"),
+        index("coffee_runs", "idx_b", "workspace_id", "channel_id"),
+        index("coffee_runs", "idx_c", "workspace_id", "channel_id"),
+        index("users", "users_email_key", "email", unique=True, constraint=True),
+        index("users", "idx_users_email", "email"),
+        index("audit_logs", "idx_gin", "payload", method="gin"),
+        index("audit_logs", "idx_partial", "payload", predicate="(user_id IS NULL)"),
+    ]
+
+    dropped = {r.index_name: r.evidence[0] for r in find_redundant(snapshot(indexes))}
+
+    assert dropped == {
+        "idx_a": "leading columns of idx_b (workspace_id, channel_id)",
+        "idx_c": "leading columns of idx_b (workspace_id, channel_id)",
+        "idx_users_email": "leading columns of users_email_key (email)",
+    }
+
+
+def test_advise_drops_unused_but_keeps_foreign_key_indexes() -> None:
+    indexes = [
+        index("coffee_runs", "idx_coffee_runs_status", "status", scans=0),
+        index("orders", "idx_orders_user_id", "user_id", scans=0),
+        index("orders", "orders_pkey", "order_id", scans=0, unique=True, constraint=True),
+    ]
+
+    recommendations = advise(snapshot(indexes), COLUMNS)
+
+    assert [(r.action, r.index_name, r.reason) for r in recommendations] == [
+        ("drop", "idx_coffee_runs_status", "unused")
+    ]
+    assert recommendations[0].down_sql == (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_coffee_runs_status ON public.coffee_runs USING btree (status);"
+    )
+
+
+def test_advise_keeps_a_used_prefix_of_an_unused_index() -> None:
+    indexes = [
+        index("coffee_runs", "idx_a", "workspace_id", scans=100000),
+        index("coffee_runs", "idx_ab", "workspace_id", "created_at", scans=0),
+    ]
+
+    recommendations = advise(snapshot(indexes), COLUMNS, fk_columns={})
+
+    assert [(r.action, r.index_name, r.reason) for r in recommendations] == [("drop", "idx_ab", "unused")]
+
+
+def test_advise_recommends_composite_and_partial_indexes() -> None:
+    indexes = [
+        index("coffee_runs", "idx_coffee_runs_workspace_id", "workspace_id"),
+        index("orders", "idx_orders_run_id", "run_id"),
+    ]
+    statements = [
+        StatementStat(HISTORY_SQL, 5000, 9000.0, 1.8),
+        StatementStat("SELECT * FROM orders WHERE orders.run_id = $1", 9000, 4000.0, 0.4),
+        StatementStat(
+            "SELECT * FROM audit_logs WHERE audit_logs.user_id = $1 AND audit_logs.timestamp >= $2 "
+            "ORDER BY audit_logs.timestamp DESC",
+            100,
+            500.0,
+            5.0,
+        ),
+    ]
+    status = ColumnStat("coffee_runs", "status", 3, ("completed", "cancelled", "active"), (0.9, 0.08, 0.02))
+
+    recommendations = advise(snapshot(indexes, statements, [status]), COLUMNS)
+
+    assert [r.up_sql for r in recommendations] == [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_coffee_runs_workspace_id_channel_id_created_at_active "
+        "ON coffee_runs (workspace_id, channel_id, created_at) WHERE status = 'active';",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_user_id_timestamp ON audit_logs (user_id, timestamp);",
+    ]
+    assert recommendations[0].reason == "partial" and "5000 calls" in recommendations[0].evidence[0]
+
+
+def test_small_tables_get_no_new_indexes() -> None:
+    statements = [StatementStat("SELECT * FROM users WHERE users.email = $1", 10, 1.0, 0.1)]
+
+    assert advise(snapshot([], statements, rows=100), COLUMNS) == []
+
+
+def test_render_migration_is_a_valid_no_transaction_migration(tmp_path: Path) -> None:
+    recommendations = advise(snapshot([index("coffee_runs", "idx_coffee_runs_status", "status", scans=0)]), COLUMNS)
+
+    up_sql, down_sql = render_migration(recommendations, "V0009")
+    (tmp_path / "V0009.up.sql").write_text(up_sql)
+    (tmp_path / "V0009.down.sql").write_text(down_sql)
+    migration = discover_migrations(tmp_path)[0]
+
+    assert migration.version == "V0009" and not migration.transactional
+    assert migration.description == "Index advisor recommendations (generated; review before applying)"
+    assert "DROP INDEX CONCURRENTLY IF EXISTS idx_coffee_runs_status;" in up_sql
+    assert "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_coffee_runs_status" in down_sql
+
+
+@pytest.mark.asyncio
+async def test_collect_snapshot_reads_schema_statistics(worker_database_url: str) -> None:
+    db = DatabaseManager(worker_database_url, pool_size=1)
+    try:
+        async with db.engine.connect() as conn:
+            result = await collect_snapshot(conn, sorted(COLUMNS))
+    finally:
+        await db.close()
+
+    indexes = {i.name: i for i in result.indexes}
+    assert indexes["idx_audit_logs_event_type_timestamp"].columns == ("event_type", "timestamp", "log_id")
+    assert indexes["idx_audit_logs_payload"].method == "gin"
+    assert indexes["audit_logs_pkey"].unique and indexes["audit_logs_pkey"].constraint
+    assert {t.table for t in result.tables} == set(COLUMNS)
+    assert result.statements_available or result.statements == []
@@ -0,0 +1,66 @@
+"""
+Unit tests for the COPY-based synthetic data loader.
+
+Covers chunk planning and the row generators; the COPY path itself
+needs a live PostgreSQL.
+"""
+from datetime import datetime
+
+import pytest
+
+from storage.bench.loader import plan_chunks
+from storage.bench.synthetic import (
+    PRESETS,
+    TABLES,
+    BenchmarkScale,
+    orders_rows,
+    run_id,
+    runs_rows,
+    workspace_id,
+    workspace_of_run,
+)
+
+NOW = datetime(2025, 1, 20, 12, 0, 0)
+SCALE = BenchmarkScale(workspaces=4, users_per_workspace=10, orders=600, audit_logs=900, chunk_size=250)
+
+
+def test_plan_chunks_cover_every_row_once() -> None:
+    chunks = plan_chunks(SCALE)
+
+    for spec in TABLES:
+        ranges = sorted((lo, hi) for table, lo, hi in chunks if table == spec.name)
+        assert ranges[0][0] == 0
+        assert ranges[-1][1] == spec.count(SCALE)
+        assert all(prev[1] == cur[0] for prev, cur in zip(ranges, ranges[1:]))
+        assert all(hi - lo <= SCALE.chunk_size for lo, hi in ranges)
+
+
+def test_plan_chunks_start_with_largest_table() -> None:
+    assert plan_chunks(SCALE)[0][0] == "audit_logs"
+
+
+@pytest.mark.parametrize("spec", TABLES, ids=lambda spec: spec.name)
+def test_rows_match_copy_columns_and_are_deterministic(spec) -> None:
+    first = list(spec.rows(SCALE, 0, 50, NOW))
+    second = list(spec.rows(SCALE, 0, 50, NOW))
+
+    assert first == second
+    assert all(len(row) == len(spec.columns) for row in first)
+
+
+def test_orders_reference_users_of_the_run_workspace() -> None:
+    runs = {row[0]: row[1] for row in runs_rows(SCALE, 0, SCALE.runs, NOW)}
+
+    for order in orders_rows(SCALE, 0, SCALE.orders, NOW):
+        assert order[1] in runs
+        assert order[2].startswith("BU" + runs[order[1]][2:])
+
+
+def test_workspace_skew_favours_low_workspace_numbers() -> None:
+    scale = PRESETS["medium"]
+    counts = [0] * scale.workspaces
+    for run in range(20_000):
+        counts[workspace_of_run(scale, run)] += 1
+
+    assert counts[0] > 3 * counts[-1]
+    assert next(runs_rows(scale, 0, 1, NOW))[:2] == (run_id(0), workspace_id(workspace_of_run(scale, 0)))
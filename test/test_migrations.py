@@ -0,0 +1,189 @@
+"""
+Tests for the versioned migration runner.
+
+Statement splitting and discovery are pure; the runner tests need
+DATABASE_URL and run against a fresh clone of the template database.
+"""
+import asyncio
+import uuid
+from pathlib import Path
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from storage.database import DatabaseManager
+from storage.migrations import MigrationError, MigrationRunner, discover_migrations, split_statements
+
+FUNCTION_SQL = """
+-- Description: function with a body
+CREATE OR REPLACE FUNCTION f() RETURNS void AS $$
+BEGIN
+    DELETE FROM t WHERE note = 'a;b';
+END;
+$$ LANGUAGE plpgsql;
+/* block; comment */
+INSERT INTO t (note) VALUES ('it''s; fine');
+-- trailing comment;
+"""
+
+
+def test_split_statements_respects_quotes_and_bodies() -> None:
+    statements = split_statements(FUNCTION_SQL)
+
+    assert len(statements) == 2
+    assert statements[0].endswith("$$ LANGUAGE plpgsql")
+    assert "'it''s; fine'" in statements[1]
+
+
+def test_split_statements_handles_tagged_dollar_quotes() -> None:
+    sql = "SELECT $body$ ; $body$; SELECT 2"
+    assert split_statements(sql) == ["SELECT $body$ ; $body$", "SELECT 2"]
+
+
+def test_discover_migrations_orders_by_number(tmp_path: Path) -> None:
+    (tmp_path / "V0010.up.sql").write_text("-- Description: ten\nSELECT 10;")
+    (tmp_path / "V0002.up.sql").write_text("-- runner: no-transaction\nSELECT 2;")
+    (tmp_path / "V0002.down.sql").write_text("SELECT -2;")
+    (tmp_path / "README.md").write_text("not a migration")
+
+    migrations = discover_migrations(tmp_path)
+
+    assert [m.version for m in migrations] == ["V0002", "V0010"]
+    assert migrations[0].transactional is False
+    assert migrations[0].down_sql == "SELECT -2;"
+    assert migrations[1].transactional is True
+    assert migrations[1].description == "ten"
+    assert migrations[1].down_sql is None
+
+
+def test_repository_migrations_are_discoverable() -> None:
+    migrations = discover_migrations()
+    assert migrations[0].version == "V0001"
+    assert all(m.down_sql is not None for m in migrations)
+
+
+@pytest_asyncio.fixture
+async def clone_manager(database_url: str) -> AsyncGenerator[DatabaseManager, None]:
+    # The runner drives transactions itself, so it needs a real clone rather than rollback mode
+    manager = DatabaseManager(database_url, pool_size=5)
+    yield manager
+    await manager.close()
+
+
+@pytest.fixture
+def suffix() -> str:
+    return uuid.uuid4().hex[:8]
+
+
+@pytest.fixture
+def migrations_dir(tmp_path: Path, suffix: str) -> Path:
+    (tmp_path / "V0001.up.sql").write_text(
+        f"-- Description: probe table\nCREATE TABLE probe_{suffix} (id INT PRIMARY KEY, note TEXT);\n"
+        f"INSERT INTO probe_{suffix} VALUES (1, 'seed');"
+    )
+    (tmp_path / "V0001.down.sql").write_text(f"DROP TABLE probe_{suffix};")
+    (tmp_path / "V0002.up.sql").write_text(
+        f"-- runner: no-transaction\n"
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_probe_{suffix}_note ON probe_{suffix} (note);"
+    )
+    (tmp_path / "V0002.down.sql").write_text(f"DROP INDEX IF EXISTS idx_probe_{suffix}_note;")
+    return tmp_path
+
+
+@pytest.fixture
+def runner(clone_manager: DatabaseManager, migrations_dir: Path, suffix: str) -> MigrationRunner:
+    return MigrationRunner(clone_manager, sql_dir=migrations_dir, table_name=f"schema_migrations_{suffix}")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_replicas_apply_each_migration_once(
+    runner: MigrationRunner, clone_manager: DatabaseManager, migrations_dir: Path
+) -> None:
+    replicas = [
+        MigrationRunner(clone_manager, sql_dir=migrations_dir, table_name=runner.table_name) for _ in range(3)
+    ]
+
+    results = await asyncio.gather(*(replica.upgrade() for replica in replicas))
+
+    assert sorted(v for applied in results for v in applied) == ["V0001", "V0002"]
+    assert await runner.upgrade() == []
+    assert [record is not None for _, record in await runner.status()] == [True, True]
+
+
+@pytest.mark.asyncio
+async def test_checksum_mismatch_is_rejected(runner: MigrationRunner, migrations_dir: Path) -> None:
+    await runner.upgrade(target="V0001")
+    path = migrations_dir / "V0001.up.sql"
+    path.write_text(path.read_text() + "\n-- edited")
+
+    with pytest.raises(MigrationError, match="Checksum mismatch"):
+        await runner.upgrade()
+
+
+@pytest.mark.asyncio
+async def test_failed_migration_rolls_back(runner: MigrationRunner, migrations_dir: Path, suffix: str) -> None:
+    await runner.upgrade()
+    (migrations_dir / "V0003.up.sql").write_text(
+        f"INSERT INTO probe_{suffix} VALUES (2, 'ok');\nINSERT INTO probe_{suffix} VALUES (1, 'duplicate');"
+    )
+
+    with pytest.raises(MigrationError, match="V0003"):
+        await runner.upgrade()
+
+    status = {migration.version: record for migration, record in await runner.status()}
+    assert status["V0003"] is None
+
+
+@pytest.mark.asyncio
+async def test_downgrade_rolls_back_newest_first(runner: MigrationRunner) -> None:
+    await runner.upgrade()
+
+    assert await runner.downgrade(target="V0001") == ["V0002"]
+    assert await runner.downgrade() == ["V0001"]
+
+
+@pytest.mark.asyncio
+async def test_downgrade_runs_no_transaction_down_scripts_in_autocommit(
+    runner: MigrationRunner, clone_manager: DatabaseManager, migrations_dir: Path, suffix: str
+) -> None:
+    (migrations_dir / "V0002.down.sql").write_text(
+        f"-- runner: no-transaction\n"
+        f"DROP INDEX CONCURRENTLY IF EXISTS idx_probe_{suffix}_note;\n"
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_probe_{suffix}_id_note ON probe_{suffix} (id, note);"
+    )
+    await runner.upgrade()
+
+    assert await runner.downgrade(target="V0001") == ["V0002"]
+
+    async with clone_manager.session() as session:
+        result = await session.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :table"), {"table": f"probe_{suffix}"}
+        )
+        indexes = set(result.scalars())
+    assert f"idx_probe_{suffix}_note" not in indexes
+    assert f"idx_probe_{suffix}_id_note" in indexes
+    assert [record is not None for _, record in await runner.status()] == [True, False]
+    assert await runner.downgrade() == ["V0001"]
+
+
+@pytest.mark.asyncio
+async def test_audit_index_migration_rolls_back_and_reapplies(database_url: str) -> None:
+    # V0003 swaps indexes CONCURRENTLY in both directions, so both files must run outside a transaction
+    v0003 = next(m for m in discover_migrations() if m.version == "V0003")
+    assert not v0003.transactional and not v0003.down_transactional
+
+    manager = DatabaseManager(database_url, pool_size=2)
+    try:
+        runner = MigrationRunner(manager)
+        assert await runner.downgrade(target="V0002") == ["V0004", "V0003"]
+        async with manager.session() as session:
+            result = await session.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = 'audit_logs'"))
+            indexes = set(result.scalars())
+        assert "idx_audit_logs_event_type" in indexes
+        assert "idx_audit_logs_payload" not in indexes
+
+        assert await runner.upgrade() == ["V0003", "V0004"]
+    finally:
+        await manager.close()
@@ -0,0 +1,124 @@
+"""
+Tests for the micro-batching order writer.
+
+Run in rollback mode against the per-worker database: concurrent writes
+must share one transaction, counters must aggregate per preference, and a
+bad item must fail alone.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from storage.database import DatabaseManager
+from storage.models import AuditLog, CoffeeRun, Order, User, UserPreference
+from storage.order_writer import OrderWrite, OrderWriter
+
+
+async def seed_run(db_manager: DatabaseManager) -> str:
+    run_id = uuid4()
+    async with db_manager.session() as session:
+        session.add(User(user_id="U1", display_name="Ada", email="ada@example.com"))
+        session.add(
+            CoffeeRun(run_id=run_id, workspace_id="W1", channel_id="C1", initiator_user_id="U1", status="active")
+        )
+        session.add(UserPreference(user_id="U1", drink_type="latte", size="large", order_count=3))
+        await session.commit()
+    return str(run_id)
+
+
+def counting_sessions(db_manager: DatabaseManager) -> tuple:
+    transactions = []
+
+    @asynccontextmanager
+    async def session_factory():
+        transactions.append(1)
+        async with db_manager.session() as session:
+            yield session
+
+    return session_factory, transactions
+
+
+def order(run_id: str, user_id: str = "U1", drink_type: str = "latte", order_id: str | None = None) -> OrderWrite:
+    return OrderWrite(
+        order_id=order_id or str(uuid4()),
+        run_id=run_id,
+        user_id=user_id,
+        drink_type=drink_type,
+        size="large",
+        display_name=user_id,
+        audit_payload={"drink_type": drink_type},
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_share_one_transaction(db_manager: DatabaseManager) -> None:
+    run_id = await seed_run(db_manager)
+    session_factory, transactions = counting_sessions(db_manager)
+    writer = OrderWriter(session_factory, max_delay=0.05)
+    items = [order(run_id), order(run_id), order(run_id, "U2"), order(run_id, drink_type="mocha")]
+
+    results = await asyncio.gather(*(writer.write(item) for item in items))
+
+    assert results == [True, True, True, True]
+    assert len(transactions) == 1
+    async with db_manager.session() as session:
+        orders = (await session.execute(select(Order))).scalars().all()
+        preferences = {
+            (p.user_id, p.drink_type): p.order_count
+            for p in (await session.execute(select(UserPreference))).scalars()
+        }
+        audits = (await session.execute(select(AuditLog))).scalars().all()
+    assert len(orders) == 4
+    assert preferences == {("U1", "latte"): 5, ("U2", "latte"): 1, ("U1", "mocha"): 1}
+    assert len(audits) == 4
+
+
+@pytest.mark.asyncio
+async def test_duplicate_order_ids_are_created_once(db_manager: DatabaseManager) -> None:
+    run_id = await seed_run(db_manager)
+    writer = OrderWriter(db_manager.session, max_delay=0.05)
+    order_id = str(uuid4())
+
+    results = await asyncio.gather(
+        writer.write(order(run_id, order_id=order_id)), writer.write(order(run_id, order_id=order_id))
+    )
+    again = await writer.write(order(run_id, order_id=order_id))
+
+    assert (results, again) == ([True, False], False)
+    async with db_manager.session() as session:
+        preference = (await session.execute(select(UserPreference))).scalar_one()
+        audits = (await session.execute(select(AuditLog))).scalars().all()
+    assert preference.order_count == 4
+    assert len(audits) == 1
+
+
+@pytest.mark.asyncio
+async def test_failing_item_does_not_fail_the_batch(db_manager: DatabaseManager) -> None:
+    run_id = await seed_run(db_manager)
+    writer = OrderWriter(db_manager.session, max_delay=0.05)
+    good, bad = order(run_id), order(str(uuid4()))
+
+    results = await asyncio.gather(writer.write(good), writer.write(bad), return_exceptions=True)
+
+    assert results[0] is True
+    assert isinstance(results[1], IntegrityError)
+    async with db_manager.session() as session:
+        order_ids = (await session.execute(select(Order.order_id))).scalars().all()
+    assert order_ids == [UUID(good.order_id)]
+
+
+@pytest.mark.asyncio
+async def test_max_batch_flushes_without_waiting(db_manager: DatabaseManager) -> None:
+    run_id = await seed_run(db_manager)
+    session_factory, transactions = counting_sessions(db_manager)
+    writer = OrderWriter(session_factory, max_batch=2, max_delay=60)
+
+    results = await asyncio.wait_for(asyncio.gather(writer.write(order(run_id)), writer.write(order(run_id))), 5)
+
+    assert results == [True, True]
+    assert len(transactions) == 1
+    await writer.close()
@@ -0,0 +1,225 @@
+"""
+Tests for the projection-based read models and the hydration benchmark.
+
+Read models must carry the same data as the entities, in a fixed number of
+queries, without registering anything in the session. Entities never lazy
+load: relationships not named in the query raise.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, List
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import joinedload
+
+from storage.bench.hydration import LOADERS, measure
+from storage.database import DatabaseManager
+from storage.models import AuditLog, CoffeeRun, Order, User
+from storage.read_models import OrderRow, RunRow, get_run_details, run_history, user_names, user_orders
+
+
+@contextmanager
+def count_queries(db_manager: DatabaseManager) -> Iterator[List[str]]:
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # Rollback mode wraps sessions in savepoints; only count real queries
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(db_manager.engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(db_manager.engine.sync_engine, "before_cursor_execute", record)
+
+
+async def seed(db_manager: DatabaseManager) -> list:
+    start = datetime(2024, 1, 1)
+    run_ids = [uuid4(), uuid4()]
+    async with db_manager.session() as session:
+        session.add_all(
+            [
+                User(user_id="U1", display_name="Ada", email="ada@example.com"),
+                User(user_id="U2", display_name="Grace", email="grace@example.com"),
+            ]
+        )
+        session.add(
+            CoffeeRun(
+                run_id=run_ids[0],
+                workspace_id="W1",
+                channel_id="C1",
+                initiator_user_id="U1",
+                runner_user_id="U2",
+                status="completed",
+                created_at=start,
+            )
+        )
+        session.add(
+            CoffeeRun(
+                run_id=run_ids[1],
+                workspace_id="W1",
+                channel_id="C1",
+                initiator_user_id="U2",
+                status="active",
+                created_at=start + timedelta(hours=1),
+            )
+        )
+        for run_id, user_id, drink_type, minutes in (
+            (run_ids[0], "U1", "latte", 0),
+            (run_ids[0], "U2", "mocha", 1),
+            (run_ids[1], "U1", "espresso", 60),
+        ):
+            session.add(
+                Order(
+                    run_id=run_id,
+                    user_id=user_id,
+                    drink_type=drink_type,
+                    size="small",
+                    created_at=start + timedelta(minutes=minutes),
+                )
+            )
+        session.add(AuditLog(event_type="order_placed", user_id="U1", run_id=run_ids[0], payload={"a": 1}))
+        await session.commit()
+    return run_ids
+
+
+@pytest.mark.asyncio
+async def test_run_details_projection(db_manager: DatabaseManager) -> None:
+    run_ids = await seed(db_manager)
+
+    async with db_manager.session() as session:
+        details = await get_run_details(session, run_ids[0])
+        assert len(session.identity_map) == 0
+        missing = await get_run_details(session, uuid4())
+
+    assert missing is None
+    assert isinstance(details.run, RunRow)
+    assert (details.run.initiator_name, details.run.runner_name, details.run.status) == ("Ada", "Grace", "completed")
+    assert [(o.display_name, o.drink_type) for o in details.orders] == [("Ada", "latte"), ("Grace", "mocha")]
+    assert details.orders[0]._asdict()["size"] == "small"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("orders_per_run", [1, 20])
+async def test_run_details_query_count_is_constant(db_manager: DatabaseManager, orders_per_run: int) -> None:
+    run_id = uuid4()
+    async with db_manager.session() as session:
+        session.add_all(
+            User(user_id=f"U{i}", display_name=f"User {i}", email=f"u{i}@example.com") for i in range(20)
+        )
+        session.add(
+            CoffeeRun(run_id=run_id, workspace_id="W1", channel_id="C1", initiator_user_id="U0", status="active")
+        )
+        session.add_all(
+            Order(run_id=run_id, user_id=f"U{i}", drink_type="latte", size="small") for i in range(orders_per_run)
+        )
+        await session.commit()
+
+    async with db_manager.session() as session:
+        with count_queries(db_manager) as statements:
+            details = await get_run_details(session, run_id)
+
+    assert len(statements) == 2
+    assert len(details.orders) == orders_per_run
+
+
+@pytest.mark.asyncio
+async def test_run_details_without_names(db_manager: DatabaseManager) -> None:
+    run_ids = await seed(db_manager)
+
+    async with db_manager.session() as session:
+        details = await get_run_details(session, run_ids[0], with_names=False)
+
+    assert (details.run.initiator_user_id, details.run.initiator_name, details.run.runner_name) == ("U1", None, None)
+    assert [(o.user_id, o.display_name, o.drink_type) for o in details.orders] == [
+        ("U1", None, "latte"),
+        ("U2", None, "mocha"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_history_and_user_orders(db_manager: DatabaseManager) -> None:
+    run_ids = await seed(db_manager)
+
+    async with db_manager.session() as session:
+        history = await run_history(session, "W1")
+        older = await run_history(session, "W1", before=(history[0].created_at, history[0].run_id))
+        orders = await user_orders(session, "U1")
+
+    assert [(row.run_id, row.order_count) for row in history] == [(run_ids[1], 1), (run_ids[0], 2)]
+    assert [row.run_id for row in older] == [run_ids[0]]
+    assert all(isinstance(order, OrderRow) for order in orders)
+    assert [order.drink_type for order in orders] == ["espresso", "latte"]
+
+
+@pytest.mark.asyncio
+async def test_history_pages_through_runs_created_at_the_same_time(db_manager: DatabaseManager) -> None:
+    created_at = datetime(2024, 2, 1, 9, 0)
+    async with db_manager.session() as session:
+        session.add(User(user_id="U1", display_name="Ada", email="ada@example.com"))
+        session.add_all(
+            CoffeeRun(
+                workspace_id="W2", channel_id="C1", initiator_user_id="U1", status="active", created_at=created_at
+            )
+            for _ in range(5)
+        )
+        await session.commit()
+
+    pages = []
+    before = None
+    async with db_manager.session() as session:
+        while page := await run_history(session, "W2", before=before, limit=2):
+            pages.append([row.run_id for row in page])
+            before = (page[-1].created_at, page[-1].run_id)
+
+    run_ids = sum(pages, [])
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert run_ids == sorted(set(run_ids), reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_user_names_pages_by_user_id(db_manager: DatabaseManager) -> None:
+    await seed(db_manager)
+
+    async with db_manager.session() as session:
+        first = await user_names(session, limit=1)
+        second = await user_names(session, after=first[-1].user_id, limit=1)
+        rest = await user_names(session, after=second[-1].user_id)
+
+    assert [(row.user_id, row.display_name) for row in first + second] == [("U1", "Ada"), ("U2", "Grace")]
+    assert isinstance(first[0].updated_at, datetime)
+    assert rest == []
+
+
+@pytest.mark.asyncio
+async def test_unloaded_relationships_raise(db_manager: DatabaseManager) -> None:
+    run_ids = await seed(db_manager)
+
+    async with db_manager.session() as session:
+        run = await session.get(CoffeeRun, run_ids[0])
+        with pytest.raises(InvalidRequestError):
+            run.orders
+        with pytest.raises(InvalidRequestError):
+            run.runner
+        orders = (await session.scalars(select(Order).options(joinedload(Order.user)).order_by(Order.created_at))).all()
+        with pytest.raises(InvalidRequestError):
+            orders[0].run
+
+    assert [order.user.display_name for order in orders] == ["Ada", "Grace", "Ada"]
+
+
+@pytest.mark.asyncio
+async def test_hydration_benchmark_reports_every_loader(db_manager: DatabaseManager) -> None:
+    await seed(db_manager)
+
+    results = [await measure(db_manager, name, loader, rows=10, repeat=1) for name, loader in LOADERS.items()]
+
+    assert [result.name for result in results] == list(LOADERS)
+    assert {result.name: result.rows for result in results} == {
+        "orders_orm": 3, "orders_read_model": 3, "audit_orm": 1, "audit_read_model": 1
+    }
+    assert all(result.cpu_ms_per_10k >= 0 and result.peak_kib_per_10k > 0 for result in results)
@@ -0,0 +1,83 @@
+"""
+Tests for idempotent event replay.
+
+Run in rollback mode against the per-worker database: a batch must fold to
+the last state per key, re-applying it must change nothing, and events for
+unknown runs must be counted rather than fail the batch.
+"""
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from storage.database import DatabaseManager
+from storage.models import CoffeeRun, Order, User
+from storage.replay import ApplyResult, ReplayEvent, apply_events
+
+START = datetime(2024, 1, 1, 9)
+
+
+def events(*payloads: dict) -> list:
+    return [ReplayEvent(payload, START + timedelta(seconds=i)) for i, payload in enumerate(payloads)]
+
+
+async def state(db_manager: DatabaseManager) -> tuple:
+    async with db_manager.session() as session:
+        runs = await session.execute(
+            select(CoffeeRun.run_id, CoffeeRun.runner_user_id, CoffeeRun.status, CoffeeRun.completed_at)
+        )
+        orders = await session.execute(select(Order.order_id, Order.size).order_by(Order.order_id))
+    return sorted(runs.all()), orders.all()
+
+
+@pytest.mark.asyncio
+async def test_replay_folds_batch_and_is_idempotent(db_manager: DatabaseManager) -> None:
+    run_id, kept, cancelled = str(uuid4()), str(uuid4()), str(uuid4())
+    context = {"run_id": run_id, "workspace_id": "W1", "channel_id": "C1", "initiator_user_id": "U1"}
+    order = {"run_id": run_id, "user_id": "U2", "user_name": "Grace", "size": "small"}
+    batch = events(
+        {"event_type": "order_placed", "order_id": kept, "drink_type": "latte", **order, **context},
+        {"event_type": "order_placed", "order_id": cancelled, "drink_type": "mocha", **order},
+        {"event_type": "order_updated", "order_id": kept, "drink_type": "latte", **order, "size": "large"},
+        {"event_type": "order_cancelled", "order_id": cancelled, "run_id": run_id},
+        {"event_type": "runner_assigned", "run_id": run_id, "runner_user_id": "U3"},
+        {"event_type": "runner_assigned", "run_id": run_id, "runner_user_id": "U2"},
+        {"event_type": "run_completed", "run_id": run_id, "user_id": "U1"},
+        {"event_type": "run_cancelled", "run_id": run_id},
+    )
+
+    for _ in range(2):
+        async with db_manager.session() as session:
+            result = await apply_events(session, batch)
+            await session.commit()
+        assert result == ApplyResult(applied=8)
+        runs, orders = await state(db_manager)
+        assert [(str(r.run_id), r.runner_user_id, r.status, r.completed_at) for r in runs] == [
+            (run_id, "U2", "completed", START + timedelta(seconds=6))
+        ]
+        assert [(str(o.order_id), o.size) for o in orders] == [(kept, "large")]
+
+    async with db_manager.session() as session:
+        names = dict((await session.execute(select(User.user_id, User.display_name))).all())
+    assert names == {"U1": "U1", "U2": "Grace", "U3": "U3"}
+
+
+@pytest.mark.asyncio
+async def test_replay_counts_orphaned_and_malformed_events(db_manager: DatabaseManager) -> None:
+    unknown = str(uuid4())
+    batch = events(
+        {"event_type": "order_placed", "order_id": str(uuid4()), "run_id": unknown, "user_id": "U1",
+         "drink_type": "latte", "size": "small"},
+        {"event_type": "run_completed", "run_id": unknown},
+        {"event_type": "order_placed", "order_id": "not-a-uuid", "run_id": unknown},
+        {"event_type": "slash_command", "run_id": unknown},
+        {"event_type": "order_cancelled", "order_id": str(uuid4())},
+    )
+
+    async with db_manager.session() as session:
+        result = await apply_events(session, batch)
+        await session.commit()
+
+    assert result == ApplyResult(applied=1, orphaned=2, skipped=2)
+    assert await state(db_manager) == ([], [])
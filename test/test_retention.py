@@ -0,0 +1,137 @@
+"""
+Tests for the batched retention jobs.
+
+The runner holds an advisory lock and drives its own transactions on one
+connection, so these tests use a fresh clone rather than rollback mode.
+"""
+from datetime import datetime, timedelta
+from typing import AsyncGenerator, List
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select, text
+
+from storage import retention
+from storage.database import DatabaseManager
+from storage.models import AuditLog, RetentionJob, User, UserPreference
+from storage.retention import ADVISORY_LOCK_CLASS, POLICIES, RetentionRunner
+
+
+@pytest_asyncio.fixture
+async def clone_manager(database_url: str) -> AsyncGenerator[DatabaseManager, None]:
+    manager = DatabaseManager(database_url, pool_size=2)
+    yield manager
+    await manager.close()
+
+
+async def seed(db: DatabaseManager, old: int = 7, recent: int = 3) -> None:
+    now = datetime.now()
+    async with db.session() as session:
+        session.add(User(user_id="U1", display_name="Ada", email="ada@example.com"))
+        for i in range(old + recent):
+            age = timedelta(days=100, minutes=i) if i < old else timedelta(days=10)
+            session.add(AuditLog(event_type="order_placed", user_id="U1", payload={"i": i}, timestamp=now - age))
+            session.add(
+                UserPreference(user_id="U1", drink_type=f"drink-{i}", size="small", last_ordered_at=now - age)
+            )
+        await session.commit()
+
+
+async def count(db: DatabaseManager, model) -> int:
+    async with db.session() as session:
+        return await session.scalar(select(func.count()).select_from(model))
+
+
+class Sleeps:
+    def __init__(self, fail_after: int = -1) -> None:
+        self.calls: List[float] = []
+        self.fail_after = fail_after
+
+    async def __call__(self, seconds: float) -> None:
+        if len(self.calls) == self.fail_after:
+            raise ConnectionError("connection lost")
+        self.calls.append(seconds)
+
+
+@pytest.mark.asyncio
+async def test_jobs_delete_expired_rows_in_batches(clone_manager: DatabaseManager) -> None:
+    await seed(clone_manager)
+    sleeps = Sleeps()
+
+    results = await RetentionRunner(clone_manager, batch_size=3, sleep=sleeps).run_all(list(POLICIES.values()))
+
+    assert [(r.name, r.rows_deleted, r.batches, r.outcome) for r in results] == [
+        ("audit_logs", 7, 3, "completed"),
+        ("user_preferences", 7, 3, "completed"),
+    ]
+    assert len(sleeps.calls) == 4 and all(pause >= 0.05 for pause in sleeps.calls)
+    assert await count(clone_manager, AuditLog) == 3
+    assert await count(clone_manager, UserPreference) == 3
+    async with clone_manager.session() as session:
+        job = await session.get(RetentionJob, "audit_logs")
+    assert job.rows_deleted == 7 and job.finished_at is not None
+
+
+@pytest.mark.asyncio
+async def test_interrupted_job_resumes_with_the_same_cutoff(clone_manager: DatabaseManager) -> None:
+    await seed(clone_manager)
+    policy = POLICIES["audit_logs"]
+
+    with pytest.raises(ConnectionError):
+        await RetentionRunner(clone_manager, batch_size=2, sleep=Sleeps(fail_after=1)).run(policy)
+    async with clone_manager.session() as session:
+        job = await session.get(RetentionJob, "audit_logs")
+    assert job.rows_deleted == 4 and job.finished_at is None
+
+    result = await RetentionRunner(clone_manager, batch_size=2, sleep=Sleeps()).run(policy)
+
+    assert result.resumed and result.completed and result.rows_deleted == 3
+    async with clone_manager.session() as session:
+        resumed_job = await session.get(RetentionJob, "audit_logs", populate_existing=True)
+    assert resumed_job.cutoff == job.cutoff and resumed_job.rows_deleted == 7
+    assert await count(clone_manager, AuditLog) == 3
+
+
+@pytest.mark.asyncio
+async def test_time_budget_pauses_the_job(clone_manager: DatabaseManager) -> None:
+    await seed(clone_manager)
+
+    result = await RetentionRunner(clone_manager, batch_size=2, max_duration=0).run(POLICIES["audit_logs"])
+
+    assert result.outcome == "paused" and result.rows_deleted == 0
+    assert await count(clone_manager, AuditLog) == 10
+
+
+@pytest.mark.asyncio
+async def test_job_waits_for_replication_lag(clone_manager: DatabaseManager, monkeypatch) -> None:
+    await seed(clone_manager)
+    monkeypatch.setattr(retention, "REPLICATION_LAG_SQL", text("SELECT 30"))
+    sleeps = Sleeps()
+
+    async def sleep(seconds: float) -> None:
+        await sleeps(seconds)
+        monkeypatch.setattr(retention, "REPLICATION_LAG_SQL", text("SELECT 0"))
+
+    result = await RetentionRunner(clone_manager, batch_size=10, lag_poll_interval=5.0, sleep=sleep).run(
+        POLICIES["audit_logs"]
+    )
+
+    assert sleeps.calls == [5.0]
+    assert result.completed and result.throttled_seconds == 5.0
+
+
+@pytest.mark.asyncio
+async def test_job_skips_when_another_replica_holds_the_lock(clone_manager: DatabaseManager) -> None:
+    await seed(clone_manager)
+
+    async with clone_manager.engine.connect() as other:
+        await other.execute(
+            text("SELECT pg_advisory_lock(:lock_class, hashtext('audit_logs'))"), {"lock_class": ADVISORY_LOCK_CLASS}
+        )
+        result = await RetentionRunner(clone_manager).run(POLICIES["audit_logs"])
+        await other.execute(
+            text("SELECT pg_advisory_unlock(:lock_class, hashtext('audit_logs'))"), {"lock_class": ADVISORY_LOCK_CLASS}
+        )
+
+    assert result.skipped and result.rows_deleted == 0
+    assert await count(clone_manager, AuditLog) == 10
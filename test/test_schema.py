@@ -0,0 +1,69 @@
+"""
+Shape tests for the migrated schema.
+
+Run against the per-worker clone of the template database, so no test
+re-runs migrations; writes happen in rollback mode and never leak.
+"""
+import pytest
+from sqlalchemy import func, select, text
+
+from storage.database import DatabaseManager
+from storage.models import User
+from storage.testing import rollback_database_manager
+
+
+@pytest.mark.asyncio
+async def test_migrations_create_tables(db_manager: DatabaseManager) -> None:
+    async with db_manager.session() as session:
+        result = await session.execute(
+            text("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'")
+        )
+        tables = {row[0] for row in result}
+
+    assert {"users", "coffee_runs", "orders", "user_preferences", "audit_logs", "schema_migrations"} <= tables
+
+
+@pytest.mark.asyncio
+async def test_foreign_key_constraints(db_manager: DatabaseManager) -> None:
+    async with db_manager.session() as session:
+        result = await session.execute(
+            text(
+                """
+                SELECT tc.table_name, kcu.column_name, ccu.table_name
+                FROM information_schema.table_constraints AS tc
+                JOIN information_schema.key_column_usage AS kcu ON tc.constraint_name = kcu.constraint_name
+                JOIN information_schema.constraint_column_usage AS ccu ON ccu.constraint_name = tc.constraint_name
+                WHERE tc.constraint_type = 'FOREIGN KEY'
+                """
+            )
+        )
+        fk_map = {(row[0], row[1]): row[2] for row in result}
+
+    assert fk_map[("coffee_runs", "initiator_user_id")] == "users"
+    assert fk_map[("coffee_runs", "runner_user_id")] == "users"
+    assert fk_map[("orders", "run_id")] == "coffee_runs"
+    assert fk_map[("orders", "user_id")] == "users"
+
+
+@pytest.mark.asyncio
+async def test_indexes_exist(db_manager: DatabaseManager) -> None:
+    async with db_manager.session() as session:
+        result = await session.execute(text("SELECT indexname FROM pg_indexes WHERE schemaname = 'public'"))
+        index_names = {row[0] for row in result}
+
+    for index in ("idx_users_email", "idx_coffee_runs_workspace_id", "idx_orders_run_id", "idx_audit_logs_timestamp"):
+        assert index in index_names
+
+
+@pytest.mark.asyncio
+async def test_rollback_mode_discards_committed_writes(worker_database_url: str) -> None:
+    async with rollback_database_manager(worker_database_url) as db:
+        async with db.session() as session:
+            session.add(User(user_id="UROLLBACK", display_name="Temp", email="temp@example.com"))
+            await session.commit()
+        async with db.session() as session:
+            assert await session.scalar(select(func.count()).where(User.user_id == "UROLLBACK")) == 1
+
+    async with rollback_database_manager(worker_database_url) as db:
+        async with db.session() as session:
+            assert await session.scalar(select(func.count()).where(User.user_id == "UROLLBACK")) == 0
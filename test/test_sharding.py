@@ -0,0 +1,185 @@
+"""
+Tests for the workspace shard router.
+
+The hash ring tests are pure; the router and move tests need DATABASE_URL
+and run against two fresh clones of the template database.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncGenerator, Dict, Generator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select, update
+
+from storage import sharding
+from storage.models import AuditLog, CoffeeRun, Order, User
+from storage.sharding import (
+    HashRing,
+    ShardRouter,
+    WorkspaceMovingError,
+    _set_placement,
+    move_workspace,
+    parse_shard_urls,
+)
+from storage.testing import TemplateDatabase
+
+
+def test_ring_is_deterministic_and_spreads_keys() -> None:
+    ring = HashRing(["s0", "s1", "s2"])
+    keys = [f"T{i:05d}" for i in range(3000)]
+
+    owners = [ring.shard_for(key) for key in keys]
+
+    assert owners == [HashRing(["s2", "s0", "s1"]).shard_for(key) for key in keys]
+    assert all(700 < owners.count(shard) < 1300 for shard in ("s0", "s1", "s2"))
+
+
+def test_adding_a_shard_only_moves_keys_to_it() -> None:
+    before, after = HashRing(["s0", "s1", "s2"]), HashRing(["s0", "s1", "s2", "s3"])
+    keys = [f"T{i:05d}" for i in range(3000)]
+
+    moved = [key for key in keys if before.shard_for(key) != after.shard_for(key)]
+
+    assert all(after.shard_for(key) == "s3" for key in moved)
+    assert len(moved) < 0.35 * len(keys)
+
+
+def test_parse_shard_urls() -> None:
+    assert parse_shard_urls("a=postgresql://h/db0, b=postgresql://h/db1") == {
+        "a": "postgresql://h/db0",
+        "b": "postgresql://h/db1",
+    }
+    with pytest.raises(ValueError):
+        parse_shard_urls("postgresql://h/db0")
+
+
+@pytest.fixture
+def shard_urls(template_database: TemplateDatabase) -> Generator[Dict[str, str], None, None]:
+    urls = {"shard0": template_database.clone_sync(), "shard1": template_database.clone_sync()}
+    yield urls
+    for url in urls.values():
+        template_database.drop_sync(url)
+
+
+@pytest_asyncio.fixture
+async def router(shard_urls: Dict[str, str]) -> AsyncGenerator[ShardRouter, None]:
+    router = ShardRouter(shard_urls, pool_size=2, placement_ttl=0.2, move_wait_timeout=0.5)
+    yield router
+    await router.close()
+
+
+async def seed_workspace(router: ShardRouter, workspace_id: str) -> None:
+    async with router.session(workspace_id) as session:
+        session.add(User(user_id="U1", display_name="One", email="one@example.com"))
+        await session.flush()
+        run = CoffeeRun(workspace_id=workspace_id, channel_id="C1", initiator_user_id="U1", status="active")
+        session.add(run)
+        await session.flush()
+        session.add_all(
+            [Order(run_id=run.run_id, user_id="U1", drink_type="latte", size="large") for _ in range(3)]
+            + [AuditLog(event_type="run_created", user_id="U1", run_id=run.run_id)]
+        )
+        await session.commit()
+
+
+async def count_rows(router: ShardRouter, shard: str, model) -> int:
+    async with router.managers[shard].session() as session:
+        return await session.scalar(select(func.count()).select_from(model))
+
+
+@pytest.mark.asyncio
+async def test_sessions_use_the_owning_shards_pool(router: ShardRouter) -> None:
+    workspace_id = f"T{uuid.uuid4().hex[:8]}"
+    owner = router.ring.shard_for(workspace_id)
+    other = "shard1" if owner == "shard0" else "shard0"
+
+    await seed_workspace(router, workspace_id)
+
+    assert await count_rows(router, owner, Order) == 3
+    assert await count_rows(router, other, Order) == 0
+
+
+@pytest.mark.asyncio
+async def test_move_workspace_relocates_data_and_routing(router: ShardRouter, shard_urls: Dict[str, str]) -> None:
+    workspace_id = f"T{uuid.uuid4().hex[:8]}"
+    source = router.ring.shard_for(workspace_id)
+    target = "shard1" if source == "shard0" else "shard0"
+    await seed_workspace(router, workspace_id)
+
+    copied = await move_workspace(router, workspace_id, target, freeze_grace=0)
+
+    assert copied >= 6
+    assert await router.shard_for(workspace_id) == target
+    assert [await count_rows(router, target, model) for model in (CoffeeRun, Order, AuditLog)] == [1, 3, 1]
+    assert [await count_rows(router, source, model) for model in (CoffeeRun, Order, AuditLog)] == [0, 0, 0]
+
+    # A fresh router (e.g. another worker) picks the placement up from the directory shard
+    other = ShardRouter(shard_urls, pool_size=1)
+    try:
+        assert await other.shard_for(workspace_id) == target
+    finally:
+        await other.close()
+
+
+@pytest.mark.asyncio
+async def test_frozen_workspace_blocks_new_sessions(router: ShardRouter) -> None:
+    workspace_id = f"T{uuid.uuid4().hex[:8]}"
+    await _set_placement(router, workspace_id, "shard0", "moving", "shard1")
+
+    with pytest.raises(WorkspaceMovingError):
+        async with router.session(workspace_id):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_move_keeps_orders_edited_after_the_bulk_copy(
+    router: ShardRouter, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    workspace_id = f"T{uuid.uuid4().hex[:8]}"
+    source = router.ring.shard_for(workspace_id)
+    target = "shard1" if source == "shard0" else "shard0"
+    await seed_workspace(router, workspace_id)
+    async with router.managers[source].session() as session:
+        await session.execute(update(Order).values(created_at=datetime.utcnow() - timedelta(days=1)))
+        await session.commit()
+    set_placement = sharding._set_placement
+
+    async def edit_when_frozen(router, workspace_id, shard, state, target_shard=None):
+        await set_placement(router, workspace_id, shard, state, target_shard)
+        if state == "moving":
+            # A session opened before the freeze commits an edit after the bulk copy
+            async with router.managers[source].session() as session:
+                await session.execute(update(Order).values(size="small"))
+                await session.commit()
+
+    monkeypatch.setattr(sharding, "_set_placement", edit_when_frozen)
+
+    await move_workspace(router, workspace_id, target, freeze_grace=0)
+
+    async with router.managers[target].session() as session:
+        assert (await session.scalars(select(Order.size))).all() == ["small"] * 3
+
+
+@pytest.mark.asyncio
+async def test_sessions_waiting_on_a_move_share_placement_reloads(router: ShardRouter) -> None:
+    workspace_id = f"T{uuid.uuid4().hex[:8]}"
+    await _set_placement(router, workspace_id, "shard0", "moving", "shard1")
+    sessions = router.directory.session
+    reloads = 0
+
+    def counting_session():
+        nonlocal reloads
+        reloads += 1
+        return sessions()
+
+    router.directory.session = counting_session
+
+    results = await asyncio.gather(
+        *(router.shard_for(workspace_id) for _ in range(20)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, WorkspaceMovingError) for result in results)
+    # One reload per 0.2s poll for all 20 waiters, not one per waiter
+    assert reloads <= 5